@@ -0,0 +1,49 @@
+"""Unique (data_type, date) on market_data
+
+Revision ID: 0001_market_data_unique
+Revises: 
+Create Date: 2026-10-19 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001_market_data_unique'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+CONSTRAINT = "uq_market_data_type_date"
+
+
+def _has_constraint(inspector) -> bool:
+    names = {c["name"] for c in inspector.get_unique_constraints("market_data")}
+    names |= {i["name"] for i in inspector.get_indexes("market_data") if i.get("unique")}
+    return CONSTRAINT in names
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    # Tables are created by the app on startup; a fresh database gets the
+    # constraint from the model directly
+    if not inspector.has_table("market_data") or _has_constraint(inspector):
+        return
+
+    # Earlier refreshes could insert the same date twice; keep the newest row
+    op.execute(
+        "DELETE FROM market_data WHERE id NOT IN "
+        "(SELECT MAX(id) FROM market_data GROUP BY data_type, date)"
+    )
+    with op.batch_alter_table("market_data") as batch_op:
+        batch_op.create_unique_constraint(CONSTRAINT, ["data_type", "date"])
+
+
+def downgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table("market_data") or not _has_constraint(inspector):
+        return
+
+    with op.batch_alter_table("market_data") as batch_op:
+        batch_op.drop_constraint(CONSTRAINT, type_="unique")
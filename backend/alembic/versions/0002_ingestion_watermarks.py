@@ -0,0 +1,37 @@
+"""Ingestion watermarks for raw data files
+
+Revision ID: 0002_ingestion_watermarks
+Revises: 0001_market_data_unique
+Create Date: 2026-10-19 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002_ingestion_watermarks'
+down_revision = '0001_market_data_unique'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    if sa.inspect(op.get_bind()).has_table("ingestion_watermarks"):
+        return
+
+    op.create_table(
+        "ingestion_watermarks",
+        sa.Column("source", sa.String(), primary_key=True),
+        sa.Column("data_type", sa.String(), nullable=False),
+        sa.Column("size", sa.BigInteger(), nullable=False),
+        sa.Column("mtime", sa.Float(), nullable=False),
+        sa.Column("content_hash", sa.String(length=64), nullable=False),
+        sa.Column("last_date", sa.DateTime(), nullable=True),
+        sa.Column("row_count", sa.Integer(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("ingestion_watermarks")
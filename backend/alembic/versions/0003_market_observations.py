@@ -0,0 +1,97 @@
+"""Typed market observations, backfilled from market_data JSON
+
+Revision ID: 0003_market_observations
+Revises: 0002_ingestion_watermarks
+Create Date: 2026-10-19 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003_market_observations'
+down_revision = '0002_ingestion_watermarks'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+market_data = sa.table(
+    "market_data",
+    sa.column("id", sa.Integer),
+    sa.column("date", sa.DateTime),
+    sa.column("data_type", sa.String),
+    sa.column("processed_data", sa.JSON),
+)
+
+
+def _observations(row):
+    for column, value in (row.processed_data or {}).items():
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or value != value:
+            continue
+        yield {
+            "series": f"{row.data_type}.{column}",
+            "date": row.date,
+            "value": float(value),
+            "data_type": row.data_type,
+        }
+
+
+def _backfill(bind, observations):
+    """Copy numeric fields out of the JSON rows, in id order"""
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(market_data)
+            .where(market_data.c.id > last_id)
+            .order_by(market_data.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            return
+
+        batch = [obs for row in rows for obs in _observations(row)]
+        if batch:
+            bind.execute(observations.insert(), batch)
+        last_id = rows[-1].id
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if inspector.has_table("market_observations"):
+        # Already created by Base.metadata.create_all at app start; it still
+        # needs the backfill if nothing has been written to it yet
+        observations = sa.table(
+            "market_observations",
+            sa.column("series", sa.String),
+            sa.column("date", sa.DateTime),
+            sa.column("value", sa.Float),
+            sa.column("data_type", sa.String),
+        )
+        empty = bind.execute(sa.select(sa.func.count()).select_from(observations)).scalar() == 0
+        if empty and inspector.has_table("market_data"):
+            _backfill(bind, observations)
+        return
+
+    observations = op.create_table(
+        "market_observations",
+        sa.Column("series", sa.String(), primary_key=True),
+        sa.Column("date", sa.DateTime(), primary_key=True),
+        sa.Column("value", sa.Float(), nullable=False),
+        sa.Column("data_type", sa.String(), nullable=False),
+    )
+    op.create_index("ix_market_observations_data_type", "market_observations", ["data_type"])
+    op.create_index(
+        "ix_market_observations_series_date_value", "market_observations", ["series", "date", "value"]
+    )
+
+    if inspector.has_table("market_data"):
+        _backfill(bind, observations)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_market_observations_series_date_value", table_name="market_observations")
+    op.drop_index("ix_market_observations_data_type", table_name="market_observations")
+    op.drop_table("market_observations")
@@ -0,0 +1,43 @@
+"""Keyset pagination indexes on market_data
+
+Revision ID: 0004_market_data_keyset
+Revises: 0003_market_observations
+Create Date: 2026-10-19 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004_market_data_keyset'
+down_revision = '0003_market_observations'
+branch_labels = None
+depends_on = None
+
+INDEXES = {
+    "ix_market_data_date_id": ["date", "id"],
+    "ix_market_data_type_date_id": ["data_type", "date", "id"],
+}
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table("market_data"):
+        return
+
+    existing = {i["name"] for i in inspector.get_indexes("market_data")}
+    for name, columns in INDEXES.items():
+        if name not in existing:
+            op.create_index(name, "market_data", columns)
+
+
+def downgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table("market_data"):
+        return
+
+    existing = {i["name"] for i in inspector.get_indexes("market_data")}
+    for name in INDEXES:
+        if name in existing:
+            op.drop_index(name, table_name="market_data")
@@ -0,0 +1,97 @@
+"""Per-series market data summary, backfilled from market_data and observations
+
+Revision ID: 0005_market_series_summary
+Revises: 0004_market_data_keyset
+Create Date: 2026-10-19 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005_market_series_summary'
+down_revision = '0004_market_data_keyset'
+branch_labels = None
+depends_on = None
+
+market_data = sa.table(
+    "market_data",
+    sa.column("date", sa.DateTime),
+    sa.column("data_type", sa.String),
+)
+
+observations = sa.table(
+    "market_observations",
+    sa.column("series", sa.String),
+    sa.column("date", sa.DateTime),
+    sa.column("value", sa.Float),
+    sa.column("data_type", sa.String),
+)
+
+COLUMNS = ["series", "data_type", "record_count", "first_date", "last_date", "last_value"]
+
+
+def _backfill(bind, summary, inspector):
+    if inspector.has_table("market_data"):
+        bind.execute(summary.insert().from_select(COLUMNS, sa.select(
+            market_data.c.data_type,
+            market_data.c.data_type,
+            sa.func.count(),
+            sa.func.min(market_data.c.date),
+            sa.func.max(market_data.c.date),
+            sa.null(),
+        ).group_by(market_data.c.data_type)))
+
+    if inspector.has_table("market_observations"):
+        per_series = sa.select(
+            observations.c.series,
+            observations.c.data_type,
+            sa.func.count().label("record_count"),
+            sa.func.min(observations.c.date).label("first_date"),
+            sa.func.max(observations.c.date).label("last_date"),
+        ).group_by(observations.c.series, observations.c.data_type).subquery()
+        latest = observations.alias("latest")
+        bind.execute(summary.insert().from_select(COLUMNS, sa.select(
+            per_series.c.series,
+            per_series.c.data_type,
+            per_series.c.record_count,
+            per_series.c.first_date,
+            per_series.c.last_date,
+            latest.c.value,
+        ).join(latest, sa.and_(
+            latest.c.series == per_series.c.series,
+            latest.c.date == per_series.c.last_date,
+        ))))
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if inspector.has_table("market_series_summary"):
+        # Already created by Base.metadata.create_all at app start; it still
+        # needs the backfill if nothing has been written to it yet
+        summary = sa.table("market_series_summary", *(sa.column(name) for name in COLUMNS))
+        if bind.execute(sa.select(sa.func.count()).select_from(summary)).scalar() == 0:
+            _backfill(bind, summary, inspector)
+        return
+
+    summary = op.create_table(
+        "market_series_summary",
+        sa.Column("series", sa.String(), primary_key=True),
+        sa.Column("data_type", sa.String(), nullable=False),
+        sa.Column("record_count", sa.Integer(), nullable=False),
+        sa.Column("first_date", sa.DateTime(), nullable=False),
+        sa.Column("last_date", sa.DateTime(), nullable=False),
+        sa.Column("last_value", sa.Float(), nullable=True),
+    )
+    op.create_index("ix_market_series_summary_data_type", "market_series_summary", ["data_type"])
+
+    _backfill(bind, summary, inspector)
+
+
+def downgrade() -> None:
+    if not sa.inspect(op.get_bind()).has_table("market_series_summary"):
+        return
+    op.drop_index("ix_market_series_summary_data_type", table_name="market_series_summary")
+    op.drop_table("market_series_summary")
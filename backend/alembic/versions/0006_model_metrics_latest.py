@@ -0,0 +1,142 @@
+"""Latest-value table, its insert trigger and history indexes for model metrics
+
+Revision ID: 0006_model_metrics_latest
+Revises: 0005_market_series_summary
+Create Date: 2026-10-19 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006_model_metrics_latest'
+down_revision = '0005_market_series_summary'
+branch_labels = None
+depends_on = None
+
+INDEXES = {
+    "ix_model_metrics_model_metric_date_id": ["model_name", "model_version", "metric_name", "evaluation_date", "id"],
+    "ix_model_metrics_model_date_id": ["model_name", "model_version", "evaluation_date", "id"],
+}
+
+model_metrics = sa.table(
+    "model_metrics",
+    sa.column("id", sa.Integer),
+    sa.column("model_name", sa.String),
+    sa.column("model_version", sa.String),
+    sa.column("metric_name", sa.String),
+    sa.column("metric_value", sa.Float),
+    sa.column("evaluation_date", sa.DateTime(timezone=True)),
+)
+
+
+LATEST_METRIC_UPSERT = """
+    INSERT INTO model_metrics_latest
+        (model_name, model_version, metric_name, metric_value, evaluation_date, metric_id)
+    VALUES (NEW.model_name, NEW.model_version, NEW.metric_name, NEW.metric_value, NEW.evaluation_date, NEW.id)
+    ON CONFLICT (model_name, model_version, metric_name) DO UPDATE SET
+        metric_value = excluded.metric_value,
+        evaluation_date = excluded.evaluation_date,
+        metric_id = excluded.metric_id
+    WHERE (model_metrics_latest.evaluation_date, model_metrics_latest.metric_id)
+        <= (excluded.evaluation_date, excluded.metric_id);
+"""
+
+TRIGGER_DDL = {
+    "sqlite": [f"""
+CREATE TRIGGER IF NOT EXISTS trg_model_metrics_latest AFTER INSERT ON model_metrics
+BEGIN {LATEST_METRIC_UPSERT} END
+"""],
+    "postgresql": [f"""
+CREATE OR REPLACE FUNCTION model_metrics_latest_upsert() RETURNS trigger AS $$
+BEGIN {LATEST_METRIC_UPSERT} RETURN NULL; END
+$$ LANGUAGE plpgsql
+""", """
+CREATE OR REPLACE TRIGGER trg_model_metrics_latest AFTER INSERT ON model_metrics
+FOR EACH ROW EXECUTE FUNCTION model_metrics_latest_upsert()
+"""],
+}
+
+DROP_TRIGGER_DDL = {
+    "sqlite": ["DROP TRIGGER IF EXISTS trg_model_metrics_latest"],
+    "postgresql": [
+        "DROP TRIGGER IF EXISTS trg_model_metrics_latest ON model_metrics",
+        "DROP FUNCTION IF EXISTS model_metrics_latest_upsert()",
+    ],
+}
+
+
+def _backfill(bind, latest):
+    """Copy the newest row of each metric, by (evaluation_date, id)"""
+    ranked = sa.select(
+        model_metrics,
+        sa.func.row_number().over(
+            partition_by=[model_metrics.c.model_name, model_metrics.c.model_version, model_metrics.c.metric_name],
+            order_by=[model_metrics.c.evaluation_date.desc(), model_metrics.c.id.desc()],
+        ).label("rn"),
+    ).subquery()
+    bind.execute(latest.insert().from_select(
+        ["model_name", "model_version", "metric_name", "metric_value", "evaluation_date", "metric_id"],
+        sa.select(
+            ranked.c.model_name,
+            ranked.c.model_version,
+            ranked.c.metric_name,
+            ranked.c.metric_value,
+            ranked.c.evaluation_date,
+            ranked.c.id,
+        ).where(ranked.c.rn == 1),
+    ))
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if not inspector.has_table("model_metrics"):
+        return
+
+    existing = {index["name"] for index in inspector.get_indexes("model_metrics")}
+    for name, columns in INDEXES.items():
+        if name not in existing:
+            op.create_index(name, "model_metrics", columns)
+
+    if inspector.has_table("model_metrics_latest"):
+        # Already created by Base.metadata.create_all at app start; it still
+        # needs the backfill if nothing has been written to it yet
+        latest = sa.table("model_metrics_latest", *(sa.column(name) for name in (
+            "model_name", "model_version", "metric_name", "metric_value", "evaluation_date", "metric_id"
+        )))
+        if bind.execute(sa.select(sa.func.count()).select_from(latest)).scalar() == 0:
+            _backfill(bind, latest)
+    else:
+        latest = op.create_table(
+            "model_metrics_latest",
+            sa.Column("model_name", sa.String(), primary_key=True),
+            sa.Column("model_version", sa.String(), primary_key=True),
+            sa.Column("metric_name", sa.String(), primary_key=True),
+            sa.Column("metric_value", sa.Float(), nullable=False),
+            sa.Column("evaluation_date", sa.DateTime(timezone=True), nullable=True),
+            sa.Column("metric_id", sa.Integer(), nullable=False),
+        )
+        _backfill(bind, latest)
+
+    # Keep it current for every insert into model_metrics, whoever writes it
+    for statement in TRIGGER_DDL.get(bind.dialect.name, []):
+        op.execute(statement)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if inspector.has_table("model_metrics"):
+        for statement in DROP_TRIGGER_DDL.get(bind.dialect.name, []):
+            op.execute(statement)
+    if inspector.has_table("model_metrics_latest"):
+        op.drop_table("model_metrics_latest")
+    if not inspector.has_table("model_metrics"):
+        return
+
+    existing = {index["name"] for index in inspector.get_indexes("model_metrics")}
+    for name in INDEXES:
+        if name in existing:
+            op.drop_index(name, table_name="model_metrics")
@@ -2,7 +2,7 @@
 API v1 router
 """
 from fastapi import APIRouter
-from app.api.v1.endpoints import predict, auth, health, data, metrics
+from app.api.v1.endpoints import predict, auth, health, data, metrics, analytics
 
 router = APIRouter()
 
@@ -11,4 +11,5 @@ router.include_router(health.router, prefix="/health", tags=["Health"])
 router.include_router(auth.router, prefix="/auth", tags=["Authentication"])
 router.include_router(predict.router, prefix="/predict", tags=["Predictions"])
 router.include_router(data.router, prefix="/data", tags=["Market Data"])
-router.include_router(metrics.router, prefix="/metrics", tags=["Model Metrics"])
\ No newline at end of file
+router.include_router(metrics.router, prefix="/metrics", tags=["Model Metrics"])
+router.include_router(analytics.router, prefix="/analytics", tags=["Analytics"])
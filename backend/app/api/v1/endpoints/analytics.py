@@ -0,0 +1,173 @@
+"""
+Cross-indicator analytics endpoints
+"""
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, List, Literal, Optional, Tuple
+from datetime import date
+from itertools import combinations
+import numpy as np
+from app.db.session import get_async_db
+from app.crud.market_observations import get_observations
+from app.utils.market_cache import market_cache, date_bounds, DATETIME_UNIT
+from app.utils.http_cache import response_cache
+from app.utils.rolling import align, nullable, rolling_correlation, rolling_stats, to_periods
+import logging
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+MAX_SERIES = 10
+
+async def load_series(
+    db: AsyncSession,
+    names: List[str],
+    start_date: Optional[date],
+    end_date: Optional[date]
+) -> Tuple[Dict[str, Tuple[np.ndarray, np.ndarray]], Optional[str], Optional[object]]:
+    """
+    Read date-sorted arrays for some series from the market data cache, or the database
+
+    Returns:
+        ({name: (dates, values)}, dataset version, modified at); the version is
+        None when the data came from the database
+
+    Raises:
+        HTTPException: 404 if a series doesn't exist
+    """
+    snapshot = await market_cache.snapshot()
+    series = {}
+    if snapshot is not None:
+        for name in names:
+            arrays = snapshot.series.get(name)
+            if arrays is None:
+                raise HTTPException(status_code=404, detail=f"Series not found: {name}")
+            lo, hi = date_bounds(arrays.dates, start_date, end_date)
+            series[name] = (arrays.dates[lo:hi], arrays.values[lo:hi])
+        return series, snapshot.etag_version, snapshot.modified_at
+
+    rows = await get_observations(db, names, start_date, end_date, limit=None)
+    grouped: Dict[str, Tuple[list, list]] = {}
+    for row in rows:
+        dates, values = grouped.setdefault(row.series, ([], []))
+        dates.append(row.date)
+        values.append(row.value)
+    for name in names:
+        if name not in grouped:
+            raise HTTPException(status_code=404, detail=f"Series not found: {name}")
+        dates, values = grouped[name]
+        series[name] = (np.array(dates, dtype=DATETIME_UNIT), np.array(values, dtype=np.float64))
+    return series, None, None
+
+async def respond(request: Request, key: str, version: Optional[str], modified_at, build):
+    """Go through the conditional response cache when the data has a version"""
+    if version is None:
+        return build()
+    return await response_cache.respond(request, key, version, modified_at, build)
+
+@router.get("/rolling")
+async def get_rolling_statistics(
+    request: Request,
+    series: str = Query(..., description="Series name, e.g. exchange_rates.USD_KES"),
+    window: int = Query(..., ge=2, le=1000, description="Window length in points (after resampling)"),
+    freq: Optional[Literal["W", "M", "Q"]] = Query(None, description="Average into periods first"),
+    start_date: Optional[date] = Query(None, description="Start date for data"),
+    end_date: Optional[date] = Query(None, description="End date for data"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Get rolling mean, standard deviation and z-score of one series
+
+    Computed in O(n) from cumulative sums; points start at the first full
+    window. Cached per parameters and dataset version, with an ETag.
+    """
+    try:
+        data, version, modified_at = await load_series(db, [series], start_date, end_date)
+
+        def build() -> dict:
+            dates, values = to_periods(*data[series], freq)
+            points = []
+            if len(values) >= window:
+                stats = rolling_stats(values, window)
+                points = [
+                    {"date": d, "value": v, "mean": m, "std": s, "zscore": z}
+                    for d, v, m, s, z in zip(
+                        dates[window - 1:].astype(object).tolist(),
+                        values[window - 1:].tolist(),
+                        stats["mean"].tolist(),
+                        stats["std"].tolist(),
+                        nullable(stats["zscore"])
+                    )
+                ]
+            return {"series": series, "window": window, "freq": freq, "points": points}
+
+        return await respond(
+            request, f"rolling:{series}:{window}:{freq}:{start_date}:{end_date}", version, modified_at, build
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error computing rolling statistics: {e}")
+        raise HTTPException(status_code=500, detail="Error computing rolling statistics")
+
+@router.get("/correlation")
+async def get_correlation(
+    request: Request,
+    series: List[str] = Query(..., description="Two or more series names"),
+    freq: Optional[Literal["W", "M", "Q"]] = Query("M", description="Common frequency the series are averaged to before aligning"),
+    window: Optional[int] = Query(None, ge=3, le=1000, description="Rolling window; omit for one correlation matrix"),
+    start_date: Optional[date] = Query(None, description="Start date for data"),
+    end_date: Optional[date] = Query(None, description="End date for data"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Get the correlation matrix of several series, or their rolling pairwise correlations
+
+    Series are averaged to `freq` and joined on the periods they all
+    cover, so daily and quarterly indicators can be compared. Without
+    `window` the result is the full-sample Pearson matrix; with it, one
+    O(n) rolling correlation per pair. Cached per parameters and dataset
+    version, with an ETag.
+    """
+    names = list(dict.fromkeys(series))
+    if not 2 <= len(names) <= MAX_SERIES:
+        raise HTTPException(status_code=400, detail=f"Pass between 2 and {MAX_SERIES} distinct series")
+
+    try:
+        data, version, modified_at = await load_series(db, names, start_date, end_date)
+
+        def build() -> dict:
+            dates, matrix = align({name: to_periods(*data[name], freq) for name in names})
+            result = {"series": names, "freq": freq, "observations": len(dates)}
+
+            if window is None:
+                corr = np.full((len(names), len(names)), np.nan)
+                if len(dates) >= 2:
+                    with np.errstate(divide="ignore", invalid="ignore"):
+                        corr = np.corrcoef(matrix, rowvar=False)
+                result["matrix"] = [nullable(row) for row in corr]
+                return result
+
+            pairs = []
+            for i, j in combinations(range(len(names)), 2):
+                points = []
+                if len(dates) >= window:
+                    values = rolling_correlation(matrix[:, i], matrix[:, j], window)
+                    points = [
+                        {"date": d, "value": v}
+                        for d, v in zip(dates[window - 1:].astype(object).tolist(), nullable(values))
+                    ]
+                pairs.append({"x": names[i], "y": names[j], "points": points})
+            result["window"] = window
+            result["pairs"] = pairs
+            return result
+
+        key = f"correlation:{','.join(names)}:{freq}:{window}:{start_date}:{end_date}"
+        return await respond(request, key, version, modified_at, build)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error computing correlations: {e}")
+        raise HTTPException(status_code=500, detail="Error computing correlations")
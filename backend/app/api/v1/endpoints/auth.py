@@ -4,12 +4,12 @@ Authentication endpoints
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel, EmailStr
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timedelta
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from app.core.config import settings
-from app.db.session import get_db
+from app.db.session import get_async_db
 from app.db.models import User
 from app.crud.users import get_user_by_email, create_user, verify_password
 import logging
@@ -81,12 +81,12 @@ def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
             detail="Invalid authentication credentials"
         )
 
-def get_current_user(
+async def get_current_user(
     email: str = Depends(verify_token),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get current authenticated user"""
-    user = get_user_by_email(db, email)
+    user = await get_user_by_email(db, email)
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -95,10 +95,10 @@ def get_current_user(
     return user
 
 @router.post("/register", response_model=UserResponse)
-async def register(request: RegisterRequest, db: Session = Depends(get_db)):
+async def register(request: RegisterRequest, db: AsyncSession = Depends(get_async_db)):
     """Register a new user"""
     # Check if user already exists
-    existing_user = get_user_by_email(db, request.email)
+    existing_user = await get_user_by_email(db, request.email)
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -107,7 +107,7 @@ async def register(request: RegisterRequest, db: Session = Depends(get_db)):
     
     try:
         # Create new user
-        user = create_user(
+        user = await create_user(
             db=db,
             email=request.email,
             username=request.username,
@@ -126,9 +126,9 @@ async def register(request: RegisterRequest, db: Session = Depends(get_db)):
         )
 
 @router.post("/login", response_model=Token)
-async def login(request: LoginRequest, db: Session = Depends(get_db)):
+async def login(request: LoginRequest, db: AsyncSession = Depends(get_async_db)):
     """Authenticate user and return access token"""
-    user = get_user_by_email(db, request.email)
+    user = await get_user_by_email(db, request.email)
     
     if not user or not verify_password(request.password, user.hashed_password):
         raise HTTPException(
@@ -151,7 +151,7 @@ async def login(request: LoginRequest, db: Session = Depends(get_db)):
     
     # Update last login
     user.last_login = datetime.utcnow()
-    db.commit()
+    await db.commit()
     
     logger.info(f"User logged in: {user.email}")
     
@@ -1,14 +1,24 @@
 """
 Market data endpoints
 """
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any, AsyncIterator, Awaitable, Callable, List, Literal, Optional, Tuple
 from datetime import datetime, date
+import numpy as np
 from pydantic import BaseModel
-from app.db.session import get_db
-from app.crud.market_data import get_market_data, get_market_data_by_type
+from app.core.config import settings
+from app.db.session import get_async_db, SessionLocal, AsyncSessionLocal
+from app.crud.market_data import get_market_data_page, get_latest_market_data, get_dataset_version
+from app.crud.market_observations import get_observations, get_series_names, get_data_type_summaries
 from app.utils.data_processor import load_and_process_data
+from app.utils.pagination import NEXT_CURSOR_HEADER, encode_cursor, decode_cursor
+from app.utils.market_cache import market_cache, date_bounds, DATETIME_UNIT
+from app.utils.resampling import resample_series, period_ends
+from app.utils.feature_store import feature_store
+from app.utils.http_cache import response_cache
 import logging
 
 logger = logging.getLogger(__name__)
@@ -23,33 +33,129 @@ class MarketDataResponse(BaseModel):
     processed_data: dict
     created_at: datetime
 
+class ObservationResponse(BaseModel):
+    """Typed observation response model"""
+    series: str
+    date: datetime
+    value: float
+
+STREAM_MEDIA_TYPES = {
+    "json": "application/json",
+    "ndjson": "application/x-ndjson"
+}
+
+async def respond_from_db(request: Request, db: AsyncSession, key: str, build: Callable[[], Awaitable[Any]]):
+    """
+    Answer from the database when the market cache has no snapshot
+    
+    Conditional requests are still honoured, against a version derived
+    from the ingestion watermarks; before any ingestion there is nothing
+    to version and the payload is returned as is.
+    """
+    version, modified_at = await get_dataset_version(db)
+    if version is None:
+        return await build()
+    return await response_cache.respond(request, key, version, modified_at, build)
+
+async def stream_market_data(
+    format: str,
+    data_type: Optional[str],
+    start_date: Optional[date],
+    end_date: Optional[date],
+    after: Optional[Tuple[datetime, int]]
+) -> AsyncIterator[str]:
+    """
+    Serialize every matching row, one keyset page at a time
+    
+    Uses its own session, since the response body outlives the request
+    handler, and drops each page from the session once written so memory
+    stays flat however long the history is.
+    """
+    batch_size = settings.DATA_STREAM_BATCH_SIZE
+    separator = "\n" if format == "ndjson" else ","
+    
+    async with AsyncSessionLocal() as db:
+        if format == "json":
+            yield "["
+        first = True
+        while True:
+            rows = await get_market_data_page(
+                db=db,
+                data_type=data_type,
+                start_date=start_date,
+                end_date=end_date,
+                after=after,
+                limit=batch_size
+            )
+            if rows:
+                items = [MarketDataResponse.model_validate(row, from_attributes=True).model_dump_json() for row in rows]
+                chunk = separator.join(items)
+                if format == "ndjson":
+                    yield chunk + "\n"
+                else:
+                    yield chunk if first else "," + chunk
+                first = False
+                after = (rows[-1].date, rows[-1].id)
+                db.expunge_all()
+            if len(rows) < batch_size:
+                break
+        if format == "json":
+            yield "]"
+
 @router.get("/", response_model=List[MarketDataResponse])
 async def get_data(
+    response: Response,
     data_type: Optional[str] = Query(None, description="Filter by data type (gdp, inflation, etc.)"),
     start_date: Optional[date] = Query(None, description="Start date filter"),
     end_date: Optional[date] = Query(None, description="End date filter"),
     limit: int = Query(100, le=1000, description="Maximum number of records"),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="Resume after this cursor (from X-Next-Cursor)"),
+    stream: bool = Query(False, description="Stream every matching record instead of one page"),
+    format: Literal["json", "ndjson"] = Query("json", description="Body format; ndjson always streams"),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
-    Get market data with optional filters
+    Get market data with optional filters, newest first
+    
+    Results are paged on (date, id): when a page is full, the
+    X-Next-Cursor header carries the cursor for the next one. With
+    `stream` (or `format=ndjson`) every matching record from the cursor
+    on is streamed instead, ignoring `limit`.
+    
+    Records are the ingested rows of the market_data table, whose
+    processed_data keeps text columns (Quarter, Month, ...) that the typed
+    market_observations table does not store. Typed series reads go
+    through /observations and /series/{name}, which use that table.
     """
     try:
-        if data_type:
-            data = get_market_data_by_type(
-                db=db,
-                data_type=data_type,
-                start_date=start_date,
-                end_date=end_date,
-                limit=limit
-            )
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if stream or format == "ndjson":
+        return StreamingResponse(
+            stream_market_data(format, data_type, start_date, end_date, after),
+            media_type=STREAM_MEDIA_TYPES[format]
+        )
+    
+    try:
+        snapshot = await market_cache.snapshot()
+        if snapshot is not None:
+            data = snapshot.page(data_type, start_date, end_date, after, limit)
+            last = (data[-1]["date"], data[-1]["id"]) if data else None
         else:
-            data = get_market_data(
+            data = await get_market_data_page(
                 db=db,
+                data_type=data_type,
                 start_date=start_date,
                 end_date=end_date,
+                after=after,
                 limit=limit
             )
+            last = (data[-1].date, data[-1].id) if data else None
+        
+        if len(data) == limit:
+            response.headers[NEXT_CURSOR_HEADER] = encode_cursor(*last)
         
         return data
         
@@ -57,18 +163,176 @@ async def get_data(
         logger.error(f"Error fetching market data: {e}")
         raise HTTPException(status_code=500, detail="Error fetching market data")
 
+@router.get("/observations", response_model=List[ObservationResponse])
+async def get_series_observations(
+    series: List[str] = Query(..., description="Series names, e.g. exchange_rates.USD_KES"),
+    start_date: Optional[date] = Query(None, description="Start date filter"),
+    end_date: Optional[date] = Query(None, description="End date filter"),
+    limit: int = Query(1000, le=10000, description="Maximum number of observations"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Get typed observations for one or more series, oldest first
+    """
+    try:
+        snapshot = await market_cache.snapshot()
+        if snapshot is not None:
+            return snapshot.observations(series, start_date, end_date, limit)
+        
+        rows = await get_observations(
+            db=db,
+            series=series,
+            start_date=start_date,
+            end_date=end_date,
+            limit=limit
+        )
+        return [ObservationResponse(series=r.series, date=r.date, value=r.value) for r in rows]
+        
+    except Exception as e:
+        logger.error(f"Error fetching observations: {e}")
+        raise HTTPException(status_code=500, detail="Error fetching observations")
+
+@router.get("/series")
+async def list_series(
+    data_type: Optional[str] = Query(None, description="Only series of this data type"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Get the names of stored series
+    """
+    try:
+        snapshot = await market_cache.snapshot()
+        if snapshot is not None:
+            names = sorted(snapshot.series)
+            if data_type:
+                names = [n for n in names if n.split(".", 1)[0] == data_type]
+            return {"series": names}
+        
+        return {"series": await get_series_names(db, data_type)}
+        
+    except Exception as e:
+        logger.error(f"Error listing series: {e}")
+        return {"series": []}
+
+@router.get("/series/{name}")
+async def get_series(
+    request: Request,
+    name: str,
+    freq: Optional[Literal["W", "M", "Q"]] = Query(None, description="Aggregate into weeks, months or quarters"),
+    agg: Literal["mean", "last", "ohlc"] = Query("mean", description="How to aggregate each period"),
+    start_date: Optional[date] = Query(None, description="Start date for data"),
+    end_date: Optional[date] = Query(None, description="End date for data"),
+    max_points: Optional[int] = Query(None, ge=3, le=10000, description="Downsample to at most this many points"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Get one series resampled on the server, ready to chart
+    
+    Periods are labelled with their last day. With `max_points`, lines are
+    reduced with LTTB, which keeps their visual shape, and OHLC bars by
+    merging neighbours. Results are cached per parameters and dataset
+    version, with an ETag like /summary.
+    """
+    try:
+        def build(dates: np.ndarray, values: np.ndarray) -> dict:
+            return {
+                "series": name,
+                "freq": freq,
+                "agg": agg,
+                "points": resample_series(dates, values, freq, agg, max_points)
+            }
+        
+        snapshot = await market_cache.snapshot()
+        if snapshot is not None:
+            arrays = snapshot.series.get(name)
+            if arrays is None:
+                raise HTTPException(status_code=404, detail=f"Series not found: {name}")
+            lo, hi = date_bounds(arrays.dates, start_date, end_date)
+            return await response_cache.respond(
+                request,
+                f"series:{name}:{freq}:{agg}:{start_date}:{end_date}:{max_points}",
+                snapshot.etag_version,
+                snapshot.modified_at,
+                lambda: build(arrays.dates[lo:hi], arrays.values[lo:hi])
+            )
+        
+        async def build_from_db() -> dict:
+            rows = await get_observations(db, [name], start_date, end_date, limit=None)
+            if not rows and name not in await get_series_names(db, name.split(".", 1)[0]):
+                raise HTTPException(status_code=404, detail=f"Series not found: {name}")
+            return build(
+                np.array([r.date for r in rows], dtype=DATETIME_UNIT),
+                np.array([r.value for r in rows], dtype=np.float64)
+            )
+        
+        return await respond_from_db(
+            request, db, f"series:{name}:{freq}:{agg}:{start_date}:{end_date}:{max_points}", build_from_db
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error resampling series {name}: {e}")
+        raise HTTPException(status_code=500, detail="Error resampling series")
+
+@router.get("/features")
+async def get_feature_vectors(
+    as_of: Optional[List[date]] = Query(None, description="Dates to build feature vectors for"),
+    start_date: Optional[date] = Query(None, description="First date of a generated range"),
+    end_date: Optional[date] = Query(None, description="Last date of a generated range"),
+    freq: Literal["D", "W", "M", "Q"] = Query("M", description="Spacing of dates in a generated range"),
+):
+    """
+    Get prediction feature vectors as of one or many dates
+    
+    Each feature is the latest observation of its series released on or
+    before the date (see FEATURE_RELEASE_LAG_DAYS), with the date it was
+    observed. Pass explicit `as_of` dates, or
+    `start_date`/`end_date` for every day, week end, month end or quarter
+    end in between (for backtests). With neither, returns the latest
+    vector.
+    """
+    max_dates = settings.FEATURE_VECTORS_MAX_DATES
+    if as_of:
+        dates = as_of
+    elif start_date and end_date:
+        if end_date < start_date:
+            raise HTTPException(status_code=400, detail="end_date is before start_date")
+        if freq == "D" and (end_date - start_date).days >= max_dates:
+            raise HTTPException(status_code=400, detail=f"At most {max_dates} dates per request")
+        days = np.arange(np.datetime64(start_date, "D"), np.datetime64(end_date, "D") + 1)
+        if freq != "D":
+            days = np.unique(period_ends(days, freq))
+            days = days[days <= np.datetime64(end_date, "D")]
+        dates = days.astype(object).tolist()
+    elif start_date or end_date:
+        raise HTTPException(status_code=400, detail="Pass both start_date and end_date")
+    else:
+        dates = None
+    
+    if dates is not None and len(dates) > max_dates:
+        raise HTTPException(status_code=400, detail=f"At most {max_dates} dates per request")
+    
+    try:
+        if dates is None:
+            return {"vectors": [await feature_store.latest()]}
+        return {"vectors": await feature_store.vectors(dates)}
+        
+    except Exception as e:
+        logger.error(f"Error building feature vectors: {e}")
+        raise HTTPException(status_code=500, detail="Error building feature vectors")
+
 @router.get("/types")
-async def get_data_types(db: Session = Depends(get_db)):
+async def get_data_types(db: AsyncSession = Depends(get_async_db)):
     """
     Get available data types
     """
     try:
-        # Query distinct data types from database
-        result = db.execute(
-            "SELECT DISTINCT data_type FROM market_data ORDER BY data_type"
-        ).fetchall()
-        
-        data_types = [row[0] for row in result]
+        snapshot = await market_cache.snapshot()
+        if snapshot is not None:
+            data_types = sorted(snapshot.by_type)
+        else:
+            data_types = [s.data_type for s in await get_data_type_summaries(db)]
         
         # If no data in DB, return available types from data files
         if not data_types:
@@ -84,52 +348,80 @@ async def get_data_types(db: Session = Depends(get_db)):
         return {"data_types": []}
 
 @router.get("/summary")
-async def get_data_summary(db: Session = Depends(get_db)):
+async def get_data_summary(request: Request, db: AsyncSession = Depends(get_async_db)):
     """
     Get summary statistics of available data
+    
+    Carries an ETag for the dataset version; polling clients that send it
+    back in If-None-Match get a 304.
     """
     try:
-        # Get data summary from database
-        result = db.execute("""
-            SELECT 
-                data_type,
-                COUNT(*) as count,
-                MIN(date) as earliest_date,
-                MAX(date) as latest_date
-            FROM market_data 
-            GROUP BY data_type
-            ORDER BY data_type
-        """).fetchall()
-        
-        summary = []
-        for row in result:
-            summary.append({
-                "data_type": row[0],
-                "record_count": row[1],
-                "earliest_date": row[2],
-                "latest_date": row[3]
-            })
-        
-        return {"summary": summary}
+        snapshot = await market_cache.snapshot()
+        if snapshot is not None:
+            return await response_cache.respond(
+                request,
+                "data-summary",
+                snapshot.etag_version,
+                snapshot.modified_at,
+                lambda: {"summary": snapshot.summary()}
+            )
+        
+        async def build_from_db() -> dict:
+            # Per-type counts and date ranges are maintained by ingestion
+            summary = []
+            for row in await get_data_type_summaries(db):
+                summary.append({
+                    "data_type": row.data_type,
+                    "record_count": row.record_count,
+                    "earliest_date": row.first_date,
+                    "latest_date": row.last_date
+                })
+            return {"summary": summary}
+        
+        return await respond_from_db(request, db, "data-summary", build_from_db)
         
     except Exception as e:
         logger.error(f"Error getting data summary: {e}")
         return {"summary": []}
 
+def _refresh_data_sync(data_type: Optional[str], full: bool) -> dict:
+    """Run ingestion on its own sync session"""
+    db = SessionLocal()
+    try:
+        return load_and_process_data(db, data_type, full=full)
+    finally:
+        db.close()
+
 @router.post("/refresh")
 async def refresh_data(
     data_type: Optional[str] = Query(None, description="Specific data type to refresh"),
-    db: Session = Depends(get_db)
+    full: bool = Query(False, description="Reload every file, ignoring ingestion watermarks")
 ):
     """
     Refresh market data from source files
+    
+    Unchanged files are skipped and only rows appended since the last
+    refresh are ingested, unless `full` is set.
+    
+    Ingestion is CSV parsing plus bulk writes, so it runs in a worker
+    thread with a sync session rather than on the event loop.
     """
     try:
-        result = load_and_process_data(db, data_type)
+        result = await run_in_threadpool(_refresh_data_sync, data_type, full)
+        if result.get("processed_types"):
+            await market_cache.publish_refresh(result["processed_types"])
+            await feature_store.refresh()
+        
         return {
             "message": "Data refresh completed",
             "processed_types": result.get("processed_types", []),
-            "total_records": result.get("total_records", 0)
+            "total_records": result.get("total_records", 0),
+            "removed_records": result.get("removed_records", 0),
+            "skipped_files": result.get("skipped_files", 0),
+            "appended_files": result.get("appended_files", 0),
+            "rewritten_files": result.get("rewritten_files", 0),
+            "elapsed_seconds": result.get("elapsed_seconds", 0.0),
+            "rows_per_second": result.get("rows_per_second", 0.0)
         }
         
     except Exception as e:
@@ -138,32 +430,49 @@ async def refresh_data(
 
 @router.get("/latest")
 async def get_latest_data(
+    request: Request,
     data_type: str = Query(..., description="Data type to get latest data for"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get the latest data point for a specific data type
+    
+    Carries an ETag for the dataset version, like /summary.
     """
     try:
-        latest_data = db.execute("""
-            SELECT * FROM market_data 
-            WHERE data_type = :data_type 
-            ORDER BY date DESC 
-            LIMIT 1
-        """, {"data_type": data_type}).fetchone()
-        
-        if not latest_data:
-            raise HTTPException(
-                status_code=404, 
-                detail=f"No data found for type: {data_type}"
+        snapshot = await market_cache.snapshot()
+        if snapshot is not None:
+            latest = snapshot.latest.get(data_type)
+            if latest is None:
+                raise HTTPException(
+                    status_code=404,
+                    detail=f"No data found for type: {data_type}"
+                )
+            return await response_cache.respond(
+                request,
+                f"data-latest:{data_type}",
+                snapshot.etag_version,
+                snapshot.modified_at,
+                lambda: latest
             )
         
-        return {
-            "data_type": latest_data.data_type,
-            "date": latest_data.date,
-            "data": latest_data.processed_data or latest_data.raw_data,
-            "source": latest_data.data_source
-        }
+        async def build_from_db() -> dict:
+            latest_data = await get_latest_market_data(db, data_type)
+            
+            if not latest_data:
+                raise HTTPException(
+                    status_code=404, 
+                    detail=f"No data found for type: {data_type}"
+                )
+            
+            return {
+                "data_type": latest_data.data_type,
+                "date": latest_data.date,
+                "data": latest_data.processed_data or latest_data.raw_data,
+                "source": latest_data.data_source
+            }
+        
+        return await respond_from_db(request, db, f"data-latest:{data_type}", build_from_db)
         
     except HTTPException:
         raise
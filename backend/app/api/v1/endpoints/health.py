@@ -3,9 +3,9 @@ Health check endpoints
 """
 from fastapi import APIRouter, Depends
 from sqlalchemy import text
-from app.db.session import get_db
+from app.db.session import get_async_db
 from app.core.config import settings
-import httpx
+from app.utils.ml_client import ml_client
 import redis
 import time
 
@@ -21,7 +21,7 @@ async def health_check():
     }
 
 @router.get("/detailed")
-async def detailed_health_check(db=Depends(get_db)):
+async def detailed_health_check(db=Depends(get_async_db)):
     """Detailed health check including dependencies"""
     health_status = {
         "status": "healthy",
@@ -31,7 +31,7 @@ async def detailed_health_check(db=Depends(get_db)):
     
     # Check database
     try:
-        db.execute(text("SELECT 1"))
+        await db.execute(text("SELECT 1"))
         health_status["dependencies"]["database"] = "healthy"
     except Exception as e:
         health_status["dependencies"]["database"] = f"unhealthy: {str(e)}"
@@ -48,13 +48,14 @@ async def detailed_health_check(db=Depends(get_db)):
     
     # Check ML Service
     try:
-        async with httpx.AsyncClient(timeout=5.0) as client:
-            response = await client.get(f"{settings.ML_SERVICE_URL}/healthz")
-            if response.status_code == 200:
-                health_status["dependencies"]["ml_service"] = "healthy"
-            else:
-                health_status["dependencies"]["ml_service"] = f"unhealthy: HTTP {response.status_code}"
-                health_status["status"] = "degraded"
+        response = await ml_client.get("/healthz", timeout=5.0)
+        if response.status_code == 200:
+            health_status["dependencies"]["ml_service"] = "healthy"
+        else:
+            health_status["dependencies"]["ml_service"] = f"unhealthy: HTTP {response.status_code}"
+            health_status["status"] = "degraded"
+        health_status["ml_client_pool"] = ml_client.pool_stats()
+        health_status["ml_replicas"] = ml_client.upstream_stats()
     except Exception as e:
         health_status["dependencies"]["ml_service"] = f"unhealthy: {str(e)}"
         health_status["status"] = "degraded"
@@ -62,10 +63,10 @@ async def detailed_health_check(db=Depends(get_db)):
     return health_status
 
 @router.get("/ready")
-async def readiness_check(db=Depends(get_db)):
+async def readiness_check(db=Depends(get_async_db)):
     """Kubernetes readiness probe"""
     try:
-        db.execute(text("SELECT 1"))
+        await db.execute(text("SELECT 1"))
         return {"status": "ready"}
     except Exception:
         return {"status": "not ready"}, 503
@@ -1,13 +1,20 @@
 """
 Model metrics endpoints
 """
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from pydantic import BaseModel
-from datetime import datetime
-from app.db.session import get_db
-from app.crud.model_metrics import get_model_metrics, create_model_metric
+from datetime import datetime, date
+import numpy as np
+from app.db.session import get_async_db
+from app.crud.model_metrics import (
+    get_model_metrics, create_model_metric, get_metrics_version, get_latest_metric_values,
+    get_model_metrics_page, get_metric_values
+)
+from app.utils.http_cache import response_cache
+from app.utils.pagination import NEXT_CURSOR_HEADER, encode_cursor, decode_cursor
+from app.utils.resampling import lttb
 import logging
 
 logger = logging.getLogger(__name__)
@@ -29,13 +36,13 @@ async def get_metrics(
     model_version: Optional[str] = None,
     metric_name: Optional[str] = None,
     limit: int = 100,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get model performance metrics
     """
     try:
-        metrics = get_model_metrics(
+        metrics = await get_model_metrics(
             db=db,
             model_name=model_name,
             model_version=model_version,
@@ -49,74 +56,80 @@ async def get_metrics(
         raise HTTPException(status_code=500, detail="Error fetching model metrics")
 
 @router.get("/summary")
-async def get_metrics_summary(db: Session = Depends(get_db)):
+async def get_metrics_summary(request: Request, db: AsyncSession = Depends(get_async_db)):
     """
     Get summary of model performance
+    
+    Reads model_metrics_latest, which holds one row per metric. Its ETag
+    comes from an aggregate over the same rows, so unchanged polls get a
+    304 without any serialization.
     """
     try:
-        # Get latest metrics for each model
-        result = db.execute("""
-            WITH latest_metrics AS (
-                SELECT 
-                    model_name,
-                    model_version,
-                    metric_name,
-                    metric_value,
-                    evaluation_date,
-                    ROW_NUMBER() OVER (
-                        PARTITION BY model_name, model_version, metric_name 
-                        ORDER BY evaluation_date DESC
-                    ) as rn
-                FROM model_metrics
-            )
-            SELECT 
-                model_name,
-                model_version,
-                metric_name,
-                metric_value,
-                evaluation_date
-            FROM latest_metrics 
-            WHERE rn = 1
-            ORDER BY model_name, model_version, metric_name
-        """).fetchall()
-        
-        summary = {}
-        for row in result:
-            model_key = f"{row[0]}:{row[1]}"
-            if model_key not in summary:
-                summary[model_key] = {
-                    "model_name": row[0],
-                    "model_version": row[1],
-                    "metrics": {},
-                    "last_evaluation": row[4]
-                }
-            
-            summary[model_key]["metrics"][row[2]] = row[3]
-        
-        return {"models": list(summary.values())}
+        version, last_evaluation = await get_metrics_version(db)
+        return await response_cache.respond(
+            request,
+            "metrics-summary",
+            version,
+            last_evaluation,
+            lambda: _load_metrics_summary(db)
+        )
         
     except Exception as e:
         logger.error(f"Error getting metrics summary: {e}")
         return {"models": []}
 
+async def _load_metrics_summary(db: AsyncSession) -> dict:
+    """Latest value of every metric, grouped by model"""
+    summary = {}
+    for row in await get_latest_metric_values(db):
+        model_key = f"{row.model_name}:{row.model_version}"
+        if model_key not in summary:
+            summary[model_key] = {
+                "model_name": row.model_name,
+                "model_version": row.model_version,
+                "metrics": {},
+                "last_evaluation": row.evaluation_date
+            }
+        
+        model = summary[model_key]
+        model["metrics"][row.metric_name] = row.metric_value
+        if row.evaluation_date and (model["last_evaluation"] is None or row.evaluation_date > model["last_evaluation"]):
+            model["last_evaluation"] = row.evaluation_date
+    
+    return {"models": list(summary.values())}
+
 @router.get("/performance")
 async def get_model_performance(
+    response: Response,
     model_name: str,
     model_version: str = "latest",
-    db: Session = Depends(get_db)
+    metric_name: Optional[str] = Query(None, description="Only this metric"),
+    start_date: Optional[date] = Query(None, description="Earliest evaluation date"),
+    end_date: Optional[date] = Query(None, description="Latest evaluation date"),
+    limit: int = Query(100, ge=1, le=1000, description="History rows per page"),
+    cursor: Optional[str] = Query(None, description=f"Resume after the page that returned this {NEXT_CURSOR_HEADER}"),
+    max_points: Optional[int] = Query(None, ge=3, le=5000, description="Downsample each metric's history to this many points instead of paging"),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get detailed performance metrics for a specific model
+    
+    `latest` holds the current value of each metric. History is paged
+    newest first on (evaluation_date, id), with X-Next-Cursor set while
+    more rows remain. With `max_points`, each metric's whole history in
+    the date range is instead reduced with LTTB, which keeps its shape.
     """
     try:
-        metrics = get_model_metrics(
-            db=db,
-            model_name=model_name,
-            model_version=model_version,
-            limit=None
-        )
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
+        latest = await get_latest_metric_values(db, model_name, model_version)
+        if metric_name:
+            latest = [m for m in latest if m.metric_name == metric_name]
         
-        if not metrics:
+        if not latest:
             raise HTTPException(
                 status_code=404,
                 detail=f"No metrics found for model {model_name}:{model_version}"
@@ -126,36 +139,56 @@ async def get_model_performance(
         performance = {
             "model_name": model_name,
             "model_version": model_version,
+            "latest": {
+                m.metric_name: {"value": m.metric_value, "date": m.evaluation_date}
+                for m in latest
+            },
             "metrics": {},
             "evaluation_history": []
         }
         
-        for metric in metrics:
-            if metric.metric_name not in performance["metrics"]:
-                performance["metrics"][metric.metric_name] = []
-            
-            performance["metrics"][metric.metric_name].append({
-                "value": metric.metric_value,
-                "date": metric.evaluation_date,
-                "dataset_info": metric.dataset_info
+        if max_points:
+            rows = await get_metric_values(db, model_name, model_version, metric_name, start_date, end_date)
+            history = []
+            # Rows come grouped by metric, oldest first
+            for start, end in _runs([r.metric_name for r in rows]):
+                x = np.array([r.evaluation_date.timestamp() for r in rows[start:end]])
+                y = np.array([r.metric_value for r in rows[start:end]])
+                history.extend(rows[start + i] for i in lttb(x, y, max_points))
+            history.sort(key=lambda r: r.evaluation_date, reverse=True)
+            points = [(r.metric_name, r.metric_value, r.evaluation_date, None) for r in history]
+        else:
+            page = await get_model_metrics_page(
+                db, model_name, model_version, metric_name, start_date, end_date, after, limit
+            )
+            if len(page) == limit:
+                response.headers[NEXT_CURSOR_HEADER] = encode_cursor(page[-1].evaluation_date, page[-1].id)
+            points = [(m.metric_name, m.metric_value, m.evaluation_date, m.dataset_info) for m in page]
+        
+        for name, value, evaluated, dataset_info in points:
+            performance["metrics"].setdefault(name, []).append({
+                "value": value,
+                "date": evaluated,
+                "dataset_info": dataset_info
             })
-            
             performance["evaluation_history"].append({
-                "metric_name": metric.metric_name,
-                "metric_value": metric.metric_value,
-                "evaluation_date": metric.evaluation_date
+                "metric_name": name,
+                "metric_value": value,
+                "evaluation_date": evaluated
             })
         
-        # Sort evaluation history by date
-        performance["evaluation_history"].sort(
-            key=lambda x: x["evaluation_date"], 
-            reverse=True
-        )
-        
         return performance
         
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Error getting model performance: {e}")
-        raise HTTPException(status_code=500, detail="Error getting model performance")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="Error getting model performance")
+
+def _runs(keys: list):
+    """(start, end) of each run of equal consecutive keys"""
+    start = 0
+    for i in range(1, len(keys) + 1):
+        if i == len(keys) or keys[i] != keys[start]:
+            yield start, i
+            start = i
@@ -1,25 +1,40 @@
 """
 Prediction endpoints
 """
-from fastapi import APIRouter, HTTPException, Depends, Request, BackgroundTasks
+from fastapi import APIRouter, HTTPException, Request, Response, BackgroundTasks
 from pydantic import BaseModel, Field
 import httpx
 import asyncio
 import time
-from typing import Dict, Any, Optional
+import math
+from typing import Dict, Any, List, Optional, Tuple
+from datetime import date
 from app.core.config import settings
-from app.db.session import get_db
-from app.crud.predictions import create_prediction_history
-from app.utils.rate_limiter import rate_limit
+from app.utils.history_writer import history_writer
+from app.utils.rate_limiter import rate_limiter
+from app.utils.ml_client import ml_client
+from app.utils.resilience import UpstreamUnavailable
+from app.utils.prediction_cache import prediction_cache
+from app.utils.feature_store import feature_store
+from app.utils.data_processor import prepare_features_for_prediction
+from app.utils.metrics import PREDICTION_CACHE_REQUESTS
 import logging
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+REQUIRED_FEATURES = [
+    "gdp_growth_rate", "inflation_rate", "usd_kes_rate",
+    "cbr_rate", "trade_balance"
+]
+
+# Set by the ML service to the concrete version behind the requested one
+MODEL_VERSION_HEADER = "X-Model-Version"
+
 class PredictionRequest(BaseModel):
     """Request model for predictions"""
-    features: Dict[str, float] = Field(
-        ..., 
+    features: Optional[Dict[str, float]] = Field(
+        default=None,
         description="Feature dictionary with economic indicators",
         example={
             "gdp_growth_rate": 2.5,
@@ -29,121 +44,217 @@ class PredictionRequest(BaseModel):
             "trade_balance": -12000.5
         }
     )
+    as_of: Optional[date] = Field(
+        default=None,
+        description="Fill features from stored indicators as of this date; explicit features override them"
+    )
     model_version: Optional[str] = Field(
         default="latest",
         description="Model version to use for prediction"
     )
 
+class BatchPredictionRequest(BaseModel):
+    """Request model for batch predictions"""
+    rows: List[Dict[str, Any]] = Field(
+        ...,
+        min_length=1,
+        max_length=settings.BATCH_MAX_ROWS,
+        description="Feature dictionaries, one per prediction"
+    )
+    model_version: Optional[str] = Field(
+        default="latest",
+        description="Model version to use for all rows"
+    )
+
+class BatchPredictionResult(BaseModel):
+    """Result for one batch row"""
+    index: int = Field(..., description="Position of the row in the request")
+    prediction: Optional[float] = Field(None, description="Predicted value")
+    confidence: Optional[float] = Field(None, description="Confidence score (0-1)")
+    error: Optional[str] = Field(None, description="Why this row has no prediction")
+
+class BatchPredictionResponse(BaseModel):
+    """Response model for batch predictions"""
+    results: List[BatchPredictionResult] = Field(..., description="Per-row results, in request order")
+    model_version: str = Field(..., description="Model version used")
+    succeeded: int = Field(..., description="Rows with a prediction")
+    failed: int = Field(..., description="Rows with an error")
+    timestamp: str = Field(..., description="Prediction timestamp")
+
 class PredictionResponse(BaseModel):
     """Response model for predictions"""
     prediction: float = Field(..., description="Predicted value")
     confidence: Optional[float] = Field(None, description="Confidence score (0-1)")
     model_version: str = Field(..., description="Model version used")
     features_used: Dict[str, float] = Field(..., description="Features used in prediction")
+    as_of: Optional[date] = Field(None, description="Date stored indicators were read as of")
     explanation: Optional[Dict[str, Any]] = Field(None, description="Model explanation")
     timestamp: str = Field(..., description="Prediction timestamp")
+    cached: bool = Field(False, description="Whether the prediction was served from cache")
 
-async def log_prediction_async(
-    features: Dict[str, float],
-    result: Dict[str, Any],
-    user_id: Optional[str],
-    db_session
-):
-    """Log prediction asynchronously"""
+def validate_row(row: Dict[str, Any]) -> Tuple[Optional[Dict[str, float]], Optional[str]]:
+    """Check one batch row, returning its numeric features or an error"""
+    missing_features = [f for f in REQUIRED_FEATURES if f not in row]
+    if missing_features:
+        return None, f"Missing required features: {missing_features}"
+    
+    features = {}
+    for name, value in row.items():
+        try:
+            features[name] = float(value)
+        except (TypeError, ValueError):
+            return None, f"Feature {name} is not numeric"
+        if not math.isfinite(features[name]):
+            return None, f"Feature {name} is not finite"
+    return features, None
+
+async def call_ml_service(path: str, payload: Dict[str, Any]) -> httpx.Response:
+    """POST to the ML service, mapping failures to gateway HTTP errors"""
     try:
-        create_prediction_history(
-            db=db_session,
-            input_features=features,
-            prediction_result=result,
-            user_id=user_id
+        # Predictions have no side effects, so they may be retried or hedged
+        response = await ml_client.post(path, json=payload, idempotent=True)
+        
+        if response.status_code != 200:
+            logger.error(f"ML service error: {response.status_code} - {response.text}")
+            raise HTTPException(
+                status_code=503,
+                detail="Prediction service temporarily unavailable"
+            )
+        
+        return response
+        
+    except httpx.TimeoutException:
+        logger.error("ML service timeout")
+        raise HTTPException(
+            status_code=504,
+            detail="Prediction service timeout"
+        )
+    except httpx.RequestError as e:
+        logger.error(f"ML service connection error: {e}")
+        raise HTTPException(
+            status_code=503,
+            detail="Cannot connect to prediction service"
         )
+    except UpstreamUnavailable:
+        logger.error("All ML service replicas have open circuits")
+        raise HTTPException(
+            status_code=503,
+            detail="Prediction service temporarily unavailable"
+        )
+
+async def fetch_prediction(features: Dict[str, float], model_version: str) -> Dict[str, Any]:
+    """Call the ML service and cache its answer under the version it reports"""
+    payload = {
+        "features": features,
+        "model_version": model_version
+    }
+    response = await call_ml_service("/predict", payload)
+    ml_result = response.json()
+    
+    # Answers from the latency-fallback student are not worth keeping
+    resolved_version = response.headers.get(MODEL_VERSION_HEADER)
+    if resolved_version and ml_result.get("model_version") != "student":
+        await prediction_cache.set(features, model_version, resolved_version, ml_result)
+    
+    return ml_result
+
+async def refresh_cached_prediction(features: Dict[str, float], model_version: str, key: str):
+    """Revalidate a stale cache entry after its response has been sent"""
+    try:
+        await fetch_prediction(features, model_version)
+    except HTTPException as e:
+        logger.warning(f"Failed to refresh cached prediction: {e.detail}")
     except Exception as e:
-        logger.error(f"Failed to log prediction: {e}")
+        logger.error(f"Failed to refresh cached prediction: {e}")
+    finally:
+        await prediction_cache.release_refresh_lock(key)
+
+async def enforce_rate_limit(req: Request, response: Response, cost: int = 1):
+    """Count a request against the caller's limit and attach X-RateLimit-* headers"""
+    result = await rate_limiter.hit(
+        req.client.host, settings.RATE_LIMIT_REQUESTS, settings.RATE_LIMIT_WINDOW, cost=cost
+    )
+    if not result.allowed:
+        raise HTTPException(status_code=429, detail="Rate limit exceeded", headers=result.headers())
+    response.headers.update(result.headers())
 
 @router.post("/", response_model=PredictionResponse)
 async def predict(
     request: PredictionRequest,
     background_tasks: BackgroundTasks,
     req: Request,
-    db=Depends(get_db)
+    response: Response
 ):
     """
     Generate investment predictions based on economic indicators
     
     This endpoint validates input features and forwards them to the ML service.
-    It includes rate limiting, logging, and error handling.
+    It includes rate limiting, logging, and error handling. Answers are
+    cached per feature vector and model version; stale entries are served
+    while a background refresh runs.
+    
+    With `as_of`, features come from the stored indicators' latest values
+    on or before that date, so a date alone is a complete request.
     """
     # Rate limiting
-    if not await rate_limit(req.client.host, settings.RATE_LIMIT_REQUESTS, settings.RATE_LIMIT_WINDOW):
-        raise HTTPException(status_code=429, detail="Rate limit exceeded")
+    await enforce_rate_limit(req, response)
     
     start_time = time.time()
     
     try:
-        # Validate required features
-        required_features = [
-            "gdp_growth_rate", "inflation_rate", "usd_kes_rate", 
-            "cbr_rate", "trade_balance"
-        ]
+        if request.features is None and request.as_of is None:
+            raise HTTPException(status_code=422, detail="Pass features, as_of, or both")
+        
+        features = request.features or {}
+        if request.as_of is not None:
+            # Explicit features (or their aliases) win; the rest come from the stored vector
+            vector = (await feature_store.vectors([request.as_of]))[0]
+            features = prepare_features_for_prediction(features, fallback=vector["features"])
         
-        missing_features = [f for f in required_features if f not in request.features]
+        # Validate required features
+        missing_features = [f for f in REQUIRED_FEATURES if f not in features]
         if missing_features:
             raise HTTPException(
                 status_code=422,
                 detail=f"Missing required features: {missing_features}"
             )
         
-        # Call ML service
-        ml_service_url = f"{settings.ML_SERVICE_URL}/predict"
-        payload = {
-            "features": request.features,
-            "model_version": request.model_version
-        }
-        
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            try:
-                response = await client.post(ml_service_url, json=payload)
-                
-                if response.status_code != 200:
-                    logger.error(f"ML service error: {response.status_code} - {response.text}")
-                    raise HTTPException(
-                        status_code=503,
-                        detail="Prediction service temporarily unavailable"
-                    )
-                
-                ml_result = response.json()
-                
-            except httpx.TimeoutException:
-                logger.error("ML service timeout")
-                raise HTTPException(
-                    status_code=504,
-                    detail="Prediction service timeout"
-                )
-            except httpx.RequestError as e:
-                logger.error(f"ML service connection error: {e}")
-                raise HTTPException(
-                    status_code=503,
-                    detail="Cannot connect to prediction service"
+        # Serve from the shared cache when possible
+        cached = await prediction_cache.get(features, request.model_version)
+        if cached is not None:
+            ml_result = cached["result"]
+            PREDICTION_CACHE_REQUESTS.labels(result="stale" if cached["stale"] else "hit").inc()
+            if cached["stale"] and await prediction_cache.acquire_refresh_lock(cached["key"]):
+                background_tasks.add_task(
+                    refresh_cached_prediction,
+                    features,
+                    request.model_version,
+                    cached["key"]
                 )
+        else:
+            PREDICTION_CACHE_REQUESTS.labels(result="miss").inc()
+            ml_result = await fetch_prediction(features, request.model_version)
         
         # Prepare response
         prediction_response = PredictionResponse(
             prediction=ml_result.get("prediction", 0.0),
             confidence=ml_result.get("confidence"),
             model_version=ml_result.get("model_version", request.model_version),
-            features_used=request.features,
+            features_used=features,
+            as_of=request.as_of,
             explanation=ml_result.get("explanation"),
-            timestamp=time.strftime("%Y-%m-%d %H:%M:%S UTC", time.gmtime())
+            timestamp=time.strftime("%Y-%m-%d %H:%M:%S UTC", time.gmtime()),
+            cached=cached is not None
         )
         
-        # Log prediction in background
+        # Queue for the buffered history writer
         user_id = getattr(req.state, 'user_id', None)
-        background_tasks.add_task(
-            log_prediction_async,
-            request.features,
-            prediction_response.dict(),
+        history_writer.submit(
+            features,
+            # JSON mode, since as_of is a date
+            prediction_response.model_dump(mode="json"),
             user_id,
-            db
+            prediction_response.model_version
         )
         
         # Log performance metrics
@@ -164,29 +275,105 @@ async def predict(
             detail="Internal server error during prediction"
         )
 
+@router.post("/batch", response_model=BatchPredictionResponse)
+async def predict_batch(
+    request: BatchPredictionRequest,
+    req: Request,
+    response: Response
+):
+    """
+    Generate predictions for many feature rows in one call
+    
+    Rows are validated in one pass and the valid ones are forwarded to the
+    ML service as a single request. Invalid rows get a per-row error
+    instead of failing the batch. The batch counts against the rate limit
+    in proportion to its size.
+    """
+    cost = max(1, math.ceil(len(request.rows) * settings.RATE_LIMIT_BATCH_ROW_WEIGHT))
+    await enforce_rate_limit(req, response, cost=cost)
+    
+    start_time = time.time()
+    
+    try:
+        results = [BatchPredictionResult(index=i) for i in range(len(request.rows))]
+        valid_rows = []
+        for i, row in enumerate(request.rows):
+            features, error = validate_row(row)
+            if error:
+                results[i].error = error
+            else:
+                valid_rows.append((i, features))
+        
+        model_version = request.model_version
+        if valid_rows:
+            payload = {
+                "instances": [features for _, features in valid_rows],
+                "model_version": request.model_version
+            }
+            ml_response = await call_ml_service("/predict/batch", payload)
+            ml_result = ml_response.json()
+            model_version = ml_result.get("model_version", request.model_version)
+            
+            for (i, _), row_result in zip(valid_rows, ml_result["predictions"]):
+                results[i].prediction = row_result.get("prediction")
+                results[i].confidence = row_result.get("confidence")
+                results[i].error = row_result.get("error")
+        
+        succeeded = [(i, features) for i, features in valid_rows if results[i].error is None]
+        
+        # Queue successful rows for the buffered history writer
+        user_id = getattr(req.state, 'user_id', None)
+        for i, features in succeeded:
+            history_writer.submit(
+                features,
+                results[i].model_dump(mode="json", exclude={"index", "error"}),
+                user_id,
+                model_version
+            )
+        
+        processing_time = time.time() - start_time
+        logger.info(
+            f"Batch prediction completed in {processing_time:.3f}s - "
+            f"{len(succeeded)}/{len(results)} rows"
+        )
+        
+        return BatchPredictionResponse(
+            results=results,
+            model_version=model_version,
+            succeeded=len(succeeded),
+            failed=len(results) - len(succeeded),
+            timestamp=time.strftime("%Y-%m-%d %H:%M:%S UTC", time.gmtime())
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception(f"Unexpected error in batch prediction: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail="Internal server error during batch prediction"
+        )
+
 @router.get("/models")
 async def list_available_models():
     """
     List available prediction models and their versions
     """
     try:
-        ml_service_url = f"{settings.ML_SERVICE_URL}/models"
+        response = await ml_client.get("/models", timeout=10.0)
         
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.get(ml_service_url)
-            
-            if response.status_code == 200:
-                return response.json()
-            else:
-                return {
-                    "models": [
-                        {
-                            "name": "investwise_model",
-                            "version": "latest",
-                            "status": "available"
-                        }
-                    ]
-                }
+        if response.status_code == 200:
+            return response.json()
+        else:
+            return {
+                "models": [
+                    {
+                        "name": "investwise_model",
+                        "version": "latest",
+                        "status": "available"
+                    }
+                ]
+            }
     except Exception as e:
         logger.error(f"Error fetching models: {e}")
         return {
@@ -1,13 +1,15 @@
 """
 CRUD operations for market data
 """
-from sqlalchemy.orm import Session
-from app.db.models import MarketData
-from typing import List, Optional
+import hashlib
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.models import MarketData, IngestionWatermark
+from typing import List, Optional, Tuple
 from datetime import datetime, date
 
-def create_market_data(
-    db: Session,
+async def create_market_data(
+    db: AsyncSession,
     date: datetime,
     data_type: str,
     data_source: str,
@@ -24,49 +26,112 @@ def create_market_data(
     )
     
     db.add(db_data)
-    db.commit()
-    db.refresh(db_data)
+    await db.commit()
+    await db.refresh(db_data)
     return db_data
 
-def get_market_data(
-    db: Session,
+async def get_market_data(
+    db: AsyncSession,
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
     limit: int = 100
 ) -> List[MarketData]:
     """Get market data with optional date filters"""
-    query = db.query(MarketData)
+    query = select(MarketData)
     
     if start_date:
-        query = query.filter(MarketData.date >= start_date)
+        query = query.where(MarketData.date >= start_date)
     if end_date:
-        query = query.filter(MarketData.date <= end_date)
+        query = query.where(MarketData.date <= end_date)
     
-    return query.order_by(MarketData.date.desc()).limit(limit).all()
+    result = await db.execute(query.order_by(MarketData.date.desc()).limit(limit))
+    return list(result.scalars().all())
 
-def get_market_data_by_type(
-    db: Session,
+async def get_market_data_page(
+    db: AsyncSession,
+    data_type: Optional[str] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    after: Optional[Tuple[datetime, int]] = None,
+    limit: int = 100
+) -> List[MarketData]:
+    """
+    Get one page of market data, newest first
+    
+    Pages are keyed on (date, id): `after` is the last row of the
+    previous page, so every page is an index range scan no matter how
+    deep it is.
+    """
+    query = select(MarketData)
+    
+    if data_type:
+        query = query.where(MarketData.data_type == data_type)
+    if start_date:
+        query = query.where(MarketData.date >= start_date)
+    if end_date:
+        query = query.where(MarketData.date <= end_date)
+    if after:
+        query = query.where(tuple_(MarketData.date, MarketData.id) < tuple_(*after))
+    
+    result = await db.execute(
+        query.order_by(MarketData.date.desc(), MarketData.id.desc()).limit(limit)
+    )
+    return list(result.scalars().all())
+
+async def get_market_data_by_type(
+    db: AsyncSession,
     data_type: str,
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
     limit: int = 100
 ) -> List[MarketData]:
     """Get market data filtered by type"""
-    query = db.query(MarketData).filter(MarketData.data_type == data_type)
+    query = select(MarketData).where(MarketData.data_type == data_type)
     
     if start_date:
-        query = query.filter(MarketData.date >= start_date)
+        query = query.where(MarketData.date >= start_date)
     if end_date:
-        query = query.filter(MarketData.date <= end_date)
+        query = query.where(MarketData.date <= end_date)
     
-    return query.order_by(MarketData.date.desc()).limit(limit).all()
+    result = await db.execute(query.order_by(MarketData.date.desc()).limit(limit))
+    return list(result.scalars().all())
 
-def get_latest_market_data(
-    db: Session,
+async def get_latest_market_data(
+    db: AsyncSession,
     data_type: str
 ) -> Optional[MarketData]:
     """Get the most recent data for a specific type"""
-    return db.query(MarketData)\
-        .filter(MarketData.data_type == data_type)\
-        .order_by(MarketData.date.desc())\
-        .first()
\ No newline at end of file
+    result = await db.execute(
+        select(MarketData)
+        .where(MarketData.data_type == data_type)
+        .order_by(MarketData.date.desc())
+        .limit(1)
+    )
+    return result.scalars().first()
+
+async def get_dataset_version(db: AsyncSession) -> Tuple[Optional[str], Optional[datetime]]:
+    """
+    Get a version of the ingested market data and when it last changed
+    
+    Hashes the ingestion watermarks (one row per source file), which change
+    whenever ingestion writes or prunes rows. Returns (None, None) before
+    anything has been ingested.
+    """
+    result = await db.execute(
+        select(
+            IngestionWatermark.source,
+            IngestionWatermark.size,
+            IngestionWatermark.content_hash,
+            IngestionWatermark.updated_at
+        ).order_by(IngestionWatermark.source)
+    )
+    rows = result.all()
+    if not rows:
+        return None, None
+    
+    digest = hashlib.sha256()
+    for source, size, content_hash, _ in rows:
+        digest.update(f"{source}:{size}:{content_hash}\n".encode())
+    modified = [r.updated_at for r in rows if r.updated_at is not None]
+    # Prefixed so it can't collide with the market cache's dataset versions
+    return f"db.{digest.hexdigest()[:16]}", max(modified, default=None)
@@ -0,0 +1,61 @@
+"""
+CRUD operations for typed market observations and their summaries
+"""
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.models import MarketObservation, MarketSeriesSummary
+from typing import List, Optional
+from datetime import date
+
+async def get_observations(
+    db: AsyncSession,
+    series: List[str],
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    limit: Optional[int] = 1000
+) -> list:
+    """
+    Get (series, date, value) rows for some series, oldest first
+    
+    Selects only columns held in the covering index, so range scans
+    don't touch the table.
+    """
+    query = select(
+        MarketObservation.series,
+        MarketObservation.date,
+        MarketObservation.value
+    ).where(MarketObservation.series.in_(series))
+    
+    if start_date:
+        query = query.where(MarketObservation.date >= start_date)
+    if end_date:
+        query = query.where(MarketObservation.date <= end_date)
+    
+    result = await db.execute(
+        query.order_by(MarketObservation.series, MarketObservation.date).limit(limit)
+    )
+    return list(result.all())
+
+async def get_series_names(db: AsyncSession, data_type: Optional[str] = None) -> List[str]:
+    """Get the names of stored series"""
+    query = select(MarketSeriesSummary.series).where(
+        MarketSeriesSummary.series != MarketSeriesSummary.data_type
+    )
+    if data_type:
+        query = query.where(MarketSeriesSummary.data_type == data_type)
+    
+    result = await db.execute(query.order_by(MarketSeriesSummary.series))
+    return list(result.scalars().all())
+
+async def get_data_type_summaries(db: AsyncSession) -> List[MarketSeriesSummary]:
+    """
+    Get the market_data row count and date range of each data type
+    
+    Reads the summary table maintained by ingestion, one row per type.
+    """
+    result = await db.execute(
+        select(MarketSeriesSummary)
+        .where(MarketSeriesSummary.series == MarketSeriesSummary.data_type)
+        .order_by(MarketSeriesSummary.data_type)
+    )
+    return list(result.scalars().all())
@@ -1,20 +1,32 @@
 """
 CRUD operations for model metrics
 """
-from sqlalchemy.orm import Session
-from app.db.models import ModelMetrics
-from typing import List, Optional, Dict, Any
-from datetime import datetime
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.models import ModelMetrics, ModelMetricLatest, LATEST_METRIC_TRIGGER_DIALECTS
+from typing import List, Optional, Dict, Any, Tuple
+from datetime import datetime, date
 
-def create_model_metric(
-    db: Session,
+INSERT_DIALECTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+async def create_model_metric(
+    db: AsyncSession,
     model_name: str,
     model_version: str,
     metric_name: str,
     metric_value: float,
     dataset_info: Dict[str, Any] = None
 ) -> ModelMetrics:
-    """Create a new model metric record"""
+    """
+    Create a new model metric record
+    
+    model_metrics_latest is updated in the same transaction, by the insert
+    trigger on SQLite and PostgreSQL and explicitly elsewhere.
+    """
     db_metric = ModelMetrics(
         model_name=model_name,
         model_version=model_version,
@@ -24,44 +36,184 @@ def create_model_metric(
     )
     
     db.add(db_metric)
-    db.commit()
-    db.refresh(db_metric)
+    await db.flush()
+    await db.refresh(db_metric)  # evaluation_date is set by the database
+    if db.get_bind().dialect.name not in LATEST_METRIC_TRIGGER_DIALECTS:
+        await upsert_latest_metric(db, db_metric)
+    await db.commit()
     return db_metric
 
-def get_model_metrics(
-    db: Session,
+async def upsert_latest_metric(db: AsyncSession, metric: ModelMetrics):
+    """
+    Record `metric` as its series' latest value unless a newer one is stored
+    
+    Ties on evaluation_date go to the newer row. Only needed on databases
+    without the model_metrics insert trigger. The caller commits.
+    """
+    values = {
+        "model_name": metric.model_name,
+        "model_version": metric.model_version,
+        "metric_name": metric.metric_name,
+        "metric_value": metric.metric_value,
+        "evaluation_date": metric.evaluation_date,
+        "metric_id": metric.id
+    }
+    insert = INSERT_DIALECTS.get(db.get_bind().dialect.name)
+    if insert is not None:
+        stmt = insert(ModelMetricLatest).values(values)
+        await db.execute(stmt.on_conflict_do_update(
+            index_elements=["model_name", "model_version", "metric_name"],
+            set_={c: stmt.excluded[c] for c in ("metric_value", "evaluation_date", "metric_id")},
+            where=tuple_(ModelMetricLatest.evaluation_date, ModelMetricLatest.metric_id)
+            <= tuple_(stmt.excluded.evaluation_date, stmt.excluded.metric_id)
+        ))
+        return
+    
+    current = await db.get(ModelMetricLatest, (metric.model_name, metric.model_version, metric.metric_name))
+    if current is None:
+        db.add(ModelMetricLatest(**values))
+    elif (current.evaluation_date, current.metric_id) <= (metric.evaluation_date, metric.id):
+        current.metric_value = metric.metric_value
+        current.evaluation_date = metric.evaluation_date
+        current.metric_id = metric.id
+
+async def get_model_metrics(
+    db: AsyncSession,
     model_name: Optional[str] = None,
     model_version: Optional[str] = None,
     metric_name: Optional[str] = None,
     limit: Optional[int] = 100
 ) -> List[ModelMetrics]:
     """Get model metrics with optional filters"""
-    query = db.query(ModelMetrics)
+    query = select(ModelMetrics)
     
     if model_name:
-        query = query.filter(ModelMetrics.model_name == model_name)
+        query = query.where(ModelMetrics.model_name == model_name)
     if model_version:
-        query = query.filter(ModelMetrics.model_version == model_version)
+        query = query.where(ModelMetrics.model_version == model_version)
     if metric_name:
-        query = query.filter(ModelMetrics.metric_name == metric_name)
+        query = query.where(ModelMetrics.metric_name == metric_name)
     
     query = query.order_by(ModelMetrics.evaluation_date.desc())
     
     if limit:
         query = query.limit(limit)
     
-    return query.all()
+    result = await db.execute(query)
+    return list(result.scalars().all())
 
-def get_latest_metrics(
-    db: Session,
+async def get_latest_metrics(
+    db: AsyncSession,
     model_name: str,
     model_version: str = "latest"
 ) -> List[ModelMetrics]:
     """Get the latest metrics for a specific model"""
-    return db.query(ModelMetrics)\
-        .filter(
+    result = await db.execute(
+        select(ModelMetrics)
+        .where(
             ModelMetrics.model_name == model_name,
             ModelMetrics.model_version == model_version
-        )\
-        .order_by(ModelMetrics.evaluation_date.desc())\
-        .all()
\ No newline at end of file
+        )
+        .order_by(ModelMetrics.evaluation_date.desc())
+    )
+    return list(result.scalars().all())
+
+async def get_latest_metric_values(
+    db: AsyncSession,
+    model_name: Optional[str] = None,
+    model_version: Optional[str] = None
+) -> List[ModelMetricLatest]:
+    """Get the latest value of every metric, ordered by model, version and metric"""
+    query = select(ModelMetricLatest)
+    if model_name:
+        query = query.where(ModelMetricLatest.model_name == model_name)
+    if model_version:
+        query = query.where(ModelMetricLatest.model_version == model_version)
+    
+    result = await db.execute(query.order_by(
+        ModelMetricLatest.model_name, ModelMetricLatest.model_version, ModelMetricLatest.metric_name
+    ))
+    return list(result.scalars().all())
+
+async def get_model_metrics_page(
+    db: AsyncSession,
+    model_name: str,
+    model_version: str,
+    metric_name: Optional[str] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    after: Optional[Tuple[datetime, int]] = None,
+    limit: int = 100
+) -> List[ModelMetrics]:
+    """
+    Get one page of a model's metric history, newest first
+    
+    Keyed on (evaluation_date, id) like market data pages; served by the
+    composite model/metric/date indexes.
+    """
+    query = select(ModelMetrics).where(
+        ModelMetrics.model_name == model_name,
+        ModelMetrics.model_version == model_version
+    )
+    if metric_name:
+        query = query.where(ModelMetrics.metric_name == metric_name)
+    if start_date:
+        query = query.where(ModelMetrics.evaluation_date >= start_date)
+    if end_date:
+        query = query.where(ModelMetrics.evaluation_date <= end_date)
+    if after:
+        query = query.where(tuple_(ModelMetrics.evaluation_date, ModelMetrics.id) < tuple_(*after))
+    
+    result = await db.execute(
+        query.order_by(ModelMetrics.evaluation_date.desc(), ModelMetrics.id.desc()).limit(limit)
+    )
+    return list(result.scalars().all())
+
+async def get_metric_values(
+    db: AsyncSession,
+    model_name: str,
+    model_version: str,
+    metric_name: Optional[str] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None
+) -> list:
+    """Get (metric_name, evaluation_date, metric_value) rows, oldest first within each metric"""
+    query = select(
+        ModelMetrics.metric_name,
+        ModelMetrics.evaluation_date,
+        ModelMetrics.metric_value
+    ).where(
+        ModelMetrics.model_name == model_name,
+        ModelMetrics.model_version == model_version
+    )
+    if metric_name:
+        query = query.where(ModelMetrics.metric_name == metric_name)
+    if start_date:
+        query = query.where(ModelMetrics.evaluation_date >= start_date)
+    if end_date:
+        query = query.where(ModelMetrics.evaluation_date <= end_date)
+    
+    result = await db.execute(query.order_by(
+        ModelMetrics.metric_name, ModelMetrics.evaluation_date, ModelMetrics.id
+    ))
+    return list(result.all())
+
+async def get_metrics_version(db: AsyncSession) -> Tuple[str, Optional[datetime]]:
+    """
+    Cheap fingerprint of the latest model metrics
+    
+    Reads model_metrics_latest, one row per metric. A new latest value
+    changes its row's metric_id, so the row count and id sum change
+    whenever anything in the metrics summary does.
+    
+    Returns:
+        Tuple of (version, latest evaluation date)
+    """
+    count, id_sum, last_evaluation = (await db.execute(
+        select(
+            func.count(),
+            func.sum(ModelMetricLatest.metric_id),
+            func.max(ModelMetricLatest.evaluation_date)
+        )
+    )).one()
+    return f"{id_sum or 0}.{count}", last_evaluation
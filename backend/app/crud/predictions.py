@@ -1,12 +1,14 @@
 """
 CRUD operations for predictions
 """
-from sqlalchemy.orm import Session
+from sqlalchemy import insert, select, func
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.models import PredictionHistory
 from typing import Dict, Any, Optional, List
+from datetime import datetime, timedelta, timezone
 
-def create_prediction_history(
-    db: Session,
+async def create_prediction_history(
+    db: AsyncSession,
     input_features: Dict[str, Any],
     prediction_result: Dict[str, Any],
     user_id: Optional[str] = None,
@@ -24,45 +26,82 @@ def create_prediction_history(
     )
     
     db.add(db_prediction)
-    db.commit()
-    db.refresh(db_prediction)
+    await db.commit()
+    await db.refresh(db_prediction)
     return db_prediction
 
-def get_prediction_history(
-    db: Session,
+def build_prediction_history_row(
+    input_features: Dict[str, Any],
+    prediction_result: Dict[str, Any],
+    user_id: Optional[str] = None,
+    model_version: str = "latest"
+) -> Dict[str, Any]:
+    """
+    Build the column values of a prediction history record
+    """
+    return {
+        "user_id": user_id,
+        "input_features": input_features,
+        "prediction_result": prediction_result,
+        "model_version": model_version,
+        "confidence_score": prediction_result.get("confidence")
+    }
+
+async def create_prediction_history_bulk(
+    db: AsyncSession,
+    rows: List[Dict[str, Any]]
+) -> int:
+    """
+    Create many prediction history records in one INSERT
+    
+    Args:
+        rows: Column values, as built by build_prediction_history_row
+    
+    Returns:
+        Number of rows inserted
+    """
+    if not rows:
+        return 0
+    
+    await db.execute(insert(PredictionHistory), rows)
+    await db.commit()
+    return len(rows)
+
+async def get_prediction_history(
+    db: AsyncSession,
     user_id: Optional[str] = None,
     limit: int = 100
 ) -> List[PredictionHistory]:
     """
     Get prediction history
     """
-    query = db.query(PredictionHistory)
+    query = select(PredictionHistory)
     
     if user_id:
-        query = query.filter(PredictionHistory.user_id == user_id)
+        query = query.where(PredictionHistory.user_id == user_id)
     
-    return query.order_by(PredictionHistory.created_at.desc()).limit(limit).all()
+    result = await db.execute(query.order_by(PredictionHistory.created_at.desc()).limit(limit))
+    return list(result.scalars().all())
 
-def get_prediction_stats(db: Session) -> Dict[str, Any]:
+async def get_prediction_stats(db: AsyncSession) -> Dict[str, Any]:
     """
     Get prediction statistics
     """
-    total_predictions = db.query(PredictionHistory).count()
+    total_predictions = await db.scalar(select(func.count()).select_from(PredictionHistory))
     
     # Get prediction counts by day for the last 30 days
-    result = db.execute("""
-        SELECT 
-            DATE(created_at) as prediction_date,
-            COUNT(*) as count
-        FROM prediction_history 
-        WHERE created_at >= NOW() - INTERVAL '30 days'
-        GROUP BY DATE(created_at)
-        ORDER BY prediction_date DESC
-    """).fetchall()
+    prediction_date = func.date(PredictionHistory.created_at).label("prediction_date")
+    since = datetime.now(timezone.utc) - timedelta(days=30)
+    result = await db.execute(
+        select(prediction_date, func.count().label("count"))
+        .where(PredictionHistory.created_at >= since)
+        .group_by(prediction_date)
+        .order_by(prediction_date.desc())
+    )
     
-    daily_counts = [{"date": row[0], "count": row[1]} for row in result]
+    daily_counts = [{"date": row[0], "count": row[1]} for row in result.all()]
     
     return {
         "total_predictions": total_predictions,
         "daily_predictions": daily_counts
-    }
\ No newline at end of file
+    }
@@ -1,7 +1,8 @@
 """
 CRUD operations for users
 """
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from passlib.context import CryptContext
 from app.db.models import User
 from typing import Optional
@@ -16,16 +17,18 @@ def get_password_hash(password: str) -> str:
     """Hash a password"""
     return pwd_context.hash(password)
 
-def get_user_by_email(db: Session, email: str) -> Optional[User]:
+async def get_user_by_email(db: AsyncSession, email: str) -> Optional[User]:
     """Get user by email"""
-    return db.query(User).filter(User.email == email).first()
+    result = await db.execute(select(User).where(User.email == email))
+    return result.scalars().first()
 
-def get_user_by_username(db: Session, username: str) -> Optional[User]:
+async def get_user_by_username(db: AsyncSession, username: str) -> Optional[User]:
     """Get user by username"""
-    return db.query(User).filter(User.username == username).first()
+    result = await db.execute(select(User).where(User.username == username))
+    return result.scalars().first()
 
-def create_user(
-    db: Session,
+async def create_user(
+    db: AsyncSession,
     email: str,
     username: str,
     password: str,
@@ -44,13 +47,13 @@ def create_user(
     )
     
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     return db_user
 
-def update_user(db: Session, user_id: int, **kwargs) -> Optional[User]:
+async def update_user(db: AsyncSession, user_id: int, **kwargs) -> Optional[User]:
     """Update user information"""
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, user_id)
     if not user:
         return None
     
@@ -58,6 +61,6 @@ def update_user(db: Session, user_id: int, **kwargs) -> Optional[User]:
         if hasattr(user, key):
             setattr(user, key, value)
     
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
     return user
\ No newline at end of file
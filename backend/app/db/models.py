@@ -1,7 +1,7 @@
 """
 Database models for InvestWise Predictor
 """
-from sqlalchemy import Column, Integer, String, Float, DateTime, JSON, Boolean, Text
+from sqlalchemy import Column, Integer, BigInteger, String, Float, DateTime, JSON, Boolean, Text, UniqueConstraint, Index, DDL, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql import func
 import datetime
@@ -23,6 +23,13 @@ class PredictionHistory(Base):
 class MarketData(Base):
     """Store processed market data"""
     __tablename__ = "market_data"
+    __table_args__ = (
+        # One row per series and date; ingestion upserts on this key
+        UniqueConstraint("data_type", "date", name="uq_market_data_type_date"),
+        # Keyset pagination order, with and without a data type filter
+        Index("ix_market_data_date_id", "date", "id"),
+        Index("ix_market_data_type_date_id", "data_type", "date", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     date = Column(DateTime, nullable=False, index=True)
@@ -33,9 +40,53 @@ class MarketData(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
+class MarketObservation(Base):
+    """One numeric value of one market data series on one date"""
+    __tablename__ = "market_observations"
+    __table_args__ = (
+        # Covers range scans that read only values, so they can be index-only
+        Index("ix_market_observations_series_date_value", "series", "date", "value"),
+    )
+    
+    series = Column(String, primary_key=True)  # "<data_type>.<column>", e.g. "exchange_rates.USD_KES"
+    date = Column(DateTime, primary_key=True)
+    value = Column(Float, nullable=False)
+    data_type = Column(String, nullable=False, index=True)
+
+class MarketSeriesSummary(Base):
+    """Row count, date range and latest value per series, kept current by ingestion"""
+    __tablename__ = "market_series_summary"
+    
+    # An observation series ("gdp.GDP_Real"), or a bare data type ("gdp")
+    # summarizing that type's market_data rows
+    series = Column(String, primary_key=True)
+    data_type = Column(String, nullable=False, index=True)
+    record_count = Column(Integer, nullable=False)
+    first_date = Column(DateTime, nullable=False)
+    last_date = Column(DateTime, nullable=False)
+    last_value = Column(Float, nullable=True)  # None for data type rows
+
+class IngestionWatermark(Base):
+    """How far each raw data file has been ingested"""
+    __tablename__ = "ingestion_watermarks"
+    
+    source = Column(String, primary_key=True)  # file name under the raw data dir
+    data_type = Column(String, nullable=False)
+    size = Column(BigInteger, nullable=False)  # bytes ingested; appends resume here
+    mtime = Column(Float, nullable=False)
+    content_hash = Column(String(64), nullable=False)  # sha256 of the first `size` bytes
+    last_date = Column(DateTime, nullable=True)
+    row_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
 class ModelMetrics(Base):
     """Store model performance metrics"""
     __tablename__ = "model_metrics"
+    __table_args__ = (
+        # History of one metric, and of all metrics of a model, newest first
+        Index("ix_model_metrics_model_metric_date_id", "model_name", "model_version", "metric_name", "evaluation_date", "id"),
+        Index("ix_model_metrics_model_date_id", "model_name", "model_version", "evaluation_date", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     model_name = Column(String, nullable=False)
@@ -45,6 +96,47 @@ class ModelMetrics(Base):
     evaluation_date = Column(DateTime(timezone=True), server_default=func.now())
     dataset_info = Column(JSON, nullable=True)
 
+class ModelMetricLatest(Base):
+    """Most recent value of each model metric, kept current by an insert trigger"""
+    __tablename__ = "model_metrics_latest"
+    
+    model_name = Column(String, primary_key=True)
+    model_version = Column(String, primary_key=True)
+    metric_name = Column(String, primary_key=True)
+    metric_value = Column(Float, nullable=False)
+    evaluation_date = Column(DateTime(timezone=True), nullable=True)
+    metric_id = Column(Integer, nullable=False)  # model_metrics row the value came from
+
+# Keep model_metrics_latest current for every insert into model_metrics,
+# whoever writes it; ties on evaluation_date go to the newer row. Also
+# created by migration 0006.
+LATEST_METRIC_UPSERT = """
+    INSERT INTO model_metrics_latest
+        (model_name, model_version, metric_name, metric_value, evaluation_date, metric_id)
+    VALUES (NEW.model_name, NEW.model_version, NEW.metric_name, NEW.metric_value, NEW.evaluation_date, NEW.id)
+    ON CONFLICT (model_name, model_version, metric_name) DO UPDATE SET
+        metric_value = excluded.metric_value,
+        evaluation_date = excluded.evaluation_date,
+        metric_id = excluded.metric_id
+    WHERE (model_metrics_latest.evaluation_date, model_metrics_latest.metric_id)
+        <= (excluded.evaluation_date, excluded.metric_id);
+"""
+LATEST_METRIC_TRIGGER_DIALECTS = ("sqlite", "postgresql")
+
+event.listen(Base.metadata, "after_create", DDL(f"""
+CREATE TRIGGER IF NOT EXISTS trg_model_metrics_latest AFTER INSERT ON model_metrics
+BEGIN {LATEST_METRIC_UPSERT} END
+""").execute_if(dialect="sqlite"))
+event.listen(Base.metadata, "after_create", DDL(f"""
+CREATE OR REPLACE FUNCTION model_metrics_latest_upsert() RETURNS trigger AS $$
+BEGIN {LATEST_METRIC_UPSERT} RETURN NULL; END
+$$ LANGUAGE plpgsql
+""").execute_if(dialect="postgresql"))
+event.listen(Base.metadata, "after_create", DDL("""
+CREATE OR REPLACE TRIGGER trg_model_metrics_latest AFTER INSERT ON model_metrics
+FOR EACH ROW EXECUTE FUNCTION model_metrics_latest_upsert()
+""").execute_if(dialect="postgresql"))
+
 class User(Base):
     """User model for authentication"""
     __tablename__ = "users"
@@ -2,8 +2,11 @@
 Database session management
 """
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.pool import StaticPool
+from typing import AsyncIterator
 from app.core.config import settings
 import logging
 
@@ -21,6 +24,47 @@ engine = create_engine(
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async drivers for the sync URLs DATABASE_URL is usually written with
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+def async_database_url(url: str) -> str:
+    """Map a database URL onto its asyncio driver"""
+    parsed = make_url(url)
+    driver = ASYNC_DRIVERS.get(parsed.drivername)
+    if driver is None:
+        return url
+    return parsed.set(drivername=driver).render_as_string(hide_password=False)
+
+def create_async_db_engine(url: str):
+    """Create an async engine with pooling suited to the backend"""
+    async_url = async_database_url(url)
+    options = {"echo": settings.ENVIRONMENT == "development"}
+    
+    if make_url(async_url).get_backend_name() == "sqlite":
+        if make_url(async_url).database in (None, "", ":memory:"):
+            # In-memory databases exist per connection; share one
+            options["poolclass"] = StaticPool
+    else:
+        options.update(
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_pre_ping=True,
+            pool_recycle=300,
+        )
+    
+    return create_async_engine(async_url, **options)
+
+async_engine = create_async_db_engine(settings.ASYNC_DATABASE_URL or settings.DATABASE_URL)
+
+# expire_on_commit=False keeps loaded attributes readable after commit,
+# since async sessions cannot lazy-load them during response serialization
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False, autoflush=False)
+
 def get_db() -> Session:
     """
     Dependency to get database session
@@ -33,4 +77,16 @@ def get_db() -> Session:
         db.rollback()
         raise
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    """
+    Dependency to get an async database session
+    """
+    async with AsyncSessionLocal() as db:
+        try:
+            yield db
+        except Exception as e:
+            logger.error(f"Database session error: {e}")
+            await db.rollback()
+            raise
@@ -1,16 +1,23 @@
 """
 FastAPI main application
 """
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
 import time
 import uvicorn
+from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
 from app.api.v1 import router as api_router
 from app.core.config import settings
 from app.db.session import engine
 from app.db import models
+from app.utils.ml_client import ml_client
+from app.utils.prediction_cache import prediction_cache
+from app.utils.rate_limiter import rate_limiter, RATE_LIMIT_HEADERS
+from app.utils.pagination import NEXT_CURSOR_HEADER
+from app.utils.market_cache import market_cache
+from app.utils.history_writer import history_writer
 import logging
 
 # Configure logging
@@ -39,6 +46,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Let browser clients read paging, rate limit and cache validator headers
+    expose_headers=[NEXT_CURSOR_HEADER, "ETag", *RATE_LIMIT_HEADERS],
 )
 
 # Request timing middleware
@@ -53,11 +62,36 @@ async def add_process_time_header(request, call_next):
 # Include API routes
 app.include_router(api_router, prefix="/v1")
 
+@app.on_event("startup")
+async def startup_event():
+    """Open shared connection pools and background writers"""
+    await ml_client.start()
+    await history_writer.start()
+    await market_cache.start()
+    await prediction_cache.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Flush background writers and close shared connection pools"""
+    await history_writer.stop()
+    await ml_client.close()
+    await prediction_cache.stop()
+    await rate_limiter.close()
+    await market_cache.stop()
+
 @app.get("/healthz")
 async def health_check():
     """Health check endpoint"""
     return {"status": "healthy", "service": "InvestWise API"}
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics endpoint"""
+    if not settings.ENABLE_METRICS:
+        return Response(status_code=404)
+    ml_client.export_metrics()
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
 @app.get("/")
 async def root():
     """Root endpoint"""
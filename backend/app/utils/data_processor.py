@@ -2,108 +2,480 @@
 Data processing utilities
 """
 import pandas as pd
+import hashlib
+import io
 import os
+import time
+from sqlalchemy import and_, delete, insert, select, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import Session
-from app.crud.market_data import create_market_data
-from typing import Dict, Any, Optional
+from sqlalchemy.sql import func
+from app.core.config import settings
+from app.db.models import MarketData, MarketObservation, MarketSeriesSummary, IngestionWatermark
+from typing import Dict, Any, List, Optional, Tuple
 import logging
 
 logger = logging.getLogger(__name__)
 
-def load_and_process_data(db: Session, data_type: Optional[str] = None) -> Dict[str, Any]:
+# Map of CSV files to data types
+FILE_MAPPING = {
+    "gdp.csv": "gdp",
+    "inflation.csv": "inflation",
+    "exchange_rates.csv": "exchange_rates",
+    "interest_rates.csv": "interest_rates",
+    "mobile_payments.csv": "mobile_payments",
+    "trade_foreign_summary.csv": "trade_foreign_summary"
+}
+
+HASH_CHUNK_SIZE = 1 << 20
+
+INSERT_DIALECTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+def build_market_data_records(df: pd.DataFrame, data_type: str, data_source: str) -> List[Dict[str, Any]]:
+    """
+    Turn a raw CSV frame into market_data rows, column-wise
+    
+    Rows without a parseable date are dropped, and repeated dates keep
+    the last row so each (data_type, date) appears once per upsert.
+    """
+    date_column = next((c for c in df.columns if c.lower() == "date"), None)
+    if date_column is None:
+        raise ValueError(f"No date column in {data_source}")
+    
+    dates = pd.to_datetime(df[date_column], errors="coerce")
+    valid = dates.notna()
+    if not valid.all():
+        logger.warning(f"Skipping {(~valid).sum()} rows without a valid date in {data_source}")
+    df = df[valid]
+    dates = dates[valid]
+    
+    keep = ~dates.duplicated(keep="last")
+    df = df[keep]
+    dates = dates[keep]
+    
+    # JSON columns can't hold NaN
+    clean = df.astype(object).where(df.notna(), None)
+    raw_records = clean.to_dict(orient="records")
+    processed_records = clean.drop(
+        columns=[c for c in clean.columns if c.lower() in ("date", "index")]
+    ).to_dict(orient="records")
+    
+    return [
+        {
+            "date": date,
+            "data_type": data_type,
+            "data_source": data_source,
+            "raw_data": raw,
+            "processed_data": processed
+        }
+        for date, raw, processed in zip(dates.dt.to_pydatetime(), raw_records, processed_records)
+    ]
+
+def build_observation_records(records: List[Dict[str, Any]], data_type: str) -> List[Dict[str, Any]]:
+    """
+    Numeric columns of market_data rows as long-format observations
+    
+    Each column becomes a series named "<data_type>.<column>"; text
+    columns and missing values are left out.
+    """
+    if not records:
+        return []
+    
+    frame = pd.DataFrame([r["processed_data"] for r in records]).select_dtypes(include="number")
+    frame.insert(0, "date", pd.to_datetime([r["date"] for r in records]))
+    long = frame.melt(id_vars="date", var_name="column", value_name="value").dropna(subset=["value"])
+    
+    return [
+        {"series": f"{data_type}.{column}", "data_type": data_type, "date": date, "value": float(value)}
+        for date, column, value in zip(long["date"].dt.to_pydatetime(), long["column"], long["value"])
+    ]
+
+def _upsert(
+    db: Session,
+    model,
+    records: List[Dict[str, Any]],
+    key_columns: List[str],
+    chunk_size: Optional[int] = None
+) -> int:
+    """
+    Insert or update rows keyed by `key_columns`
+    
+    Uses INSERT ... ON CONFLICT in chunks on PostgreSQL and SQLite, and
+    delete-then-insert elsewhere. The caller commits.
+    """
+    chunk_size = chunk_size or settings.INGEST_CHUNK_SIZE
+    insert = INSERT_DIALECTS.get(db.get_bind().dialect.name)
+    keys = [getattr(model, c) for c in key_columns]
+    
+    for i in range(0, len(records), chunk_size):
+        chunk = records[i:i + chunk_size]
+        if insert is not None:
+            stmt = insert(model).values(chunk)
+            updates = {c: stmt.excluded[c] for c in chunk[0] if c not in key_columns}
+            if hasattr(model, "updated_at"):
+                updates["updated_at"] = func.now()
+            db.execute(stmt.on_conflict_do_update(index_elements=key_columns, set_=updates))
+        else:
+            chunk_keys = [tuple(r[c] for c in key_columns) for r in chunk]
+            db.execute(delete(model).where(tuple_(*keys).in_(chunk_keys)))
+            db.execute(model.__table__.insert(), chunk)
+    
+    return len(records)
+
+def upsert_market_data(db: Session, records: List[Dict[str, Any]], chunk_size: Optional[int] = None) -> int:
+    """
+    Insert or update market data rows keyed by (data_type, date)
+    
+    Returns:
+        Number of rows written
+    """
+    return _upsert(db, MarketData, records, ["data_type", "date"], chunk_size)
+
+def upsert_observations(db: Session, records: List[Dict[str, Any]], chunk_size: Optional[int] = None) -> int:
+    """Insert or update observations keyed by (series, date)"""
+    return _upsert(db, MarketObservation, records, ["series", "date"], chunk_size)
+
+def prune_market_data(db: Session, data_type: str, keep_dates: set, chunk_size: Optional[int] = None) -> int:
+    """Delete rows of a data type whose date is no longer in its source file"""
+    chunk_size = chunk_size or settings.INGEST_CHUNK_SIZE
+    rows = db.execute(select(MarketData.id, MarketData.date).where(MarketData.data_type == data_type)).all()
+    stale = [row.id for row in rows if row.date not in keep_dates]
+    
+    for i in range(0, len(stale), chunk_size):
+        db.execute(delete(MarketData).where(MarketData.id.in_(stale[i:i + chunk_size])))
+    return len(stale)
+
+def prune_observations(db: Session, data_type: str, keep_keys: set, chunk_size: Optional[int] = None) -> int:
+    """Delete observations of a data type whose (series, date) is no longer in its source file"""
+    chunk_size = chunk_size or settings.INGEST_CHUNK_SIZE
+    rows = db.execute(
+        select(MarketObservation.series, MarketObservation.date).where(MarketObservation.data_type == data_type)
+    ).all()
+    stale = [tuple(row) for row in rows if tuple(row) not in keep_keys]
+    
+    key = tuple_(MarketObservation.series, MarketObservation.date)
+    for i in range(0, len(stale), chunk_size):
+        db.execute(delete(MarketObservation).where(key.in_(stale[i:i + chunk_size])))
+    return len(stale)
+
+def refresh_series_summary(db: Session, data_type: str) -> int:
+    """
+    Rebuild the market_series_summary rows of one data type
+    
+    Aggregates only that type's entries of the (data_type, date, id) and
+    (series, date) indexes, and is called in the ingestion transaction of
+    rewritten files so the summary always matches the data it describes.
+    The caller commits.
+    
+    Returns:
+        Number of summary rows written
+    """
+    summaries = []
+    count, first_date, last_date = db.execute(
+        select(func.count(), func.min(MarketData.date), func.max(MarketData.date))
+        .where(MarketData.data_type == data_type)
+    ).one()
+    if count:
+        summaries.append({
+            "series": data_type,
+            "data_type": data_type,
+            "record_count": count,
+            "first_date": first_date,
+            "last_date": last_date,
+            "last_value": None
+        })
+    
+    per_series = (
+        select(
+            MarketObservation.series,
+            func.count().label("record_count"),
+            func.min(MarketObservation.date).label("first_date"),
+            func.max(MarketObservation.date).label("last_date")
+        )
+        .where(MarketObservation.data_type == data_type)
+        .group_by(MarketObservation.series)
+        .subquery()
+    )
+    rows = db.execute(
+        select(per_series, MarketObservation.value).join(
+            MarketObservation,
+            and_(
+                MarketObservation.series == per_series.c.series,
+                MarketObservation.date == per_series.c.last_date
+            )
+        )
+    ).all()
+    summaries.extend(
+        {
+            "series": row.series,
+            "data_type": data_type,
+            "record_count": row.record_count,
+            "first_date": row.first_date,
+            "last_date": row.last_date,
+            "last_value": row.value
+        }
+        for row in rows
+    )
+    
+    db.execute(delete(MarketSeriesSummary).where(MarketSeriesSummary.data_type == data_type))
+    if summaries:
+        db.execute(insert(MarketSeriesSummary), summaries)
+    return len(summaries)
+
+def append_series_summary(
+    db: Session,
+    data_type: str,
+    records: List[Dict[str, Any]],
+    observations: List[Dict[str, Any]],
+    chunk_size: Optional[int] = None
+) -> int:
+    """
+    Apply appended rows to the market_series_summary rows of one data type
+    
+    Counts only keys not already stored and moves first/last dates and the
+    last value forward, without aggregating the rows already there. Must
+    be called before the rows are upserted. The caller commits.
+    
+    Returns:
+        Number of summary rows written
+    """
+    chunk_size = chunk_size or settings.INGEST_CHUNK_SIZE
+    points: Dict[str, Dict[Any, Optional[float]]] = {}
+    for record in records:
+        points.setdefault(data_type, {})[record["date"]] = None
+    for obs in observations:
+        points.setdefault(obs["series"], {})[obs["date"]] = obs["value"]
+    
+    existing = set()
+    dates = sorted(points.get(data_type, {}))
+    for i in range(0, len(dates), chunk_size):
+        rows = db.execute(
+            select(MarketData.date)
+            .where(MarketData.data_type == data_type, MarketData.date.in_(dates[i:i + chunk_size]))
+        ).all()
+        existing.update((data_type, row.date) for row in rows)
+    
+    keys = [(o["series"], o["date"]) for o in observations]
+    key = tuple_(MarketObservation.series, MarketObservation.date)
+    for i in range(0, len(keys), chunk_size):
+        rows = db.execute(
+            select(MarketObservation.series, MarketObservation.date).where(key.in_(keys[i:i + chunk_size]))
+        ).all()
+        existing.update(tuple(row) for row in rows)
+    
+    current = {
+        row.series: row
+        for row in db.execute(
+            select(
+                MarketSeriesSummary.series, MarketSeriesSummary.record_count, MarketSeriesSummary.first_date,
+                MarketSeriesSummary.last_date, MarketSeriesSummary.last_value
+            ).where(MarketSeriesSummary.data_type == data_type)
+        )
+    }
+    
+    summaries = []
+    for series, by_date in points.items():
+        last_date = max(by_date)
+        summary = {
+            "series": series,
+            "data_type": data_type,
+            "record_count": sum(1 for d in by_date if (series, d) not in existing),
+            "first_date": min(by_date),
+            "last_date": last_date,
+            "last_value": by_date[last_date]
+        }
+        previous = current.get(series)
+        if previous is not None:
+            summary["record_count"] += previous.record_count
+            summary["first_date"] = min(summary["first_date"], previous.first_date)
+            if previous.last_date > last_date:
+                summary["last_date"] = previous.last_date
+                summary["last_value"] = previous.last_value
+        summaries.append(summary)
+    
+    return _upsert(db, MarketSeriesSummary, summaries, ["series"], chunk_size) if summaries else 0
+
+def read_file_changes(
+    filepath: str,
+    watermark: Optional[IngestionWatermark]
+) -> Tuple[str, Optional[bytes], str, int, float]:
+    """
+    Work out what changed in a raw file since its watermark
+    
+    A file whose first `watermark.size` bytes still hash the same has
+    only been appended to, so just the new lines (behind the header) need
+    parsing. Anything else is treated as rewritten.
+    
+    Returns:
+        (mode, csv_bytes, content_hash, size, mtime) where mode is
+        "skipped", "appended" or "rewritten", and csv_bytes is the CSV to
+        parse (None when skipped)
+    """
+    stat = os.stat(filepath)
+    if watermark is not None and stat.st_size == watermark.size and stat.st_mtime == watermark.mtime:
+        return "skipped", None, watermark.content_hash, watermark.size, stat.st_mtime
+    
+    with open(filepath, "rb") as f:
+        if watermark is not None and 0 < watermark.size <= stat.st_size:
+            header = f.readline()
+            f.seek(0)
+            
+            digest = hashlib.sha256()
+            remaining = watermark.size
+            last_byte = b""
+            while remaining > 0:
+                chunk = f.read(min(HASH_CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                digest.update(chunk)
+                last_byte = chunk[-1:]
+                remaining -= len(chunk)
+            
+            if remaining == 0 and digest.hexdigest() == watermark.content_hash:
+                appended = f.read()
+                if not appended:
+                    # Touched but not changed
+                    return "skipped", None, watermark.content_hash, watermark.size, stat.st_mtime
+                if last_byte == b"\n":
+                    digest.update(appended)
+                    return "appended", header + appended, digest.hexdigest(), watermark.size + len(appended), stat.st_mtime
+            
+            f.seek(0)
+        
+        data = f.read()
+    
+    return "rewritten", data, hashlib.sha256(data).hexdigest(), len(data), stat.st_mtime
+
+def load_and_process_data(
+    db: Session,
+    data_type: Optional[str] = None,
+    full: bool = False
+) -> Dict[str, Any]:
     """
     Load and process data from CSV files into the database
+    
+    A watermark per file (size, mtime, content hash, last date) lets a
+    refresh skip unchanged files and parse only lines appended since the
+    last run; files changed in any other way are reloaded in full, and
+    rows whose dates disappeared from them are removed. `full` ignores
+    the watermarks.
+    
+    Rows are written both as JSON market_data records and as typed
+    (series, date, value) observations. Each file is upserted in chunks,
+    together with its watermark and its market_series_summary rows, in
+    its own transaction; appends update the summary by delta, rewrites
+    rebuild it. Runs on a sync session; API handlers call it through
+    the threadpool.
     """
-    data_dir = "data/raw"
+    data_dir = settings.DATA_RAW_DIR
     processed_types = []
     total_records = 0
+    removed_records = 0
+    file_counts = {"skipped": 0, "appended": 0, "rewritten": 0}
+    start = time.perf_counter()
     
-    # Map of CSV files to data types
-    file_mapping = {
-        "gdp.csv": "gdp",
-        "inflation.csv": "inflation", 
-        "exchange_rates.csv": "exchange_rates",
-        "interest_rates.csv": "interest_rates",
-        "mobile_payments.csv": "mobile_payments",
-        "trade_foreign_summary.csv": "trade_foreign_summary"
-    }
-    
-    try:
-        for filename, dtype in file_mapping.items():
-            # Skip if specific data type requested and this isn't it
-            if data_type and dtype != data_type:
-                continue
-                
-            filepath = os.path.join(data_dir, filename)
+    for filename, dtype in FILE_MAPPING.items():
+        # Skip if specific data type requested and this isn't it
+        if data_type and dtype != data_type:
+            continue
+            
+        filepath = os.path.join(data_dir, filename)
+        
+        if not os.path.exists(filepath):
+            logger.warning(f"Data file not found: {filepath}")
+            continue
+        
+        try:
+            file_start = time.perf_counter()
+            watermark = db.get(IngestionWatermark, filename)
+            mode, payload, content_hash, size, mtime = read_file_changes(
+                filepath, None if full else watermark
+            )
             
-            if not os.path.exists(filepath):
-                logger.warning(f"Data file not found: {filepath}")
+            if mode == "skipped":
+                if watermark.mtime != mtime:
+                    watermark.mtime = mtime
+                    db.commit()
+                file_counts["skipped"] += 1
                 continue
             
-            try:
-                # Load CSV data
-                df = pd.read_csv(filepath)
-                
-                if df.empty:
-                    logger.warning(f"Empty data file: {filepath}")
-                    continue
-                
-                # Process each row
-                records_added = 0
-                for _, row in df.iterrows():
-                    try:
-                        # Convert row to dict and handle date
-                        row_data = row.to_dict()
-                        
-                        # Parse date column
-                        date_val = pd.to_datetime(row_data.get('Date', row_data.get('date')))
-                        
-                        # Create processed data (remove Date from features)
-                        processed_data = {k: v for k, v in row_data.items() 
-                                        if k.lower() not in ['date', 'index']}
-                        
-                        # Check if record already exists
-                        existing = db.query(
-                            "SELECT id FROM market_data WHERE date = %s AND data_type = %s"
-                        ).fetchone()
-                        
-                        if not existing:
-                            create_market_data(
-                                db=db,
-                                date=date_val,
-                                data_type=dtype,
-                                data_source=filename,
-                                raw_data=row_data,
-                                processed_data=processed_data
-                            )
-                            records_added += 1
-                        
-                    except Exception as e:
-                        logger.error(f"Error processing row in {filename}: {e}")
-                        continue
-                
-                processed_types.append(dtype)
-                total_records += records_added
-                logger.info(f"Processed {records_added} records from {filename}")
-                
-            except Exception as e:
-                logger.error(f"Error processing file {filename}: {e}")
+            df = pd.read_csv(io.BytesIO(payload))
+            if df.empty and mode == "rewritten":
+                logger.warning(f"Empty data file: {filepath}")
                 continue
-        
-        return {
-            "processed_types": processed_types,
-            "total_records": total_records
-        }
-        
-    except Exception as e:
-        logger.error(f"Error in load_and_process_data: {e}")
-        return {"processed_types": [], "total_records": 0}
+            
+            records = build_market_data_records(df, dtype, filename)
+            observations = build_observation_records(records, dtype)
+            if mode == "appended":
+                append_series_summary(db, dtype, records, observations)
+            written = upsert_market_data(db, records)
+            upsert_observations(db, observations)
+            
+            dates = [r["date"] for r in records]
+            if mode == "rewritten":
+                removed_records += prune_market_data(db, dtype, set(dates))
+                prune_observations(db, dtype, {(o["series"], o["date"]) for o in observations})
+                refresh_series_summary(db, dtype)
+                row_count = len(records)
+            else:
+                dates.append(watermark.last_date)
+                row_count = watermark.row_count + len(records)
+            
+            if watermark is None:
+                watermark = IngestionWatermark(source=filename)
+                db.add(watermark)
+            watermark.data_type = dtype
+            watermark.size = size
+            watermark.mtime = mtime
+            watermark.content_hash = content_hash
+            watermark.last_date = max((d for d in dates if d is not None), default=None)
+            watermark.row_count = row_count
+            db.commit()
+            
+            elapsed = time.perf_counter() - file_start
+            processed_types.append(dtype)
+            total_records += written
+            file_counts[mode] += 1
+            logger.info(
+                f"Upserted {written} records from {filename} ({mode}) in {elapsed:.3f}s "
+                f"({written / max(elapsed, 1e-9):.0f} rows/s)"
+            )
+            
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error processing file {filename}: {e}")
+            continue
+    
+    elapsed = time.perf_counter() - start
+    return {
+        "processed_types": processed_types,
+        "total_records": total_records,
+        "removed_records": removed_records,
+        "skipped_files": file_counts["skipped"],
+        "appended_files": file_counts["appended"],
+        "rewritten_files": file_counts["rewritten"],
+        "elapsed_seconds": round(elapsed, 3),
+        "rows_per_second": round(total_records / elapsed, 1) if elapsed > 0 else 0.0
+    }
 
-def prepare_features_for_prediction(data: Dict[str, Any]) -> Dict[str, float]:
+def prepare_features_for_prediction(
+    data: Dict[str, Any],
+    fallback: Optional[Dict[str, float]] = None
+) -> Dict[str, float]:
     """
     Prepare and validate features for ML prediction
+    
+    Features missing from `data`, or not numeric, are taken from
+    `fallback`, normally a point-in-time vector from the feature store
+    (`feature_store.latest()` or `.vectors([...])`). Features found in
+    neither are left out, so validate_prediction_features reports them.
     """
-    # Define feature mappings and defaults
+    fallback = fallback or {}
+    
+    # Define feature mappings
     feature_mapping = {
         "gdp_growth_rate": ["GDP_Growth_Rate", "gdp_growth", "growth_rate"],
         "inflation_rate": ["Inflation_Rate", "inflation", "cpi"],
@@ -117,8 +489,8 @@ def prepare_features_for_prediction(data: Dict[str, Any]) -> Dict[str, float]:
     for feature_name, possible_keys in feature_mapping.items():
         value = None
         
-        # Try to find value using possible keys
-        for key in possible_keys:
+        # Try to find value using its own name, then known aliases
+        for key in (feature_name, *possible_keys):
             if key in data:
                 value = data[key]
                 break
@@ -127,19 +499,12 @@ def prepare_features_for_prediction(data: Dict[str, Any]) -> Dict[str, float]:
         if value is not None:
             try:
                 features[feature_name] = float(value)
+                continue
             except (ValueError, TypeError):
                 logger.warning(f"Could not convert {feature_name} value {value} to float")
-                features[feature_name] = 0.0
-        else:
-            # Set default value
-            default_values = {
-                "gdp_growth_rate": 2.0,
-                "inflation_rate": 5.0,
-                "usd_kes_rate": 110.0,
-                "cbr_rate": 9.0,
-                "trade_balance": -10000.0
-            }
-            features[feature_name] = default_values.get(feature_name, 0.0)
+        
+        if feature_name in fallback:
+            features[feature_name] = float(fallback[feature_name])
     
     return features
 
@@ -0,0 +1,188 @@
+"""
+Point-in-time prediction feature vectors built from stored series
+"""
+from datetime import date, datetime, time
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from sqlalchemy import select
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.db.models import MarketSeriesSummary
+from app.crud.market_observations import get_observations
+from app.utils.market_cache import DATETIME_UNIT, MarketDataCache, market_cache
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Prediction feature -> stored series it is read from
+FEATURE_SERIES = {
+    "gdp_growth_rate": "gdp.GDP_Growth_Rate",
+    "inflation_rate": "inflation.Inflation_Rate",
+    "usd_kes_rate": "exchange_rates.USD_KES",
+    "cbr_rate": "interest_rates.CBR",
+    "trade_balance": "trade_foreign_summary.Trade_Balance"
+}
+
+Arrays = Dict[str, Tuple[np.ndarray, np.ndarray]]
+
+def as_of_indices(series_dates: np.ndarray, query_dates: np.ndarray) -> np.ndarray:
+    """
+    Index of the last observation on or before each query date, -1 if none
+
+    One binary search per query date; `query_dates` need not be sorted.
+    """
+    return np.searchsorted(series_dates, query_dates, side="right") - 1
+
+def build_vectors(
+    series: Arrays,
+    as_of: List[date],
+    release_lags: Optional[Dict[str, int]] = None
+) -> List[dict]:
+    """
+    Feature vectors as of each date, with the date each value was observed
+
+    Args:
+        series: Date-sorted (dates, values) per series name
+        as_of: Dates to build vectors for, in any order
+        release_lags: Days after its observation date each series'
+            values become available; series not listed have none
+    """
+    release_lags = release_lags or {}
+    query = np.array([datetime.combine(d, time()) for d in as_of], dtype=DATETIME_UNIT)
+    columns = {}
+    for feature, name in FEATURE_SERIES.items():
+        dates, values = series.get(name, (np.empty(0, dtype=DATETIME_UNIT), np.empty(0)))
+        # Search on release dates; a constant shift keeps them sorted
+        released = dates + np.timedelta64(release_lags.get(name, 0), "D")
+        idx = as_of_indices(released, query)
+        found = idx >= 0
+        safe = np.where(found, idx, 0)
+        columns[feature] = (
+            found.tolist(),
+            values[safe].tolist() if len(values) else [None] * len(query),
+            dates[safe].astype(object).tolist() if len(dates) else [None] * len(query)
+        )
+
+    vectors = []
+    for i, day in enumerate(as_of):
+        features, observed, missing = {}, {}, []
+        for feature, (found, values, dates) in columns.items():
+            if found[i]:
+                features[feature] = values[i]
+                observed[feature] = dates[i]
+            else:
+                missing.append(feature)
+        vectors.append({"as_of": day, "features": features, "observed": observed, "missing": missing})
+    return vectors
+
+class FeatureStore:
+    """
+    Builds prediction feature vectors "as of" dates from stored series
+
+    Each feature takes the latest observation of its series released on
+    or before the as-of date, where a value is released
+    FEATURE_RELEASE_LAG_DAYS (per series, default 0) after its observation
+    date; e.g. with a 90-day lag for GDP, a quarter's figure only counts
+    from about three months after the quarter's last day. The latest
+    vector uses whatever is stored, which has been released by definition.
+
+    Reads come from the market data cache when it's on, so any number of
+    dates costs one vectorized search per series. The latest vector is
+    kept per dataset version and rebuilt after ingestion.
+    """
+
+    def __init__(
+        self,
+        cache: MarketDataCache = market_cache,
+        session_factory=AsyncSessionLocal,
+        release_lags: Optional[Dict[str, int]] = None
+    ):
+        self.cache = cache
+        self.session_factory = session_factory
+        self.release_lags = settings.FEATURE_RELEASE_LAG_DAYS if release_lags is None else release_lags
+        self._latest: Optional[Tuple[str, dict]] = None
+
+    async def vectors(self, as_of: List[date]) -> List[dict]:
+        """Feature vectors for many dates at once, in the order given"""
+        if not as_of:
+            return []
+
+        snapshot = await self.cache.snapshot()
+        if snapshot is not None:
+            series = {
+                name: (snapshot.series[name].dates, snapshot.series[name].values)
+                for name in FEATURE_SERIES.values() if name in snapshot.series
+            }
+            return build_vectors(series, as_of, self.release_lags)
+
+        end = datetime.combine(max(as_of), time())
+        async with self.session_factory() as db:
+            rows = await get_observations(db, list(FEATURE_SERIES.values()), end_date=end, limit=None)
+        grouped: Dict[str, Tuple[list, list]] = {}
+        for row in rows:
+            dates, values = grouped.setdefault(row.series, ([], []))
+            dates.append(row.date)
+            values.append(row.value)
+        series = {
+            name: (np.array(dates, dtype=DATETIME_UNIT), np.array(values, dtype=np.float64))
+            for name, (dates, values) in grouped.items()
+        }
+        return build_vectors(series, as_of, self.release_lags)
+
+    async def latest(self) -> dict:
+        """
+        Vector of the latest value of every feature
+
+        `as_of` is the most recent observation date among the features.
+        """
+        snapshot = await self.cache.snapshot()
+        if snapshot is None:
+            return await self._latest_from_summary()
+
+        if self._latest is not None and self._latest[0] == snapshot.etag_version:
+            return self._latest[1]
+
+        features, observed, missing = {}, {}, []
+        for feature, name in FEATURE_SERIES.items():
+            arrays = snapshot.series.get(name)
+            if arrays is None or not len(arrays.dates):
+                missing.append(feature)
+                continue
+            features[feature] = float(arrays.values[-1])
+            observed[feature] = arrays.dates[-1].astype(object)
+        vector = self._latest_vector(features, observed, missing)
+        self._latest = (snapshot.etag_version, vector)
+        return vector
+
+    async def refresh(self):
+        """Rebuild the latest vector, e.g. right after ingestion"""
+        self._latest = None
+        try:
+            await self.latest()
+        except Exception as e:
+            logger.warning(f"Could not refresh latest feature vector: {e}")
+
+    async def _latest_from_summary(self) -> dict:
+        """Latest vector from market_series_summary, one row per feature"""
+        async with self.session_factory() as db:
+            rows = (await db.execute(
+                select(MarketSeriesSummary).where(MarketSeriesSummary.series.in_(FEATURE_SERIES.values()))
+            )).scalars().all()
+        by_series = {row.series: row for row in rows}
+
+        features, observed, missing = {}, {}, []
+        for feature, name in FEATURE_SERIES.items():
+            row = by_series.get(name)
+            if row is None or row.last_value is None:
+                missing.append(feature)
+                continue
+            features[feature] = row.last_value
+            observed[feature] = row.last_date
+        return self._latest_vector(features, observed, missing)
+
+    @staticmethod
+    def _latest_vector(features: dict, observed: dict, missing: list) -> dict:
+        as_of = max(observed.values()).date() if observed else None
+        return {"as_of": as_of, "features": features, "observed": observed, "missing": missing}
+
+feature_store = FeatureStore()
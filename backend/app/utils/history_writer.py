@@ -0,0 +1,332 @@
+"""
+Buffered bulk writer for prediction history
+"""
+import asyncio
+import glob
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional
+from fastapi.concurrency import run_in_threadpool
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.crud.predictions import build_prediction_history_row, create_prediction_history_bulk
+from app.utils.metrics import (
+    HISTORY_QUEUE_DEPTH, HISTORY_FLUSH_DURATION, HISTORY_ROWS_WRITTEN,
+    HISTORY_ROWS_DROPPED, HISTORY_ROWS_SPILLED
+)
+import logging
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process development only
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+class PredictionHistoryWriter:
+    """
+    Collects prediction history rows in memory and inserts them in bulk
+
+    Rows are flushed every `batch_size` rows or `flush_interval_ms`,
+    whichever comes first, using the writer's own session. The queue is
+    bounded; when it is full or a flush fails, rows are dropped or, with
+    the "spill" policy, appended to a JSON-lines file that is replayed on
+    the next start. Spill files are written by one background thread, in
+    submission order, so the event loop never waits on the disk; at most
+    `max_spill_backlog` rows may wait for that thread before further rows
+    are dropped.
+
+    Every process spills to its own `<spill_path>.<pid>` file, so workers
+    sharing a spill path never write to the same file. On start a worker
+    claims, under a lock file, its own file and those of processes that
+    are no longer running, moving their rows into its `.replay` file
+    before inserting them.
+    """
+
+    _STOP = object()
+
+    def __init__(
+        self,
+        session_factory=AsyncSessionLocal,
+        batch_size: Optional[int] = None,
+        flush_interval_ms: Optional[float] = None,
+        max_queue: Optional[int] = None,
+        overflow_policy: Optional[str] = None,
+        spill_path: Optional[str] = None,
+        max_spill_backlog: Optional[int] = None
+    ):
+        self.session_factory = session_factory
+        self.batch_size = batch_size or settings.HISTORY_BATCH_SIZE
+        self.flush_interval = (flush_interval_ms or settings.HISTORY_FLUSH_INTERVAL_MS) / 1000.0
+        self.max_queue = max_queue or settings.HISTORY_MAX_QUEUE
+        self.overflow_policy = overflow_policy or settings.HISTORY_OVERFLOW_POLICY
+        self.spill_path = spill_path or settings.HISTORY_SPILL_PATH
+        self.max_spill_backlog = max_spill_backlog or settings.HISTORY_MAX_SPILL_BACKLOG
+
+        if self.overflow_policy not in ("drop", "spill"):
+            raise ValueError(f"Unknown history overflow policy: {self.overflow_policy}")
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+        self._spill_executor: Optional[ThreadPoolExecutor] = None
+        self._spill_backlog = 0
+        self._spill_backlog_lock = threading.Lock()
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    @property
+    def pid(self) -> int:
+        # Looked up per call, since workers fork after this module is imported
+        return os.getpid()
+
+    @property
+    def process_spill_path(self) -> str:
+        return f"{self.spill_path}.{self.pid}"
+
+    async def start(self):
+        """Start the background flush loop"""
+        if self._task is not None:
+            return
+
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._closing = False
+        HISTORY_QUEUE_DEPTH.set_function(lambda: self.queue_depth)
+        self._task = asyncio.create_task(self._run())
+        logger.info(
+            f"Prediction history writer started: batch_size={self.batch_size}, "
+            f"flush_interval={self.flush_interval * 1000:.0f}ms, policy={self.overflow_policy}"
+        )
+
+    async def stop(self, timeout: float = 10.0):
+        """Flush queued rows and stop"""
+        if self._task is None:
+            return
+
+        self._closing = True
+        try:
+            await asyncio.wait_for(self._queue.put(self._STOP), timeout)
+            await asyncio.wait_for(self._task, timeout)
+        except asyncio.TimeoutError:
+            self._task.cancel()
+            # Whatever is still queued would be lost; keep it if we can
+            remaining = self._drain()
+            logger.error(f"Prediction history writer did not drain in {timeout}s, {len(remaining)} rows left")
+            self._overflow(remaining, reason="shutdown")
+        await self.wait_for_spills()
+        if self._spill_executor is not None:
+            self._spill_executor.shutdown(wait=False)
+            self._spill_executor = None
+        self._task = None
+        logger.info("Prediction history writer stopped")
+
+    async def wait_for_spills(self):
+        """Wait until rows handed to the spill thread so far are on disk"""
+        if self._spill_executor is not None:
+            # One worker, so this runs after every earlier spill
+            await asyncio.wrap_future(self._spill_executor.submit(lambda: None))
+
+    def _spill_thread(self) -> ThreadPoolExecutor:
+        if self._spill_executor is None:
+            self._spill_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="history-spill")
+        return self._spill_executor
+
+    def submit(
+        self,
+        input_features: Dict[str, Any],
+        prediction_result: Dict[str, Any],
+        user_id: Optional[str] = None,
+        model_version: str = "latest"
+    ) -> bool:
+        """
+        Queue a prediction for writing; never blocks
+
+        Returns:
+            False if the row had to be dropped or spilled
+        """
+        row = build_prediction_history_row(input_features, prediction_result, user_id, model_version)
+        # Stamp now rather than at flush time
+        row["created_at"] = datetime.now(timezone.utc)
+
+        if self._queue is None or self._closing:
+            self._overflow([row], reason="not_running")
+            return False
+
+        try:
+            self._queue.put_nowait(row)
+            return True
+        except asyncio.QueueFull:
+            self._overflow([row], reason="queue_full")
+            return False
+
+    async def _run(self):
+        try:
+            await self._replay_spill()
+        except Exception as e:
+            logger.error(f"Failed to replay spilled prediction history: {e}")
+
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await self._queue.get()
+            if item is self._STOP:
+                return
+
+            batch = [item]
+            stop = False
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is self._STOP:
+                    stop = True
+                    break
+                batch.append(item)
+
+            await self._flush(batch)
+            if stop:
+                return
+
+    async def _flush(self, batch: List[Dict[str, Any]]):
+        start = time.perf_counter()
+        try:
+            await self._write(batch)
+            HISTORY_ROWS_WRITTEN.inc(len(batch))
+        except Exception as e:
+            logger.error(f"Failed to write {len(batch)} prediction history rows: {e}")
+            self._overflow(batch, reason="write_failed")
+        finally:
+            HISTORY_FLUSH_DURATION.observe(time.perf_counter() - start)
+
+    async def _write(self, rows: List[Dict[str, Any]]):
+        async with self.session_factory() as db:
+            await create_prediction_history_bulk(db, rows)
+
+    def _drain(self) -> List[Dict[str, Any]]:
+        rows = []
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            if item is not self._STOP:
+                rows.append(item)
+        return rows
+
+    def _overflow(self, rows: List[Dict[str, Any]], reason: str) -> Optional[Future]:
+        """Apply the overflow policy to rows that can't be written now; never blocks"""
+        if self.overflow_policy == "spill":
+            with self._spill_backlog_lock:
+                backlog_full = self._spill_backlog + len(rows) > self.max_spill_backlog
+                if not backlog_full:
+                    self._spill_backlog += len(rows)
+            if not backlog_full:
+                return self._spill_thread().submit(self._spill, rows, reason)
+            reason = "spill_backlog"
+
+        self._drop(rows, reason)
+        return None
+
+    def _spill(self, rows: List[Dict[str, Any]], reason: str):
+        """Append rows to this process's spill file; runs on the spill thread"""
+        path = self.process_spill_path
+        try:
+            with open(path, "a") as f:
+                for row in rows:
+                    f.write(json.dumps({**row, "created_at": row["created_at"].isoformat()}) + "\n")
+            HISTORY_ROWS_SPILLED.inc(len(rows))
+        except OSError as e:
+            logger.error(f"Failed to spill prediction history to {path}: {e}")
+            self._drop(rows, reason)
+        finally:
+            with self._spill_backlog_lock:
+                self._spill_backlog -= len(rows)
+
+    @staticmethod
+    def _drop(rows: List[Dict[str, Any]], reason: str):
+        HISTORY_ROWS_DROPPED.labels(reason=reason).inc(len(rows))
+        logger.warning(f"Dropped {len(rows)} prediction history rows ({reason})")
+
+    @staticmethod
+    def _process_running(pid: int) -> bool:
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            pass
+        return True
+
+    def _claimable_spills(self) -> List[str]:
+        """Spill files of this process and of processes that are gone, including pre-pid ones"""
+        paths = []
+        for path in glob.glob(glob.escape(self.spill_path)) + glob.glob(glob.escape(self.spill_path) + ".*"):
+            suffix = path[len(self.spill_path):].split(".")
+            if suffix == [""] or suffix == ["", "replay"]:
+                paths.append(path)
+            elif len(suffix) in (2, 3) and suffix[1].isdigit() and suffix[2:] in ([], ["replay"]):
+                pid = int(suffix[1])
+                if pid == self.pid or not self._process_running(pid):
+                    paths.append(path)
+        return paths
+
+    def _claim_spills(self) -> Optional[List[Dict[str, Any]]]:
+        """
+        Move claimable spill files into this process's replay file and read it
+
+        Runs on the spill thread, so this process's own spills can't
+        interleave, and under an exclusive lock on `<spill_path>.lock`, so
+        two starting workers never claim the same file.
+        """
+        replay_path = self.process_spill_path + ".replay"
+        if not self._claimable_spills():
+            return None
+
+        with open(self.spill_path + ".lock", "a") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                for path in self._claimable_spills():
+                    if path == replay_path or not os.path.exists(path):
+                        continue
+                    with open(path) as src, open(replay_path, "a") as dst:
+                        dst.write(src.read())
+                        dst.flush()
+                        os.fsync(dst.fileno())
+                    os.remove(path)
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+
+        if not os.path.exists(replay_path):
+            return None
+
+        with open(replay_path) as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+        for row in rows:
+            row["created_at"] = datetime.fromisoformat(row["created_at"])
+        return rows
+
+    async def _replay_spill(self):
+        """Insert rows spilled by earlier or crashed workers"""
+        replay_path = self.process_spill_path + ".replay"
+        rows = await asyncio.wrap_future(self._spill_thread().submit(self._claim_spills))
+        if rows is None:
+            return
+
+        for i in range(0, len(rows), self.batch_size):
+            await self._write(rows[i:i + self.batch_size])
+
+        await run_in_threadpool(os.remove, replay_path)
+        HISTORY_ROWS_WRITTEN.inc(len(rows))
+        logger.info(f"Replayed {len(rows)} spilled prediction history rows")
+
+# Shared instance, started and stopped by the application lifespan hooks
+history_writer = PredictionHistoryWriter()
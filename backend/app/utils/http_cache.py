@@ -0,0 +1,140 @@
+"""
+Conditional GET support: version-based ETags and precompressed bodies
+"""
+import gzip
+import inspect
+import json
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Callable, Optional
+from fastapi import Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
+from app.utils.metrics import CONDITIONAL_RESPONSES
+
+@dataclass
+class CachedBody:
+    """Serialized response for one resource at one version"""
+    etag: str
+    body: bytes
+    gzipped: bytes
+
+class ConditionalResponseCache:
+    """
+    Serves JSON resources whose content is identified by a version
+
+    The ETag is derived from the version alone, so a client that already
+    has it gets a 304 without the payload being built at all. Otherwise
+    the body is serialized and gzipped once per version and kept, and
+    later requests are answered from those bytes. GZipMiddleware leaves
+    responses that already carry a Content-Encoding alone.
+    """
+
+    def __init__(self, max_entries: int = 256, compresslevel: int = 6):
+        self.max_entries = max_entries
+        self.compresslevel = compresslevel
+        self._bodies: "OrderedDict[str, CachedBody]" = OrderedDict()
+
+    @staticmethod
+    def etag(key: str, version: Any) -> str:
+        # Weak, since the gzipped and identity bodies share it
+        return f'W/"{key}:{version}"'
+
+    @staticmethod
+    def not_modified(request: Request, etag: str, last_modified: Optional[datetime]) -> bool:
+        """Evaluate If-None-Match, or If-Modified-Since when no ETag was sent"""
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None:
+            tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+            return "*" in tags or etag.removeprefix("W/") in tags
+
+        if_modified_since = request.headers.get("if-modified-since")
+        if if_modified_since and last_modified is not None:
+            try:
+                since = parsedate_to_datetime(if_modified_since)
+            except (TypeError, ValueError):
+                return False
+            if since.tzinfo is None:
+                since = since.replace(tzinfo=timezone.utc)
+            return last_modified.replace(microsecond=0) <= since
+        return False
+
+    @staticmethod
+    def accepts_gzip(accept_encoding: str) -> bool:
+        """Whether Accept-Encoding allows gzip, honouring q-values (gzip;q=0 refuses it)"""
+        qualities = {}
+        for item in accept_encoding.split(","):
+            coding, *params = [part.strip() for part in item.split(";")]
+            if not coding:
+                continue
+            q = 1.0
+            for param in params:
+                name, _, value = param.partition("=")
+                if name.strip().lower() == "q":
+                    try:
+                        q = float(value)
+                    except ValueError:
+                        q = 0.0
+            qualities[coding.lower()] = q
+
+        for coding in ("gzip", "x-gzip", "*"):
+            if coding in qualities:
+                return qualities[coding] > 0
+        return False
+
+    async def respond(
+        self,
+        request: Request,
+        key: str,
+        version: Any,
+        last_modified: Optional[datetime],
+        build: Callable[[], Any]
+    ) -> Response:
+        """
+        Answer a GET for `key` at `version`
+
+        Args:
+            request: Incoming request, for its conditional and encoding headers
+            key: Resource identity, including any query parameters that shape it
+            version: Anything that changes whenever the payload would
+            last_modified: When that version was produced, if known
+            build: Returns (or awaits to) the payload; only called on a miss
+        """
+        etag = self.etag(key, version)
+        if last_modified is not None and last_modified.tzinfo is None:
+            last_modified = last_modified.replace(tzinfo=timezone.utc)
+
+        headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+        if last_modified is not None:
+            headers["Last-Modified"] = format_datetime(last_modified.astimezone(timezone.utc), usegmt=True)
+
+        if self.not_modified(request, etag, last_modified):
+            CONDITIONAL_RESPONSES.labels(result="not_modified").inc()
+            return Response(status_code=304, headers=headers)
+
+        cached = self._bodies.get(key)
+        if cached is not None and cached.etag == etag:
+            CONDITIONAL_RESPONSES.labels(result="hit").inc()
+            self._bodies.move_to_end(key)
+        else:
+            CONDITIONAL_RESPONSES.labels(result="miss").inc()
+            payload = build()
+            if inspect.isawaitable(payload):
+                payload = await payload
+            body = json.dumps(
+                jsonable_encoder(payload), ensure_ascii=False, allow_nan=False, separators=(",", ":")
+            ).encode("utf-8")
+            cached = CachedBody(etag, body, gzip.compress(body, compresslevel=self.compresslevel))
+            self._bodies[key] = cached
+            self._bodies.move_to_end(key)
+            while len(self._bodies) > self.max_entries:
+                self._bodies.popitem(last=False)
+
+        if self.accepts_gzip(request.headers.get("accept-encoding", "")):
+            headers["Content-Encoding"] = "gzip"
+            return Response(cached.gzipped, media_type="application/json", headers=headers)
+        return Response(cached.body, media_type="application/json", headers=headers)
+
+response_cache = ConditionalResponseCache()
@@ -0,0 +1,438 @@
+"""
+Process-local columnar cache of market data for read endpoints
+"""
+import asyncio
+import json
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import date, datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+import redis.asyncio as aioredis
+from redis.exceptions import RedisError
+from sqlalchemy import select
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.db.models import MarketData, MarketObservation
+from app.utils.metrics import MARKET_CACHE_RELOADS, MARKET_CACHE_RELOAD_DURATION, MARKET_CACHE_VERSION
+import logging
+
+logger = logging.getLogger(__name__)
+
+DATETIME_UNIT = "datetime64[us]"
+
+# Tells this process's local versions apart from every other pod's
+INSTANCE_ID = uuid.uuid4().hex[:12]
+
+def to_datetime64(value) -> np.datetime64:
+    return np.datetime64(value).astype(DATETIME_UNIT)
+
+def date_bounds(dates: np.ndarray, start_date: Optional[date], end_date: Optional[date]) -> Tuple[int, int]:
+    """Index range of `dates` (sorted) within [start_date, end_date]"""
+    lo = 0 if start_date is None else int(np.searchsorted(dates, to_datetime64(start_date), side="left"))
+    hi = len(dates) if end_date is None else int(np.searchsorted(dates, to_datetime64(end_date), side="right"))
+    return lo, max(lo, hi)
+
+@dataclass
+class RowArrays:
+    """market_data rows sorted by (date, id), with their response bodies"""
+    dates: np.ndarray
+    ids: np.ndarray
+    rows: np.ndarray  # object array of MarketDataResponse-shaped dicts
+
+    @classmethod
+    def build(cls, dates: List[datetime], ids: List[int], rows: List[dict]) -> "RowArrays":
+        dates_arr = np.array(dates, dtype=DATETIME_UNIT)
+        ids_arr = np.array(ids, dtype=np.int64)
+        order = np.lexsort((ids_arr, dates_arr))
+        rows_arr = np.empty(len(rows), dtype=object)
+        rows_arr[:] = rows
+        return cls(dates_arr[order], ids_arr[order], rows_arr[order])
+
+    @classmethod
+    def concat(cls, parts: Iterable["RowArrays"]) -> "RowArrays":
+        parts = list(parts)
+        if not parts:
+            return cls.build([], [], [])
+        dates = np.concatenate([p.dates for p in parts])
+        ids = np.concatenate([p.ids for p in parts])
+        rows = np.concatenate([p.rows for p in parts])
+        order = np.lexsort((ids, dates))
+        return cls(dates[order], ids[order], rows[order])
+
+    def position(self, after: Tuple[datetime, int]) -> int:
+        """Number of rows ordered before the (date, id) key"""
+        key = to_datetime64(after[0])
+        lo = int(np.searchsorted(self.dates, key, side="left"))
+        hi = int(np.searchsorted(self.dates, key, side="right"))
+        return lo + int(np.searchsorted(self.ids[lo:hi], after[1], side="left"))
+
+    def page(
+        self,
+        start_date: Optional[date],
+        end_date: Optional[date],
+        after: Optional[Tuple[datetime, int]],
+        limit: int
+    ) -> List[dict]:
+        """Newest-first page, same order and cursor semantics as the database query"""
+        lo, hi = date_bounds(self.dates, start_date, end_date)
+        if after is not None:
+            hi = max(lo, min(hi, self.position(after)))
+        start = max(lo, hi - limit)
+        return list(self.rows[start:hi][::-1])
+
+@dataclass
+class SeriesArrays:
+    """One typed series sorted by date"""
+    dates: np.ndarray
+    values: np.ndarray
+
+@dataclass
+class MarketDataSnapshot:
+    """Immutable view of market data at one dataset version"""
+    version: int
+    loaded_at: float
+    modified_at: datetime  # when this version was first seen, for Last-Modified
+    by_type: Dict[str, RowArrays] = field(default_factory=dict)
+    all_rows: Optional[RowArrays] = None
+    latest: Dict[str, dict] = field(default_factory=dict)
+    series: Dict[str, SeriesArrays] = field(default_factory=dict)
+    shared: bool = True  # version came from Redis, so every pod agrees on it
+
+    @property
+    def etag_version(self) -> str:
+        """Version for ETags; local versions are qualified by the process that made them"""
+        return str(self.version) if self.shared else f"{INSTANCE_ID}.{self.version}"
+
+    def summary(self) -> List[dict]:
+        return [
+            {
+                "data_type": data_type,
+                "record_count": len(arrays.dates),
+                "earliest_date": arrays.rows[0]["date"],
+                "latest_date": arrays.rows[-1]["date"]
+            }
+            for data_type, arrays in sorted(self.by_type.items())
+            if len(arrays.dates)
+        ]
+
+    def page(
+        self,
+        data_type: Optional[str],
+        start_date: Optional[date],
+        end_date: Optional[date],
+        after: Optional[Tuple[datetime, int]],
+        limit: int
+    ) -> List[dict]:
+        arrays = self.by_type.get(data_type) if data_type else self.all_rows
+        if arrays is None:
+            return []
+        return arrays.page(start_date, end_date, after, limit)
+
+    def observations(
+        self,
+        series: List[str],
+        start_date: Optional[date],
+        end_date: Optional[date],
+        limit: int
+    ) -> List[dict]:
+        """(series, date, value) rows ordered by series then date"""
+        result = []
+        for name in sorted(set(series)):
+            arrays = self.series.get(name)
+            if arrays is None:
+                continue
+            lo, hi = date_bounds(arrays.dates, start_date, end_date)
+            hi = min(hi, lo + limit - len(result))
+            dates = arrays.dates[lo:hi].astype(object)
+            result.extend(
+                {"series": name, "date": d, "value": v}
+                for d, v in zip(dates, arrays.values[lo:hi].tolist())
+            )
+            if len(result) >= limit:
+                break
+        return result
+
+class MarketDataCache:
+    """
+    Keeps market data in NumPy arrays sorted by date, per data type and series
+
+    Market data only changes when /refresh runs, so read endpoints answer
+    from an in-memory snapshot with binary searches instead of querying
+    the database. A refresh bumps a dataset version in Redis and publishes
+    the changed data types; every pod then reloads just those types on its
+    next read. Snapshots older than `max_age` are reloaded in full in case
+    a message was missed, e.g. while Redis was down.
+
+    Once a snapshot exists, reads never wait for a reload: they get the
+    current snapshot while a background task builds the next one. Failed
+    reloads are retried with exponential backoff instead of on every read.
+    """
+
+    VERSION_KEY = "market_data:version"
+    CHANNEL = "market_data:invalidate"
+    RETRY_MIN_SECONDS = 1.0
+    RETRY_MAX_SECONDS = 60.0
+
+    def __init__(
+        self,
+        redis_url: Optional[str] = None,
+        enabled: Optional[bool] = None,
+        max_age: Optional[float] = None,
+        session_factory=AsyncSessionLocal
+    ):
+        self.enabled = settings.DATA_CACHE_ENABLED if enabled is None else enabled
+        self.max_age = max_age or settings.DATA_CACHE_MAX_AGE
+        self.session_factory = session_factory
+        self._redis = aioredis.from_url(redis_url or settings.REDIS_URL, decode_responses=True)
+
+        self._snapshot: Optional[MarketDataSnapshot] = None
+        self._dirty: Optional[set] = None  # None: full reload; empty: clean
+        self._target_version: Optional[int] = None
+        self._lock = asyncio.Lock()
+        self._listener: Optional[asyncio.Task] = None
+        self._reload_task: Optional[asyncio.Task] = None
+        self._failures = 0
+        self._retry_at = 0.0
+        self._local_version = 0
+
+    @property
+    def version(self) -> Optional[int]:
+        """Dataset version of the current snapshot"""
+        return self._snapshot.version if self._snapshot is not None else None
+
+    async def start(self):
+        """Subscribe to invalidation messages from other pods"""
+        if self.enabled and self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        for task in (self._listener, self._reload_task):
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._listener = None
+        self._reload_task = None
+        await self._redis.aclose()
+
+    async def snapshot(self) -> Optional[MarketDataSnapshot]:
+        """
+        Current snapshot; an outdated one is returned as is while it reloads
+
+        Returns:
+            None when the cache is disabled or nothing has been loaded yet,
+            in which case callers read from the database
+        """
+        if not self.enabled:
+            return None
+
+        if self._snapshot is None:
+            # Nothing to serve yet, so the first load happens inline
+            if time.monotonic() >= self._retry_at:
+                await self._reload_now()
+        elif self._needs_reload():
+            self._schedule_reload()
+        return self._snapshot
+
+    def invalidate(self, data_types: Optional[Iterable[str]] = None, version: Optional[int] = None):
+        """Mark data types (or everything, if None) for reload on the next read"""
+        if data_types is None or self._dirty is None:
+            self._dirty = None
+        else:
+            self._dirty |= set(data_types)
+        if version is not None:
+            self._target_version = max(version, self._target_version or 0)
+
+    async def publish_refresh(self, data_types: List[str]) -> Optional[int]:
+        """
+        Announce that data types changed: bump the dataset version and tell every pod
+
+        This pod reloads before returning, so its next read sees the change.
+
+        Returns:
+            The new dataset version, or None if Redis is unavailable
+        """
+        version = None
+        try:
+            version = await self._redis.incr(self.VERSION_KEY)
+            await self._redis.publish(
+                self.CHANNEL, json.dumps({"version": version, "data_types": data_types})
+            )
+        except (RedisError, OSError) as e:
+            logger.warning(f"Could not publish market data version: {e}")
+        self.invalidate(data_types, version)
+        if self.enabled:
+            await self._reload_now()
+        return version
+
+    def _needs_reload(self) -> bool:
+        if self._snapshot is None or self._dirty is None or self._dirty:
+            return True
+        return time.monotonic() - self._snapshot.loaded_at > self.max_age
+
+    def _schedule_reload(self):
+        """Start a background reload unless one is running or backing off"""
+        if self._reload_task is not None and not self._reload_task.done():
+            return
+        if time.monotonic() < self._retry_at:
+            return
+        self._reload_task = asyncio.create_task(self._reload_now())
+
+    async def _reload_now(self) -> bool:
+        """Reload if still needed; on failure, back off before the next background attempt"""
+        async with self._lock:
+            if not self._needs_reload():
+                return True
+            try:
+                await self._reload()
+            except Exception as e:
+                self._failures += 1
+                delay = min(self.RETRY_MAX_SECONDS, self.RETRY_MIN_SECONDS * 2 ** (self._failures - 1))
+                self._retry_at = time.monotonic() + delay
+                logger.error(f"Failed to load market data cache, retrying in {delay:.0f}s: {e}")
+                return False
+            self._failures = 0
+            self._retry_at = 0.0
+            return True
+
+    async def _current_version(self) -> Tuple[int, bool]:
+        """(version, whether it is the shared one from Redis)"""
+        try:
+            return int(await self._redis.get(self.VERSION_KEY) or 0), True
+        except (RedisError, OSError) as e:
+            logger.warning(f"Could not read market data version: {e}")
+        # Without Redis, versions only need to move forward within this pod
+        self._local_version = max(self._local_version, self.version or 0) + 1
+        return self._local_version, False
+
+    async def _reload(self):
+        start = time.perf_counter()
+        previous = self._snapshot
+        stale = previous is None or time.monotonic() - previous.loaded_at > self.max_age
+        data_types = None if stale or self._dirty is None else set(self._dirty)
+        target = self._target_version
+        self._dirty = set()
+        self._target_version = None
+
+        try:
+            current, shared = await self._current_version()
+            version = max(target or 0, current)
+            by_type, latest, series = await self._load(data_types)
+        except Exception:
+            # Keep what needs reloading for the next attempt
+            self.invalidate(data_types, target)
+            raise
+
+        if data_types is not None:
+            # Patch: keep unchanged data types from the previous snapshot
+            by_type = {**{k: v for k, v in previous.by_type.items() if k not in data_types}, **by_type}
+            latest = {**{k: v for k, v in previous.latest.items() if k not in data_types}, **latest}
+            series = {
+                **{k: v for k, v in previous.series.items() if k.split(".", 1)[0] not in data_types},
+                **series
+            }
+
+        if previous is not None and previous.version == version and previous.shared == shared:
+            modified_at = previous.modified_at
+        else:
+            modified_at = datetime.now(timezone.utc)
+
+        self._snapshot = MarketDataSnapshot(
+            version=version,
+            loaded_at=time.monotonic(),
+            modified_at=modified_at,
+            by_type=by_type,
+            all_rows=RowArrays.concat(by_type.values()),
+            latest=latest,
+            series=series,
+            shared=shared
+        )
+
+        kind = "full" if data_types is None else "patch"
+        MARKET_CACHE_RELOADS.labels(kind=kind).inc()
+        MARKET_CACHE_RELOAD_DURATION.observe(time.perf_counter() - start)
+        MARKET_CACHE_VERSION.set(version)
+        logger.info(
+            f"Market data cache {kind} reload at version {version}: "
+            f"{len(self._snapshot.all_rows.dates)} rows, {len(series)} series "
+            f"in {time.perf_counter() - start:.3f}s"
+        )
+
+    async def _load(self, data_types: Optional[set]):
+        """Read market data rows and observations for some (or all) data types"""
+        rows_query = select(
+            MarketData.id, MarketData.date, MarketData.data_type, MarketData.data_source,
+            MarketData.processed_data, MarketData.raw_data, MarketData.created_at
+        ).order_by(MarketData.data_type, MarketData.date, MarketData.id)
+        obs_query = select(
+            MarketObservation.series, MarketObservation.date, MarketObservation.value
+        ).order_by(MarketObservation.series, MarketObservation.date)
+        if data_types is not None:
+            rows_query = rows_query.where(MarketData.data_type.in_(data_types))
+            obs_query = obs_query.where(MarketObservation.data_type.in_(data_types))
+
+        async with self.session_factory() as db:
+            rows = (await db.execute(rows_query)).all()
+            observations = (await db.execute(obs_query)).all()
+
+        grouped: Dict[str, Tuple[list, list, list]] = {}
+        latest = {}
+        for row in rows:
+            dates, ids, bodies = grouped.setdefault(row.data_type, ([], [], []))
+            dates.append(row.date)
+            ids.append(row.id)
+            bodies.append({
+                "id": row.id,
+                "date": row.date,
+                "data_type": row.data_type,
+                "data_source": row.data_source,
+                "processed_data": row.processed_data,
+                "created_at": row.created_at
+            })
+            # Rows arrive in date order, so the last one per type wins
+            latest[row.data_type] = {
+                "data_type": row.data_type,
+                "date": row.date,
+                "data": row.processed_data or row.raw_data,
+                "source": row.data_source
+            }
+        by_type = {data_type: RowArrays.build(*parts) for data_type, parts in grouped.items()}
+
+        series = {}
+        if observations:
+            names = np.array([o.series for o in observations], dtype=object)
+            dates = np.array([o.date for o in observations], dtype=DATETIME_UNIT)
+            values = np.array([o.value for o in observations], dtype=np.float64)
+            # Rows are sorted by series, so each one is a contiguous slice
+            boundaries = np.flatnonzero(names[1:] != names[:-1]) + 1
+            for lo, hi in zip(np.r_[0, boundaries], np.r_[boundaries, len(names)]):
+                series[names[lo]] = SeriesArrays(dates[lo:hi], values[lo:hi])
+
+        return by_type, latest, series
+
+    async def _listen(self):
+        """Apply invalidations published by other pods; reconnect on errors"""
+        while True:
+            pubsub = self._redis.pubsub()
+            try:
+                await pubsub.subscribe(self.CHANNEL)
+                async for message in pubsub.listen():
+                    if message.get("type") != "message":
+                        continue
+                    payload = json.loads(message["data"])
+                    if self.version is not None and payload["version"] <= self.version:
+                        continue
+                    self.invalidate(payload.get("data_types"), payload["version"])
+            except asyncio.CancelledError:
+                raise
+            except (RedisError, OSError, ValueError, KeyError) as e:
+                logger.warning(f"Market data invalidation listener error: {e}")
+                await asyncio.sleep(5)
+            finally:
+                await pubsub.aclose()
+
+market_cache = MarketDataCache()
@@ -0,0 +1,42 @@
+"""
+Prometheus metrics for the API gateway
+"""
+from prometheus_client import Counter, Gauge, Histogram
+
+ML_CLIENT_CONNECTIONS = Gauge(
+    'ml_client_pool_connections', 'Pooled connections to the ML service', ['state']
+)
+ML_CLIENT_POOL_LIMIT = Gauge('ml_client_pool_max_connections', 'Connection pool size limit')
+ML_CLIENT_QUEUED = Gauge('ml_client_pool_queued_requests', 'Requests waiting for a pooled connection')
+ML_CLIENT_IN_FLIGHT = Gauge('ml_client_requests_in_flight', 'Requests in flight to the ML service')
+ML_CLIENT_REQUEST_DURATION = Histogram(
+    'ml_client_request_duration_seconds', 'Latency of ML service calls', ['endpoint']
+)
+ML_CLIENT_RETRIES = Counter('ml_client_retries_total', 'ML service calls retried on another attempt')
+ML_CLIENT_HEDGES = Counter('ml_client_hedged_requests_total', 'ML service calls hedged to a second replica')
+ML_UPSTREAM_CIRCUIT_STATE = Gauge(
+    'ml_upstream_circuit_state', 'Circuit state per replica (0 closed, 1 half-open, 2 open)', ['upstream']
+)
+ML_UPSTREAM_LATENCY_EWMA = Gauge(
+    'ml_upstream_latency_ewma_seconds', 'Smoothed response latency per replica', ['upstream']
+)
+PREDICTION_CACHE_REQUESTS = Counter(
+    'prediction_cache_requests_total', 'Prediction cache lookups by outcome', ['result']
+)
+HISTORY_QUEUE_DEPTH = Gauge('prediction_history_queue_depth', 'Prediction history rows waiting to be written')
+HISTORY_FLUSH_DURATION = Histogram('prediction_history_flush_seconds', 'Time spent writing a batch of history rows')
+HISTORY_ROWS_WRITTEN = Counter('prediction_history_rows_written_total', 'Prediction history rows inserted')
+HISTORY_ROWS_DROPPED = Counter(
+    'prediction_history_rows_dropped_total', 'Prediction history rows discarded', ['reason']
+)
+HISTORY_ROWS_SPILLED = Counter('prediction_history_rows_spilled_total', 'Prediction history rows spilled to disk')
+MARKET_CACHE_RELOADS = Counter(
+    'market_data_cache_reloads_total', 'Market data cache reloads', ['kind']
+)
+MARKET_CACHE_RELOAD_DURATION = Histogram(
+    'market_data_cache_reload_seconds', 'Time spent loading market data into the cache'
+)
+MARKET_CACHE_VERSION = Gauge('market_data_cache_version', 'Dataset version held by the market data cache')
+CONDITIONAL_RESPONSES = Counter(
+    'conditional_responses_total', 'Versioned GET responses by outcome', ['result']
+)
@@ -0,0 +1,375 @@
+"""
+Shared HTTP client for calls from the gateway to the ML service
+"""
+import asyncio
+import time
+import httpx
+from typing import Dict, Any, List, Optional
+from app.core.config import settings
+from app.utils.metrics import (
+    ML_CLIENT_CONNECTIONS, ML_CLIENT_IN_FLIGHT, ML_CLIENT_POOL_LIMIT,
+    ML_CLIENT_QUEUED, ML_CLIENT_REQUEST_DURATION, ML_CLIENT_RETRIES,
+    ML_CLIENT_HEDGES, ML_UPSTREAM_CIRCUIT_STATE, ML_UPSTREAM_LATENCY_EWMA
+)
+from app.utils.resilience import (
+    DEADLINE_HEADER, RetryBudget, Upstream, UpstreamUnavailable, pick_upstream
+)
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Upstream statuses worth another replica's attempt
+RETRYABLE_STATUS = {502, 503, 504}
+
+CIRCUIT_STATE_VALUES = {"closed": 0, "half_open": 1, "open": 2}
+
+class MLClient:
+    """
+    Application-lifetime connection pool to the ML service
+
+    One client is created at startup and shared by every request, so
+    connections (and TLS sessions) are reused instead of being set up per
+    prediction. When the services are co-located the client can talk over
+    a Unix domain socket instead of TCP.
+
+    Requests are spread over the configured replicas by latency, with a
+    circuit breaker per replica, a shared retry budget and optional
+    hedging.
+    """
+
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        urls: Optional[List[str]] = None,
+        timeout: Optional[float] = None,
+        max_connections: Optional[int] = None,
+        max_keepalive: Optional[int] = None,
+        keepalive_expiry: Optional[float] = None,
+        http2: Optional[bool] = None,
+        uds: Optional[str] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        attempt_timeout: Optional[float] = None,
+        max_retries: Optional[int] = None,
+        hedge: Optional[bool] = None,
+        hedge_delay_ms: Optional[float] = None
+    ):
+        if urls is None:
+            urls = [base_url] if base_url else (settings.ML_SERVICE_URLS or [settings.ML_SERVICE_URL])
+        self.upstreams = [
+            Upstream(
+                url,
+                failure_threshold=settings.ML_SERVICE_BREAKER_FAILURES,
+                reset_timeout=settings.ML_SERVICE_BREAKER_RESET
+            )
+            for url in urls
+        ]
+        self.retry_budget = RetryBudget(
+            ratio=settings.ML_SERVICE_RETRY_BUDGET_RATIO,
+            min_retries_per_second=settings.ML_SERVICE_RETRY_MIN_PER_SECOND
+        )
+        self.max_retries = settings.ML_SERVICE_MAX_RETRIES if max_retries is None else max_retries
+        self.hedge = settings.ML_SERVICE_HEDGE if hedge is None else hedge
+        self.hedge_delay = (hedge_delay_ms or settings.ML_SERVICE_HEDGE_DELAY_MS) / 1000.0
+
+        self.timeout = timeout if timeout is not None else settings.ML_SERVICE_TIMEOUT
+        # Slow answers (large batches, synchronous explanations) keep the whole
+        # call timeout unless a shorter per-attempt one is configured
+        self.attempt_timeout = attempt_timeout or settings.ML_SERVICE_ATTEMPT_TIMEOUT or self.timeout
+        self.max_connections = max_connections or settings.ML_SERVICE_MAX_CONNECTIONS
+        self.max_keepalive = max_keepalive or settings.ML_SERVICE_MAX_KEEPALIVE
+        self.keepalive_expiry = (
+            keepalive_expiry if keepalive_expiry is not None
+            else settings.ML_SERVICE_KEEPALIVE_EXPIRY
+        )
+        self.http2 = settings.ML_SERVICE_HTTP2 if http2 is None else http2
+        self.uds = uds if uds is not None else settings.ML_SERVICE_UDS
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self.in_flight = 0
+
+    async def start(self):
+        """Open the connection pool"""
+        if self._client is not None:
+            return
+
+        limits = httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive,
+            keepalive_expiry=self.keepalive_expiry
+        )
+        transport = self._transport
+        if transport is None:
+            # Over a Unix socket the replica URL only supplies the Host header
+            transport = httpx.AsyncHTTPTransport(
+                limits=limits,
+                http2=self.http2,
+                uds=self.uds or None
+            )
+
+        self._client = httpx.AsyncClient(
+            timeout=self.timeout,
+            limits=limits,
+            http2=self.http2,
+            transport=transport
+        )
+        ML_CLIENT_POOL_LIMIT.set(self.max_connections)
+        logger.info(
+            f"ML service client started: {', '.join(u.url for u in self.upstreams)}"
+            f"{' via ' + self.uds if self.uds else ''}, "
+            f"max_connections={self.max_connections}, http2={self.http2}"
+        )
+
+    async def close(self):
+        """Close the connection pool"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            logger.info("ML service client closed")
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        idempotent: Optional[bool] = None,
+        hedge: Optional[bool] = None,
+        deadline: Optional[float] = None,
+        **kwargs
+    ) -> httpx.Response:
+        """
+        Send a request to the ML service over the shared pool
+
+        Idempotent requests that fail with a connection error, timeout or
+        5xx are retried on another replica while the retry budget allows,
+        and may be hedged: if the first replica hasn't answered within its
+        recent p95 latency, a second replica is asked too and the first
+        good answer wins.
+
+        Args:
+            method: HTTP method
+            path: Path relative to the ML service base URL
+            idempotent: Whether the call is safe to retry (default: GET/HEAD)
+            hedge: Whether to hedge (default: ML_SERVICE_HEDGE for idempotent calls)
+            deadline: Absolute deadline (epoch seconds) across all attempts
+            **kwargs: Passed through to httpx (json, params, timeout, ...)
+
+        Returns:
+            The ML service response
+
+        Raises:
+            UpstreamUnavailable: every replica's circuit is open
+            httpx.RequestError: the last attempt failed to get a response
+        """
+        if self._client is None:
+            # Lazily open the pool, e.g. when lifespan hooks did not run
+            await self.start()
+
+        if idempotent is None:
+            idempotent = method.upper() in ("GET", "HEAD")
+        hedge = idempotent and (self.hedge if hedge is None else hedge)
+        if deadline is None:
+            deadline = time.time() + self.timeout
+        attempts = 1 + (self.max_retries if idempotent else 0)
+
+        self.retry_budget.record_request()
+        tried = set()
+        last_error: Optional[Exception] = None
+        last_response: Optional[httpx.Response] = None
+
+        for attempt in range(attempts):
+            if attempt:
+                if time.time() >= deadline or not self.retry_budget.withdraw():
+                    break
+                ML_CLIENT_RETRIES.inc()
+
+            # Prefer a replica not tried yet, but retry the same one if it's all we have
+            upstream = pick_upstream(self.upstreams, exclude=tried) or pick_upstream(self.upstreams)
+            if upstream is None:
+                break
+            tried.add(upstream)
+
+            try:
+                if hedge and len(self.upstreams) > 1:
+                    response = await self._hedged(upstream, tried, method, path, deadline, kwargs)
+                else:
+                    response = await self._attempt(upstream, method, path, deadline, kwargs)
+            except httpx.RequestError as e:
+                logger.warning(f"ML service call to {upstream.url}{path} failed: {e!r}")
+                last_error = e
+                continue
+
+            if response.status_code not in RETRYABLE_STATUS:
+                return response
+            last_response = response
+
+        if last_response is not None:
+            return last_response
+        if last_error is not None:
+            raise last_error
+        raise UpstreamUnavailable("No ML service replica is available")
+
+    async def _attempt(
+        self,
+        upstream: Upstream,
+        method: str,
+        path: str,
+        deadline: float,
+        kwargs: Dict[str, Any]
+    ) -> httpx.Response:
+        """Send one attempt to one replica and record the outcome"""
+        kwargs = dict(kwargs)
+        remaining = deadline - time.time()
+        timeout = min(kwargs.pop("timeout", None) or self.attempt_timeout, remaining)
+
+        if timeout <= 0:
+            upstream.breaker.record_cancelled()
+            raise httpx.TimeoutException("Deadline exceeded before sending")
+
+        headers = dict(kwargs.pop("headers", None) or {})
+        headers[DEADLINE_HEADER] = f"{deadline:.3f}"
+        request = self._client.build_request(
+            method, upstream.url + path, headers=headers, timeout=timeout, **kwargs
+        )
+
+        upstream.in_flight += 1
+        self.in_flight += 1
+        ML_CLIENT_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            # httpx timeouts are per phase; bound the whole exchange as well
+            response = await asyncio.wait_for(self._client.send(request), timeout)
+        except asyncio.TimeoutError:
+            upstream.stats.observe_failure(self.attempt_timeout)
+            upstream.breaker.record_failure()
+            raise httpx.TimeoutException(f"No response within {timeout:.3f}s", request=request)
+        except httpx.RequestError:
+            upstream.stats.observe_failure(self.attempt_timeout)
+            upstream.breaker.record_failure()
+            raise
+        except asyncio.CancelledError:
+            upstream.breaker.record_cancelled()
+            raise
+        finally:
+            upstream.in_flight -= 1
+            self.in_flight -= 1
+            ML_CLIENT_IN_FLIGHT.dec()
+            ML_CLIENT_REQUEST_DURATION.labels(endpoint=path).observe(time.perf_counter() - start)
+
+        if response.status_code >= 500:
+            upstream.stats.observe_failure(self.attempt_timeout)
+            upstream.breaker.record_failure()
+        else:
+            upstream.stats.observe(time.perf_counter() - start)
+            upstream.breaker.record_success()
+        return response
+
+    async def _hedged(
+        self,
+        primary: Upstream,
+        tried: set,
+        method: str,
+        path: str,
+        deadline: float,
+        kwargs: Dict[str, Any]
+    ) -> httpx.Response:
+        """Race a second replica against a primary that is slower than usual"""
+        delay = primary.stats.percentile(0.95)
+        if delay is None:
+            delay = self.hedge_delay
+
+        tasks = [asyncio.ensure_future(self._attempt(primary, method, path, deadline, kwargs))]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if done:
+                return tasks[0].result()
+
+            secondary = pick_upstream(self.upstreams, exclude=tried)
+            if secondary is None:
+                return await tasks[0]
+            if not self.retry_budget.withdraw():
+                secondary.breaker.record_cancelled()
+                return await tasks[0]
+
+            tried.add(secondary)
+            ML_CLIENT_HEDGES.inc()
+            tasks.append(asyncio.ensure_future(self._attempt(secondary, method, path, deadline, kwargs)))
+
+            # First good answer wins; otherwise report the last failure
+            pending = set(tasks)
+            outcome = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None and task.result().status_code not in RETRYABLE_STATUS:
+                        return task.result()
+                    outcome = task
+
+            return outcome.result()
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def get(self, path: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", path, **kwargs)
+
+    async def post(self, path: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", path, **kwargs)
+
+    def pool_stats(self) -> Dict[str, Any]:
+        """Current pool utilization"""
+        stats = {
+            "max_connections": self.max_connections,
+            "in_flight": self.in_flight,
+            "active": 0,
+            "idle": 0,
+            "queued": 0
+        }
+        # httpcore doesn't expose pool stats publicly; custom transports
+        # (e.g. in tests) have no pool at all
+        pool = getattr(getattr(self._client, "_transport", None), "_pool", None)
+        if pool is None:
+            return stats
+
+        for connection in list(pool.connections):
+            if connection.is_closed():
+                continue
+            if connection.is_idle():
+                stats["idle"] += 1
+            else:
+                stats["active"] += 1
+        stats["queued"] = sum(
+            1 for pool_request in list(getattr(pool, "_requests", []))
+            if pool_request.is_queued()
+        )
+        return stats
+
+    def upstream_stats(self) -> List[Dict[str, Any]]:
+        """Routing state of each replica"""
+        return [
+            {
+                "url": upstream.url,
+                "circuit": upstream.breaker.state,
+                "latency_ewma_ms": (
+                    round(upstream.stats.ewma * 1000, 2) if upstream.stats.ewma is not None else None
+                ),
+                "in_flight": upstream.in_flight
+            }
+            for upstream in self.upstreams
+        ]
+
+    def export_metrics(self):
+        """Copy pool and replica state into the Prometheus gauges"""
+        stats = self.pool_stats()
+        ML_CLIENT_CONNECTIONS.labels(state="active").set(stats["active"])
+        ML_CLIENT_CONNECTIONS.labels(state="idle").set(stats["idle"])
+        ML_CLIENT_QUEUED.set(stats["queued"])
+
+        for upstream in self.upstreams:
+            ML_UPSTREAM_CIRCUIT_STATE.labels(upstream=upstream.url).set(
+                CIRCUIT_STATE_VALUES[upstream.breaker.state]
+            )
+            if upstream.stats.ewma is not None:
+                ML_UPSTREAM_LATENCY_EWMA.labels(upstream=upstream.url).set(upstream.stats.ewma)
+
+# Shared instance, opened and closed by the application lifespan hooks
+ml_client = MLClient()
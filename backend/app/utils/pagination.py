@@ -0,0 +1,29 @@
+"""
+Keyset pagination cursors
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Tuple
+
+# Response header carrying the cursor for the next page
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def encode_cursor(date: datetime, id: int) -> str:
+    """Opaque cursor for the position after a (date, id) row"""
+    payload = json.dumps({"d": date.isoformat(), "i": id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    Parse a cursor made by encode_cursor
+    
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(payload["d"]), int(payload["i"])
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
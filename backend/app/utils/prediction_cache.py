@@ -0,0 +1,191 @@
+"""
+Prediction response cache in Redis, shared by all gateway pods
+"""
+import asyncio
+import hashlib
+import json
+import time
+import redis.asyncio as aioredis
+from redis.exceptions import RedisError
+from typing import Dict, Any, Optional
+from app.core.config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+class PredictionCache:
+    """
+    Caches ML service answers by canonical features and concrete model version
+
+    Entries are fresh for `ttl` seconds and may then be served stale for
+    another `stale_ttl` seconds while one pod refreshes them. Requests for
+    "latest" are keyed by the version the ML service last reported behind
+    it; when that changes, older entries simply stop being looked up and
+    expire. The ML service publishes on CHANNEL when it swaps models and
+    every pod drops that version entry from its own database, so the next
+    "latest" request misses and re-resolves it instead of serving the old
+    model's answers for up to `version_ttl` seconds.
+
+    Redis being unavailable is treated as a cache miss.
+    """
+
+    KEY_PREFIX = "prediction_cache"
+    CHANNEL = "prediction_cache:invalidate"
+
+    def __init__(
+        self,
+        redis_url: Optional[str] = None,
+        ttl: Optional[int] = None,
+        stale_ttl: Optional[int] = None,
+        version_ttl: Optional[int] = None,
+        lock_ttl: int = 30,
+        enabled: Optional[bool] = None
+    ):
+        self.enabled = settings.PREDICTION_CACHE_ENABLED if enabled is None else enabled
+        self.ttl = ttl or settings.PREDICTION_CACHE_TTL
+        self.stale_ttl = settings.PREDICTION_CACHE_STALE_TTL if stale_ttl is None else stale_ttl
+        self.version_ttl = version_ttl or settings.PREDICTION_CACHE_VERSION_TTL
+        self.lock_ttl = lock_ttl
+        self._redis = aioredis.from_url(redis_url or settings.REDIS_URL, decode_responses=True)
+        self._listener: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def feature_digest(features: Dict[str, float]) -> str:
+        """Hash of the feature vector, independent of key order and int/float spelling"""
+        canonical = json.dumps(
+            {name: float(value) for name, value in features.items()},
+            sort_keys=True,
+            separators=(",", ":")
+        )
+        return hashlib.sha256(canonical.encode()).hexdigest()
+
+    def key(self, features: Dict[str, float], version: str) -> str:
+        return f"{self.KEY_PREFIX}:{version}:{self.feature_digest(features)}"
+
+    @property
+    def _latest_version_key(self) -> str:
+        return f"{self.KEY_PREFIX}:latest_version"
+
+    async def resolve_version(self, model_version: str) -> Optional[str]:
+        """Concrete version for a requested one, or None if not known yet"""
+        if model_version != "latest":
+            return model_version
+        return await self._redis.get(self._latest_version_key)
+
+    async def get(self, features: Dict[str, float], model_version: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached prediction
+
+        Returns:
+            None on a miss, otherwise a dict with the cached ML service
+            `result`, whether it is `stale`, and its cache `key`
+        """
+        if not self.enabled:
+            return None
+
+        try:
+            version = await self.resolve_version(model_version)
+            if version is None:
+                return None
+
+            key = self.key(features, version)
+            raw = await self._redis.get(key)
+        except (RedisError, OSError) as e:
+            logger.warning(f"Prediction cache lookup failed: {e}")
+            return None
+
+        if raw is None:
+            return None
+
+        entry = json.loads(raw)
+        return {
+            "result": entry["result"],
+            "stale": time.time() - entry["cached_at"] > self.ttl,
+            "key": key
+        }
+
+    async def set(
+        self,
+        features: Dict[str, float],
+        model_version: str,
+        resolved_version: str,
+        result: Dict[str, Any]
+    ):
+        """Store an ML service answer and remember the version behind "latest" """
+        if not self.enabled:
+            return
+
+        try:
+            if model_version == "latest":
+                previous = await self._redis.get(self._latest_version_key)
+                if previous is not None and previous != resolved_version:
+                    logger.info(f"Latest model changed {previous} -> {resolved_version}; cached predictions invalidated")
+                await self._redis.set(self._latest_version_key, resolved_version, ex=self.version_ttl)
+
+            entry = json.dumps({"result": result, "cached_at": time.time()})
+            await self._redis.set(
+                self.key(features, resolved_version), entry, ex=self.ttl + self.stale_ttl
+            )
+        except (RedisError, OSError) as e:
+            logger.warning(f"Prediction cache store failed: {e}")
+
+    async def acquire_refresh_lock(self, key: str) -> bool:
+        """Claim the refresh of a stale entry so only one pod revalidates it"""
+        try:
+            return bool(await self._redis.set(f"{key}:refresh", "1", nx=True, ex=self.lock_ttl))
+        except (RedisError, OSError) as e:
+            logger.warning(f"Prediction cache lock failed: {e}")
+            return False
+
+    async def release_refresh_lock(self, key: str):
+        try:
+            await self._redis.delete(f"{key}:refresh")
+        except (RedisError, OSError) as e:
+            logger.warning(f"Prediction cache unlock failed: {e}")
+
+    async def drop_latest_version(self, announced: Optional[str] = None):
+        """Forget the version behind "latest" so the next request re-resolves it"""
+        try:
+            await self._redis.delete(self._latest_version_key)
+            logger.info(f"Latest model changed to {announced}; cached predictions invalidated")
+        except (RedisError, OSError) as e:
+            logger.warning(f"Prediction cache invalidation failed: {e}")
+
+    async def start(self):
+        """Subscribe to model swaps announced by the ML service"""
+        if self.enabled and self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        await self.close()
+
+    async def close(self):
+        await self._redis.aclose()
+
+    async def _listen(self):
+        """Drop the "latest" version on every announced model swap; reconnect on errors"""
+        while True:
+            pubsub = self._redis.pubsub()
+            try:
+                await pubsub.subscribe(self.CHANNEL)
+                async for message in pubsub.listen():
+                    if message.get("type") != "message":
+                        continue
+                    payload = json.loads(message["data"])
+                    await self.drop_latest_version(payload.get("latest_version"))
+            except asyncio.CancelledError:
+                raise
+            except (RedisError, OSError, ValueError) as e:
+                logger.warning(f"Prediction cache invalidation listener error: {e}")
+                await asyncio.sleep(5)
+            finally:
+                await pubsub.aclose()
+
+prediction_cache = PredictionCache()
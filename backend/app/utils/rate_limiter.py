@@ -1,108 +1,203 @@
 """
 Rate limiting utility using Redis
 """
-import redis
+import math
 import time
-import asyncio
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional
+import redis.asyncio as aioredis
+from redis.exceptions import RedisError
 from app.core.config import settings
 import logging
 
 logger = logging.getLogger(__name__)
 
-# Redis client
-try:
-    redis_client = redis.from_url(settings.REDIS_URL, decode_responses=True)
-except Exception as e:
-    logger.warning(f"Redis connection failed: {e}. Rate limiting will be disabled.")
-    redis_client = None
-
-async def rate_limit(
-    identifier: str,
-    limit: int = 100,
-    window: int = 60
-) -> bool:
+# Generic cell rate algorithm: the key holds the "theoretical arrival time"
+# (TAT) of the next request. Each request pushes it forward by
+# window / limit per unit of cost; a request is rejected when that would
+# put the TAT more than one window ahead of now. Uses the Redis clock so
+# gateway pods with skewed clocks agree.
+GCRA_SCRIPT = """
+if redis.replicate_commands then redis.replicate_commands() end
+local emission = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local tat = tonumber(redis.call('GET', KEYS[1]))
+if tat == nil or tat < now then
+    tat = now
+end
+
+local new_tat = tat + emission * cost
+local retry_after = new_tat - window - now
+if retry_after > 0 then
+    local remaining = math.floor((window - (tat - now)) / emission)
+    return {0, remaining, tostring(tat - now), tostring(retry_after)}
+end
+
+redis.call('SET', KEYS[1], tostring(new_tat), 'PX', math.ceil((new_tat - now) * 1000))
+local remaining = math.floor((window - (new_tat - now)) / emission)
+return {1, remaining, tostring(new_tat - now), '0'}
+"""
+
+# Every header RateLimitResult.headers() can set
+RATE_LIMIT_HEADERS = ["X-RateLimit-Limit", "X-RateLimit-Remaining", "X-RateLimit-Reset", "Retry-After"]
+
+@dataclass
+class RateLimitResult:
+    """Outcome of a rate limit check"""
+    allowed: bool
+    limit: int
+    remaining: Optional[int] = None
+    reset_after: Optional[float] = None  # seconds until the full limit is available again
+    retry_after: Optional[float] = None  # seconds until this request would be allowed
+
+    def headers(self) -> Dict[str, str]:
+        """X-RateLimit-* headers (and Retry-After when rejected)"""
+        headers = {"X-RateLimit-Limit": str(self.limit)}
+        if self.remaining is not None:
+            headers["X-RateLimit-Remaining"] = str(max(0, self.remaining))
+        if self.reset_after is not None:
+            headers["X-RateLimit-Reset"] = str(math.ceil(self.reset_after))
+        if not self.allowed and self.retry_after is not None:
+            headers["Retry-After"] = str(max(1, math.ceil(self.retry_after)))
+        return headers
+
+class LocalTokenBucket:
     """
-    Rate limiting using sliding window counter
-    
-    Args:
-        identifier: Unique identifier (IP, user ID, etc.)
-        limit: Maximum requests allowed in window
-        window: Time window in seconds
-    
-    Returns:
-        True if request is allowed, False if rate limited
+    In-process token buckets, one per identifier
+
+    A pod only sees part of an identifier's traffic, so when its own bucket
+    for the same limit and window is empty the shared limit is certainly
+    exceeded too. That lets floods be rejected without a Redis round-trip.
+    Least recently seen identifiers are evicted past `max_keys`.
     """
-    if not redis_client:
-        # If Redis is unavailable, allow all requests
-        return True
-    
-    try:
-        key = f"rate_limit:{identifier}"
-        current_time = int(time.time())
-        
-        # Use Redis pipeline for atomic operations
-        pipe = redis_client.pipeline()
-        
-        # Remove expired entries
-        pipe.zremrangebyscore(key, 0, current_time - window)
-        
-        # Count current requests in window
-        pipe.zcard(key)
-        
-        # Add current request
-        pipe.zadd(key, {str(current_time): current_time})
-        
-        # Set expiration
-        pipe.expire(key, window)
-        
-        results = pipe.execute()
-        
-        # Check if under limit (before adding current request)
-        current_count = results[1]
-        
-        if current_count >= limit:
-            # Remove the request we just added since it's rate limited
-            redis_client.zrem(key, str(current_time))
-            return False
-        
-        return True
-        
-    except Exception as e:
-        logger.error(f"Rate limiting error: {e}")
-        # If there's an error, allow the request
-        return True
-
-async def get_rate_limit_status(identifier: str, window: int = 60) -> dict:
+
+    def __init__(self, max_keys: int = 10000):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, list]" = OrderedDict()
+
+    def consume(self, identifier: str, limit: int, window: int, cost: int = 1) -> Optional[float]:
+        """
+        Take `cost` tokens
+
+        Returns:
+            None if allowed, otherwise seconds until enough tokens refill
+        """
+        rate = limit / window
+        now = time.monotonic()
+        bucket = self._buckets.pop(identifier, None)
+        if bucket is None:
+            bucket = [float(limit), now]
+        else:
+            bucket[0] = min(float(limit), bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+
+        self._buckets[identifier] = bucket
+        if len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+
+        if bucket[0] < cost:
+            return (cost - bucket[0]) / rate
+        bucket[0] -= cost
+        return None
+
+    def refund(self, identifier: str, limit: int, cost: int = 1):
+        """Give back tokens for a request the shared limiter rejected"""
+        bucket = self._buckets.get(identifier)
+        if bucket is not None:
+            bucket[0] = min(float(limit), bucket[0] + cost)
+
+class RateLimiter:
     """
-    Get current rate limit status for an identifier
+    Shared rate limit across gateway pods, one Redis round-trip per check
+
+    Checks run as a single atomic script, with an optional local token
+    bucket in front of it. Redis being unavailable allows the request.
     """
-    if not redis_client:
-        return {"requests": 0, "limit": settings.RATE_LIMIT_REQUESTS, "window": window}
-    
-    try:
-        key = f"rate_limit:{identifier}"
-        current_time = int(time.time())
-        
-        # Clean up expired entries and count current requests
-        redis_client.zremrangebyscore(key, 0, current_time - window)
-        current_count = redis_client.zcard(key)
-        
+
+    KEY_PREFIX = "rate_limit:gcra"
+
+    def __init__(self, redis_url: Optional[str] = None, local_bucket: Optional[bool] = None):
+        use_local = settings.RATE_LIMIT_LOCAL_BUCKET if local_bucket is None else local_bucket
+        self.local = LocalTokenBucket() if use_local else None
+        self._redis = aioredis.from_url(redis_url or settings.REDIS_URL, decode_responses=True)
+        self._script = self._redis.register_script(GCRA_SCRIPT)
+
+    def key(self, identifier: str) -> str:
+        return f"{self.KEY_PREFIX}:{identifier}"
+
+    async def hit(
+        self,
+        identifier: str,
+        limit: int = 100,
+        window: int = 60,
+        cost: int = 1
+    ) -> RateLimitResult:
+        """
+        Count a request against an identifier's limit
+
+        Args:
+            identifier: Unique identifier (IP, user ID, etc.)
+            limit: Maximum requests allowed in window
+            window: Time window in seconds
+            cost: Number of requests this call counts as (e.g. weighted batch size)
+        """
+        if self.local is not None:
+            retry_after = self.local.consume(identifier, limit, window, cost)
+            if retry_after is not None:
+                return RateLimitResult(False, limit, remaining=0, retry_after=retry_after)
+
+        try:
+            allowed, remaining, reset_after, retry_after = await self._script(
+                keys=[self.key(identifier)],
+                args=[window / limit, window, cost]
+            )
+        except (RedisError, OSError) as e:
+            logger.error(f"Rate limiting error: {e}")
+            # If there's an error, allow the request
+            return RateLimitResult(True, limit)
+
+        if not allowed and self.local is not None:
+            self.local.refund(identifier, limit, cost)
+
+        return RateLimitResult(
+            bool(allowed),
+            limit,
+            remaining=int(remaining),
+            reset_after=float(reset_after),
+            retry_after=float(retry_after)
+        )
+
+    async def status(self, identifier: str, limit: int = 100, window: int = 60) -> dict:
+        """
+        Get current rate limit status for an identifier
+        """
+        try:
+            tat = await self._redis.get(self.key(identifier))
+        except (RedisError, OSError) as e:
+            logger.error(f"Error getting rate limit status: {e}")
+            return {"limit": limit, "window": window}
+
+        backlog = max(0.0, float(tat) - time.time()) if tat is not None else 0.0
         return {
-            "requests": current_count,
-            "limit": settings.RATE_LIMIT_REQUESTS,
+            "limit": limit,
             "window": window,
-            "remaining": max(0, settings.RATE_LIMIT_REQUESTS - current_count)
+            "remaining": max(0, math.floor((window - backlog) / (window / limit))),
+            "reset_after": backlog
         }
-        
-    except Exception as e:
-        logger.error(f"Error getting rate limit status: {e}")
-        return {"requests": 0, "limit": settings.RATE_LIMIT_REQUESTS, "window": window}
-
-def reset_rate_limit(identifier: str):
-    """Reset rate limit for an identifier"""
-    if redis_client:
+
+    async def reset(self, identifier: str):
+        """Reset rate limit for an identifier"""
         try:
-            key = f"rate_limit:{identifier}"
-            redis_client.delete(key)
-        except Exception as e:
-            logger.error(f"Error resetting rate limit: {e}")
\ No newline at end of file
+            await self._redis.delete(self.key(identifier))
+        except (RedisError, OSError) as e:
+            logger.error(f"Error resetting rate limit: {e}")
+
+    async def close(self):
+        await self._redis.aclose()
+
+rate_limiter = RateLimiter()
@@ -0,0 +1,149 @@
+"""
+Vectorized resampling and downsampling of indicator series
+"""
+from typing import Dict, List, Optional
+import numpy as np
+
+FREQUENCIES = ("W", "M", "Q")
+AGGREGATIONS = ("mean", "last", "ohlc")
+AGGREGATE_COLUMNS = {"mean": ("value",), "last": ("value",), "ohlc": ("open", "high", "low", "close")}
+
+def period_ends(dates: np.ndarray, freq: str) -> np.ndarray:
+    """
+    Label each date with the last day of its period
+
+    Weeks end on Sunday, months and quarters on their last calendar day,
+    matching pandas' "W", "M" and "Q" resampling labels.
+    """
+    days = dates.astype("datetime64[D]")
+    if freq == "W":
+        # 1970-01-01 was a Thursday; Monday is weekday 0
+        weekday = (days.astype(np.int64) + 3) % 7
+        return days + (6 - weekday)
+    months = days.astype("datetime64[M]")
+    if freq == "Q":
+        months = months - months.astype(np.int64) % 3 + 2
+    elif freq != "M":
+        raise ValueError(f"Unsupported frequency: {freq}")
+    return (months + 1).astype("datetime64[D]") - 1
+
+def group_bounds(keys: np.ndarray) -> np.ndarray:
+    """Start index of each run of equal keys in a sorted array"""
+    if len(keys) == 0:
+        return np.zeros(0, dtype=np.int64)
+    return np.r_[0, np.flatnonzero(keys[1:] != keys[:-1]) + 1]
+
+def aggregate(
+    labels: np.ndarray,
+    values: np.ndarray,
+    starts: np.ndarray,
+    agg: str,
+    closes: Optional[np.ndarray] = None,
+    highs: Optional[np.ndarray] = None,
+    lows: Optional[np.ndarray] = None
+) -> Dict[str, np.ndarray]:
+    """
+    Reduce sorted values over groups beginning at `starts`
+
+    `closes`, `highs` and `lows` default to `values`; they're passed when
+    re-aggregating bars that are already OHLC.
+    """
+    if agg not in AGGREGATE_COLUMNS:
+        raise ValueError(f"Unsupported aggregation: {agg}")
+    if len(starts) == 0:
+        return {"date": labels[:0], **{name: np.zeros(0) for name in AGGREGATE_COLUMNS[agg]}}
+
+    ends = np.r_[starts[1:], len(values)]
+    result = {"date": labels[ends - 1]}
+    if agg == "mean":
+        result["value"] = np.add.reduceat(values, starts) / (ends - starts)
+    elif agg == "last":
+        result["value"] = values[ends - 1]
+    elif agg == "ohlc":
+        closes = values if closes is None else closes
+        result["open"] = values[starts]
+        result["high"] = np.maximum.reduceat(values if highs is None else highs, starts)
+        result["low"] = np.minimum.reduceat(values if lows is None else lows, starts)
+        result["close"] = closes[ends - 1]
+    return result
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets downsampling
+
+    Keeps the first and last points and, from each of `threshold - 2`
+    equal buckets in between, the point forming the largest triangle with
+    the previously kept point and the mean of the next bucket. Keeps the
+    visual shape of a line chart far better than taking every nth point.
+
+    Returns:
+        Sorted indices of the points to keep
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = x.astype(np.float64)
+    edges = np.floor(np.linspace(1, n - 1, threshold - 1)).astype(np.int64)
+    # Mean point of each bucket, used as the third vertex for the bucket before it
+    sizes = np.diff(edges)
+    mean_x = np.add.reduceat(x[:-1], edges[:-1]) / sizes
+    mean_y = np.add.reduceat(y[:-1], edges[:-1]) / sizes
+    mean_x = np.r_[mean_x[1:], x[-1]]
+    mean_y = np.r_[mean_y[1:], y[-1]]
+
+    keep = np.empty(threshold, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        area = np.abs(
+            (x[a] - mean_x[i]) * (y[lo:hi] - y[a])
+            - (x[a] - x[lo:hi]) * (mean_y[i] - y[a])
+        )
+        a = lo + int(np.argmax(area))
+        keep[i + 1] = a
+    return keep
+
+def resample_series(
+    dates: np.ndarray,
+    values: np.ndarray,
+    freq: Optional[str] = None,
+    agg: str = "mean",
+    max_points: Optional[int] = None
+) -> List[dict]:
+    """
+    Resample a date-sorted series and cap the number of points returned
+
+    Args:
+        dates: datetime64 dates, ascending
+        values: Float values aligned with `dates`
+        freq: "W", "M" or "Q" to aggregate into periods, None for raw points
+        agg: "mean" or "last" for one value per period, "ohlc" for bars
+        max_points: Upper bound on points; lines are reduced with LTTB,
+            OHLC bars by merging runs of adjacent bars
+
+    Returns:
+        Points with "date" and either "value" or "open"/"high"/"low"/"close"
+    """
+    if agg not in AGGREGATIONS:
+        raise ValueError(f"Unsupported aggregation: {agg}")
+    labels = dates.astype("datetime64[us]") if freq is None else period_ends(dates, freq).astype("datetime64[us]")
+    starts = np.arange(len(values)) if freq is None else group_bounds(labels)
+    columns = aggregate(labels, values, starts, agg)
+
+    count = len(columns["date"])
+    if max_points is not None and count > max_points:
+        if agg == "ohlc":
+            merged = np.arange(0, count, -(-count // max_points))
+            columns = aggregate(
+                columns["date"], columns["open"], merged, "ohlc",
+                closes=columns["close"], highs=columns["high"], lows=columns["low"]
+            )
+        else:
+            keep = lttb(columns["date"].astype(np.int64), columns["value"], max_points)
+            columns = {name: column[keep] for name, column in columns.items()}
+
+    names = list(columns)
+    as_lists = [columns["date"].astype(object).tolist()] + [columns[n].tolist() for n in names[1:]]
+    return [dict(zip(names, row)) for row in zip(*as_lists)]
@@ -0,0 +1,187 @@
+"""
+Circuit breakers, retry budgets and latency tracking for upstream replicas
+"""
+import random
+import time
+from collections import deque
+from typing import Iterable, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Absolute deadline (Unix epoch seconds) understood by the ML service
+DEADLINE_HEADER = "X-Request-Deadline"
+
+class UpstreamUnavailable(Exception):
+    """Raised when no replica can take a request"""
+
+class CircuitBreaker:
+    """
+    Per-upstream circuit breaker
+
+    Opens after `failure_threshold` consecutive failures and rejects calls
+    for `reset_timeout` seconds. It then lets a single probe through
+    (half-open): success closes the circuit, failure opens it again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 10.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+
+    def available(self) -> bool:
+        """Whether a call could be let through now, without reserving it"""
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN:
+            return time.monotonic() - self.opened_at >= self.reset_timeout
+        return not self._probe_in_flight
+
+    def allow_request(self) -> bool:
+        """Reserve a call; in half-open state only one probe is allowed"""
+        if not self.available():
+            return False
+        if self.state == self.OPEN:
+            self._set_state(self.HALF_OPEN)
+        if self.state == self.HALF_OPEN:
+            self._probe_in_flight = True
+        return True
+
+    def record_success(self):
+        self.failures = 0
+        self._probe_in_flight = False
+        if self.state != self.CLOSED:
+            self._set_state(self.CLOSED)
+
+    def record_failure(self):
+        self.failures += 1
+        self._probe_in_flight = False
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+            if self.state != self.OPEN:
+                self._set_state(self.OPEN)
+
+    def record_cancelled(self):
+        """A call was abandoned (e.g. a losing hedge) without an outcome"""
+        self._probe_in_flight = False
+
+    def _set_state(self, state: str):
+        logger.warning(f"Circuit for {self.name}: {self.state} -> {state}")
+        self.state = state
+
+class RetryBudget:
+    """
+    Caps retries to a fraction of recent traffic
+
+    Within a sliding window, retries are allowed while they stay below
+    `min_retries_per_second * window + ratio * requests`, so a failing
+    upstream can't turn every request into several.
+    """
+
+    def __init__(self, ratio: float = 0.2, min_retries_per_second: float = 1.0, window: float = 10.0):
+        self.ratio = ratio
+        self.min_retries_per_second = min_retries_per_second
+        self.window = window
+        self._requests: deque = deque()
+        self._retries: deque = deque()
+
+    def record_request(self):
+        now = time.monotonic()
+        self._trim(now)
+        self._requests.append(now)
+
+    def withdraw(self) -> bool:
+        """Try to spend one retry; returns False when the budget is exhausted"""
+        now = time.monotonic()
+        self._trim(now)
+        allowed = self.min_retries_per_second * self.window + self.ratio * len(self._requests)
+        if len(self._retries) >= allowed:
+            return False
+        self._retries.append(now)
+        return True
+
+    def _trim(self, now: float):
+        cutoff = now - self.window
+        for timestamps in (self._requests, self._retries):
+            while timestamps and timestamps[0] < cutoff:
+                timestamps.popleft()
+
+class UpstreamStats:
+    """Latency EWMA and recent-latency percentiles for one upstream"""
+
+    def __init__(self, alpha: float = 0.3, window: int = 200, min_samples: int = 20):
+        self.alpha = alpha
+        self.min_samples = min_samples
+        self.ewma: Optional[float] = None
+        self._samples: deque = deque(maxlen=window)
+
+    def observe(self, latency: float):
+        self._samples.append(latency)
+        if self.ewma is None:
+            self.ewma = latency
+        else:
+            self.ewma = self.alpha * latency + (1 - self.alpha) * self.ewma
+
+    def observe_failure(self, penalty: float):
+        """Count a failed call as slow so routing steers away from it"""
+        # Failures are often fast; left alone they would attract traffic.
+        # Only the EWMA is penalised, so percentiles (and hedge delays)
+        # still reflect real response times.
+        if self.ewma is None:
+            self.ewma = penalty
+        else:
+            self.ewma = self.alpha * max(penalty, self.ewma) + (1 - self.alpha) * self.ewma
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Latency percentile over recent calls, or None with too few samples"""
+        if len(self._samples) < self.min_samples:
+            return None
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(q * len(ordered)))
+        return ordered[index]
+
+class Upstream:
+    """One ML service replica"""
+
+    def __init__(self, url: str, failure_threshold: int = 5, reset_timeout: float = 10.0):
+        self.url = url.rstrip("/")
+        self.breaker = CircuitBreaker(self.url, failure_threshold, reset_timeout)
+        self.stats = UpstreamStats()
+        self.in_flight = 0
+
+    def score(self) -> float:
+        """Expected cost of sending one more request here; lower is better"""
+        # Replicas without samples score 0 so they get tried
+        return (self.stats.ewma or 0.0) * (self.in_flight + 1)
+
+def pick_upstream(upstreams: List[Upstream], exclude: Iterable[Upstream] = ()) -> Optional[Upstream]:
+    """
+    Choose a replica by power of two choices on latency EWMA
+
+    Comparing two random candidates instead of always taking the fastest
+    keeps traffic from stampeding onto one replica between updates.
+    Reserves a breaker slot on the chosen replica.
+    """
+    excluded = set(exclude)
+    candidates = [u for u in upstreams if u not in excluded and u.breaker.available()]
+
+    while candidates:
+        if len(candidates) == 1:
+            choice = candidates[0]
+        else:
+            a, b = random.sample(candidates, 2)
+            choice = a if a.score() <= b.score() else b
+        if choice.breaker.allow_request():
+            return choice
+        candidates.remove(choice)
+
+    return None
@@ -0,0 +1,80 @@
+"""
+O(n) rolling statistics and correlations from cumulative sums
+"""
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from app.utils.resampling import aggregate, group_bounds, period_ends
+
+def window_sums(x: np.ndarray, window: int) -> np.ndarray:
+    """Sum of every `window` consecutive values, one cumulative sum for the whole series"""
+    c = np.concatenate(([0.0], np.cumsum(x, dtype=np.float64)))
+    return c[window:] - c[:-window]
+
+def rolling_stats(values: np.ndarray, window: int) -> Dict[str, np.ndarray]:
+    """
+    Rolling mean, sample standard deviation and z-score
+
+    Matches pandas' `rolling(window).mean()/.std()` from the first full
+    window on. Values are centred on the series mean first so the
+    sum-of-squares variance doesn't lose precision on large levels (e.g.
+    USD/KES around 150). Windows with zero variance get a NaN z-score.
+
+    Returns:
+        Arrays of length len(values) - window + 1, aligned to each window's last value
+    """
+    x = values - values.mean()
+    n = float(window)
+    sums = window_sums(x, window)
+    sq_sums = window_sums(x * x, window)
+
+    mean = sums / n
+    var = np.maximum(sq_sums - sums * mean, 0.0) / (n - 1)
+    std = np.sqrt(var)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        zscore = np.where(std > 0, (x[window - 1:] - mean) / std, np.nan)
+    return {"mean": mean + values.mean(), "std": std, "zscore": zscore}
+
+def rolling_correlation(x: np.ndarray, y: np.ndarray, window: int) -> np.ndarray:
+    """Pearson correlation of every window of two aligned series; NaN where either is flat"""
+    x = x - x.mean()
+    y = y - y.mean()
+    n = float(window)
+    sx, sy = window_sums(x, window), window_sums(y, window)
+    cov = window_sums(x * y, window) - sx * sy / n
+    var_x = np.maximum(window_sums(x * x, window) - sx * sx / n, 0.0)
+    var_y = np.maximum(window_sums(y * y, window) - sy * sy / n, 0.0)
+    denominator = np.sqrt(var_x * var_y)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(denominator > 0, cov / denominator, np.nan)
+
+def to_periods(dates: np.ndarray, values: np.ndarray, freq: Optional[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """Period means labelled by period end, or the series unchanged when `freq` is None"""
+    if freq is None or len(dates) == 0:
+        return dates.astype("datetime64[us]"), values
+    labels = period_ends(dates, freq).astype("datetime64[us]")
+    columns = aggregate(labels, values, group_bounds(labels), "mean")
+    return columns["date"], columns["value"]
+
+def align(series: Dict[str, Tuple[np.ndarray, np.ndarray]]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Inner-join date-sorted series on their dates
+
+    Returns:
+        (dates, matrix) with one column per series, in the order given
+    """
+    names = list(series)
+    if not names:
+        return np.zeros(0, dtype="datetime64[us]"), np.empty((0, 0), dtype=np.float64)
+    common = series[names[0]][0]
+    for name in names[1:]:
+        common = np.intersect1d(common, series[name][0], assume_unique=True)
+
+    matrix = np.empty((len(common), len(names)), dtype=np.float64)
+    for i, name in enumerate(names):
+        dates, values = series[name]
+        matrix[:, i] = values[np.searchsorted(dates, common)]
+    return common, matrix
+
+def nullable(values: np.ndarray) -> List[Optional[float]]:
+    """Floats for JSON, with NaN as None"""
+    return [None if v != v else v for v in values.tolist()]
@@ -0,0 +1,99 @@
+"""
+Stub ML service replicas for exercising the gateway's resilience layer
+
+Each replica can be made slow or failing. In tests the replicas are served
+in-process through StubCluster; run this module to serve one over HTTP:
+
+    python tests/stub_ml_service.py --port 8001 --delay 0.5 --fail-rate 0.2
+"""
+import argparse
+import asyncio
+import random
+from typing import Dict
+
+import httpx
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+
+
+def create_stub_app(
+    name: str,
+    delay: float = 0.0,
+    fail_rate: float = 0.0,
+    fail_status: int = 503,
+    prediction: float = 1.0
+) -> FastAPI:
+    """Build a replica; its behaviour can be changed through app.state"""
+    app = FastAPI(title=f"Stub ML service {name}")
+    app.state.name = name
+    app.state.delay = delay
+    app.state.fail_rate = fail_rate
+    app.state.fail_status = fail_status
+    app.state.calls = 0
+
+    @app.post("/predict")
+    async def predict(payload: dict):
+        app.state.calls += 1
+        if app.state.delay:
+            await asyncio.sleep(app.state.delay)
+        if random.random() < app.state.fail_rate:
+            return JSONResponse(status_code=app.state.fail_status, content={"detail": "stub failure"})
+        return {"prediction": prediction, "model_version": name}
+
+    @app.post("/predict/batch")
+    async def predict_batch(payload: dict):
+        app.state.calls += 1
+        app.state.last_payload = payload
+        if app.state.delay:
+            await asyncio.sleep(app.state.delay)
+        if random.random() < app.state.fail_rate:
+            return JSONResponse(status_code=app.state.fail_status, content={"detail": "stub failure"})
+        return {
+            "predictions": [
+                {"index": i, "prediction": prediction + i, "confidence": None, "error": None}
+                for i in range(len(payload["instances"]))
+            ],
+            "model_version": name,
+            "processing_time": 0.0
+        }
+
+    @app.get("/models")
+    async def models():
+        return {"models": [{"name": "investwise_model", "version": name, "status": "available"}]}
+
+    @app.get("/healthz")
+    async def healthz():
+        return {"status": "healthy", "replica": name}
+
+    return app
+
+
+class StubCluster(httpx.AsyncBaseTransport):
+    """Routes requests to in-process replicas by host name"""
+
+    def __init__(self, replicas: Dict[str, FastAPI]):
+        self.replicas = replicas
+        self._transports = {host: httpx.ASGITransport(app=app) for host, app in replicas.items()}
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        transport = self._transports.get(request.url.host)
+        if transport is None:
+            raise httpx.ConnectError(f"Unknown replica {request.url.host}", request=request)
+        return await transport.handle_async_request(request)
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Run a stub ML service replica")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--delay", type=float, default=0.0, help="Seconds to wait before answering")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Fraction of requests that fail")
+    parser.add_argument("--fail-status", type=int, default=503)
+    args = parser.parse_args()
+
+    uvicorn.run(
+        create_stub_app(f"stub-{args.port}", args.delay, args.fail_rate, args.fail_status),
+        host="127.0.0.1",
+        port=args.port
+    )
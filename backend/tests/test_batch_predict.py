@@ -0,0 +1,156 @@
+from datetime import date
+
+import pytest
+from fastapi import BackgroundTasks, HTTPException, Response
+from starlette.requests import Request
+
+from app.api.v1.endpoints import predict
+from app.api.v1.endpoints.predict import BatchPredictionRequest, PredictionRequest, predict_batch
+from app.utils.prediction_cache import PredictionCache
+from app.utils.ml_client import MLClient
+from app.utils.rate_limiter import RateLimitResult
+from stub_ml_service import StubCluster, create_stub_app
+
+ROW = {"gdp_growth_rate": 5.1, "inflation_rate": 6.5, "usd_kes_rate": 147.2, "cbr_rate": 9.5, "trade_balance": -12000}
+
+
+class RecordingLimiter:
+    """Allows requests while the summed cost stays within the limit"""
+
+    def __init__(self):
+        self.costs = []
+
+    async def hit(self, identifier, limit=100, window=60, cost=1):
+        self.costs.append(cost)
+        used = sum(self.costs)
+        return RateLimitResult(used <= limit, limit, remaining=limit - used, retry_after=1.0)
+
+
+class RecordingHistory:
+    def __init__(self):
+        self.rows = []
+
+    def submit(self, features, result, user_id, model_version):
+        self.rows.append((features, result, user_id, model_version))
+
+
+def http_request():
+    return Request({"type": "http", "method": "POST", "path": "/", "headers": [], "client": ("10.0.0.1", 1234)})
+
+
+@pytest.fixture
+def gateway(monkeypatch):
+    """Batch endpoint wired to a stub replica, a recording limiter and history"""
+    replica = create_stub_app("v3", prediction=1.0)
+    client = MLClient(urls=["http://replica"], transport=StubCluster({"replica": replica}))
+    limiter, history = RecordingLimiter(), RecordingHistory()
+    monkeypatch.setattr(predict, "ml_client", client)
+    monkeypatch.setattr(predict, "rate_limiter", limiter)
+    monkeypatch.setattr(predict, "history_writer", history)
+    monkeypatch.setattr(predict.settings, "RATE_LIMIT_BATCH_ROW_WEIGHT", 0.1)
+    return replica, limiter, history
+
+
+class TestBatchPredict:
+    """Test /v1/predict/batch"""
+
+    @pytest.mark.asyncio
+    async def test_valid_rows_are_forwarded_in_one_call(self, gateway):
+        replica, limiter, history = gateway
+        rows = [ROW, {**ROW, "cbr_rate": "high"}, {"gdp_growth_rate": 1.0}, {**ROW, "cbr_rate": 10}]
+
+        response = Response()
+        result = await predict_batch(BatchPredictionRequest(rows=rows), http_request(), response)
+
+        assert replica.state.calls == 1
+        assert [r["cbr_rate"] for r in replica.state.last_payload["instances"]] == [9.5, 10.0]
+        assert [r.prediction for r in result.results] == [1.0, None, None, 2.0]
+        assert result.results[1].error == "Feature cbr_rate is not numeric"
+        assert result.results[2].error.startswith("Missing required features")
+        assert (result.succeeded, result.failed, result.model_version) == (2, 2, "v3")
+        assert response.headers["X-RateLimit-Limit"] == "100"
+
+    @pytest.mark.asyncio
+    async def test_cost_scales_with_rows(self, gateway):
+        _, limiter, _ = gateway
+
+        await predict_batch(BatchPredictionRequest(rows=[ROW]), http_request(), Response())
+        await predict_batch(BatchPredictionRequest(rows=[ROW] * 25), http_request(), Response())
+        assert limiter.costs == [1, 3]
+
+    @pytest.mark.asyncio
+    async def test_over_limit_is_429_without_calling_the_model(self, gateway):
+        replica, limiter, _ = gateway
+        limiter.costs = [99]
+
+        with pytest.raises(HTTPException) as exc:
+            await predict_batch(BatchPredictionRequest(rows=[ROW] * 20), http_request(), Response())
+        assert exc.value.status_code == 429
+        assert exc.value.headers["Retry-After"] == "1"
+        assert replica.state.calls == 0
+
+    @pytest.mark.asyncio
+    async def test_only_successful_rows_are_written_to_history(self, gateway):
+        _, _, history = gateway
+        rows = [ROW, {"gdp_growth_rate": 1.0}, {**ROW, "inflation_rate": 7}]
+
+        await predict_batch(BatchPredictionRequest(rows=rows), http_request(), Response())
+
+        assert [features["inflation_rate"] for features, *_ in history.rows] == [6.5, 7.0]
+        assert history.rows[1][1] == {"prediction": 2.0, "confidence": None}
+        assert {model_version for *_, model_version in history.rows} == {"v3"}
+
+    @pytest.mark.asyncio
+    async def test_no_valid_rows_skips_the_model(self, gateway):
+        replica, _, history = gateway
+
+        result = await predict_batch(
+            BatchPredictionRequest(rows=[{"gdp_growth_rate": 1.0}]), http_request(), Response()
+        )
+        assert replica.state.calls == 0
+        assert history.rows == []
+        assert result.failed == 1
+
+    @pytest.mark.asyncio
+    async def test_model_failure_is_503(self, gateway):
+        replica, _, history = gateway
+        replica.state.fail_rate = 1.0
+
+        with pytest.raises(HTTPException) as exc:
+            await predict_batch(BatchPredictionRequest(rows=[ROW]), http_request(), Response())
+        assert exc.value.status_code == 503
+        assert history.rows == []
+
+
+class StoredVector:
+    """Feature store answering every date with the same stored indicators"""
+
+    def __init__(self, features):
+        self.features = features
+
+    async def vectors(self, dates):
+        return [{"as_of": day, "features": dict(self.features), "observed": {}, "missing": []} for day in dates]
+
+
+class TestPredictAsOf:
+    """Test /v1/predict filling features from stored indicators"""
+
+    @pytest.fixture
+    def stored(self, gateway, monkeypatch):
+        monkeypatch.setattr(predict, "prediction_cache", PredictionCache(redis_url="redis://127.0.0.1:1/0", enabled=False))
+        monkeypatch.setattr(predict, "feature_store", StoredVector({**ROW, "cbr_rate": 9.0}))
+        return gateway
+
+    @pytest.mark.asyncio
+    async def test_explicit_features_and_aliases_override_stored_values(self, stored):
+        request = PredictionRequest(as_of=date(2024, 6, 30), features={"CBR": 10.5, "unused": 1.0})
+
+        result = await predict.predict(request, BackgroundTasks(), http_request(), Response())
+
+        assert result.features_used == {**ROW, "cbr_rate": 10.5}
+        assert result.as_of == date(2024, 6, 30)
+
+    @pytest.mark.asyncio
+    async def test_date_alone_is_a_complete_request(self, stored):
+        result = await predict.predict(PredictionRequest(as_of=date(2024, 6, 30)), BackgroundTasks(), http_request(), Response())
+        assert result.features_used == {k: float(v) for k, v in {**ROW, "cbr_rate": 9.0}.items()}
@@ -0,0 +1,132 @@
+from datetime import date, datetime
+
+import numpy as np
+import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from app.db.models import Base, MarketObservation, MarketSeriesSummary
+from app.utils.data_processor import prepare_features_for_prediction
+from app.utils.feature_store import FEATURE_SERIES, FeatureStore, build_vectors
+from app.utils.market_cache import MarketDataCache
+
+
+UNREACHABLE_REDIS = "redis://127.0.0.1:1/0"
+
+OBSERVATIONS = {
+    "gdp.GDP_Growth_Rate": [(datetime(2023, 3, 31), 2.1), (datetime(2023, 6, 30), 1.8)],
+    "inflation.Inflation_Rate": [(datetime(2023, 4, 30), 6.3), (datetime(2023, 5, 31), 6.1)],
+    "exchange_rates.USD_KES": [(datetime(2023, 5, 16), 146.5), (datetime(2023, 5, 17), 147.2)],
+    "interest_rates.CBR": [(datetime(2023, 4, 30), 9.5)],
+    "trade_foreign_summary.Trade_Balance": [(datetime(2023, 4, 30), -120526.7)],
+}
+
+
+def arrays(points):
+    dates = np.array([d for d, _ in points], dtype="datetime64[us]")
+    return dates, np.array([v for _, v in points])
+
+
+@pytest_asyncio.fixture
+async def session_factory():
+    """Session factory over a private in-memory database holding the feature series"""
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    factory = async_sessionmaker(engine, expire_on_commit=False)
+    async with factory() as session:
+        for series, points in OBSERVATIONS.items():
+            for when, value in points:
+                session.add(MarketObservation(
+                    series=series, date=when, value=value, data_type=series.split(".")[0]
+                ))
+            session.add(MarketSeriesSummary(
+                series=series, data_type=series.split(".")[0], record_count=len(points),
+                first_date=points[0][0], last_date=points[-1][0], last_value=points[-1][1]
+            ))
+        await session.commit()
+
+    yield factory
+    await engine.dispose()
+
+
+class TestBuildVectors:
+    """Test vectorized as-of lookups"""
+
+    def test_takes_last_observation_on_or_before_each_date(self):
+        series = {name: arrays(points) for name, points in OBSERVATIONS.items()}
+        mid_may, end_june = build_vectors(series, [date(2023, 5, 17), date(2023, 6, 30)])
+
+        assert mid_may["features"]["usd_kes_rate"] == 147.2
+        assert mid_may["features"]["gdp_growth_rate"] == 2.1
+        assert mid_may["observed"]["inflation_rate"] == datetime(2023, 4, 30)
+        assert end_june["features"]["gdp_growth_rate"] == 1.8
+        assert end_june["missing"] == []
+
+    def test_dates_before_a_series_starts_are_missing(self):
+        series = {name: arrays(points) for name, points in OBSERVATIONS.items()}
+        (vector,) = build_vectors(series, [date(2023, 4, 1)])
+
+        assert vector["features"] == {"gdp_growth_rate": 2.1}
+        assert set(vector["missing"]) == set(FEATURE_SERIES) - {"gdp_growth_rate"}
+
+    def test_release_lag_shifts_availability(self):
+        series = {name: arrays(points) for name, points in OBSERVATIONS.items()}
+        lags = {"gdp.GDP_Growth_Rate": 90, "exchange_rates.USD_KES": 1}
+        early, late = build_vectors(series, [date(2023, 5, 17), date(2023, 6, 29)], lags)
+
+        # Q1 GDP (Mar 31) is only released on Jun 29
+        assert "gdp_growth_rate" in early["missing"]
+        assert late["features"]["gdp_growth_rate"] == 2.1
+        assert late["observed"]["gdp_growth_rate"] == datetime(2023, 3, 31)
+        # May 16 USD/KES is released on May 17; May 17's value not yet
+        assert early["features"]["usd_kes_rate"] == 146.5
+        assert early["features"]["inflation_rate"] == 6.3
+
+
+class TestFeatureStore:
+    """Test the feature store with and without the market data cache"""
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("cached", [True, False])
+    async def test_vectors_and_latest(self, session_factory, cached):
+        cache = MarketDataCache(redis_url=UNREACHABLE_REDIS, enabled=cached, session_factory=session_factory)
+        store = FeatureStore(cache=cache, session_factory=session_factory)
+
+        vectors = await store.vectors([date(2023, 6, 1), date(2023, 5, 16)])
+        assert [v["features"]["usd_kes_rate"] for v in vectors] == [147.2, 146.5]
+
+        latest = await store.latest()
+        assert latest["as_of"] == date(2023, 6, 30)
+        assert latest["features"]["inflation_rate"] == 6.1
+        assert latest["observed"]["usd_kes_rate"] == datetime(2023, 5, 17)
+        await cache.stop()
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("cached", [True, False])
+    async def test_release_lags_apply_to_both_paths(self, session_factory, cached):
+        cache = MarketDataCache(redis_url=UNREACHABLE_REDIS, enabled=cached, session_factory=session_factory)
+        store = FeatureStore(
+            cache=cache, session_factory=session_factory, release_lags={"inflation.Inflation_Rate": 20}
+        )
+
+        (vector,) = await store.vectors([date(2023, 6, 15)])
+        assert vector["features"]["inflation_rate"] == 6.3
+        assert vector["observed"]["inflation_rate"] == datetime(2023, 4, 30)
+        await cache.stop()
+
+
+class TestPrepareFeatures:
+    """Test filling request features from a stored vector"""
+
+    def test_missing_and_invalid_values_come_from_fallback(self):
+        features = prepare_features_for_prediction(
+            {"USD_KES": 150.0, "cbr_rate": "n/a"},
+            fallback={"usd_kes_rate": 147.2, "cbr_rate": 9.5, "inflation_rate": 6.1}
+        )
+        assert features == {"usd_kes_rate": 150.0, "cbr_rate": 9.5, "inflation_rate": 6.1}
+
+    def test_no_hard_coded_defaults(self):
+        assert prepare_features_for_prediction({}) == {}
@@ -0,0 +1,226 @@
+import asyncio
+import os
+import time
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from app.db.models import Base, PredictionHistory
+from app.utils.history_writer import PredictionHistoryWriter
+
+
+FEATURES = {"gdp_growth_rate": 2.5, "inflation_rate": 5.2}
+RESULT = {"prediction": 1.0, "confidence": 0.9}
+
+
+@pytest_asyncio.fixture
+async def session_factory():
+    """Session factory over a private in-memory database"""
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield async_sessionmaker(engine, expire_on_commit=False)
+    await engine.dispose()
+
+
+async def count_rows(session_factory):
+    async with session_factory() as db:
+        return await db.scalar(select(func.count()).select_from(PredictionHistory))
+
+
+def failing_session_factory():
+    raise RuntimeError("database unavailable")
+
+
+class TestPredictionHistoryWriter:
+    """Test buffered prediction history writes"""
+
+    @pytest.mark.asyncio
+    async def test_flushes_full_batches(self, session_factory):
+        writer = PredictionHistoryWriter(session_factory, batch_size=3, flush_interval_ms=10_000)
+        await writer.start()
+
+        for _ in range(7):
+            assert writer.submit(FEATURES, RESULT)
+        await asyncio.sleep(0.2)
+        assert await count_rows(session_factory) == 6
+
+        await writer.stop()
+        assert await count_rows(session_factory) == 7
+
+    @pytest.mark.asyncio
+    async def test_flushes_on_interval(self, session_factory):
+        writer = PredictionHistoryWriter(session_factory, batch_size=100, flush_interval_ms=20)
+        await writer.start()
+
+        writer.submit(FEATURES, RESULT, user_id="user-1", model_version="3")
+        writer.submit(FEATURES, RESULT)
+        await asyncio.sleep(0.2)
+
+        async with session_factory() as db:
+            result = await db.execute(select(PredictionHistory).order_by(PredictionHistory.id))
+            rows = result.scalars().all()
+        assert len(rows) == 2
+        assert rows[0].user_id == "user-1"
+        assert rows[0].model_version == "3"
+        assert rows[0].confidence_score == 0.9
+        await writer.stop()
+
+    @pytest.mark.asyncio
+    async def test_drops_when_queue_full(self, session_factory):
+        writer = PredictionHistoryWriter(session_factory, max_queue=2, overflow_policy="drop")
+        await writer.start()
+
+        accepted = [writer.submit(FEATURES, RESULT) for _ in range(5)]
+        assert accepted == [True, True, False, False, False]
+
+        await writer.stop()
+        assert await count_rows(session_factory) == 2
+
+    @pytest.mark.asyncio
+    async def test_spills_failed_writes_and_replays(self, session_factory, tmp_path):
+        spill_path = str(tmp_path / "spill.jsonl")
+
+        writer = PredictionHistoryWriter(
+            failing_session_factory, flush_interval_ms=10, overflow_policy="spill", spill_path=spill_path
+        )
+        await writer.start()
+        for _ in range(3):
+            writer.submit(FEATURES, RESULT)
+        await writer.stop()
+        assert os.path.exists(writer.process_spill_path)
+
+        writer = PredictionHistoryWriter(session_factory, overflow_policy="spill", spill_path=spill_path)
+        await writer.start()
+        await writer.stop()
+
+        assert await count_rows(session_factory) == 3
+        assert not os.path.exists(writer.process_spill_path)
+
+    @pytest.mark.asyncio
+    async def test_spilling_does_not_block_submit(self, tmp_path, monkeypatch):
+        spill_path = str(tmp_path / "spill.jsonl")
+        writer = PredictionHistoryWriter(failing_session_factory, overflow_policy="spill", spill_path=spill_path)
+        spill = writer._spill
+
+        def slow_spill(rows, reason):
+            time.sleep(0.2)
+            spill(rows, reason)
+
+        monkeypatch.setattr(writer, "_spill", slow_spill)
+
+        # Not started, so the row goes straight to the spill file
+        start = time.perf_counter()
+        assert not writer.submit(FEATURES, RESULT)
+        assert time.perf_counter() - start < 0.1
+
+        await writer.wait_for_spills()
+        with open(writer.process_spill_path) as f:
+            assert len(f.readlines()) == 1
+
+
+class WorkerWriter(PredictionHistoryWriter):
+    """A writer posing as another gunicorn worker process"""
+
+    def __init__(self, pid, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._fake_pid = pid
+
+    @property
+    def pid(self):
+        return self._fake_pid
+
+
+class TestSpillFilesAcrossWorkers:
+    """Test workers sharing a spill path never lose or double-replay rows"""
+
+    @pytest.fixture
+    def running(self, monkeypatch):
+        """Pids treated as live processes"""
+        pids = set()
+        monkeypatch.setattr(PredictionHistoryWriter, "_process_running", staticmethod(lambda pid: pid in pids))
+        return pids
+
+    async def spill_rows(self, pid, spill_path, n):
+        writer = WorkerWriter(pid, failing_session_factory, overflow_policy="spill", spill_path=spill_path)
+        for _ in range(n):
+            writer.submit(FEATURES, RESULT)
+        await writer.wait_for_spills()
+        return writer.process_spill_path
+
+    @pytest.mark.asyncio
+    async def test_each_worker_spills_to_its_own_file(self, tmp_path):
+        spill_path = str(tmp_path / "spill.jsonl")
+        first = await self.spill_rows(1001, spill_path, 2)
+        second = await self.spill_rows(1002, spill_path, 1)
+
+        assert first != second
+        with open(first) as f:
+            assert len(f.readlines()) == 2
+        with open(second) as f:
+            assert len(f.readlines()) == 1
+
+    @pytest.mark.asyncio
+    async def test_live_workers_files_are_left_alone(self, session_factory, tmp_path, running):
+        spill_path = str(tmp_path / "spill.jsonl")
+        live = await self.spill_rows(1001, spill_path, 2)
+        dead = await self.spill_rows(1002, spill_path, 3)
+        running.update({1001, 1003})
+
+        writer = WorkerWriter(1003, session_factory, overflow_policy="spill", spill_path=spill_path)
+        await writer.start()
+        await writer.stop()
+
+        assert await count_rows(session_factory) == 3
+        assert os.path.exists(live)
+        assert not os.path.exists(dead)
+
+    @pytest.mark.asyncio
+    async def test_concurrent_starts_replay_each_file_once(self, session_factory, tmp_path, running):
+        spill_path = str(tmp_path / "spill.jsonl")
+        for pid, n in ((901, 2), (902, 3), (903, 4)):
+            await self.spill_rows(pid, spill_path, n)
+        # A file left by a version that did not suffix the pid
+        with open(await self.spill_rows(904, spill_path, 1)) as src, open(spill_path, "w") as dst:
+            dst.write(src.read())
+        os.remove(spill_path + ".904")
+        running.update(range(1001, 1005))
+
+        writers = [
+            WorkerWriter(pid, session_factory, overflow_policy="spill", spill_path=spill_path)
+            for pid in range(1001, 1005)
+        ]
+        await asyncio.gather(*(writer.start() for writer in writers))
+        await asyncio.gather(*(writer.stop() for writer in writers))
+
+        assert await count_rows(session_factory) == 10
+        assert os.listdir(tmp_path) == ["spill.jsonl.lock"]
+
+    @pytest.mark.asyncio
+    async def test_spill_backlog_is_bounded(self, tmp_path, monkeypatch):
+        writer = PredictionHistoryWriter(
+            failing_session_factory, overflow_policy="spill",
+            spill_path=str(tmp_path / "spill.jsonl"), max_spill_backlog=2
+        )
+        spill = writer._spill
+
+        def slow_spill(rows, reason):
+            time.sleep(0.2)
+            spill(rows, reason)
+
+        monkeypatch.setattr(writer, "_spill", slow_spill)
+
+        for _ in range(5):
+            writer.submit(FEATURES, RESULT)
+        await writer.wait_for_spills()
+        with open(writer.process_spill_path) as f:
+            assert len(f.readlines()) == 2
+
+        # Once written, the backlog has room again
+        writer.submit(FEATURES, RESULT)
+        await writer.wait_for_spills()
+        with open(writer.process_spill_path) as f:
+            assert len(f.readlines()) == 3
@@ -0,0 +1,190 @@
+import gzip
+import json
+from datetime import datetime, timezone
+
+import pytest
+import pytest_asyncio
+from fastapi import Request
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from app.api.v1.endpoints import data
+from app.db.models import Base, IngestionWatermark, MarketSeriesSummary
+from app.utils.http_cache import ConditionalResponseCache
+
+
+MODIFIED = datetime(2024, 12, 1, 8, 30, tzinfo=timezone.utc)
+
+
+def make_request(**headers):
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": "/",
+        "headers": [(k.replace("_", "-").encode(), v.encode()) for k, v in headers.items()],
+    })
+
+
+@pytest_asyncio.fixture
+async def db():
+    """Async session over a private in-memory database"""
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    session = async_sessionmaker(engine, expire_on_commit=False)()
+    yield session
+    await session.close()
+    await engine.dispose()
+
+
+class Payload:
+    """Counts how often the payload is built"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return {"summary": [{"data_type": "gdp", "latest_date": datetime(2024, 9, 30)}]}
+
+
+class TestConditionalResponseCache:
+    """Test ETag handling and per-version body caching"""
+
+    @pytest.mark.asyncio
+    async def test_body_is_built_once_per_version(self):
+        cache = ConditionalResponseCache()
+        build = Payload()
+
+        first = await cache.respond(make_request(), "summary", 1, MODIFIED, build)
+        second = await cache.respond(make_request(), "summary", 1, MODIFIED, build)
+        assert build.calls == 1
+        assert first.body == second.body
+        assert json.loads(first.body)["summary"][0]["latest_date"] == "2024-09-30T00:00:00"
+        assert first.headers["etag"] == 'W/"summary:1"'
+        assert first.headers["last-modified"] == "Sun, 01 Dec 2024 08:30:00 GMT"
+
+        await cache.respond(make_request(), "summary", 2, MODIFIED, build)
+        assert build.calls == 2
+
+    @pytest.mark.asyncio
+    async def test_matching_etag_is_not_modified(self):
+        cache = ConditionalResponseCache()
+        build = Payload()
+
+        response = await cache.respond(
+            make_request(if_none_match='"other", W/"summary:3"'), "summary", 3, MODIFIED, build
+        )
+        assert response.status_code == 304
+        assert response.body == b""
+        assert build.calls == 0
+
+        stale = await cache.respond(make_request(if_none_match='W/"summary:2"'), "summary", 3, MODIFIED, build)
+        assert stale.status_code == 200
+
+    @pytest.mark.asyncio
+    async def test_if_modified_since(self):
+        cache = ConditionalResponseCache()
+        build = Payload()
+
+        fresh = await cache.respond(
+            make_request(if_modified_since="Sun, 01 Dec 2024 08:30:00 GMT"), "summary", 1, MODIFIED, build
+        )
+        assert fresh.status_code == 304
+
+        older = await cache.respond(
+            make_request(if_modified_since="Sat, 30 Nov 2024 00:00:00 GMT"), "summary", 1, MODIFIED, build
+        )
+        assert older.status_code == 200
+
+    @pytest.mark.asyncio
+    async def test_gzip_body_is_precompressed(self):
+        cache = ConditionalResponseCache()
+
+        plain = await cache.respond(make_request(), "summary", 1, MODIFIED, Payload())
+        zipped = await cache.respond(make_request(accept_encoding="gzip, br"), "summary", 1, MODIFIED, Payload())
+        assert zipped.headers["content-encoding"] == "gzip"
+        assert gzip.decompress(zipped.body) == plain.body
+
+    @pytest.mark.parametrize("accept_encoding, gzipped", [
+        ("gzip", True),
+        ("br, GZIP;q=0.5", True),
+        ("*", True),
+        ("gzip;q=0", False),
+        ("gzip; q=0.0, identity", False),
+        ("identity, *;q=0", False),
+        ("x-gzip", True),
+        ("br", False),
+    ])
+    @pytest.mark.asyncio
+    async def test_gzip_honours_q_values(self, accept_encoding, gzipped):
+        cache = ConditionalResponseCache()
+
+        response = await cache.respond(make_request(accept_encoding=accept_encoding), "summary", 1, MODIFIED, Payload())
+        assert ("content-encoding" in response.headers) is gzipped
+
+    @pytest.mark.asyncio
+    async def test_evicts_least_recently_used(self):
+        cache = ConditionalResponseCache(max_entries=2)
+        build = Payload()
+        for key in ("a", "b", "c"):
+            await cache.respond(make_request(), key, 1, None, build)
+
+        await cache.respond(make_request(), "a", 1, None, build)
+        assert build.calls == 4
+
+
+class TestDatabaseFallback:
+    """Test endpoints answered from the database still support conditional GETs"""
+
+    @pytest.fixture(autouse=True)
+    def no_snapshot(self, monkeypatch):
+        async def snapshot():
+            return None
+
+        monkeypatch.setattr(data.market_cache, "snapshot", snapshot)
+
+    async def ingest(self, db, content_hash):
+        watermark = await db.get(IngestionWatermark, "gdp.csv")
+        if watermark is None:
+            watermark = IngestionWatermark(source="gdp.csv", data_type="gdp", mtime=0.0, row_count=1)
+            db.add(watermark)
+            db.add(MarketSeriesSummary(
+                series="gdp", data_type="gdp", record_count=1,
+                first_date=datetime(2024, 3, 31), last_date=datetime(2024, 3, 31)
+            ))
+        watermark.size = len(content_hash)
+        watermark.content_hash = content_hash
+        await db.commit()
+
+    @pytest.mark.asyncio
+    async def test_summary_is_not_modified_until_ingestion(self, db):
+        await self.ingest(db, "a" * 64)
+
+        first = await data.get_data_summary(make_request(), db)
+        assert first.status_code == 200
+        assert json.loads(first.body)["summary"][0]["record_count"] == 1
+        etag = first.headers["etag"]
+        assert first.headers["last-modified"]
+
+        again = await data.get_data_summary(make_request(if_none_match=etag), db)
+        assert again.status_code == 304
+
+        await self.ingest(db, "b" * 64)
+        changed = await data.get_data_summary(make_request(if_none_match=etag), db)
+        assert changed.status_code == 200
+        assert changed.headers["etag"] != etag
+
+    @pytest.mark.asyncio
+    async def test_latest_missing_type_is_still_404(self, db):
+        await self.ingest(db, "a" * 64)
+
+        with pytest.raises(data.HTTPException) as e:
+            await data.get_latest_data(make_request(), "inflation", db)
+        assert e.value.status_code == 404
+
+    @pytest.mark.asyncio
+    async def test_nothing_ingested_has_no_validators(self, db):
+        response = await data.get_data_summary(make_request(), db)
+        assert response == {"summary": []}
@@ -0,0 +1,214 @@
+import os
+
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.config import settings
+from app.db.models import Base, IngestionWatermark, MarketData, MarketObservation, MarketSeriesSummary
+from app.utils import data_processor
+from app.utils.data_processor import (
+    build_market_data_records, build_observation_records, load_and_process_data
+)
+
+
+@pytest.fixture
+def db():
+    """Session over a private in-memory database"""
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+@pytest.fixture
+def raw_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "DATA_RAW_DIR", str(tmp_path))
+    return tmp_path
+
+
+def write_rates(path, rows):
+    pd.DataFrame(rows, columns=["Date", "USD_KES", "EUR_KES"]).to_csv(path / "exchange_rates.csv", index=False)
+
+
+def count_rows(db):
+    return db.scalar(select(func.count()).select_from(MarketData))
+
+
+class TestBuildRecords:
+    """Test column-wise record building"""
+
+    def test_drops_bad_dates_and_keeps_last_duplicate(self):
+        df = pd.DataFrame({
+            "Date": ["2020-01-01", "not a date", "2020-01-02", "2020-01-01"],
+            "USD_KES": [100.0, 101.0, 102.0, 103.0],
+        })
+        records = build_market_data_records(df, "exchange_rates", "exchange_rates.csv")
+
+        assert len(records) == 2
+        by_date = {r["date"].date().isoformat(): r for r in records}
+        assert by_date["2020-01-01"]["processed_data"] == {"USD_KES": 103.0}
+        assert by_date["2020-01-02"]["raw_data"]["Date"] == "2020-01-02"
+
+    def test_missing_values_become_null(self):
+        df = pd.DataFrame({"Date": ["2020-01-01"], "USD_KES": [float("nan")]})
+        records = build_market_data_records(df, "exchange_rates", "exchange_rates.csv")
+        assert records[0]["processed_data"] == {"USD_KES": None}
+
+    def test_observations_keep_numeric_columns(self):
+        df = pd.DataFrame({
+            "Date": ["2020-03-31", "2020-06-30"],
+            "Quarter": ["Q1", "Q2"],
+            "GDP_Growth_Rate": [1.93, None],
+        })
+        records = build_market_data_records(df, "gdp", "gdp.csv")
+        observations = build_observation_records(records, "gdp")
+
+        assert len(observations) == 1
+        assert observations[0]["series"] == "gdp.GDP_Growth_Rate"
+        assert observations[0]["value"] == 1.93
+
+
+class TestLoadAndProcessData:
+    """Test bulk, idempotent ingestion"""
+
+    def test_refresh_is_idempotent(self, db, raw_dir):
+        write_rates(raw_dir, [["2020-01-01", 100.0, 110.0], ["2020-01-02", 101.0, 111.0]])
+
+        result = load_and_process_data(db, "exchange_rates")
+        assert result["processed_types"] == ["exchange_rates"]
+        assert result["total_records"] == 2
+        assert result["rows_per_second"] > 0
+
+        load_and_process_data(db, "exchange_rates")
+        assert count_rows(db) == 2
+
+    def test_refresh_updates_changed_rows(self, db, raw_dir):
+        write_rates(raw_dir, [["2020-01-01", 100.0, 110.0]])
+        load_and_process_data(db, "exchange_rates")
+
+        write_rates(raw_dir, [["2020-01-01", 99.5, 110.0], ["2020-01-02", 101.0, 111.0]])
+        load_and_process_data(db, "exchange_rates")
+
+        rows = db.scalars(select(MarketData).order_by(MarketData.date)).all()
+        assert len(rows) == 2
+        assert rows[0].processed_data["USD_KES"] == 99.5
+
+
+class TestIncrementalRefresh:
+    """Test watermark-based skip, append and rewrite handling"""
+
+    def test_unchanged_and_touched_files_are_skipped(self, db, raw_dir):
+        write_rates(raw_dir, [["2020-01-01", 100.0, 110.0]])
+        load_and_process_data(db, "exchange_rates")
+
+        result = load_and_process_data(db, "exchange_rates")
+        assert result["skipped_files"] == 1
+        assert result["total_records"] == 0
+
+        path = raw_dir / "exchange_rates.csv"
+        stat = path.stat()
+        os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+        assert load_and_process_data(db, "exchange_rates")["skipped_files"] == 1
+
+    def test_appended_rows_only_are_ingested(self, db, raw_dir):
+        write_rates(raw_dir, [["2020-01-01", 100.0, 110.0], ["2020-01-02", 101.0, 111.0]])
+        load_and_process_data(db, "exchange_rates")
+
+        with open(raw_dir / "exchange_rates.csv", "a") as f:
+            f.write("2020-01-03,102.0,112.0\n")
+        result = load_and_process_data(db, "exchange_rates")
+
+        assert result["appended_files"] == 1
+        assert result["total_records"] == 1
+        assert count_rows(db) == 3
+
+        watermark = db.get(IngestionWatermark, "exchange_rates.csv")
+        assert watermark.last_date.date().isoformat() == "2020-01-03"
+        assert watermark.row_count == 3
+
+    def test_rewritten_file_is_reloaded_and_pruned(self, db, raw_dir):
+        write_rates(raw_dir, [["2020-01-01", 100.0, 110.0], ["2020-01-02", 101.0, 111.0]])
+        load_and_process_data(db, "exchange_rates")
+
+        write_rates(raw_dir, [["2020-01-02", 101.5, 111.0], ["2020-01-03", 102.0, 112.0]])
+        result = load_and_process_data(db, "exchange_rates")
+
+        assert result["rewritten_files"] == 1
+        assert result["removed_records"] == 1
+        dates = db.scalars(select(MarketData.date).order_by(MarketData.date)).all()
+        assert [d.date().isoformat() for d in dates] == ["2020-01-02", "2020-01-03"]
+
+    def test_rewrite_prunes_observations(self, db, raw_dir):
+        write_rates(raw_dir, [["2020-01-01", 100.0, 110.0], ["2020-01-02", 101.0, 111.0]])
+        load_and_process_data(db, "exchange_rates")
+        assert db.scalar(select(func.count()).select_from(MarketObservation)) == 4
+
+        write_rates(raw_dir, [["2020-01-02", 101.5, 111.0]])
+        load_and_process_data(db, "exchange_rates")
+
+        rows = db.execute(
+            select(MarketObservation.series, MarketObservation.value).order_by(MarketObservation.series)
+        ).all()
+        assert [tuple(r) for r in rows] == [("exchange_rates.EUR_KES", 111.0), ("exchange_rates.USD_KES", 101.5)]
+
+
+class TestSeriesSummary:
+    """Test the summary rows maintained alongside ingestion"""
+
+    def test_summary_follows_appends(self, db, raw_dir):
+        write_rates(raw_dir, [["2020-01-01", 100.0, 110.0], ["2020-01-02", 101.0, 111.0]])
+        load_and_process_data(db, "exchange_rates")
+
+        with open(raw_dir / "exchange_rates.csv", "a") as f:
+            f.write("2020-01-03,102.0,\n")
+        load_and_process_data(db, "exchange_rates")
+
+        rates = db.get(MarketSeriesSummary, "exchange_rates")
+        assert rates.record_count == 3
+        assert rates.last_date.date().isoformat() == "2020-01-03"
+        assert rates.last_value is None
+
+        usd = db.get(MarketSeriesSummary, "exchange_rates.USD_KES")
+        assert (usd.record_count, usd.last_value) == (3, 102.0)
+        eur = db.get(MarketSeriesSummary, "exchange_rates.EUR_KES")
+        assert (eur.record_count, eur.last_date.date().isoformat(), eur.last_value) == (2, "2020-01-02", 111.0)
+
+    def test_appends_update_summary_without_rebuilding(self, db, raw_dir, monkeypatch):
+        write_rates(raw_dir, [["2020-01-01", 100.0, 110.0], ["2020-01-02", 101.0, 111.0]])
+        load_and_process_data(db, "exchange_rates")
+
+        def rebuild(*args):
+            raise AssertionError("appends should not rebuild the summary")
+
+        monkeypatch.setattr(data_processor, "refresh_series_summary", rebuild)
+        with open(raw_dir / "exchange_rates.csv", "a") as f:
+            # A corrected repeat of the last date plus one new date
+            f.write("2020-01-02,101.5,111.5\n2020-01-03,102.0,112.0\n")
+        result = load_and_process_data(db, "exchange_rates")
+        assert result["appended_files"] == 1
+
+        rows = db.scalars(select(MarketSeriesSummary).order_by(MarketSeriesSummary.series)).all()
+        assert [(r.series, r.record_count, r.last_value) for r in rows] == [
+            ("exchange_rates", 3, None), ("exchange_rates.EUR_KES", 3, 112.0), ("exchange_rates.USD_KES", 3, 102.0)
+        ]
+        assert all(r.first_date.date().isoformat() == "2020-01-01" for r in rows)
+
+    def test_summary_follows_rewrites(self, db, raw_dir):
+        write_rates(raw_dir, [["2020-01-01", 100.0, 110.0], ["2020-01-02", 101.0, 111.0]])
+        load_and_process_data(db, "exchange_rates")
+
+        pd.DataFrame(
+            [["2020-01-02", 101.5]], columns=["Date", "USD_KES"]
+        ).to_csv(raw_dir / "exchange_rates.csv", index=False)
+        load_and_process_data(db, "exchange_rates")
+
+        rows = db.scalars(select(MarketSeriesSummary).order_by(MarketSeriesSummary.series)).all()
+        assert [(r.series, r.record_count, r.last_value) for r in rows] == [
+            ("exchange_rates", 1, None), ("exchange_rates.USD_KES", 1, 101.5)
+        ]
+        assert rows[0].first_date.date().isoformat() == "2020-01-02"
@@ -0,0 +1,201 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from app.crud.market_data import get_market_data_page
+from app.db.models import Base, MarketData, MarketObservation
+from app.utils.market_cache import INSTANCE_ID, MarketDataCache
+
+
+UNREACHABLE_REDIS = "redis://127.0.0.1:1/0"
+
+
+@pytest_asyncio.fixture
+async def session_factory():
+    """Session factory over a private in-memory database with two data types"""
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    factory = async_sessionmaker(engine, expire_on_commit=False)
+    async with factory() as session:
+        start = datetime(2020, 1, 1)
+        for data_type in ("gdp", "exchange_rates"):
+            for day in range(25):
+                session.add(MarketData(
+                    date=start + timedelta(days=day),
+                    data_type=data_type,
+                    data_source=f"{data_type}.csv",
+                    raw_data={},
+                    processed_data={"value": day}
+                ))
+                session.add(MarketObservation(
+                    series=f"{data_type}.value",
+                    date=start + timedelta(days=day),
+                    data_type=data_type,
+                    value=float(day)
+                ))
+        await session.commit()
+
+    yield factory
+    await engine.dispose()
+
+
+@pytest_asyncio.fixture
+async def cache(session_factory):
+    cache = MarketDataCache(redis_url=UNREACHABLE_REDIS, enabled=True, session_factory=session_factory)
+    yield cache
+    await cache.stop()
+
+
+class TestMarketDataCache:
+    """Test reads served from the in-process snapshot"""
+
+    @pytest.mark.asyncio
+    async def test_pages_match_database(self, cache, session_factory):
+        snapshot = await cache.snapshot()
+        async with session_factory() as db:
+            for data_type in (None, "gdp"):
+                after = None
+                while True:
+                    cached = snapshot.page(data_type, None, None, after, 7)
+                    stored = await get_market_data_page(db, data_type=data_type, after=after, limit=7)
+                    assert [r["id"] for r in cached] == [r.id for r in stored]
+                    if len(cached) < 7:
+                        break
+                    after = (cached[-1]["date"], cached[-1]["id"])
+
+    @pytest.mark.asyncio
+    async def test_date_range_is_inclusive(self, cache):
+        snapshot = await cache.snapshot()
+        rows = snapshot.page("gdp", datetime(2020, 1, 5), datetime(2020, 1, 9), None, 100)
+        assert [r["date"].day for r in rows] == [9, 8, 7, 6, 5]
+
+    @pytest.mark.asyncio
+    async def test_summary_latest_and_observations(self, cache):
+        snapshot = await cache.snapshot()
+
+        summary = {s["data_type"]: s for s in snapshot.summary()}
+        assert summary["gdp"]["record_count"] == 25
+        assert summary["gdp"]["latest_date"] == datetime(2020, 1, 25)
+        assert snapshot.latest["exchange_rates"]["data"] == {"value": 24}
+
+        rows = snapshot.observations(["gdp.value", "exchange_rates.value"], datetime(2020, 1, 24), None, 3)
+        assert [(r["series"], r["value"]) for r in rows] == [
+            ("exchange_rates.value", 23.0), ("exchange_rates.value", 24.0), ("gdp.value", 23.0)
+        ]
+
+    @pytest.mark.asyncio
+    async def test_refresh_patches_changed_types(self, cache, session_factory):
+        snapshot = await cache.snapshot()
+        async with session_factory() as db:
+            db.add(MarketData(
+                date=datetime(2020, 2, 1), data_type="gdp", data_source="gdp.csv",
+                raw_data={}, processed_data={"value": 99}
+            ))
+            await db.commit()
+
+        assert (await cache.snapshot()) is snapshot
+
+        await cache.publish_refresh(["gdp"])
+        refreshed = await cache.snapshot()
+        assert refreshed.version > snapshot.version
+        assert refreshed.latest["gdp"]["data"] == {"value": 99}
+        assert refreshed.by_type["exchange_rates"] is snapshot.by_type["exchange_rates"]
+        assert len(refreshed.all_rows.dates) == 51
+
+    @pytest.mark.asyncio
+    async def test_stale_snapshot_is_served_while_reloading(self, cache, session_factory):
+        snapshot = await cache.snapshot()
+        async with session_factory() as db:
+            db.add(MarketData(
+                date=datetime(2020, 2, 1), data_type="gdp", data_source="gdp.csv",
+                raw_data={}, processed_data={"value": 99}
+            ))
+            await db.commit()
+
+        cache.invalidate(["gdp"])
+        assert (await cache.snapshot()) is snapshot
+
+        await cache._reload_task
+        assert (await cache.snapshot()).latest["gdp"]["data"] == {"value": 99}
+
+    @pytest.mark.asyncio
+    async def test_failed_reloads_back_off(self, session_factory):
+        calls = []
+        failing = False
+
+        def flaky_factory():
+            calls.append(failing)
+            if failing:
+                raise ConnectionError("database down")
+            return session_factory()
+
+        cache = MarketDataCache(redis_url=UNREACHABLE_REDIS, enabled=True, session_factory=flaky_factory)
+        snapshot = await cache.snapshot()
+
+        failing = True
+        cache.invalidate()
+        for _ in range(3):
+            assert (await cache.snapshot()) is snapshot
+            await asyncio.sleep(0)
+        await cache._reload_task
+        assert calls == [False, True]
+        assert cache._retry_at > 0
+
+        # Once the backoff has passed, the next read retries with a longer delay
+        cache._retry_at = 0.0
+        assert (await cache.snapshot()) is snapshot
+        await cache._reload_task
+        assert calls == [False, True, True]
+        assert cache._failures == 2
+
+        failing = False
+        cache._retry_at = 0.0
+        await cache.snapshot()
+        await cache._reload_task
+        assert (await cache.snapshot()) is not snapshot
+        assert cache._failures == 0
+        await cache.stop()
+
+    @pytest.mark.asyncio
+    async def test_first_load_failure_defers_to_database(self, session_factory):
+        calls = []
+
+        def failing_factory():
+            calls.append(1)
+            raise ConnectionError("database down")
+
+        cache = MarketDataCache(redis_url=UNREACHABLE_REDIS, enabled=True, session_factory=failing_factory)
+        assert await cache.snapshot() is None
+        assert await cache.snapshot() is None
+        assert len(calls) == 1
+        await cache.stop()
+
+    @pytest.mark.asyncio
+    async def test_local_versions_are_not_shared_etags(self, cache):
+        snapshot = await cache.snapshot()
+        assert not snapshot.shared
+        assert snapshot.etag_version == f"{INSTANCE_ID}.{snapshot.version}"
+
+    @pytest.mark.asyncio
+    async def test_redis_versions_are_shared_etags(self, session_factory):
+        fakeredis = pytest.importorskip("fakeredis")
+        cache = MarketDataCache(redis_url=UNREACHABLE_REDIS, enabled=True, session_factory=session_factory)
+        cache._redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+
+        version = await cache.publish_refresh(["gdp"])
+        snapshot = await cache.snapshot()
+        assert snapshot.shared
+        assert snapshot.etag_version == str(version)
+        await cache.stop()
+
+    @pytest.mark.asyncio
+    async def test_disabled_cache_defers_to_database(self, session_factory):
+        cache = MarketDataCache(redis_url=UNREACHABLE_REDIS, enabled=False, session_factory=session_factory)
+        assert await cache.snapshot() is None
+        await cache.stop()
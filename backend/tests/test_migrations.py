@@ -0,0 +1,101 @@
+import importlib.util
+import os
+from datetime import datetime
+
+import pytest
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+from sqlalchemy import create_engine, select, text
+
+from app.db.models import Base, MarketData, MarketObservation, MarketSeriesSummary, ModelMetricLatest, ModelMetrics
+
+
+VERSIONS_DIR = os.path.join(os.path.dirname(__file__), "..", "alembic", "versions")
+
+
+def load_revision(name):
+    spec = importlib.util.spec_from_file_location(f"revision_{name}", os.path.join(VERSIONS_DIR, f"{name}.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def upgrade(engine, name):
+    """Run one revision's upgrade() against engine"""
+    revision = load_revision(name)
+    with engine.begin() as conn:
+        context = MigrationContext.configure(conn)
+        with Operations.context(context):
+            revision.upgrade()
+
+
+@pytest.fixture
+def engine():
+    """SQLite database with every table already made by create_all, as at app start"""
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+class TestBackfillAfterCreateAll:
+    """Test that migrations still backfill tables create_all made empty"""
+
+    def test_market_observations(self, engine):
+        with engine.begin() as conn:
+            conn.execute(MarketData.__table__.insert(), [{
+                "date": datetime(2023, 5, 31), "data_type": "inflation", "data_source": "test", "raw_data": {},
+                "processed_data": {"Inflation_Rate": 6.1, "Note": "n/a"},
+            }])
+
+        upgrade(engine, "0003_market_observations")
+        upgrade(engine, "0003_market_observations")
+
+        with engine.connect() as conn:
+            rows = conn.execute(select(MarketObservation.series, MarketObservation.value)).all()
+        assert rows == [("inflation.Inflation_Rate", 6.1)]
+
+    def test_market_series_summary(self, engine):
+        with engine.begin() as conn:
+            conn.execute(MarketData.__table__.insert(), [
+                {"date": datetime(2023, m, 28), "data_type": "inflation", "data_source": "test", "raw_data": {}}
+                for m in (4, 5)
+            ])
+            conn.execute(MarketObservation.__table__.insert(), [
+                {"series": "inflation.Inflation_Rate", "date": datetime(2023, 4, 28), "value": 6.3, "data_type": "inflation"},
+                {"series": "inflation.Inflation_Rate", "date": datetime(2023, 5, 28), "value": 6.1, "data_type": "inflation"},
+            ])
+
+        upgrade(engine, "0005_market_series_summary")
+        upgrade(engine, "0005_market_series_summary")
+
+        with engine.connect() as conn:
+            rows = conn.execute(
+                select(MarketSeriesSummary.series, MarketSeriesSummary.record_count, MarketSeriesSummary.last_value)
+                .order_by(MarketSeriesSummary.series)
+            ).all()
+        assert rows == [("inflation", 2, None), ("inflation.Inflation_Rate", 2, 6.1)]
+
+    def test_model_metrics_latest_and_trigger(self, engine):
+        with engine.begin() as conn:
+            # As left by create_all before the trigger existed
+            conn.execute(text("DROP TRIGGER trg_model_metrics_latest"))
+            conn.execute(ModelMetrics.__table__.insert(), [
+                {"model_name": "m", "model_version": "v1", "metric_name": "rmse",
+                 "metric_value": value, "evaluation_date": datetime(2024, 1, day)}
+                for day, value in ((1, 0.9), (2, 0.4))
+            ])
+
+        upgrade(engine, "0006_model_metrics_latest")
+        upgrade(engine, "0006_model_metrics_latest")
+
+        latest = select(ModelMetricLatest.metric_name, ModelMetricLatest.metric_value)
+        with engine.connect() as conn:
+            assert conn.execute(latest).all() == [("rmse", 0.4)]
+
+        with engine.begin() as conn:
+            conn.execute(ModelMetrics.__table__.insert(), [{
+                "model_name": "m", "model_version": "v1", "metric_name": "rmse",
+                "metric_value": 0.3, "evaluation_date": datetime(2024, 1, 3)
+            }])
+            assert conn.execute(latest).all() == [("rmse", 0.3)]
@@ -0,0 +1,145 @@
+from datetime import datetime, timedelta
+
+import pytest
+import pytest_asyncio
+from fastapi import HTTPException, Response
+from sqlalchemy import insert, select, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from app.api.v1.endpoints.metrics import _load_metrics_summary, get_model_performance
+from app.crud.model_metrics import create_model_metric, get_metrics_version, upsert_latest_metric
+from app.db.models import Base, ModelMetricLatest, ModelMetrics
+from app.utils.pagination import NEXT_CURSOR_HEADER
+
+
+@pytest_asyncio.fixture
+async def db():
+    """Async session over a private in-memory database"""
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    session = async_sessionmaker(engine, expire_on_commit=False)()
+    yield session
+    await session.close()
+    await engine.dispose()
+
+
+async def add_history(db, days=30):
+    """rmse and mae for model "m" v1, one evaluation per day"""
+    start = datetime(2024, 1, 1)
+    for day in range(days):
+        for metric, value in (("rmse", 1.0 / (day + 1)), ("mae", 0.5)):
+            metric_row = ModelMetrics(
+                model_name="m", model_version="v1", metric_name=metric,
+                metric_value=value, evaluation_date=start + timedelta(days=day)
+            )
+            db.add(metric_row)
+            await db.flush()
+            await upsert_latest_metric(db, metric_row)
+    await db.commit()
+
+
+class TestLatestMetrics:
+    """Test the latest-value table kept on insert"""
+
+    @pytest.mark.asyncio
+    async def test_insert_updates_latest(self, db):
+        await create_model_metric(db, "m", "v1", "rmse", 0.5)
+        second = await create_model_metric(db, "m", "v1", "rmse", 0.4)
+
+        latest = (await db.execute(select(ModelMetricLatest))).scalars().all()
+        assert [(m.metric_name, m.metric_value, m.metric_id) for m in latest] == [("rmse", 0.4, second.id)]
+
+    @pytest.mark.asyncio
+    async def test_older_evaluation_does_not_replace_latest(self, db):
+        await add_history(db, days=3)
+        late_arrival = ModelMetrics(
+            model_name="m", model_version="v1", metric_name="rmse",
+            metric_value=9.9, evaluation_date=datetime(2023, 12, 1)
+        )
+        db.add(late_arrival)
+        await db.flush()
+        await upsert_latest_metric(db, late_arrival)
+        await db.commit()
+
+        row = await db.get(ModelMetricLatest, ("m", "v1", "rmse"))
+        assert row.metric_value == pytest.approx(1.0 / 3)
+
+    @pytest.mark.asyncio
+    async def test_direct_inserts_update_latest(self, db):
+        await db.execute(insert(ModelMetrics), [
+            {"model_name": "m", "model_version": "v1", "metric_name": "rmse",
+             "metric_value": value, "evaluation_date": datetime(2024, 1, day)}
+            for day, value in ((2, 0.4), (1, 0.9), (3, 0.3))
+        ])
+        await db.execute(text(
+            "INSERT INTO model_metrics (model_name, model_version, metric_name, metric_value) "
+            "VALUES ('m', 'v1', 'mae', 0.2)"
+        ))
+        await db.commit()
+
+        latest = (await db.execute(
+            select(ModelMetricLatest.metric_name, ModelMetricLatest.metric_value).order_by(ModelMetricLatest.metric_name)
+        )).all()
+        assert latest == [("mae", 0.2), ("rmse", 0.3)]
+
+    @pytest.mark.asyncio
+    async def test_summary_and_version_follow_latest(self, db):
+        await add_history(db, days=2)
+        version, _ = await get_metrics_version(db)
+
+        summary = await _load_metrics_summary(db)
+        assert summary["models"][0]["metrics"] == {"mae": 0.5, "rmse": 0.5}
+        assert summary["models"][0]["last_evaluation"] == datetime(2024, 1, 2)
+
+        await create_model_metric(db, "m", "v1", "mae", 0.25)
+        assert (await get_metrics_version(db))[0] != version
+
+
+class TestModelPerformance:
+    """Test paged and downsampled metric history"""
+
+    @pytest.mark.asyncio
+    async def test_history_is_paged_newest_first(self, db):
+        await add_history(db, days=30)
+
+        seen = []
+        cursor = None
+        while True:
+            response = Response()
+            page = await get_model_performance(
+                response, "m", "v1", metric_name="rmse", start_date=None, end_date=None,
+                limit=7, cursor=cursor, max_points=None, db=db
+            )
+            seen.extend(h["evaluation_date"] for h in page["evaluation_history"])
+            cursor = response.headers.get(NEXT_CURSOR_HEADER)
+            if cursor is None:
+                break
+
+        assert len(seen) == 30
+        assert seen == sorted(seen, reverse=True)
+        assert page["latest"]["rmse"]["value"] == pytest.approx(1.0 / 30)
+
+    @pytest.mark.asyncio
+    async def test_history_is_downsampled_per_metric(self, db):
+        await add_history(db, days=30)
+
+        performance = await get_model_performance(
+            Response(), "m", "v1", metric_name=None, start_date=None, end_date=None,
+            limit=100, cursor=None, max_points=5, db=db
+        )
+        assert {name: len(points) for name, points in performance["metrics"].items()} == {"mae": 5, "rmse": 5}
+        rmse_dates = [p["date"] for p in performance["metrics"]["rmse"]]
+        assert rmse_dates[0] == datetime(2024, 1, 30)
+        assert rmse_dates[-1] == datetime(2024, 1, 1)
+
+    @pytest.mark.asyncio
+    async def test_unknown_model_is_404(self, db):
+        with pytest.raises(HTTPException) as exc:
+            await get_model_performance(
+                Response(), "missing", "v1", metric_name=None, start_date=None, end_date=None,
+                limit=100, cursor=None, max_points=None, db=db
+            )
+        assert exc.value.status_code == 404
@@ -0,0 +1,77 @@
+from datetime import datetime, timedelta
+
+import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from app.crud.market_data import get_market_data_page
+from app.db.models import Base, MarketData
+from app.utils.pagination import decode_cursor, encode_cursor
+
+
+@pytest_asyncio.fixture
+async def db():
+    """Async session over a private in-memory database with two series"""
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    session = async_sessionmaker(engine, expire_on_commit=False)()
+    start = datetime(2020, 1, 1)
+    for data_type in ("gdp", "exchange_rates"):
+        for day in range(25):
+            session.add(MarketData(
+                date=start + timedelta(days=day),
+                data_type=data_type,
+                data_source=f"{data_type}.csv",
+                raw_data={},
+                processed_data={"value": day}
+            ))
+    await session.commit()
+
+    yield session
+    await session.close()
+    await engine.dispose()
+
+
+class TestCursor:
+    """Test cursor encoding"""
+
+    def test_round_trip(self):
+        when = datetime(2024, 12, 1, 0, 0)
+        assert decode_cursor(encode_cursor(when, 42)) == (when, 42)
+
+    def test_rejects_garbage(self):
+        with pytest.raises(ValueError):
+            decode_cursor("not-a-cursor")
+
+
+class TestKeysetPagination:
+    """Test paging market data on (date, id)"""
+
+    @pytest.mark.asyncio
+    async def test_pages_cover_every_row_once(self, db):
+        seen = []
+        after = None
+        while True:
+            page = await get_market_data_page(db, after=after, limit=7)
+            seen.extend(row.id for row in page)
+            if len(page) < 7:
+                break
+            after = (page[-1].date, page[-1].id)
+
+        assert len(seen) == 50
+        assert len(set(seen)) == 50
+
+    @pytest.mark.asyncio
+    async def test_pages_are_newest_first_within_type(self, db):
+        first = await get_market_data_page(db, data_type="gdp", limit=10)
+        second = await get_market_data_page(
+            db, data_type="gdp", after=(first[-1].date, first[-1].id), limit=10
+        )
+
+        dates = [row.date for row in first + second]
+        assert dates == sorted(dates, reverse=True)
+        assert len(set(dates)) == 20
+        assert all(row.data_type == "gdp" for row in first + second)
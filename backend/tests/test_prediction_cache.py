@@ -0,0 +1,131 @@
+import asyncio
+import importlib.util
+import os
+
+import pytest
+
+from app.utils.prediction_cache import PredictionCache
+
+fakeredis = pytest.importorskip("fakeredis")
+
+UNREACHABLE_REDIS = "redis://127.0.0.1:1/0"
+FEATURES = {"gdp_growth_rate": 5, "inflation_rate": 6.5}
+RESULT = {"prediction": 1.25, "model_version": "latest"}
+
+# The ML service's publisher; both services name their package `app`, so load it by path
+ML_GATEWAY_CACHE = os.path.join(
+    os.path.dirname(__file__), "..", "..", "ml_service", "app", "gateway_cache.py"
+)
+
+
+def load_ml_gateway_cache():
+    spec = importlib.util.spec_from_file_location("ml_service_gateway_cache", ML_GATEWAY_CACHE)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+async def wait_for(condition, timeout=2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not await condition():
+        assert asyncio.get_running_loop().time() < deadline
+        await asyncio.sleep(0.01)
+
+
+@pytest.fixture
+def cache():
+    """Prediction cache over an in-process Redis"""
+    cache = PredictionCache(redis_url=UNREACHABLE_REDIS, ttl=60, stale_ttl=60, version_ttl=60, enabled=True)
+    cache._redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+    return cache
+
+
+class TestPredictionCache:
+    """Test prediction caching by resolved model version"""
+
+    @pytest.mark.asyncio
+    async def test_latest_is_served_under_its_resolved_version(self, cache):
+        assert await cache.get(FEATURES, "latest") is None
+        await cache.set(FEATURES, "latest", "7", RESULT)
+
+        hit = await cache.get({"inflation_rate": 6.5, "gdp_growth_rate": 5.0}, "latest")
+        assert hit["result"] == RESULT
+        assert not hit["stale"]
+        assert (await cache.get(FEATURES, "7"))["key"] == hit["key"]
+
+    @pytest.mark.asyncio
+    async def test_new_latest_version_hides_old_entries(self, cache):
+        await cache.set(FEATURES, "latest", "7", RESULT)
+        await cache.set({"gdp_growth_rate": 1.0, "inflation_rate": 1.0}, "latest", "8", RESULT)
+
+        assert await cache.get(FEATURES, "latest") is None
+        assert await cache.get(FEATURES, "7") is not None
+
+    @pytest.mark.asyncio
+    async def test_model_swap_drops_latest_version(self, cache):
+        await cache.set(FEATURES, "latest", "7", RESULT)
+
+        # What the ML service does on /models/{version}/load
+        await cache._redis.delete("prediction_cache:latest_version")
+        assert await cache.get(FEATURES, "latest") is None
+
+    @pytest.mark.asyncio
+    async def test_stale_entries_are_flagged(self, cache, monkeypatch):
+        await cache.set(FEATURES, "3", "3", RESULT)
+
+        import app.utils.prediction_cache as module
+        now = module.time.time()
+        monkeypatch.setattr(module.time, "time", lambda: now + 61)
+        assert (await cache.get(FEATURES, "3"))["stale"]
+
+    @pytest.mark.asyncio
+    async def test_refresh_lock_is_exclusive(self, cache):
+        await cache.set(FEATURES, "3", "3", RESULT)
+        key = (await cache.get(FEATURES, "3"))["key"]
+
+        assert await cache.acquire_refresh_lock(key)
+        assert not await cache.acquire_refresh_lock(key)
+        await cache.release_refresh_lock(key)
+        assert await cache.acquire_refresh_lock(key)
+
+    @pytest.mark.asyncio
+    async def test_unreachable_redis_is_a_miss(self):
+        cache = PredictionCache(redis_url=UNREACHABLE_REDIS, enabled=True)
+        await cache.set(FEATURES, "latest", "7", RESULT)
+        assert await cache.get(FEATURES, "latest") is None
+        await cache.close()
+
+
+class TestModelSwapInvalidation:
+    """Test the ML service clears the gateway's "latest" version across Redis databases"""
+
+    @pytest.mark.asyncio
+    async def test_swap_published_from_another_db_clears_gateway_entry(self):
+        server = fakeredis.FakeServer()
+        cache = PredictionCache(redis_url=UNREACHABLE_REDIS, ttl=60, stale_ttl=60, version_ttl=60, enabled=True)
+        cache._redis = fakeredis.FakeAsyncRedis(server=server, db=0, decode_responses=True)
+
+        # The ML service keeps its own state in DB 1, as docker-compose configures it
+        ml_redis = fakeredis.FakeRedis(server=server, db=1)
+        ml_redis.set("prediction_cache:latest_version", "unrelated")
+        invalidator = load_ml_gateway_cache().GatewayCacheInvalidator(client=ml_redis)
+        assert invalidator.publish_latest_version("8") == 0
+
+        await cache.start()
+        await cache.set(FEATURES, "latest", "7", RESULT)
+        assert await cache.get(FEATURES, "latest") is not None
+
+        async def subscribed():
+            return (await cache._redis.pubsub_numsub(cache.CHANNEL))[0][1] == 1
+
+        await wait_for(subscribed)
+        assert invalidator.publish_latest_version("8") == 1
+
+        async def cleared():
+            return await cache.resolve_version("latest") is None
+
+        await wait_for(cleared)
+        assert await cache.get(FEATURES, "latest") is None
+        assert await cache.get(FEATURES, "7") is not None
+        assert ml_redis.get("prediction_cache:latest_version") == b"unrelated"
+        await cache.stop()
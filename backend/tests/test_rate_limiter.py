@@ -0,0 +1,170 @@
+import asyncio
+
+import pytest
+
+from app.utils.rate_limiter import GCRA_SCRIPT, LocalTokenBucket, RateLimiter, RateLimitResult
+
+
+UNREACHABLE_REDIS = "redis://127.0.0.1:1/0"
+
+
+class TestLocalTokenBucket:
+    """Test the in-process token bucket"""
+
+    def test_allows_up_to_limit_then_rejects(self):
+        bucket = LocalTokenBucket()
+        assert all(bucket.consume("ip", limit=5, window=60) is None for _ in range(5))
+
+        retry_after = bucket.consume("ip", limit=5, window=60)
+        assert retry_after is not None
+        assert 0 < retry_after <= 12
+
+    def test_identifiers_are_independent(self):
+        bucket = LocalTokenBucket()
+        for _ in range(3):
+            bucket.consume("a", limit=3, window=60)
+
+        assert bucket.consume("a", limit=3, window=60) is not None
+        assert bucket.consume("b", limit=3, window=60) is None
+
+    def test_cost_and_refund(self):
+        bucket = LocalTokenBucket()
+        assert bucket.consume("ip", limit=10, window=60, cost=8) is None
+        assert bucket.consume("ip", limit=10, window=60, cost=3) is not None
+
+        bucket.refund("ip", limit=10, cost=8)
+        assert bucket.consume("ip", limit=10, window=60, cost=3) is None
+
+    def test_evicts_least_recently_seen(self):
+        bucket = LocalTokenBucket(max_keys=2)
+        for identifier in ("a", "b", "c"):
+            bucket.consume(identifier, limit=1, window=60)
+
+        # "a" was evicted, so it starts with a full bucket again
+        assert bucket.consume("a", limit=1, window=60) is None
+        assert bucket.consume("c", limit=1, window=60) is not None
+
+
+class TestRateLimitResult:
+    """Test rate limit response headers"""
+
+    def test_allowed_headers(self):
+        result = RateLimitResult(True, 100, remaining=42, reset_after=3.2, retry_after=0.0)
+        assert result.headers() == {
+            "X-RateLimit-Limit": "100",
+            "X-RateLimit-Remaining": "42",
+            "X-RateLimit-Reset": "4",
+        }
+
+    def test_rejected_headers_include_retry_after(self):
+        result = RateLimitResult(False, 100, remaining=0, retry_after=0.3)
+        headers = result.headers()
+        assert headers["X-RateLimit-Remaining"] == "0"
+        assert headers["Retry-After"] == "1"
+
+    def test_headers_are_exposed_to_browsers(self):
+        from fastapi.testclient import TestClient
+        from app.main import app
+
+        result = RateLimitResult(False, 100, remaining=0, reset_after=3.0, retry_after=0.3)
+        response = TestClient(app).get("/docs", headers={"Origin": "http://localhost:3000"})
+        exposed = {h.strip() for h in response.headers["access-control-expose-headers"].split(",")}
+        assert set(result.headers()) | {"X-Next-Cursor"} <= exposed
+
+
+class TestRateLimiter:
+    """Test the shared limiter's fallbacks"""
+
+    @pytest.mark.asyncio
+    async def test_redis_unavailable_allows(self):
+        limiter = RateLimiter(redis_url=UNREACHABLE_REDIS, local_bucket=False)
+        result = await limiter.hit("ip", limit=1, window=60)
+        assert result.allowed
+        await limiter.close()
+
+    @pytest.mark.asyncio
+    async def test_local_bucket_rejects_without_redis(self):
+        limiter = RateLimiter(redis_url=UNREACHABLE_REDIS, local_bucket=True)
+        assert (await limiter.hit("ip", limit=2, window=60)).allowed
+        assert (await limiter.hit("ip", limit=2, window=60)).allowed
+
+        result = await limiter.hit("ip", limit=2, window=60)
+        assert not result.allowed
+        assert "Retry-After" in result.headers()
+        await limiter.close()
+
+
+@pytest.fixture
+def limiter():
+    """Limiter running the GCRA script on an in-process Redis with Lua support"""
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    limiter = RateLimiter(redis_url=UNREACHABLE_REDIS, local_bucket=False)
+    limiter._redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+    limiter._script = limiter._redis.register_script(GCRA_SCRIPT)
+    return limiter
+
+
+class TestGcraScript:
+    """Test the shared GCRA limit"""
+
+    @pytest.mark.asyncio
+    async def test_burst_up_to_limit_then_rejects(self, limiter):
+        results = [await limiter.hit("ip", limit=5, window=60) for _ in range(6)]
+
+        assert [r.allowed for r in results] == [True] * 5 + [False]
+        assert [r.remaining for r in results[:5]] == [4, 3, 2, 1, 0]
+        assert results[4].reset_after == pytest.approx(60, abs=0.5)
+        # One request's worth of emission interval until the next is allowed
+        assert results[5].retry_after == pytest.approx(12, abs=0.5)
+        assert results[5].headers()["Retry-After"] == "12"
+
+    @pytest.mark.asyncio
+    async def test_rejected_requests_do_not_consume(self, limiter):
+        for _ in range(5):
+            await limiter.hit("ip", limit=5, window=60)
+        first = await limiter.hit("ip", limit=5, window=60)
+        second = await limiter.hit("ip", limit=5, window=60)
+        assert second.retry_after == pytest.approx(first.retry_after, abs=0.1)
+
+    @pytest.mark.asyncio
+    async def test_refills_one_emission_interval_at_a_time(self, limiter):
+        # 10 requests per second: one slot frees every 100ms
+        for _ in range(10):
+            assert (await limiter.hit("ip", limit=10, window=1)).allowed
+        assert not (await limiter.hit("ip", limit=10, window=1)).allowed
+
+        await asyncio.sleep(0.15)
+        assert (await limiter.hit("ip", limit=10, window=1)).allowed
+        assert not (await limiter.hit("ip", limit=10, window=1)).allowed
+
+    @pytest.mark.asyncio
+    async def test_cost_counts_as_several_requests(self, limiter):
+        assert (await limiter.hit("ip", limit=10, window=60, cost=7)).remaining == 3
+
+        too_big = await limiter.hit("ip", limit=10, window=60, cost=4)
+        assert not too_big.allowed
+        assert too_big.retry_after == pytest.approx(6, abs=0.5)
+
+        assert (await limiter.hit("ip", limit=10, window=60, cost=3)).allowed
+
+    @pytest.mark.asyncio
+    async def test_identifiers_are_independent(self, limiter):
+        assert (await limiter.hit("a", limit=1, window=60)).allowed
+        assert not (await limiter.hit("a", limit=1, window=60)).allowed
+        assert (await limiter.hit("b", limit=1, window=60)).allowed
+
+    @pytest.mark.asyncio
+    async def test_status_and_reset(self, limiter):
+        for _ in range(3):
+            await limiter.hit("ip", limit=5, window=60)
+        assert (await limiter.status("ip", limit=5, window=60))["remaining"] == 2
+
+        await limiter.reset("ip")
+        assert (await limiter.hit("ip", limit=5, window=60)).remaining == 4
+
+    @pytest.mark.asyncio
+    async def test_key_expires_once_fully_refilled(self, limiter):
+        await limiter.hit("ip", limit=5, window=60, cost=2)
+        ttl_ms = await limiter._redis.pttl(limiter.key("ip"))
+        assert 23000 < ttl_ms <= 24000
@@ -0,0 +1,93 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from app.utils.resampling import lttb, period_ends, resample_series
+
+
+def daily(start, days):
+    return np.arange(np.datetime64(start), np.datetime64(start) + days).astype("datetime64[us]")
+
+
+class TestPeriodEnds:
+    """Test period labels"""
+
+    @pytest.mark.parametrize("freq, expected", [
+        ("W", "2024-02-18"),  # Thursday -> following Sunday
+        ("M", "2024-02-29"),
+        ("Q", "2024-03-31"),
+    ])
+    def test_labels_are_last_day_of_period(self, freq, expected):
+        labels = period_ends(np.array(["2024-02-15"], dtype="datetime64[us]"), freq)
+        assert str(labels[0]) == expected
+
+    def test_sunday_ends_its_own_week(self):
+        labels = period_ends(np.array(["2024-02-18"], dtype="datetime64[us]"), "W")
+        assert str(labels[0]) == "2024-02-18"
+
+
+class TestResampleSeries:
+    """Test period aggregation and point caps"""
+
+    def test_monthly_mean_and_last(self):
+        dates = daily("2024-01-30", 4)  # Jan 30, Jan 31, Feb 1, Feb 2
+        values = np.array([1.0, 3.0, 10.0, 20.0])
+
+        mean = resample_series(dates, values, "M", "mean")
+        assert mean == [
+            {"date": datetime(2024, 1, 31), "value": 2.0},
+            {"date": datetime(2024, 2, 29), "value": 15.0},
+        ]
+        last = resample_series(dates, values, "M", "last")
+        assert [p["value"] for p in last] == [3.0, 20.0]
+
+    def test_ohlc_bars(self):
+        dates = daily("2024-01-01", 5)
+        values = np.array([5.0, 9.0, 1.0, 4.0, 6.0])
+
+        bars = resample_series(dates, values, "Q", "ohlc")
+        assert bars == [{"date": datetime(2024, 3, 31), "open": 5.0, "high": 9.0, "low": 1.0, "close": 6.0}]
+
+    def test_capped_ohlc_merges_neighbouring_bars(self):
+        dates = daily("2024-01-01", 366)
+        values = np.sin(np.arange(366) / 10.0)
+
+        bars = resample_series(dates, values, "W", "ohlc", max_points=10)
+        assert len(bars) <= 10
+        assert bars[0]["open"] == values[0]
+        assert bars[-1]["close"] == values[-1]
+        assert max(b["high"] for b in bars) == values.max()
+        assert min(b["low"] for b in bars) == values.min()
+
+    def test_capped_line_uses_lttb(self):
+        dates = daily("2024-01-01", 1000)
+        values = np.zeros(1000)
+        values[437] = 50.0  # a spike that every-nth sampling would miss
+
+        points = resample_series(dates, values, max_points=20)
+        assert len(points) == 20
+        assert points[0]["date"] == datetime(2024, 1, 1)
+        assert 50.0 in [p["value"] for p in points]
+
+    @pytest.mark.parametrize("freq", [None, "W", "M", "Q"])
+    @pytest.mark.parametrize("agg", ["mean", "last", "ohlc"])
+    def test_empty_series(self, freq, agg):
+        empty = np.array([], dtype="datetime64[us]")
+        assert resample_series(empty, np.array([]), freq, agg, max_points=5) == []
+
+
+class TestLTTB:
+    """Test downsampling index selection"""
+
+    def test_keeps_endpoints_and_is_sorted(self):
+        x = np.arange(500)
+        y = np.random.default_rng(0).normal(size=500)
+        keep = lttb(x, y, 50)
+
+        assert len(keep) == 50
+        assert keep[0] == 0 and keep[-1] == 499
+        assert np.all(np.diff(keep) > 0)
+
+    def test_short_series_are_unchanged(self):
+        assert list(lttb(np.arange(5), np.arange(5.0), 10)) == [0, 1, 2, 3, 4]
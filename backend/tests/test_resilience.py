@@ -0,0 +1,175 @@
+import time
+
+import httpx
+import pytest
+
+from app.utils.ml_client import MLClient
+from app.utils.resilience import CircuitBreaker, RetryBudget, UpstreamUnavailable
+from stub_ml_service import StubCluster, create_stub_app
+
+
+def make_client(replicas, **kwargs):
+    """MLClient talking to in-process stub replicas"""
+    cluster = StubCluster(replicas)
+    urls = [f"http://{host}" for host in replicas]
+    return MLClient(urls=urls, transport=cluster, **kwargs)
+
+
+class TestCircuitBreaker:
+    """Test circuit breaker state transitions"""
+
+    def test_opens_after_consecutive_failures(self):
+        breaker = CircuitBreaker("replica", failure_threshold=3, reset_timeout=60)
+        for _ in range(3):
+            assert breaker.allow_request()
+            breaker.record_failure()
+
+        assert breaker.state == CircuitBreaker.OPEN
+        assert not breaker.allow_request()
+
+    def test_half_open_allows_single_probe(self):
+        breaker = CircuitBreaker("replica", failure_threshold=1, reset_timeout=0.01)
+        breaker.record_failure()
+        time.sleep(0.02)
+
+        assert breaker.allow_request()
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        assert not breaker.allow_request()
+
+        breaker.record_success()
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    def test_failed_probe_reopens(self):
+        breaker = CircuitBreaker("replica", failure_threshold=1, reset_timeout=0.01)
+        breaker.record_failure()
+        time.sleep(0.02)
+
+        assert breaker.allow_request()
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.OPEN
+
+
+class TestRetryBudget:
+    """Test retry budget accounting"""
+
+    def test_retries_bounded_by_ratio(self):
+        budget = RetryBudget(ratio=0.1, min_retries_per_second=0, window=60)
+        for _ in range(50):
+            budget.record_request()
+
+        allowed = sum(budget.withdraw() for _ in range(20))
+        assert allowed == 5
+
+
+class TestMLClientTimeouts:
+    """Test per-attempt and whole-call timeouts"""
+
+    def test_attempt_timeout_defaults_to_call_timeout(self):
+        assert make_client({"a": create_stub_app("a")}, timeout=30.0).attempt_timeout == 30.0
+
+    def test_attempt_timeout_can_be_shorter(self):
+        assert make_client({"a": create_stub_app("a")}, timeout=30.0, attempt_timeout=5.0).attempt_timeout == 5.0
+
+
+class TestMLClientResilience:
+    """Test routing, retries and hedging against stub replicas"""
+
+    @pytest.mark.asyncio
+    async def test_failing_replica_is_retried_and_avoided(self):
+        failing = create_stub_app("failing", fail_rate=1.0)
+        healthy = create_stub_app("healthy")
+        client = make_client({"failing": failing, "healthy": healthy})
+
+        for _ in range(20):
+            response = await client.post("/predict", json={}, idempotent=True)
+            assert response.status_code == 200
+            assert response.json()["model_version"] == "healthy"
+
+        # After its first failure the replica scores too slow to be picked
+        assert failing.state.calls <= 2
+        await client.close()
+
+    @pytest.mark.asyncio
+    async def test_circuit_opens_on_failing_replica(self):
+        failing = create_stub_app("failing", fail_rate=1.0)
+        client = make_client({"failing": failing}, max_retries=0)
+        client.upstreams[0].breaker.failure_threshold = 2
+
+        for _ in range(2):
+            response = await client.post("/predict", json={}, idempotent=True)
+            assert response.status_code == 503
+
+        with pytest.raises(UpstreamUnavailable):
+            await client.post("/predict", json={}, idempotent=True)
+        assert failing.state.calls == 2
+        await client.close()
+
+    @pytest.mark.asyncio
+    async def test_stalled_replica_times_out_and_retries(self):
+        stalled = create_stub_app("stalled", delay=5.0)
+        healthy = create_stub_app("healthy")
+        client = make_client({"stalled": stalled, "healthy": healthy}, attempt_timeout=0.1)
+
+        start = time.perf_counter()
+        for _ in range(5):
+            response = await client.post("/predict", json={}, idempotent=True)
+            assert response.json()["model_version"] == "healthy"
+
+        assert time.perf_counter() - start < 2.0
+        await client.close()
+
+    @pytest.mark.asyncio
+    async def test_hedge_beats_slow_replica(self):
+        slow = create_stub_app("slow", delay=1.0)
+        fast = create_stub_app("fast")
+        client = make_client({"slow": slow, "fast": fast}, hedge=True, hedge_delay_ms=20)
+        # Route the first attempt to the slow replica
+        client.upstreams[1].stats.ewma = 10.0
+
+        start = time.perf_counter()
+        response = await client.post("/predict", json={}, idempotent=True)
+        elapsed = time.perf_counter() - start
+
+        assert response.json()["model_version"] == "fast"
+        assert slow.state.calls == 1
+        assert elapsed < 0.5
+        await client.close()
+
+    @pytest.mark.asyncio
+    async def test_non_idempotent_calls_not_retried(self):
+        failing = create_stub_app("failing", fail_rate=1.0)
+        client = make_client({"failing": failing}, max_retries=2)
+
+        response = await client.post("/predict", json={})
+        assert response.status_code == 503
+        assert failing.state.calls == 1
+
+        await client.post("/predict", json={}, idempotent=True)
+        assert failing.state.calls == 4
+        await client.close()
+
+    @pytest.mark.asyncio
+    async def test_all_circuits_open(self):
+        client = make_client({"a": create_stub_app("a"), "b": create_stub_app("b")})
+        for upstream in client.upstreams:
+            upstream.breaker.state = CircuitBreaker.OPEN
+            upstream.breaker.opened_at = time.monotonic()
+
+        with pytest.raises(UpstreamUnavailable):
+            await client.post("/predict", json={}, idempotent=True)
+        await client.close()
+
+    @pytest.mark.asyncio
+    async def test_deadline_header_propagated(self):
+        seen = {}
+
+        def handler(request):
+            seen["deadline"] = float(request.headers["X-Request-Deadline"])
+            return httpx.Response(200, json={"prediction": 1.0})
+
+        client = MLClient(urls=["http://replica"], transport=httpx.MockTransport(handler), timeout=3.0)
+        before = time.time()
+        await client.post("/predict", json={})
+
+        assert before + 2.5 < seen["deadline"] <= time.time() + 3.0
+        await client.close()
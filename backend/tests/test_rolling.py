@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+
+from app.utils.rolling import align, nullable, rolling_correlation, rolling_stats, to_periods
+
+
+def random_walk(n, level, seed=0):
+    return level + np.cumsum(np.random.default_rng(seed).normal(scale=0.5, size=n))
+
+
+class TestRollingStats:
+    """Test cumulative-sum rolling statistics against pandas"""
+
+    def test_matches_pandas_on_large_levels(self):
+        values = random_walk(2000, level=150.0)
+        stats = rolling_stats(values, 30)
+
+        rolling = pd.Series(values).rolling(30)
+        mean = rolling.mean().to_numpy()[29:]
+        std = rolling.std().to_numpy()[29:]
+        assert np.allclose(stats["mean"], mean)
+        assert np.allclose(stats["std"], std)
+        assert np.allclose(stats["zscore"], (values[29:] - mean) / std)
+
+    def test_flat_window_has_no_zscore(self):
+        stats = rolling_stats(np.array([5.0, 5.0, 5.0, 6.0]), 3)
+        assert stats["std"][0] == 0.0
+        assert nullable(stats["zscore"])[0] is None
+
+
+class TestRollingCorrelation:
+    """Test cumulative-sum rolling correlation against pandas"""
+
+    def test_matches_pandas(self):
+        x = random_walk(500, level=110.0, seed=1)
+        y = 0.3 * x + random_walk(500, level=5.0, seed=2)
+
+        expected = pd.Series(x).rolling(24).corr(pd.Series(y)).to_numpy()[23:]
+        assert np.allclose(rolling_correlation(x, y, 24), expected)
+
+
+class TestAlignment:
+    """Test resampling and joining series of different frequencies"""
+
+    def test_daily_and_monthly_series_join_on_months(self):
+        daily = np.arange(np.datetime64("2024-01-01"), np.datetime64("2024-04-01")).astype("datetime64[us]")
+        monthly = np.array(["2024-02-29", "2024-03-31"], dtype="datetime64[us]")
+
+        dates, matrix = align({
+            "fx": to_periods(daily, np.arange(len(daily), dtype=np.float64), "M"),
+            "cpi": to_periods(monthly, np.array([6.3, 5.7]), "M"),
+        })
+        assert [str(d)[:10] for d in dates] == ["2024-02-29", "2024-03-31"]
+        assert matrix[:, 0].tolist() == [45.0, 75.0]
+        assert matrix[:, 1].tolist() == [6.3, 5.7]
+
+    def test_empty_series(self):
+        empty = np.array([], dtype="datetime64[us]")
+        monthly = np.array(["2024-02-29", "2024-03-31"], dtype="datetime64[us]")
+
+        dates, values = to_periods(empty, np.array([]), "M")
+        assert len(dates) == 0 and len(values) == 0
+
+        dates, matrix = align({"fx": (dates, values), "cpi": (monthly, np.array([6.3, 5.7]))})
+        assert len(dates) == 0
+        assert matrix.shape == (0, 2)
+
+        dates, matrix = align({})
+        assert len(dates) == 0
+        assert matrix.shape == (0, 0)
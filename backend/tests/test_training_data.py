@@ -0,0 +1,75 @@
+import importlib.util
+import os
+from datetime import datetime
+
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.db.models import Base, MarketObservation
+
+
+DATA_UTILS = os.path.join(os.path.dirname(__file__), "..", "..", "ml", "training", "data_utils.py")
+
+
+def load_data_utils():
+    spec = importlib.util.spec_from_file_location("training_data_utils", DATA_UTILS)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+data_utils = load_data_utils()
+
+OBSERVATIONS = {
+    "gdp.GDP_Growth_Rate": [(datetime(2023, 3, 31), 2.0), (datetime(2023, 6, 30), 3.0), (datetime(2023, 9, 30), 4.0)],
+    "inflation.Inflation_Rate": [(datetime(2023, m, d), 6.0 + m / 10) for m, d in ((4, 30), (5, 31), (6, 30), (7, 31))],
+    "exchange_rates.USD_KES": [(datetime(2023, 5, 1), 140.0), (datetime(2023, 5, 31), 142.0), (datetime(2023, 6, 15), 150.0)],
+    "interest_rates.CBR": [(datetime(2023, 4, 30), 9.5), (datetime(2023, 5, 31), 9.5), (datetime(2023, 6, 30), 10.5)],
+    "trade_foreign_summary.Trade_Balance": [(datetime(2023, 5, 31), -1000.0), (datetime(2023, 6, 30), -1200.0)],
+}
+
+
+@pytest.fixture
+def database_url(tmp_path):
+    """SQLite database holding the observations above"""
+    url = f"sqlite:///{tmp_path / 'training.db'}"
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        for series, points in OBSERVATIONS.items():
+            for when, value in points:
+                session.add(MarketObservation(
+                    series=series, date=when, value=value, data_type=series.split(".")[0]
+                ))
+        session.commit()
+    engine.dispose()
+    return url
+
+
+class TestLoadFromDatabase:
+    """Test training data read from market_observations"""
+
+    def test_series_are_pivoted_per_dataset(self, database_url):
+        datasets = data_utils.load_financial_data_from_db(database_url)
+
+        assert set(datasets) == {"gdp", "inflation", "exchange_rates", "interest_rates", "trade"}
+        assert list(datasets["gdp"].columns) == ["Date", "GDP_Growth_Rate"]
+        assert datasets["exchange_rates"]["USD_KES"].tolist() == [140.0, 142.0, 150.0]
+
+    def test_training_frame_has_features_and_next_month_target(self, database_url):
+        frame = data_utils.build_training_frame(data_utils.load_financial_data_from_db(database_url))
+        frame = frame.set_index("Date")
+
+        may = frame.loc[pd.Timestamp(2023, 5, 31)]
+        assert may["gdp_growth_rate"] == 2.0
+        assert may["inflation_rate"] == pytest.approx(6.5)
+        assert may["usd_kes_rate"] == 141.0
+        assert may["cbr_rate"] == 9.5
+        assert may["trade_balance"] == -1000.0
+        assert may["Target_GDP_Growth_Next_Month"] == 3.0
+
+        assert frame.loc[pd.Timestamp(2023, 6, 30), "usd_kes_rate"] == 150.0
+        # Target comes from the following month, so the last month is dropped
+        assert frame.index.max() == pd.Timestamp(2023, 8, 31)
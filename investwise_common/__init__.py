@@ -0,0 +1,6 @@
+"""
+Code shared by model training (ml/) and model serving (ml_service/)
+
+Both sides import from here so the features a model is fitted on and the
+features it is served are built by the same function.
+"""
@@ -0,0 +1,49 @@
+"""
+CPU detection shared by the training pipeline and the ML service
+"""
+import os
+
+# Thread-count variables read by OpenMP, OpenBLAS, MKL, Accelerate and numexpr
+THREAD_ENV_VARS = [
+    "OMP_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "VECLIB_MAXIMUM_THREADS",
+    "NUMEXPR_NUM_THREADS",
+]
+
+# CPU quota files: cgroup v2 "<quota> <period>", cgroup v1 quota and period in microseconds
+CGROUP_V2_CPU_MAX = "/sys/fs/cgroup/cpu.max"
+CGROUP_V1_CFS_QUOTA = "/sys/fs/cgroup/cpu/cpu.cfs_quota_us"
+CGROUP_V1_CFS_PERIOD = "/sys/fs/cgroup/cpu/cpu.cfs_period_us"
+
+def available_cpus() -> int:
+    """Count CPUs usable by this process, honouring affinity and cgroup quotas"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+
+    quota = None
+    try:
+        # cgroup v2: "<quota> <period>" or "max <period>"
+        with open(CGROUP_V2_CPU_MAX) as f:
+            limit, period = f.read().split()
+            if limit != "max":
+                quota = int(limit) / int(period)
+    except (OSError, ValueError):
+        try:
+            # cgroup v1
+            with open(CGROUP_V1_CFS_QUOTA) as f:
+                limit = int(f.read())
+            with open(CGROUP_V1_CFS_PERIOD) as f:
+                period = int(f.read())
+            if limit > 0:
+                quota = limit / period
+        except (OSError, ValueError):
+            pass
+
+    if quota:
+        cpus = min(cpus, max(1, int(quota)))
+
+    return max(1, cpus)
@@ -0,0 +1,47 @@
+"""
+Feature engineering shared by training and serving
+"""
+import numpy as np
+import pandas as pd
+
+# Indicators every model is fed, in the order requests supply them
+BASE_FEATURES = ["gdp_growth_rate", "inflation_rate", "usd_kes_rate", "cbr_rate", "trade_balance"]
+
+# Columns the trained models are fitted on, in training order
+ENGINEERED_FEATURES = BASE_FEATURES + [
+    "inflation_gdp_ratio", "usd_inflation_interaction", "cbr_inflation_diff",
+    "gdp_growth_squared", "inflation_squared", "economic_stress"
+]
+
+def engineer_features(X) -> pd.DataFrame:
+    """
+    Add the engineered features to rows of base features
+
+    Args:
+        X: DataFrame with the BASE_FEATURES columns, or rows of base
+           features in BASE_FEATURES order
+
+    Returns:
+        A new DataFrame with the ENGINEERED_FEATURES columns
+    """
+    if isinstance(X, pd.DataFrame):
+        X_eng = X.copy()
+    else:
+        X_eng = pd.DataFrame(np.asarray(X, dtype=float), columns=BASE_FEATURES)
+
+    # Interaction features
+    X_eng['inflation_gdp_ratio'] = X_eng['inflation_rate'] / (X_eng['gdp_growth_rate'] + 1e-6)
+    X_eng['usd_inflation_interaction'] = X_eng['usd_kes_rate'] * X_eng['inflation_rate']
+    X_eng['cbr_inflation_diff'] = X_eng['cbr_rate'] - X_eng['inflation_rate']
+
+    # Polynomial features for key indicators
+    X_eng['gdp_growth_squared'] = X_eng['gdp_growth_rate'] ** 2
+    X_eng['inflation_squared'] = X_eng['inflation_rate'] ** 2
+
+    # Economic stress indicators
+    X_eng['economic_stress'] = (
+        (X_eng['inflation_rate'] > 7) &
+        (X_eng['gdp_growth_rate'] < 2)
+    ).astype(int)
+
+    return X_eng
@@ -56,11 +56,15 @@ def generate_sample_data() -> bool:
 def run_training() -> Dict[str, Any]:
     """Run ML model training"""
     try:
-        # Run the training script
-        result = subprocess.run([
-            sys.executable, "ml/training/train.py",
-            "--data-path", "data/processed/combined_features.csv"
-        ], capture_output=True, text=True, timeout=3600)  # 1 hour timeout
+        # Run the training script, from the database when one is configured
+        command = [sys.executable, "ml/training/train.py"]
+        database_url = os.getenv("TRAINING_DATABASE_URL")
+        if database_url:
+            command += ["--database-url", database_url]
+        else:
+            command += ["--data-path", "data/processed/combined_features.csv"]
+        
+        result = subprocess.run(command, capture_output=True, text=True, timeout=3600)  # 1 hour timeout
         
         if result.returncode == 0:
             logger.info("Training completed successfully")
@@ -149,8 +153,8 @@ def training_flow() -> str:
     logger.info("Starting ML training pipeline")
     
     try:
-        # Check if data is available
-        data_available = check_data_availability()
+        # Check if data is available; the database needs no local files
+        data_available = bool(os.getenv("TRAINING_DATABASE_URL")) or check_data_availability()
         
         if not data_available:
             logger.info("Training data not available, generating sample data")
@@ -43,6 +43,59 @@ def load_financial_data(data_dir: str = "data/raw") -> Dict[str, pd.DataFrame]:
     
     return datasets
 
+def load_financial_data_from_db(database_url: str) -> Dict[str, pd.DataFrame]:
+    """
+    Load all financial datasets from the market_observations table
+
+    Reads (series, date, value) in index order and pivots each data type
+    back to one column per indicator, so the result has the same shape as
+    load_financial_data.
+
+    Args:
+        database_url: SQLAlchemy URL of the InvestWise database
+
+    Returns:
+        Dictionary of DataFrames keyed by dataset name
+    """
+    from sqlalchemy import create_engine, text
+
+    dataset_names = {
+        "gdp": "gdp",
+        "inflation": "inflation",
+        "exchange_rates": "exchange_rates",
+        "interest_rates": "interest_rates",
+        "mobile_payments": "mobile_payments",
+        "trade_foreign_summary": "trade"
+    }
+
+    engine = create_engine(database_url)
+    try:
+        with engine.connect() as conn:
+            observations = pd.read_sql(
+                text("SELECT series, date, value FROM market_observations ORDER BY series, date"),
+                conn,
+                parse_dates=["date"]
+            )
+    finally:
+        engine.dispose()
+
+    parts = observations["series"].str.split(".", n=1, expand=True)
+    observations["data_type"] = parts[0]
+    observations["column"] = parts[1]
+
+    datasets = {}
+    for data_type, group in observations.groupby("data_type"):
+        name = dataset_names.get(data_type)
+        if name is None:
+            continue
+        df = group.pivot(index="date", columns="column", values="value")
+        df = df.reset_index().rename(columns={"date": "Date"})
+        df.columns.name = None
+        datasets[name] = df
+        logger.info(f"Loaded {name}: {len(df)} records")
+
+    return datasets
+
 def merge_datasets(datasets: Dict[str, pd.DataFrame]) -> pd.DataFrame:
     """
     Merge all datasets into a single DataFrame for ML training
@@ -56,11 +109,11 @@ def merge_datasets(datasets: Dict[str, pd.DataFrame]) -> pd.DataFrame:
     # Start with GDP data (quarterly) and resample to monthly
     if "gdp" in datasets:
         base_df = datasets["gdp"].copy()
-        base_df = base_df.set_index('Date').resample('M').ffill().reset_index()
+        base_df = base_df.set_index('Date').resample(pd.offsets.MonthEnd()).ffill().reset_index()
         base_df = base_df[['Date', 'GDP_Growth_Rate']].rename(columns={'GDP_Growth_Rate': 'gdp_growth_rate'})
     else:
         # Create dummy base data
-        dates = pd.date_range('2020-01-01', '2024-12-01', freq='M')
+        dates = pd.date_range('2020-01-01', '2024-12-01', freq=pd.offsets.MonthEnd())
         base_df = pd.DataFrame({'Date': dates, 'gdp_growth_rate': np.random.normal(2.0, 0.5, len(dates))})
     
     # Merge inflation data
@@ -74,7 +127,8 @@ def merge_datasets(datasets: Dict[str, pd.DataFrame]) -> pd.DataFrame:
         fx_monthly = fx_df.groupby(fx_df['Date'].dt.to_period('M')).agg({
             'USD_KES': 'mean'
         }).reset_index()
-        fx_monthly['Date'] = fx_monthly['Date'].dt.to_timestamp()
+        # Key by month end, like the resampled GDP base and the monthly series
+        fx_monthly['Date'] = fx_monthly['Date'].dt.to_timestamp(how='end').dt.normalize()
         fx_monthly = fx_monthly.rename(columns={'USD_KES': 'usd_kes_rate'})
         base_df = base_df.merge(fx_monthly, on='Date', how='left')
     
@@ -113,6 +167,24 @@ def create_target_variable(df: pd.DataFrame, target_col: str = 'gdp_growth_rate'
     
     return df_with_target
 
+def build_training_frame(
+    datasets: Dict[str, pd.DataFrame],
+    target_name: str = "Target_GDP_Growth_Next_Month"
+) -> pd.DataFrame:
+    """
+    Merge raw datasets into the frame the trainer reads from CSV
+
+    Args:
+        datasets: Dictionary of DataFrames, as from load_financial_data
+            or load_financial_data_from_db
+        target_name: Name of the next-month GDP growth column
+
+    Returns:
+        Monthly DataFrame with the model features and target column
+    """
+    merged = merge_datasets(datasets)
+    return create_target_variable(merged).rename(columns={'target': target_name})
+
 def engineer_features(df: pd.DataFrame) -> pd.DataFrame:
     """
     Create engineered features for better model performance
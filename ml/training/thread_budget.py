@@ -0,0 +1,58 @@
+"""
+CPU thread budget for the training pipeline
+"""
+import os
+import logging
+from typing import Dict
+
+from investwise_common.cpus import THREAD_ENV_VARS, available_cpus
+
+logger = logging.getLogger(__name__)
+
+# Grid search and boosting already use every core; BLAS inside them must not
+BLAS_THREADS = 1
+
+def training_thread_budget(n_jobs: int = None) -> Dict[str, int]:
+    """
+    Split the available cores between parallel fits and per-fit threads
+
+    Grid search already runs one fit per core, so each fitted forest gets a
+    single thread. Boosting libraries train one model at a time and get all
+    cores. BLAS stays single-threaded so neither layer multiplies the other.
+
+    Args:
+        n_jobs: Cores to use; defaults to TRAINING_N_JOBS or all available cores
+
+    Returns:
+        Dictionary of thread counts per parallelism layer
+    """
+    cores = n_jobs or int(os.getenv("TRAINING_N_JOBS", "0")) or available_cpus()
+
+    return {
+        "cores": cores,
+        "grid_search_jobs": cores,
+        "estimator_jobs": 1,
+        "boosting_threads": cores,
+        "blas_threads": BLAS_THREADS,
+    }
+
+def apply_blas_environment(threads: int = BLAS_THREADS):
+    """
+    Export BLAS/OpenMP thread caps for this process and spawned workers
+
+    Must run before numpy, scikit-learn, LightGBM or XGBoost are imported,
+    since their pools read these variables on load. Variables already set
+    by the operator are left untouched.
+    """
+    for var in THREAD_ENV_VARS:
+        os.environ.setdefault(var, str(threads))
+
+def limit_blas_threads(threads: int):
+    """Cap BLAS pools that are already loaded in this process"""
+    apply_blas_environment(threads)
+
+    try:
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(limits=threads, user_api="blas")
+    except ImportError:
+        logger.debug("threadpoolctl not installed, relying on environment limits")
@@ -2,21 +2,33 @@
 ML Training Pipeline for InvestWise Predictor
 """
 import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from thread_budget import training_thread_budget, limit_blas_threads, apply_blas_environment
+from investwise_common.features import engineer_features
+
+# Cap native thread pools before numerical libraries are imported
+apply_blas_environment()
+
 import pandas as pd
 import numpy as np
 from sklearn.model_selection import train_test_split, cross_val_score, GridSearchCV
 from sklearn.preprocessing import StandardScaler
-from sklearn.ensemble import RandomForestRegressor
+from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
 from sklearn.linear_model import LinearRegression
 from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
 import lightgbm as lgb
 import xgboost as xgb
 import joblib
+import pickle
 import mlflow
 import mlflow.sklearn
 import mlflow.lightgbm
 import mlflow.xgboost
 from datetime import datetime
+import time
 import logging
 from typing import Dict, Any, Tuple
 import argparse
@@ -28,8 +40,19 @@ logger = logging.getLogger(__name__)
 class InvestWiseTrainer:
     """Training pipeline for investment prediction models"""
     
-    def __init__(self, data_path: str = None, mlflow_uri: str = None):
+    def __init__(
+        self,
+        data_path: str = None,
+        database_url: str = None,
+        mlflow_uri: str = None,
+        distill: bool = False,
+        student_type: str = "gbm",
+        distill_samples: int = 100000,
+        n_jobs: int = None
+    ):
         self.data_path = data_path or "data/processed/combined_features.csv"
+        # When set, training reads market_observations instead of the CSV
+        self.database_url = database_url or os.getenv("TRAINING_DATABASE_URL")
         self.mlflow_uri = mlflow_uri or os.getenv("MLFLOW_TRACKING_URI", "http://localhost:5000")
         self.models_dir = "ml/training/artifacts"
         
@@ -45,15 +68,32 @@ class InvestWiseTrainer:
             "cbr_rate", "trade_balance"
         ]
         self.target_name = "Target_GDP_Growth_Next_Month"
+        
+        # Optional distillation of the random forest into a lightweight student
+        self.distill = distill
+        self.student_type = student_type
+        self.distill_samples = distill_samples
+        self.model_name = "investwise_model"
+        
+        # Thread counts per parallelism layer, so nested pools don't oversubscribe
+        self.threads = training_thread_budget(n_jobs)
+        limit_blas_threads(self.threads["blas_threads"])
+        logger.info(f"Thread budget: {self.threads}")
     
     def load_and_prepare_data(self) -> Tuple[pd.DataFrame, pd.DataFrame]:
         """Load and prepare training data"""
-        logger.info(f"Loading data from {self.data_path}")
-        
-        if not os.path.exists(self.data_path):
-            raise FileNotFoundError(f"Data file not found: {self.data_path}")
-        
-        df = pd.read_csv(self.data_path)
+        if self.database_url:
+            from data_utils import load_financial_data_from_db, build_training_frame
+            
+            logger.info("Loading data from market_observations")
+            df = build_training_frame(load_financial_data_from_db(self.database_url), self.target_name)
+        else:
+            logger.info(f"Loading data from {self.data_path}")
+            
+            if not os.path.exists(self.data_path):
+                raise FileNotFoundError(f"Data file not found: {self.data_path}")
+            
+            df = pd.read_csv(self.data_path)
         logger.info(f"Loaded {len(df)} records")
         
         # Check for required columns
@@ -72,25 +112,8 @@ class InvestWiseTrainer:
         return X, y
     
     def create_feature_engineered_data(self, X: pd.DataFrame) -> pd.DataFrame:
-        """Create additional engineered features"""
-        X_eng = X.copy()
-        
-        # Interaction features
-        X_eng['inflation_gdp_ratio'] = X_eng['inflation_rate'] / (X_eng['gdp_growth_rate'] + 1e-6)
-        X_eng['usd_inflation_interaction'] = X_eng['usd_kes_rate'] * X_eng['inflation_rate']
-        X_eng['cbr_inflation_diff'] = X_eng['cbr_rate'] - X_eng['inflation_rate']
-        
-        # Polynomial features for key indicators
-        X_eng['gdp_growth_squared'] = X_eng['gdp_growth_rate'] ** 2
-        X_eng['inflation_squared'] = X_eng['inflation_rate'] ** 2
-        
-        # Economic stress indicators
-        X_eng['economic_stress'] = (
-            (X_eng['inflation_rate'] > 7) & 
-            (X_eng['gdp_growth_rate'] < 2)
-        ).astype(int)
-        
-        return X_eng
+        """Create additional engineered features, as the ML service does at serving time"""
+        return engineer_features(X)
     
     def train_linear_model(self, X_train, X_test, y_train, y_test) -> Dict[str, Any]:
         """Train Linear Regression model"""
@@ -140,8 +163,11 @@ class InvestWiseTrainer:
                 'min_samples_leaf': [1, 2, 4]
             }
             
-            rf = RandomForestRegressor(random_state=42)
-            grid_search = GridSearchCV(rf, param_grid, cv=5, scoring='neg_mean_squared_error', n_jobs=-1)
+            rf = RandomForestRegressor(random_state=42, n_jobs=self.threads["estimator_jobs"])
+            grid_search = GridSearchCV(
+                rf, param_grid, cv=5, scoring='neg_mean_squared_error',
+                n_jobs=self.threads["grid_search_jobs"]
+            )
             grid_search.fit(X_train, y_train)
             
             model = grid_search.best_estimator_
@@ -194,7 +220,8 @@ class InvestWiseTrainer:
                 'bagging_fraction': 0.8,
                 'bagging_freq': 5,
                 'verbose': -1,
-                'random_state': 42
+                'random_state': 42,
+                'num_threads': self.threads["boosting_threads"]
             }
             
             # Create datasets
@@ -256,7 +283,8 @@ class InvestWiseTrainer:
                 'subsample': 0.8,
                 'colsample_bytree': 0.8,
                 'random_state': 42,
-                'n_estimators': 1000
+                'n_estimators': 1000,
+                'n_jobs': self.threads["boosting_threads"]
             }
             
             model = xgb.XGBRegressor(**params)
@@ -302,6 +330,107 @@ class InvestWiseTrainer:
             
             return {"model": model, "metrics": metrics, "feature_importance": feature_importance}
     
+    def _synthetic_sample(self, X_train: pd.DataFrame, n_samples: int, seed: int) -> pd.DataFrame:
+        """Draw a synthetic sample around the training distribution"""
+        rng = np.random.default_rng(seed)
+        
+        # Bootstrap the raw indicators and jitter them, then rebuild the
+        # engineered features so their relationships stay consistent
+        base = X_train[self.feature_names].to_numpy()
+        rows = base[rng.integers(0, len(base), n_samples)]
+        noise = rng.normal(0.0, 0.1, rows.shape) * base.std(axis=0)
+        X_base = pd.DataFrame(rows + noise, columns=self.feature_names)
+        
+        return self.create_feature_engineered_data(X_base)[X_train.columns]
+    
+    def _time_predict(self, model, X: pd.DataFrame, repeats: int = 3) -> float:
+        """Best-of-N wall time for a predict call, in seconds"""
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            model.predict(X)
+            timings.append(time.perf_counter() - start)
+        return min(timings)
+    
+    def distill_random_forest(self, teacher, X_train, X_test, y_test) -> Dict[str, Any]:
+        """Distill the random forest into a small student model"""
+        logger.info(f"Distilling random forest into {self.student_type} student")
+        
+        with mlflow.start_run(run_name="random_forest_student"):
+            # Label a large synthetic sample with the teacher
+            X_synth = self._synthetic_sample(X_train, self.distill_samples, seed=42)
+            y_synth = teacher.predict(X_synth)
+            
+            if self.student_type == "forest":
+                student = RandomForestRegressor(
+                    n_estimators=20, max_depth=8, min_samples_leaf=5, random_state=42,
+                    n_jobs=self.threads["cores"]
+                )
+            else:
+                student = GradientBoostingRegressor(
+                    n_estimators=150, max_depth=3, learning_rate=0.1, random_state=42
+                )
+            student.fit(X_synth, y_synth)
+            if self.student_type == "forest":
+                # Serving sets its own thread count; don't ship the training one
+                student.set_params(n_jobs=None)
+            
+            # Fidelity to the teacher on real and unseen synthetic inputs
+            X_holdout = self._synthetic_sample(X_train, min(self.distill_samples, 10000), seed=7)
+            teacher_test = teacher.predict(X_test)
+            student_test = student.predict(X_test)
+            teacher_holdout = teacher.predict(X_holdout)
+            student_holdout = student.predict(X_holdout)
+            
+            # Batch and single-row latency
+            teacher_batch = self._time_predict(teacher, X_holdout)
+            student_batch = self._time_predict(student, X_holdout)
+            teacher_single = self._time_predict(teacher, X_test.iloc[:1], repeats=20)
+            student_single = self._time_predict(student, X_test.iloc[:1], repeats=20)
+            
+            metrics = {
+                'test_rmse': np.sqrt(mean_squared_error(y_test, student_test)),
+                'test_mae': mean_absolute_error(y_test, student_test),
+                'test_r2': r2_score(y_test, student_test),
+                'fidelity_test_r2': r2_score(teacher_test, student_test),
+                'fidelity_test_rmse': np.sqrt(mean_squared_error(teacher_test, student_test)),
+                'fidelity_holdout_r2': r2_score(teacher_holdout, student_holdout),
+                'fidelity_holdout_rmse': np.sqrt(mean_squared_error(teacher_holdout, student_holdout)),
+                'teacher_test_rmse': np.sqrt(mean_squared_error(y_test, teacher_test)),
+                'batch_speedup': teacher_batch / max(student_batch, 1e-9),
+                'single_row_speedup': teacher_single / max(student_single, 1e-9),
+                'teacher_size_mb': len(pickle.dumps(teacher)) / 1e6,
+                'student_size_mb': len(pickle.dumps(student)) / 1e6
+            }
+            
+            mlflow.log_param("model_type", f"Distilled{type(student).__name__}")
+            mlflow.log_param("distill_samples", self.distill_samples)
+            mlflow.log_params({f"student_{k}": v for k, v in student.get_params().items()
+                               if k in ("n_estimators", "max_depth", "learning_rate")})
+            for metric_name, metric_value in metrics.items():
+                mlflow.log_metric(metric_name, metric_value)
+            
+            # Save and register the student next to the teacher
+            model_path = os.path.join(self.models_dir, "random_forest_student_model.joblib")
+            joblib.dump(student, model_path)
+            mlflow.log_artifact(model_path)
+            mlflow.sklearn.log_model(student, "model")
+            
+            try:
+                run_id = mlflow.active_run().info.run_id
+                mlflow.register_model(f"runs:/{run_id}/model", f"{self.model_name}_student")
+                logger.info(f"Registered student as {self.model_name}_student")
+            except Exception as e:
+                logger.error(f"Failed to register student model: {e}")
+            
+            logger.info(
+                f"Student fidelity R²: {metrics['fidelity_test_r2']:.4f}, "
+                f"batch speedup: {metrics['batch_speedup']:.1f}x, "
+                f"single-row speedup: {metrics['single_row_speedup']:.1f}x"
+            )
+            
+            return {"model": student, "metrics": metrics}
+    
     def register_best_model(self, model_results: Dict[str, Dict]) -> str:
         """Register the best performing model"""
         # Find best model based on test RMSE
@@ -312,7 +441,7 @@ class InvestWiseTrainer:
         logger.info(f"Best model: {best_model_name} (test RMSE: {best_metrics['test_rmse']:.4f})")
         
         # Register model in MLflow
-        model_name = "investwise_model"
+        model_name = self.model_name
         
         # Get the run ID for the best model
         runs = mlflow.search_runs(filter_string=f"tags.mlflow.runName = '{best_model_name}'")
@@ -383,6 +512,15 @@ class InvestWiseTrainer:
         except Exception as e:
             logger.error(f"Random forest training failed: {e}")
         
+        distillation = None
+        if self.distill and "random_forest" in model_results:
+            try:
+                distillation = self.distill_random_forest(
+                    model_results["random_forest"]["model"], X_train, X_test, y_test
+                )
+            except Exception as e:
+                logger.error(f"Random forest distillation failed: {e}")
+        
         try:
             model_results["lightgbm"] = self.train_lightgbm(
                 X_train, X_test, y_train, y_test
@@ -413,19 +551,45 @@ class InvestWiseTrainer:
             logger.info(f"  Test MAE:  {metrics['test_mae']:.4f}")
             logger.info(f"  Test R²:   {metrics['test_r2']:.4f}")
         
+        if distillation:
+            metrics = distillation["metrics"]
+            logger.info(f"\nRANDOM_FOREST_STUDENT ({self.student_type}):")
+            logger.info(f"  Test RMSE:          {metrics['test_rmse']:.4f} "
+                        f"(teacher {metrics['teacher_test_rmse']:.4f})")
+            logger.info(f"  Fidelity R²:        {metrics['fidelity_test_r2']:.4f}")
+            logger.info(f"  Batch speedup:      {metrics['batch_speedup']:.1f}x")
+            logger.info(f"  Single-row speedup: {metrics['single_row_speedup']:.1f}x")
+            logger.info(f"  Size:               {metrics['student_size_mb']:.2f}MB "
+                        f"(teacher {metrics['teacher_size_mb']:.2f}MB)")
+        
         return model_results
 
 def main():
     """Main training function"""
     parser = argparse.ArgumentParser(description="Train InvestWise prediction models")
     parser.add_argument("--data-path", type=str, help="Path to training data CSV")
+    parser.add_argument("--database-url", type=str,
+                        help="SQLAlchemy URL to train from market_observations (default: TRAINING_DATABASE_URL)")
     parser.add_argument("--mlflow-uri", type=str, help="MLflow tracking URI")
+    parser.add_argument("--distill", action="store_true",
+                        help="Distill the random forest into a lightweight student model")
+    parser.add_argument("--student-type", choices=["gbm", "forest"], default="gbm",
+                        help="Student model: shallow gradient boosting or pruned forest")
+    parser.add_argument("--distill-samples", type=int, default=100000,
+                        help="Synthetic sample size labelled by the teacher")
+    parser.add_argument("--n-jobs", type=int,
+                        help="CPU cores to use (default: TRAINING_N_JOBS or all available)")
     
     args = parser.parse_args()
     
     trainer = InvestWiseTrainer(
         data_path=args.data_path,
-        mlflow_uri=args.mlflow_uri
+        database_url=args.database_url,
+        mlflow_uri=args.mlflow_uri,
+        distill=args.distill,
+        student_type=args.student_type,
+        distill_samples=args.distill_samples,
+        n_jobs=args.n_jobs
     )
     
     results = trainer.train_all_models()
@@ -0,0 +1,236 @@
+"""
+Weighted ensemble serving across the trained model family
+"""
+import os
+import threading
+import time
+import joblib
+import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Dict, List, Any, Optional
+import logging
+
+from investwise_common.features import BASE_FEATURES, ENGINEERED_FEATURES, engineer_features
+
+logger = logging.getLogger(__name__)
+
+# Artifacts written by InvestWiseTrainer.train_all_models to ml/training/artifacts,
+# which docker-compose mounts at models/ensemble
+DEFAULT_MEMBERS = "linear_model:1,random_forest_model:1,lightgbm_model:1,xgboost_model:1"
+DEFAULT_MODELS_DIR = "models/ensemble"
+SCALER_FILE = "scaler.joblib"
+
+# Members trained on standardised features; the rest see raw engineered features
+SCALED_MEMBERS = {"linear_model"}
+
+class EnsembleFailed(RuntimeError):
+    """Every ensemble member raised, as opposed to running out of time"""
+
+class EnsembleManager:
+    """Runs every member model concurrently and combines their predictions"""
+
+    def __init__(
+        self,
+        models_dir: str = None,
+        members: str = None,
+        latency_budget_ms: float = None,
+        max_workers: int = None,
+        thread_budget=None
+    ):
+        self.models_dir = models_dir or os.getenv("ENSEMBLE_MODELS_DIR", DEFAULT_MODELS_DIR)
+        self.weights = self._parse_members(
+            members or os.getenv("ENSEMBLE_MEMBERS", DEFAULT_MEMBERS)
+        )
+        self.latency_budget_ms = latency_budget_ms or float(
+            os.getenv("ENSEMBLE_LATENCY_BUDGET_MS", "250")
+        )
+        self.thread_budget = thread_budget
+
+        # Every member of a request runs at once, so size the pool for at
+        # least one request's worth of members
+        default_workers = max(
+            len(self.weights),
+            thread_budget.executor_threads if thread_budget else 1
+        )
+        self.max_workers = max_workers or int(
+            os.getenv("ENSEMBLE_MAX_WORKERS", str(default_workers))
+        )
+        # A timed-out member keeps running on its pool thread, so cap how
+        # many calls each member may have outstanding; by default the caps
+        # add up to the pool size and a slow member cannot starve the rest
+        self.max_in_flight = int(os.getenv(
+            "ENSEMBLE_MAX_IN_FLIGHT",
+            str(max(1, self.max_workers // max(len(self.weights), 1)))
+        ))
+        self.models: Dict[str, Any] = {}
+        self.in_flight: Dict[str, threading.BoundedSemaphore] = {}
+        self.scaler = None
+        self.executor: Optional[ThreadPoolExecutor] = None
+
+    @staticmethod
+    def _parse_members(spec: str) -> Dict[str, float]:
+        """Parse 'name:weight,name:weight' into a weight mapping"""
+        weights = {}
+        for item in spec.split(","):
+            item = item.strip()
+            if not item:
+                continue
+            name, _, weight = item.partition(":")
+            weights[name.strip()] = float(weight) if weight else 1.0
+        return weights
+
+    def load_members(self) -> int:
+        """Load member models, and the scaler fitted with them, from the models directory"""
+        scaler_path = os.path.join(self.models_dir, SCALER_FILE)
+        if os.path.exists(scaler_path):
+            self.scaler = joblib.load(scaler_path)
+
+        for name in self.weights:
+            model_path = os.path.join(self.models_dir, f"{name}.joblib")
+            if not os.path.exists(model_path):
+                logger.warning(f"Ensemble member not found: {model_path}")
+                continue
+            if name in SCALED_MEMBERS and self.scaler is None:
+                logger.warning(f"Skipping ensemble member {name}: {scaler_path} not found")
+                continue
+            try:
+                model = joblib.load(model_path)
+                if self.thread_budget is not None:
+                    self.thread_budget.configure_model(model)
+                self.models[name] = model
+                logger.info(f"Loaded ensemble member {name} from {model_path}")
+            except Exception as e:
+                logger.error(f"Failed to load ensemble member {name}: {e}")
+
+        for name in self.models:
+            self.in_flight.setdefault(name, threading.BoundedSemaphore(self.max_in_flight))
+
+        if self.models and self.executor is None:
+            self.executor = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix="ensemble"
+            )
+
+        return len(self.models)
+
+    def is_ready(self) -> bool:
+        """Check if at least one member model is loaded"""
+        return bool(self.models)
+
+    def predict(
+        self,
+        X: List[List[float]],
+        weights: Optional[Dict[str, float]] = None,
+        latency_budget_ms: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """
+        Predict with every member concurrently under a latency budget
+
+        Rows are expanded to the training features once; members trained
+        on scaled data get the scaled copy. Members that have not answered
+        when the budget expires are dropped and the remaining weights are
+        renormalised. Members still busy with max_in_flight earlier calls
+        are skipped without being submitted.
+
+        Args:
+            X: Rows of base features, in BASE_FEATURES order
+            weights: Optional per-member weight overrides
+            latency_budget_ms: Optional override of the configured budget
+
+        Returns:
+            Dictionary with combined predictions and per-member details
+
+        Raises:
+            TimeoutError: No member answered and at least one ran out of time
+            EnsembleFailed: Every member raised
+        """
+        if not self.models:
+            raise RuntimeError("No ensemble members loaded")
+
+        weights = {**self.weights, **(weights or {})}
+        members = [name for name in self.models if weights.get(name, 0.0) > 0]
+        if not members:
+            raise ValueError("All ensemble member weights are zero")
+
+        budget_ms = latency_budget_ms or self.latency_budget_ms
+        X_raw = engineer_features(X)
+        X_scaled = None
+        if self.scaler is not None and any(name in SCALED_MEMBERS for name in members):
+            X_scaled = pd.DataFrame(self.scaler.transform(X_raw), columns=ENGINEERED_FEATURES)
+
+        start = time.perf_counter()
+        futures = {}
+        busy = []
+        for name in members:
+            slot = self.in_flight[name]
+            if not slot.acquire(blocking=False):
+                busy.append(name)
+                continue
+            future = self.executor.submit(
+                self._timed_predict,
+                self.models[name],
+                X_scaled if name in SCALED_MEMBERS else X_raw,
+                start
+            )
+            future.add_done_callback(lambda _, slot=slot: slot.release())
+            futures[future] = name
+        done, not_done = wait(futures, timeout=budget_ms / 1000.0)
+
+        for future in not_done:
+            future.cancel()
+
+        results = []
+        combined = np.zeros(len(X_raw))
+        total_weight = 0.0
+
+        for future, name in futures.items():
+            member = {"name": name, "weight": weights[name]}
+
+            if future in not_done:
+                member.update(status="dropped", latency_ms=budget_ms, predictions=None)
+                logger.warning(f"Ensemble member {name} exceeded {budget_ms:.0f}ms budget")
+            elif future.exception() is not None:
+                member.update(status="failed", latency_ms=None, predictions=None)
+                logger.warning(f"Ensemble member {name} failed: {future.exception()}")
+            else:
+                predictions, latency_ms = future.result()
+                combined += weights[name] * predictions
+                total_weight += weights[name]
+                member.update(
+                    status="ok",
+                    latency_ms=latency_ms,
+                    predictions=predictions.tolist()
+                )
+
+            results.append(member)
+
+        for name in busy:
+            results.append({
+                "name": name, "weight": weights[name],
+                "status": "busy", "latency_ms": None, "predictions": None
+            })
+            logger.warning(f"Ensemble member {name} skipped: {self.max_in_flight} calls still running")
+
+        if total_weight == 0:
+            if not_done or busy:
+                raise TimeoutError("No ensemble member answered within the latency budget")
+            raise EnsembleFailed("Every ensemble member failed")
+
+        return {
+            "predictions": (combined / total_weight).tolist(),
+            "members": results,
+            "dropped_members": [m["name"] for m in results if m["status"] != "ok"]
+        }
+
+    @staticmethod
+    def _timed_predict(model, X: pd.DataFrame, submitted: float):
+        """Run a member prediction and measure latency from submission"""
+        predictions = np.asarray(model.predict(X), dtype=float).ravel()
+        return predictions, (time.perf_counter() - submitted) * 1000.0
+
+    def shutdown(self):
+        """Stop the member thread pool"""
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
@@ -0,0 +1,219 @@
+"""
+Background SHAP explanation jobs
+"""
+import json
+import time
+import uuid
+import threading
+import httpx
+import redis
+from redis.exceptions import RedisError
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Iterable, Optional
+from urllib.parse import urlsplit
+import logging
+
+logger = logging.getLogger(__name__)
+
+class JobQueueFull(Exception):
+    """Raised when too many explanations are already waiting to run"""
+
+class CallbackNotAllowed(ValueError):
+    """Raised when a callback URL points at a host outside the allowlist"""
+
+class ExplanationJobStore:
+    """
+    Runs explanations off the request path and keeps results for polling
+
+    Jobs are stored in Redis when a URL is given, so any worker or replica
+    can answer a poll, and in process memory otherwise or while Redis is
+    unreachable. At most `max_queue` jobs per process wait for a worker
+    thread; beyond that, submissions are refused rather than queued
+    without bound. Results are only POSTed to http(s) callbacks whose host
+    is in `callback_hosts`; with no hosts configured, callbacks are refused.
+    """
+
+    KEY_PREFIX = "explanation_job:"
+
+    def __init__(
+        self,
+        explainer_manager,
+        max_jobs: int = 1000,
+        ttl_seconds: float = 600.0,
+        max_workers: int = 2,
+        max_queue: int = 100,
+        callback_timeout: float = 5.0,
+        callback_hosts: Iterable[str] = (),
+        redis_url: Optional[str] = None
+    ):
+        self.explainer_manager = explainer_manager
+        self.max_jobs = max_jobs
+        self.ttl_seconds = ttl_seconds
+        self.max_queue = max_queue
+        self.callback_timeout = callback_timeout
+        self.callback_hosts = {host.strip().lower() for host in callback_hosts if host.strip()}
+
+        self.redis = redis.Redis.from_url(redis_url, socket_timeout=1.0) if redis_url else None
+        self.jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._queued = 0
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="explain"
+        )
+
+    def check_callback(self, callback_url: str):
+        """Reject callback URLs that are not http(s) to an allowed host"""
+        parts = urlsplit(callback_url)
+        host = (parts.hostname or "").lower()
+        if parts.scheme not in ("http", "https") or host not in self.callback_hosts:
+            raise CallbackNotAllowed(f"Callback host not allowed: {host or callback_url!r}")
+
+    def submit(
+        self,
+        model,
+        features: List[float],
+        feature_names: List[str],
+        callback_url: Optional[str] = None
+    ) -> str:
+        """
+        Queue an explanation and return its job id
+
+        Args:
+            model: The ML model that made the prediction
+            features: Input feature values
+            feature_names: Names of the features
+            callback_url: Optional URL the finished job is POSTed to
+
+        Returns:
+            Job id to poll
+
+        Raises:
+            CallbackNotAllowed: callback_url is not an allowed http(s) host
+            JobQueueFull: max_queue jobs are already waiting
+        """
+        if callback_url:
+            self.check_callback(callback_url)
+
+        with self._lock:
+            if self._queued >= self.max_queue:
+                raise JobQueueFull(f"{self._queued} explanation jobs queued")
+            self._queued += 1
+
+        job_id = uuid.uuid4().hex
+        self._save({
+            "job_id": job_id,
+            "status": "pending",
+            "created_at": time.time(),
+            "completed_at": None,
+            "explanation": None,
+            "error": None
+        })
+
+        try:
+            self.executor.submit(self._run, job_id, model, features, feature_names, callback_url)
+        except RuntimeError:
+            # Executor shut down
+            with self._lock:
+                self._queued -= 1
+            raise
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get a job by id, or None if unknown or expired"""
+        if self.redis is not None:
+            try:
+                raw = self.redis.get(self.KEY_PREFIX + job_id)
+                if raw is not None:
+                    return json.loads(raw)
+            except RedisError as e:
+                logger.warning(f"Explanation job store unavailable, reading local jobs: {e}")
+
+        with self._lock:
+            self._evict(time.time())
+            job = self.jobs.get(job_id)
+            return dict(job) if job else None
+
+    def _save(self, job: Dict[str, Any]):
+        """Store a job until `ttl_seconds` after it was created"""
+        if self.redis is not None:
+            ttl = max(1, int(job["created_at"] + self.ttl_seconds - time.time()))
+            try:
+                self.redis.set(self.KEY_PREFIX + job["job_id"], json.dumps(job), ex=ttl)
+                return
+            except RedisError as e:
+                logger.warning(f"Explanation job store unavailable, keeping job locally: {e}")
+
+        with self._lock:
+            self._evict(time.time())
+            if job["job_id"] not in self.jobs:
+                while len(self.jobs) >= self.max_jobs:
+                    self.jobs.popitem(last=False)
+            self.jobs[job["job_id"]] = job
+
+    def _run(
+        self,
+        job_id: str,
+        model,
+        features: List[float],
+        feature_names: List[str],
+        callback_url: Optional[str]
+    ):
+        with self._lock:
+            self._queued -= 1
+
+        job = self.get(job_id)
+        if job is None:
+            # Expired or evicted before it ran; nobody can fetch it any more
+            return
+
+        try:
+            explanation = self.explainer_manager.explain_prediction(model, features, feature_names)
+            update = {"status": "completed", "explanation": explanation}
+            if explanation is None:
+                update = {"status": "failed", "error": "Explanation unavailable for this model"}
+        except Exception as e:
+            logger.warning(f"Explanation job {job_id} failed: {e}")
+            update = {"status": "failed", "error": str(e)}
+
+        update["completed_at"] = time.time()
+        job.update(update)
+        self._save(job)
+
+        if callback_url:
+            self._push(callback_url, job)
+
+    def _push(self, callback_url: str, job: Dict[str, Any]):
+        """POST a finished job to the caller's callback URL, without following redirects"""
+        try:
+            response = httpx.post(callback_url, json=job, timeout=self.callback_timeout)
+            if response.status_code >= 400:
+                logger.warning(f"Explanation callback {callback_url} returned {response.status_code}")
+        except httpx.HTTPError as e:
+            logger.warning(f"Explanation callback {callback_url} failed: {e}")
+
+    def _evict(self, now: float):
+        """Drop expired local jobs"""
+        # Jobs are kept in creation order, so expired ones are at the front
+        while self.jobs:
+            oldest = next(iter(self.jobs.values()))
+            if now - oldest["created_at"] <= self.ttl_seconds:
+                break
+            self.jobs.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        """Describe the queue and where jobs are kept"""
+        with self._lock:
+            return {
+                "store": "redis" if self.redis is not None else "memory",
+                "queued": self._queued,
+                "max_queue": self.max_queue,
+                "local_jobs": len(self.jobs)
+            }
+
+    def shutdown(self):
+        """Stop accepting work and drop queued jobs"""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        if self.redis is not None:
+            self.redis.close()
@@ -0,0 +1,149 @@
+"""
+Multi-horizon recursive forecasting
+"""
+import numpy as np
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Any, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+class RecursiveForecaster:
+    """Produces N-step forecast paths by feeding predictions back as inputs"""
+
+    def __init__(
+        self,
+        feature_order: List[str],
+        target_feature: str = "gdp_growth_rate",
+        max_cache_entries: int = 4096
+    ):
+        self.feature_order = feature_order
+        self.target_index = feature_order.index(target_feature)
+        self.max_cache_entries = max_cache_entries
+
+        # (model version, starting scenario) -> predicted path computed so far
+        self._paths: "OrderedDict[Tuple[str, Tuple[float, ...]], np.ndarray]" = OrderedDict()
+        # Model each version's paths were computed with, to spot swaps
+        self._models: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def forecast(
+        self,
+        model,
+        scenarios: List[Dict[str, float]],
+        horizon: int,
+        model_version: str
+    ) -> List[List[float]]:
+        """
+        Forecast `horizon` steps ahead for every starting scenario
+
+        All scenarios are advanced together, one `model.predict` call per
+        step. Each step's prediction replaces the target feature of the
+        next step's input; the remaining indicators are carried forward.
+        Paths already computed for a scenario are reused and, when a longer
+        horizon is requested, resumed from their last state. Paths are
+        cached per resolved model version and dropped when a different
+        model is served under that version.
+
+        Args:
+            model: Fitted model exposing `predict`
+            scenarios: Starting feature dictionaries
+            horizon: Number of steps to forecast
+            model_version: Concrete version of `model`, e.g. the registry
+                version behind "latest"
+
+        Returns:
+            One list of `horizon` predictions per scenario
+        """
+        X = np.array(
+            [[s[f] for f in self.feature_order] for s in scenarios],
+            dtype=float
+        )
+        keys = [(model_version, tuple(row)) for row in X]
+
+        # Start each scenario from its cached path, if any
+        paths: List[np.ndarray] = []
+        with self._lock:
+            if self._models.get(model_version) is not model:
+                self._drop_version(model_version)
+                self._models[model_version] = model
+            for key in keys:
+                cached = self._paths.get(key)
+                if cached is not None:
+                    self._paths.move_to_end(key)
+                paths.append(cached if cached is not None else np.empty(0))
+
+        pending = [i for i, path in enumerate(paths) if len(path) < horizon]
+        if pending:
+            self._extend_paths(model, X, paths, pending, horizon)
+
+            with self._lock:
+                if self._models.get(model_version) is not model:
+                    # Swapped while this forecast ran; don't cache stale paths
+                    return [path[:horizon].tolist() for path in paths]
+                for i in pending:
+                    self._paths[keys[i]] = paths[i]
+                    self._paths.move_to_end(keys[i])
+                while len(self._paths) > self.max_cache_entries:
+                    self._paths.popitem(last=False)
+
+        return [path[:horizon].tolist() for path in paths]
+
+    def _extend_paths(
+        self,
+        model,
+        X: np.ndarray,
+        paths: List[np.ndarray],
+        pending: List[int],
+        horizon: int
+    ):
+        """Advance the pending scenarios until each path reaches `horizon`"""
+        idx = np.array(pending)
+        state = X[idx].copy()
+        done = np.array([len(paths[i]) for i in pending])
+
+        # Resume scenarios from the last cached step
+        resumed = done > 0
+        if resumed.any():
+            state[resumed, self.target_index] = [paths[i][-1] for i in idx[resumed]]
+
+        steps = np.full((len(pending), horizon), np.nan)
+        for row, i in enumerate(pending):
+            steps[row, :done[row]] = paths[i]
+
+        for step in range(done.min(), horizon):
+            active = done <= step
+            predictions = np.asarray(model.predict(state[active]), dtype=float).ravel()
+            steps[active, step] = predictions
+            state[active, self.target_index] = predictions
+            done[active] = step + 1
+
+        for row, i in enumerate(pending):
+            paths[i] = steps[row]
+
+    def _drop_version(self, model_version: str):
+        """Drop the cached paths of one model version; caller holds the lock"""
+        for key in [key for key in self._paths if key[0] == model_version]:
+            del self._paths[key]
+        self._models.pop(model_version, None)
+
+    def invalidate(self, model_version: str):
+        """Forget paths computed by a model version, e.g. after it is reloaded"""
+        with self._lock:
+            self._drop_version(model_version)
+
+    def clear_cache(self):
+        """Clear cached forecast paths"""
+        with self._lock:
+            self._paths.clear()
+            self._models.clear()
+
+    def cache_info(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        with self._lock:
+            return {
+                "entries": len(self._paths),
+                "max_entries": self.max_cache_entries,
+                "model_versions": sorted(self._models)
+            }
@@ -0,0 +1,42 @@
+"""
+Invalidation of the gateway's prediction cache on model swaps
+"""
+import json
+import redis
+from redis.exceptions import RedisError
+from typing import Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Channel the gateway's PredictionCache listens on (backend app/utils/prediction_cache.py)
+INVALIDATION_CHANNEL = "prediction_cache:invalidate"
+
+class GatewayCacheInvalidator:
+    """
+    Tells gateway pods the model behind "latest" has changed
+
+    The gateway keeps the version it last saw behind "latest" in its own
+    Redis database; each pod clears that entry when it receives the
+    message, so the next "latest" request misses and re-resolves it. Pub/sub
+    channels are shared by every database on a Redis server, so the URL
+    only needs to reach the gateway's server. A swap published while no
+    gateway is subscribed is only picked up when the version entry expires.
+    """
+
+    def __init__(self, redis_url: Optional[str] = None, client: Optional[redis.Redis] = None):
+        self.redis = client or (redis.Redis.from_url(redis_url, socket_timeout=1.0) if redis_url else None)
+
+    def publish_latest_version(self, version: Optional[str]) -> int:
+        """Announce the new version behind "latest"; returns how many gateway pods heard it"""
+        if self.redis is None:
+            return 0
+        try:
+            return self.redis.publish(INVALIDATION_CHANNEL, json.dumps({"latest_version": version}))
+        except RedisError as e:
+            logger.warning(f"Could not invalidate gateway prediction cache: {e}")
+            return 0
+
+    def close(self):
+        if self.redis is not None:
+            self.redis.close()
@@ -0,0 +1,170 @@
+"""
+Adaptive concurrency limiting and request deadlines
+"""
+import asyncio
+import time
+from collections import deque
+from typing import Callable, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Absolute deadline set by the caller, as Unix epoch seconds
+DEADLINE_HEADER = "X-Request-Deadline"
+
+class Overloaded(Exception):
+    """Raised when a request is shed because the service is saturated"""
+
+class DeadlineExceeded(Exception):
+    """Raised when a request's deadline passes before it can be served"""
+
+def parse_deadline(value: Optional[str]) -> Optional[float]:
+    """Parse a deadline header value, ignoring malformed input"""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        logger.debug(f"Ignoring malformed deadline header: {value!r}")
+        return None
+
+def deadline_expired(deadline: Optional[float]) -> bool:
+    """Check whether a deadline has already passed"""
+    return deadline is not None and time.time() >= deadline
+
+class AdaptiveConcurrencyLimiter:
+    """
+    AIMD concurrency limit driven by queue delay
+
+    Requests beyond the current limit wait in a FIFO queue. A request that
+    waits longer than the target delay, or arrives to a full queue, is shed
+    instead of being served late. The limit grows by roughly one per limit's
+    worth of requests served without queueing past the target, and shrinks
+    multiplicatively when queue delay exceeds it.
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = 4,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        target_queue_delay_ms: float = 50.0,
+        max_queue: int = 100,
+        backoff: float = 0.9,
+        on_change: Optional[Callable[["AdaptiveConcurrencyLimiter"], None]] = None
+    ):
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.target_queue_delay = target_queue_delay_ms / 1000.0
+        self.max_queue = max_queue
+        self.backoff = backoff
+        self.on_change = on_change
+
+        self.in_flight = 0
+        self._last_backoff = 0.0
+        self._waiters: "deque[asyncio.Future]" = deque()
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    @property
+    def current_limit(self) -> int:
+        return int(self.limit)
+
+    async def acquire(self, deadline: Optional[float] = None) -> float:
+        """
+        Wait for a slot
+
+        Args:
+            deadline: Optional absolute deadline (epoch seconds)
+
+        Returns:
+            Time spent queued, in seconds
+
+        Raises:
+            Overloaded: the queue is full or the wait exceeded the target delay
+            DeadlineExceeded: the deadline passed while queued
+        """
+        if deadline_expired(deadline):
+            raise DeadlineExceeded()
+
+        if self.in_flight < self.current_limit and not self._waiters:
+            self.in_flight += 1
+            self._notify()
+            return 0.0
+
+        if len(self._waiters) >= self.max_queue:
+            raise Overloaded("queue full")
+
+        # Wait no longer than the target delay or the caller's deadline
+        timeout = self.target_queue_delay
+        deadline_bound = False
+        if deadline is not None and deadline - time.time() < timeout:
+            timeout = max(0.0, deadline - time.time())
+            deadline_bound = True
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._notify()
+        start = time.perf_counter()
+
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout)
+        except asyncio.TimeoutError:
+            if waiter.done() and not waiter.cancelled():
+                # Slot was handed over just as the wait timed out; keep it
+                return time.perf_counter() - start
+            waiter.cancel()
+            self._remove_waiter(waiter)
+            self._on_congestion()
+            self._notify()
+            if deadline_bound:
+                raise DeadlineExceeded()
+            raise Overloaded("queue delay above target")
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release(0.0)
+            else:
+                self._remove_waiter(waiter)
+                self._notify()
+            raise
+
+        return time.perf_counter() - start
+
+    def release(self, queue_delay: float):
+        """Free a slot and adapt the limit to the request's queue delay"""
+        self.in_flight -= 1
+
+        if queue_delay > self.target_queue_delay:
+            self._on_congestion()
+        else:
+            self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+
+        # Hand freed slots to queued requests in arrival order
+        while self._waiters and self.in_flight < self.current_limit:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+        self._notify()
+
+    def _on_congestion(self):
+        # Back off at most once per target interval so a burst of shed
+        # requests doesn't collapse the limit in one go
+        now = time.monotonic()
+        if now - self._last_backoff >= self.target_queue_delay:
+            self.limit = max(self.min_limit, self.limit * self.backoff)
+            self._last_backoff = now
+
+    def _notify(self):
+        if self.on_change is not None:
+            self.on_change(self)
+
+    def _remove_waiter(self, waiter: "asyncio.Future"):
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
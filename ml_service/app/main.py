@@ -1,36 +1,87 @@
 """
 ML Service FastAPI Application
 """
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel, Field
 import uvicorn
 import time
 import logging
 from typing import Dict, List, Optional, Any
+from app.thread_budget import ThreadBudget
+
+# Cap native thread pools before numerical libraries are imported
+thread_budget = ThreadBudget()
+thread_budget.apply_environment()
+
 from app.model_loader import ModelManager
 from app.explainers import ExplainerManager
-from prometheus_client import Counter, Histogram, generate_latest
-from fastapi.responses import Response
+from app.forecaster import RecursiveForecaster
+from investwise_common.features import BASE_FEATURES
+from app.ensemble import EnsembleManager, EnsembleFailed
+from app.explanation_jobs import ExplanationJobStore, JobQueueFull, CallbackNotAllowed
+from app.gateway_cache import GatewayCacheInvalidator
+from app.load_shedding import (
+    AdaptiveConcurrencyLimiter, Overloaded, DeadlineExceeded,
+    DEADLINE_HEADER, parse_deadline, deadline_expired
+)
+from app.metrics import (
+    PREDICTION_COUNTER, PREDICTION_DURATION, ERROR_COUNTER, QUEUE_DEPTH, IN_FLIGHT,
+    CONCURRENCY_LIMIT, QUEUE_DELAY, SHED_COUNTER, render_metrics, mark_current_worker_dead
+)
+from fastapi.responses import JSONResponse, Response
 import os
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Prometheus metrics
-PREDICTION_COUNTER = Counter('predictions_total', 'Total number of predictions made')
-PREDICTION_DURATION = Histogram('prediction_duration_seconds', 'Time spent on predictions')
-ERROR_COUNTER = Counter('prediction_errors_total', 'Total number of prediction errors', ['error_type'])
-
 app = FastAPI(
     title="InvestWise ML Service",
     description="Machine Learning prediction service for investment decisions",
     version="1.0.0"
 )
 
+# Model input features, in the order the models expect them
+FEATURE_ORDER = BASE_FEATURES
+
+# Concrete model version that answered, e.g. the registry version behind "latest"
+MODEL_VERSION_HEADER = "X-Model-Version"
+
 # Initialize model and explainer managers
-model_manager = ModelManager()
+model_manager = ModelManager(thread_budget=thread_budget)
 explainer_manager = ExplainerManager()
+ensemble_manager = EnsembleManager(thread_budget=thread_budget)
+explanation_jobs = ExplanationJobStore(
+    explainer_manager,
+    max_jobs=int(os.getenv("EXPLANATION_MAX_JOBS", "1000")),
+    ttl_seconds=float(os.getenv("EXPLANATION_TTL_SECONDS", "600")),
+    max_workers=int(os.getenv("EXPLANATION_WORKERS", "2")),
+    max_queue=int(os.getenv("EXPLANATION_MAX_QUEUE", "100")),
+    callback_hosts=os.getenv("EXPLANATION_CALLBACK_HOSTS", "").split(","),
+    # Explanation jobs are private to this service and may live in their own DB
+    redis_url=os.getenv("EXPLANATION_REDIS_URL") or os.getenv("REDIS_URL")
+)
+# Clears the gateway's "latest" prediction cache entry on model swaps; the
+# gateway's Redis is not necessarily the one explanation jobs use
+gateway_cache = GatewayCacheInvalidator(os.getenv("GATEWAY_REDIS_URL") or os.getenv("REDIS_URL"))
+
+def _export_limiter_state(limiter: AdaptiveConcurrencyLimiter):
+    QUEUE_DEPTH.set(limiter.queue_depth)
+    IN_FLIGHT.set(limiter.in_flight)
+    CONCURRENCY_LIMIT.set(limiter.current_limit)
+
+limiter = AdaptiveConcurrencyLimiter(
+    initial_limit=int(os.getenv("LOAD_SHED_INITIAL_LIMIT", str(thread_budget.executor_threads))),
+    max_limit=int(os.getenv("LOAD_SHED_MAX_LIMIT", str(thread_budget.executor_threads * 4))),
+    target_queue_delay_ms=float(os.getenv("LOAD_SHED_TARGET_DELAY_MS", "50")),
+    max_queue=int(os.getenv("LOAD_SHED_MAX_QUEUE", "100")),
+    on_change=_export_limiter_state
+)
+forecaster = RecursiveForecaster(
+    FEATURE_ORDER,
+    max_cache_entries=int(os.getenv("FORECAST_CACHE_ENTRIES", "4096"))
+)
 
 class PredictionRequest(BaseModel):
     """Prediction request schema"""
@@ -46,6 +97,14 @@ class PredictionRequest(BaseModel):
         default=False,
         description="Whether to include SHAP explanations"
     )
+    explain_async: bool = Field(
+        default=False,
+        description="Compute the explanation in the background and return a job id"
+    )
+    callback_url: Optional[str] = Field(
+        default=None,
+        description="URL the finished explanation job is POSTed to; host must be in EXPLANATION_CALLBACK_HOSTS"
+    )
 
 class PredictionResponse(BaseModel):
     """Prediction response schema"""
@@ -54,8 +113,140 @@ class PredictionResponse(BaseModel):
     model_version: str = Field(..., description="Model version used")
     features_used: Dict[str, float] = Field(..., description="Input features")
     explanation: Optional[Dict[str, Any]] = Field(None, description="SHAP explanation")
+    explanation_job_id: Optional[str] = Field(None, description="Background explanation job id")
+    processing_time: float = Field(..., description="Processing time in seconds")
+
+class BatchPredictionRequest(BaseModel):
+    """Batch prediction request schema"""
+    instances: List[Dict[str, float]] = Field(
+        ...,
+        min_length=1,
+        max_length=1000,
+        description="Feature dictionaries, one per row"
+    )
+    model_version: str = Field(
+        default="latest",
+        description="Model version to use"
+    )
+
+class BatchPredictionRow(BaseModel):
+    """Prediction or error for one batch row"""
+    index: int = Field(..., description="Position of the row in the request")
+    prediction: Optional[float] = Field(None, description="Predicted value")
+    confidence: Optional[float] = Field(None, description="Confidence score")
+    error: Optional[str] = Field(None, description="Why the row could not be predicted")
+
+class BatchPredictionResponse(BaseModel):
+    """Batch prediction response schema"""
+    predictions: List[BatchPredictionRow] = Field(..., description="Per-row results, in request order")
+    model_version: str = Field(..., description="Model version used")
+    processing_time: float = Field(..., description="Processing time in seconds")
+
+class ForecastRequest(BaseModel):
+    """Forecast request schema"""
+    scenarios: List[Dict[str, float]] = Field(
+        ...,
+        min_length=1,
+        max_length=1000,
+        description="Starting feature dictionaries, one per scenario"
+    )
+    horizon: int = Field(
+        default=12,
+        ge=1,
+        le=60,
+        description="Number of months to forecast"
+    )
+    model_version: str = Field(
+        default="latest",
+        description="Model version to use"
+    )
+
+class ForecastPath(BaseModel):
+    """Forecast path for a single scenario"""
+    features_used: Dict[str, float] = Field(..., description="Starting features")
+    path: List[float] = Field(..., description="Predicted value for each month ahead")
+
+class ForecastResponse(BaseModel):
+    """Forecast response schema"""
+    forecasts: List[ForecastPath] = Field(..., description="Forecast path per scenario")
+    horizon: int = Field(..., description="Number of months forecast")
+    model_version: str = Field(..., description="Model version used")
+    processing_time: float = Field(..., description="Processing time in seconds")
+
+class EnsemblePredictionRequest(BaseModel):
+    """Ensemble prediction request schema"""
+    features: Dict[str, float] = Field(
+        ...,
+        description="Feature dictionary with economic indicators"
+    )
+    weights: Optional[Dict[str, float]] = Field(
+        None,
+        description="Per-member weight overrides"
+    )
+    latency_budget_ms: Optional[float] = Field(
+        None,
+        gt=0,
+        description="Drop members that have not answered within this budget"
+    )
+
+class EnsembleBatchPredictionRequest(BaseModel):
+    """Batch ensemble prediction request schema"""
+    instances: List[Dict[str, float]] = Field(
+        ...,
+        min_length=1,
+        max_length=1000,
+        description="Feature dictionaries, one per row"
+    )
+    weights: Optional[Dict[str, float]] = Field(
+        None,
+        description="Per-member weight overrides"
+    )
+    latency_budget_ms: Optional[float] = Field(
+        None,
+        gt=0,
+        description="Drop members that have not answered within this budget"
+    )
+
+class EnsembleMember(BaseModel):
+    """Per-member ensemble result"""
+    name: str
+    weight: float
+    status: str = Field(..., description="ok, dropped, busy or failed")
+    prediction: Optional[float] = Field(None, description="Member prediction")
+    latency_ms: Optional[float] = Field(None, description="Member latency in milliseconds")
+
+class EnsemblePredictionResponse(BaseModel):
+    """Ensemble prediction response schema"""
+    prediction: float = Field(..., description="Weighted ensemble prediction")
+    members: List[EnsembleMember] = Field(..., description="Per-member results")
+    dropped_members: List[str] = Field(..., description="Members excluded from the result")
+    features_used: Dict[str, float] = Field(..., description="Input features")
+    processing_time: float = Field(..., description="Processing time in seconds")
+
+class EnsembleBatchMember(BaseModel):
+    """Per-member batch ensemble result"""
+    name: str
+    weight: float
+    status: str = Field(..., description="ok, dropped, busy or failed")
+    predictions: Optional[List[float]] = Field(None, description="Member prediction per row")
+    latency_ms: Optional[float] = Field(None, description="Member latency in milliseconds")
+
+class EnsembleBatchPredictionResponse(BaseModel):
+    """Batch ensemble prediction response schema"""
+    predictions: List[float] = Field(..., description="Weighted ensemble prediction per row")
+    members: List[EnsembleBatchMember] = Field(..., description="Per-member results")
+    dropped_members: List[str] = Field(..., description="Members excluded from the result")
     processing_time: float = Field(..., description="Processing time in seconds")
 
+class ExplanationJobResponse(BaseModel):
+    """Background explanation job schema"""
+    job_id: str
+    status: str = Field(..., description="pending, completed or failed")
+    explanation: Optional[Dict[str, Any]] = Field(None, description="SHAP explanation")
+    error: Optional[str] = None
+    created_at: float
+    completed_at: Optional[float] = None
+
 class ModelInfo(BaseModel):
     """Model information schema"""
     name: str
@@ -64,16 +255,68 @@ class ModelInfo(BaseModel):
     last_updated: Optional[str]
     metrics: Optional[Dict[str, float]]
 
+# Endpoints that run models and are subject to load shedding
+INFERENCE_PATHS = {"/predict", "/predict/batch", "/predict/ensemble", "/predict/ensemble/batch", "/forecast"}
+
+@app.middleware("http")
+async def load_shedding_middleware(request: Request, call_next):
+    """Shed inference requests early instead of serving them after the caller gave up"""
+    if request.url.path not in INFERENCE_PATHS:
+        return await call_next(request)
+    
+    deadline = parse_deadline(request.headers.get(DEADLINE_HEADER))
+    request.state.deadline = deadline
+    
+    try:
+        queue_delay = await limiter.acquire(deadline)
+    except Overloaded as e:
+        SHED_COUNTER.labels(reason='overloaded').inc()
+        logger.warning(f"Shedding {request.url.path}: {e}")
+        return JSONResponse(
+            status_code=503,
+            content={"detail": "Service overloaded"},
+            headers={"Retry-After": "1"}
+        )
+    except DeadlineExceeded:
+        SHED_COUNTER.labels(reason='deadline').inc()
+        return JSONResponse(status_code=504, content={"detail": "Request deadline exceeded"})
+    
+    QUEUE_DELAY.observe(queue_delay)
+    
+    try:
+        return await call_next(request)
+    finally:
+        limiter.release(queue_delay)
+
+def check_deadline(request: Request):
+    """Drop work whose deadline passed while it was queued or validated"""
+    if deadline_expired(getattr(request.state, "deadline", None)):
+        SHED_COUNTER.labels(reason='deadline').inc()
+        raise HTTPException(status_code=504, detail="Request deadline exceeded")
+
 @app.on_event("startup")
 async def startup_event():
     """Initialize models on startup"""
     logger.info("Starting ML service...")
+    thread_budget.limit_loaded_pools()
+    thread_budget.limit_executor()
+    logger.info(f"Thread budget: {thread_budget.as_dict()}")
     try:
         model_manager.load_default_model()
+        model_manager.load_student_model()
+        ensemble_manager.load_members()
         logger.info("ML service ready")
     except Exception as e:
         logger.error(f"Failed to load models: {e}")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Release background resources on shutdown"""
+    ensemble_manager.shutdown()
+    gateway_cache.close()
+    explanation_jobs.shutdown()
+    mark_current_worker_dead()
+
 @app.get("/")
 async def root():
     """Root endpoint"""
@@ -93,6 +336,7 @@ async def health_check():
         return {
             "status": "healthy",
             "model_status": model_status,
+            "explanation_jobs": explanation_jobs.stats(),
             "timestamp": time.strftime("%Y-%m-%d %H:%M:%S UTC", time.gmtime())
         }
     except Exception as e:
@@ -100,16 +344,18 @@ async def health_check():
         raise HTTPException(status_code=503, detail="Service unhealthy")
 
 @app.post("/predict", response_model=PredictionResponse)
-async def predict(request: PredictionRequest):
+async def predict(request: PredictionRequest, http_request: Request, http_response: Response):
     """
     Generate predictions using the loaded ML model
+    
+    The X-Model-Version response header carries the concrete version
+    behind the requested one, so callers can cache per version.
     """
     start_time = time.time()
     
     try:
         # Validate features
-        required_features = ["gdp_growth_rate", "inflation_rate", "usd_kes_rate", "cbr_rate", "trade_balance"]
-        missing_features = [f for f in required_features if f not in request.features]
+        missing_features = [f for f in FEATURE_ORDER if f not in request.features]
         
         if missing_features:
             ERROR_COUNTER.labels(error_type='missing_features').inc()
@@ -118,8 +364,15 @@ async def predict(request: PredictionRequest):
                 detail=f"Missing required features: {missing_features}"
             )
         
-        # Get model
-        model = model_manager.get_model(request.model_version)
+        if request.explain and request.explain_async and request.callback_url:
+            try:
+                explanation_jobs.check_callback(request.callback_url)
+            except CallbackNotAllowed as e:
+                ERROR_COUNTER.labels(error_type='callback_not_allowed').inc()
+                raise HTTPException(status_code=422, detail=str(e))
+        
+        # Get model, falling back to the distilled student under latency pressure
+        model, served_version = model_manager.select_model(request.model_version)
         if model is None:
             ERROR_COUNTER.labels(error_type='model_not_found').inc()
             raise HTTPException(
@@ -128,28 +381,48 @@ async def predict(request: PredictionRequest):
             )
         
         # Prepare features in correct order
-        feature_order = ["gdp_growth_rate", "inflation_rate", "usd_kes_rate", "cbr_rate", "trade_balance"]
-        X = [[request.features[f] for f in feature_order]]
+        X = [[request.features[f] for f in FEATURE_ORDER]]
+        http_response.headers[MODEL_VERSION_HEADER] = model_manager.resolved_version(served_version)
+        
+        check_deadline(http_request)
         
         # Make prediction
         with PREDICTION_DURATION.time():
-            prediction = model.predict(X)[0]
+            prediction = (await run_in_threadpool(model.predict, X))[0]
             
             # Calculate confidence if model supports it
             confidence = None
             if hasattr(model, 'predict_proba'):
                 try:
-                    proba = model.predict_proba(X)[0]
+                    proba = (await run_in_threadpool(model.predict_proba, X))[0]
                     confidence = float(max(proba))
                 except:
                     pass
         
+        # Track inference latency (excluding explanations) for student fallback
+        model_manager.record_latency((time.time() - start_time) * 1000, served_version)
+        
         # Generate explanation if requested
         explanation = None
-        if request.explain:
+        explanation_job_id = None
+        if request.explain and request.explain_async:
             try:
-                explanation = explainer_manager.explain_prediction(
-                    model, X[0], feature_order
+                explanation_job_id = await run_in_threadpool(
+                    explanation_jobs.submit, model, X[0], FEATURE_ORDER, request.callback_url
+                )
+            except JobQueueFull as e:
+                ERROR_COUNTER.labels(error_type='explanation_queue_full').inc()
+                logger.warning(f"Refusing explanation job: {e}")
+                raise HTTPException(
+                    status_code=503,
+                    detail="Explanation queue is full",
+                    headers={"Retry-After": "1"}
+                )
+        elif request.explain and not deadline_expired(http_request.state.deadline):
+            try:
+                explanation = await run_in_threadpool(
+                    explainer_manager.explain_prediction,
+                    model, X[0], FEATURE_ORDER
                 )
             except Exception as e:
                 logger.warning(f"Explanation generation failed: {e}")
@@ -162,9 +435,10 @@ async def predict(request: PredictionRequest):
         response = PredictionResponse(
             prediction=float(prediction),
             confidence=confidence,
-            model_version=request.model_version,
+            model_version=served_version,
             features_used=request.features,
             explanation=explanation,
+            explanation_job_id=explanation_job_id,
             processing_time=processing_time
         )
         
@@ -179,6 +453,269 @@ async def predict(request: PredictionRequest):
         logger.exception(f"Prediction error: {e}")
         raise HTTPException(status_code=500, detail="Prediction failed")
 
+@app.get("/explanations/{job_id}", response_model=ExplanationJobResponse)
+async def get_explanation(job_id: str):
+    """Fetch the result of a background explanation job"""
+    job = await run_in_threadpool(explanation_jobs.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Explanation job not found or expired")
+    return job
+
+@app.post("/predict/batch", response_model=BatchPredictionResponse)
+async def predict_batch(request: BatchPredictionRequest, http_request: Request, http_response: Response):
+    """
+    Generate predictions for many rows in one model call
+    
+    Rows with missing features are reported individually; the rest are
+    predicted together.
+    """
+    start_time = time.time()
+    
+    try:
+        model, served_version = model_manager.select_model(request.model_version)
+        if model is None:
+            ERROR_COUNTER.labels(error_type='model_not_found').inc()
+            raise HTTPException(
+                status_code=404,
+                detail=f"Model version {request.model_version} not found"
+            )
+        http_response.headers[MODEL_VERSION_HEADER] = model_manager.resolved_version(served_version)
+        
+        rows = [BatchPredictionRow(index=i) for i in range(len(request.instances))]
+        valid = []
+        for i, features in enumerate(request.instances):
+            missing_features = [f for f in FEATURE_ORDER if f not in features]
+            if missing_features:
+                ERROR_COUNTER.labels(error_type='missing_features').inc()
+                rows[i].error = f"Missing required features: {missing_features}"
+            else:
+                valid.append(i)
+        
+        if valid:
+            X = [[request.instances[i][f] for f in FEATURE_ORDER] for i in valid]
+            
+            check_deadline(http_request)
+            
+            with PREDICTION_DURATION.time():
+                predictions = await run_in_threadpool(model.predict, X)
+                
+                confidences = None
+                if hasattr(model, 'predict_proba'):
+                    try:
+                        confidences = (await run_in_threadpool(model.predict_proba, X)).max(axis=1)
+                    except:
+                        pass
+            
+            for j, i in enumerate(valid):
+                rows[i].prediction = float(predictions[j])
+                if confidences is not None:
+                    rows[i].confidence = float(confidences[j])
+            
+            PREDICTION_COUNTER.inc(len(valid))
+        
+        processing_time = time.time() - start_time
+        logger.info(
+            f"Batch prediction completed: {len(valid)}/{len(rows)} rows "
+            f"(took {processing_time:.3f}s)"
+        )
+        
+        return BatchPredictionResponse(
+            predictions=rows,
+            model_version=served_version,
+            processing_time=processing_time
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        ERROR_COUNTER.labels(error_type='prediction_error').inc()
+        logger.exception(f"Batch prediction error: {e}")
+        raise HTTPException(status_code=500, detail="Batch prediction failed")
+
+async def run_ensemble(
+    instances: List[Dict[str, float]],
+    weights: Optional[Dict[str, float]],
+    latency_budget_ms: Optional[float],
+    http_request: Request
+) -> Dict[str, Any]:
+    """Validate rows and run them through the ensemble, mapping failures to HTTP errors"""
+    for i, features in enumerate(instances):
+        missing_features = [f for f in FEATURE_ORDER if f not in features]
+        if missing_features:
+            ERROR_COUNTER.labels(error_type='missing_features').inc()
+            prefix = f"Row {i} missing" if len(instances) > 1 else "Missing"
+            raise HTTPException(
+                status_code=422,
+                detail=f"{prefix} required features: {missing_features}"
+            )
+    
+    if not ensemble_manager.is_ready():
+        ERROR_COUNTER.labels(error_type='ensemble_unavailable').inc()
+        raise HTTPException(status_code=503, detail="Ensemble is not loaded")
+    
+    X = [[features[f] for f in FEATURE_ORDER] for features in instances]
+    check_deadline(http_request)
+    
+    try:
+        with PREDICTION_DURATION.time():
+            return await run_in_threadpool(
+                ensemble_manager.predict,
+                X,
+                weights,
+                latency_budget_ms
+            )
+    except ValueError as e:
+        ERROR_COUNTER.labels(error_type='invalid_weights').inc()
+        raise HTTPException(status_code=422, detail=str(e))
+    except TimeoutError as e:
+        ERROR_COUNTER.labels(error_type='ensemble_timeout').inc()
+        logger.warning(f"Ensemble timeout: {e}")
+        raise HTTPException(status_code=504, detail="No ensemble member answered in time")
+    except EnsembleFailed as e:
+        ERROR_COUNTER.labels(error_type='ensemble_failed').inc()
+        logger.error(f"Ensemble failed: {e}")
+        raise HTTPException(status_code=500, detail="Every ensemble member failed")
+
+@app.post("/predict/ensemble", response_model=EnsemblePredictionResponse)
+async def predict_ensemble(request: EnsemblePredictionRequest, http_request: Request):
+    """
+    Generate a weighted prediction from all loaded ensemble members
+    """
+    start_time = time.time()
+    
+    try:
+        result = await run_ensemble(
+            [request.features], request.weights, request.latency_budget_ms, http_request
+        )
+        
+        processing_time = time.time() - start_time
+        PREDICTION_COUNTER.inc()
+        
+        members = [
+            EnsembleMember(
+                name=m["name"],
+                weight=m["weight"],
+                status=m["status"],
+                prediction=m["predictions"][0] if m["predictions"] else None,
+                latency_ms=m["latency_ms"]
+            )
+            for m in result["members"]
+        ]
+        
+        logger.info(
+            f"Ensemble prediction completed: {result['predictions'][0]:.4f} "
+            f"(took {processing_time:.3f}s, dropped {result['dropped_members']})"
+        )
+        
+        return EnsemblePredictionResponse(
+            prediction=result["predictions"][0],
+            members=members,
+            dropped_members=result["dropped_members"],
+            features_used=request.features,
+            processing_time=processing_time
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        ERROR_COUNTER.labels(error_type='prediction_error').inc()
+        logger.exception(f"Ensemble prediction error: {e}")
+        raise HTTPException(status_code=500, detail="Ensemble prediction failed")
+
+@app.post("/predict/ensemble/batch", response_model=EnsembleBatchPredictionResponse)
+async def predict_ensemble_batch(request: EnsembleBatchPredictionRequest, http_request: Request):
+    """
+    Generate weighted ensemble predictions for many rows, one call per member
+    """
+    start_time = time.time()
+    
+    try:
+        result = await run_ensemble(
+            request.instances, request.weights, request.latency_budget_ms, http_request
+        )
+        
+        processing_time = time.time() - start_time
+        PREDICTION_COUNTER.inc(len(request.instances))
+        
+        logger.info(
+            f"Batch ensemble prediction completed: {len(request.instances)} rows "
+            f"(took {processing_time:.3f}s, dropped {result['dropped_members']})"
+        )
+        
+        return EnsembleBatchPredictionResponse(
+            predictions=result["predictions"],
+            members=[EnsembleBatchMember(**m) for m in result["members"]],
+            dropped_members=result["dropped_members"],
+            processing_time=processing_time
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        ERROR_COUNTER.labels(error_type='prediction_error').inc()
+        logger.exception(f"Batch ensemble prediction error: {e}")
+        raise HTTPException(status_code=500, detail="Batch ensemble prediction failed")
+
+@app.post("/forecast", response_model=ForecastResponse)
+async def forecast(request: ForecastRequest, http_request: Request, http_response: Response):
+    """
+    Generate multi-month forecast paths for one or more starting scenarios
+    """
+    start_time = time.time()
+    
+    try:
+        for i, scenario in enumerate(request.scenarios):
+            missing_features = [f for f in FEATURE_ORDER if f not in scenario]
+            if missing_features:
+                ERROR_COUNTER.labels(error_type='missing_features').inc()
+                raise HTTPException(
+                    status_code=422,
+                    detail=f"Scenario {i} missing required features: {missing_features}"
+                )
+        
+        model, served_version = model_manager.select_model(request.model_version)
+        if model is None:
+            ERROR_COUNTER.labels(error_type='model_not_found').inc()
+            raise HTTPException(
+                status_code=404,
+                detail=f"Model version {request.model_version} not found"
+            )
+        
+        version = model_manager.resolved_version(served_version)
+        http_response.headers[MODEL_VERSION_HEADER] = version
+        
+        check_deadline(http_request)
+        
+        with PREDICTION_DURATION.time():
+            paths = await run_in_threadpool(
+                forecaster.forecast, model, request.scenarios, request.horizon, version
+            )
+        
+        processing_time = time.time() - start_time
+        PREDICTION_COUNTER.inc(len(request.scenarios))
+        
+        logger.info(
+            f"Forecast completed: {len(paths)} scenarios x {request.horizon} months "
+            f"(took {processing_time:.3f}s)"
+        )
+        
+        return ForecastResponse(
+            forecasts=[
+                ForecastPath(features_used=scenario, path=path)
+                for scenario, path in zip(request.scenarios, paths)
+            ],
+            horizon=request.horizon,
+            model_version=version,
+            processing_time=processing_time
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        ERROR_COUNTER.labels(error_type='forecast_error').inc()
+        logger.exception(f"Forecast error: {e}")
+        raise HTTPException(status_code=500, detail="Forecast failed")
+
 @app.get("/models", response_model=List[ModelInfo])
 async def list_models():
     """List available models"""
@@ -193,11 +730,19 @@ async def list_models():
 async def load_model(model_version: str):
     """Load a specific model version"""
     try:
-        success = model_manager.load_model(model_version)
+        success = await run_in_threadpool(model_manager.load_model, model_version)
         if success:
-            return {"message": f"Model {model_version} loaded successfully"}
+            forecaster.clear_cache()
+            latest_version = model_manager.resolved_version("latest")
+            await run_in_threadpool(gateway_cache.publish_latest_version, latest_version)
+            return {
+                "message": f"Model {model_version} loaded successfully",
+                "latest_version": latest_version
+            }
         else:
             raise HTTPException(status_code=404, detail="Model not found")
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error loading model {model_version}: {e}")
         raise HTTPException(status_code=500, detail="Model loading failed")
@@ -242,8 +787,8 @@ async def get_feature_info():
 
 @app.get("/metrics")
 async def get_metrics():
-    """Prometheus metrics endpoint"""
-    return Response(generate_latest(), media_type="text/plain")
+    """Prometheus metrics endpoint, aggregated across workers in multiprocess mode"""
+    return Response(render_metrics(), media_type="text/plain")
 
 if __name__ == "__main__":
     uvicorn.run(
@@ -0,0 +1,93 @@
+"""
+Prometheus metrics, aggregated across uvicorn workers in multiprocess mode
+"""
+import os
+import re
+import logging
+from typing import List
+from prometheus_client import (
+    CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+)
+
+logger = logging.getLogger(__name__)
+
+# Set by the launcher before any worker imports prometheus_client; each
+# worker then writes its samples to per-pid files in this directory
+MULTIPROC_DIR_ENV = "PROMETHEUS_MULTIPROC_DIR"
+
+PREDICTION_COUNTER = Counter('predictions_total', 'Total number of predictions made')
+PREDICTION_DURATION = Histogram('prediction_duration_seconds', 'Time spent on predictions')
+ERROR_COUNTER = Counter('prediction_errors_total', 'Total number of prediction errors', ['error_type'])
+QUEUE_DEPTH = Gauge(
+    'inference_queue_depth', 'Requests waiting for an inference slot',
+    multiprocess_mode='livesum'
+)
+IN_FLIGHT = Gauge(
+    'inference_in_flight', 'Requests holding an inference slot',
+    multiprocess_mode='livesum'
+)
+CONCURRENCY_LIMIT = Gauge(
+    'inference_concurrency_limit', 'Current adaptive concurrency limit',
+    multiprocess_mode='livesum'
+)
+QUEUE_DELAY = Histogram('inference_queue_delay_seconds', 'Time spent waiting for an inference slot')
+SHED_COUNTER = Counter('requests_shed_total', 'Requests rejected before inference', ['reason'])
+
+_PID_PATTERN = re.compile(r"_(\d+)\.db$")
+
+def multiprocess_dir() -> str:
+    """Get the shared metrics directory, or '' when running single-process"""
+    return os.getenv(MULTIPROC_DIR_ENV, "")
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def cleanup_dead_workers(path: str = None) -> List[int]:
+    """
+    Drop live gauges of workers that exited without cleaning up
+
+    Counters and histograms of dead workers are kept, since their totals
+    still count towards the service; only their live gauge files go.
+
+    Returns:
+        Pids that were marked dead
+    """
+    path = path or multiprocess_dir()
+    if not path or not os.path.isdir(path):
+        return []
+
+    pids = set()
+    for filename in os.listdir(path):
+        match = _PID_PATTERN.search(filename)
+        if match and filename.startswith("gauge_live"):
+            pids.add(int(match.group(1)))
+
+    dead = [pid for pid in pids if not _pid_alive(pid)]
+    for pid in dead:
+        multiprocess.mark_process_dead(pid, path)
+        logger.info(f"Removed live metrics of dead worker {pid}")
+
+    return dead
+
+def mark_current_worker_dead():
+    """Remove this worker's live gauges on shutdown"""
+    path = multiprocess_dir()
+    if path:
+        multiprocess.mark_process_dead(os.getpid(), path)
+
+def render_metrics() -> bytes:
+    """Render metrics for this worker, or for all workers in multiprocess mode"""
+    path = multiprocess_dir()
+    if not path:
+        return generate_latest()
+
+    cleanup_dead_workers(path)
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry, path=path)
+    return generate_latest(registry)
@@ -5,23 +5,40 @@ import os
 import joblib
 import mlflow
 import mlflow.sklearn
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple
 import logging
 from datetime import datetime
+from app.student_fallback import EngineeredFeatureModel, StudentFallback
 
 logger = logging.getLogger(__name__)
 
 class ModelManager:
     """Manages ML models loading and serving"""
     
-    def __init__(self):
+    def __init__(self, thread_budget=None):
         self.models: Dict[str, Any] = {}
+        self.thread_budget = thread_budget
         self.current_model = None
+        # Concrete version behind "latest", so callers can tell when it changes
+        self.latest_version: Optional[str] = None
         self.mlflow_uri = os.getenv("MLFLOW_TRACKING_URI", "http://mlflow:5000")
         
+        # Distilled student served instead of the primary model under latency pressure
+        self.student_model = None
+        self.fallback = StudentFallback(
+            threshold_ms=float(os.getenv("STUDENT_LATENCY_THRESHOLD_MS", "0")),
+            cooldown_seconds=float(os.getenv("STUDENT_COOLDOWN_SECONDS", "30"))
+        )
+        
         # Set MLflow tracking URI
         mlflow.set_tracking_uri(self.mlflow_uri)
         
+    def _configure_threads(self, model):
+        """Apply the process thread budget to a freshly loaded model"""
+        if self.thread_budget is not None:
+            self.thread_budget.configure_model(model)
+        return model
+    
     def load_default_model(self) -> bool:
         """Load the default model"""
         try:
@@ -47,10 +64,15 @@ class ModelManager:
                 model_uri = f"models:/{model_name}/{version}"
             
             logger.info(f"Loading model from MLflow: {model_uri}")
-            model = mlflow.sklearn.load_model(model_uri)
+            model = self._configure_threads(mlflow.sklearn.load_model(model_uri))
             
             self.models[version] = model
             self.current_model = model
+            # "latest" is now answered by this model, so report its version
+            if version == "latest":
+                self.latest_version = self._resolve_latest_version(model_name)
+            else:
+                self.latest_version = version
             
             logger.info(f"Successfully loaded model {model_name}:{version} from MLflow")
             return True
@@ -71,10 +93,11 @@ class ModelManager:
             for model_path in model_paths:
                 if os.path.exists(model_path):
                     logger.info(f"Loading model from local file: {model_path}")
-                    model = joblib.load(model_path)
+                    model = self._configure_threads(joblib.load(model_path))
                     
                     self.models["local"] = model
                     self.current_model = model
+                    self.latest_version = f"local-{int(os.path.getmtime(model_path))}"
                     
                     logger.info(f"Successfully loaded local model from {model_path}")
                     return True
@@ -102,6 +125,9 @@ class ModelManager:
             
             self.models["dummy"] = model
             self.current_model = model
+            # Each dummy is fitted on fresh random data; a fixed label would let
+            # cached predictions outlive the model that made them
+            self.latest_version = f"dummy-{joblib.hash(model)[:12]}"
             
             logger.info("Created dummy model for testing")
             return True
@@ -110,6 +136,57 @@ class ModelManager:
             logger.error(f"Failed to create dummy model: {e}")
             return False
     
+    def _resolve_latest_version(self, model_name: str) -> str:
+        """Look up the registry version number behind models:/<name>/latest"""
+        try:
+            client = mlflow.tracking.MlflowClient()
+            versions = client.get_latest_versions(model_name)
+            if versions:
+                return str(max(int(v.version) for v in versions))
+        except Exception as e:
+            logger.warning(f"Could not resolve latest version of {model_name}: {e}")
+        return "latest"
+    
+    def resolved_version(self, version: str = "latest") -> str:
+        """Get the concrete version a request for `version` is answered by"""
+        if version == "latest":
+            return self.latest_version or "latest"
+        return version
+    
+    def load_student_model(self) -> bool:
+        """Load the distilled student model, if one was trained"""
+        model_name = os.getenv("MODEL_NAME", "investwise_model")
+        
+        try:
+            model_uri = f"models:/{model_name}_student/latest"
+            logger.info(f"Loading student model from MLflow: {model_uri}")
+            student = self._configure_threads(mlflow.sklearn.load_model(model_uri))
+        except Exception as e:
+            logger.warning(f"Failed to load student model from MLflow: {e}")
+            
+            model_path = os.getenv("STUDENT_MODEL_PATH", "models/random_forest_student_model.joblib")
+            if not os.path.exists(model_path):
+                return False
+            
+            student = self._configure_threads(joblib.load(model_path))
+        
+        # Distilled on engineered features; requests carry base features
+        self.student_model = EngineeredFeatureModel(student)
+        self.models["student"] = self.student_model
+        logger.info("Student model loaded")
+        return True
+    
+    def record_latency(self, latency_ms: float, served_version: str = "latest"):
+        """Track latency of the primary "latest" model to decide when to fall back to the student"""
+        self.fallback.record(latency_ms, primary=served_version == "latest")
+    
+    def select_model(self, version: str = "latest") -> Tuple[Any, str]:
+        """Get the model to serve a request and the version label it answers as"""
+        if version == "latest" and self.student_model is not None and self.fallback.use_student():
+            return self.student_model, "student"
+        
+        return self.get_model(version), version
+    
     def load_model(self, version: str) -> bool:
         """Load a specific model version"""
         try:
@@ -120,7 +197,7 @@ class ModelManager:
             # Try local file
             model_path = f"models/{version}.joblib"
             if os.path.exists(model_path):
-                model = joblib.load(model_path)
+                model = self._configure_threads(joblib.load(model_path))
                 self.models[version] = model
                 return True
             
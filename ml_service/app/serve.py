@@ -0,0 +1,33 @@
+"""
+Multi-worker launcher for the ML service
+"""
+import os
+import shutil
+import logging
+import uvicorn
+
+logger = logging.getLogger(__name__)
+
+def main():
+    """Start uvicorn workers with a shared Prometheus metrics directory"""
+    workers = int(os.getenv("WEB_CONCURRENCY", "1"))
+
+    if workers > 1:
+        # Must be in the environment before any worker imports prometheus_client
+        path = os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/prometheus_multiproc")
+
+        # Start from an empty directory so files from earlier runs don't leak in
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path, exist_ok=True)
+        logger.info(f"Prometheus multiprocess mode: {path}")
+
+    uvicorn.run(
+        "app.main:app",
+        host=os.getenv("HOST", "0.0.0.0"),
+        port=int(os.getenv("PORT", "8000")),
+        workers=workers
+    )
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,90 @@
+"""
+Latency-driven fallback from the primary model to its distilled student
+"""
+import time
+from typing import Callable, Optional
+import logging
+
+from investwise_common.features import ENGINEERED_FEATURES, engineer_features
+
+logger = logging.getLogger(__name__)
+
+class EngineeredFeatureModel:
+    """
+    Serves a model fitted on engineered features from rows of base features
+
+    The student is distilled on InvestWiseTrainer's engineered frame while
+    requests carry only the base indicators, so rows are expanded with the
+    same engineer_features training used before they reach the model.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.columns = list(getattr(model, "feature_names_in_", ENGINEERED_FEATURES))
+
+    def predict(self, X):
+        return self.model.predict(engineer_features(X)[self.columns])
+
+class StudentFallback:
+    """
+    Decides when "latest" is served by the student instead of the primary
+
+    Only primary-model latencies feed the EWMA, so the student's own speed
+    can't make the primary look healthy again. Once switched over, the
+    primary is probed with one request per cool-down period; the switch
+    back happens when its EWMA falls below half the threshold, and the
+    switch over when it rises above the threshold.
+    """
+
+    def __init__(
+        self,
+        threshold_ms: float = 0.0,
+        cooldown_seconds: float = 30.0,
+        alpha: float = 0.2,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.threshold_ms = threshold_ms
+        self.cooldown_seconds = cooldown_seconds
+        self.alpha = alpha
+        self.clock = clock
+
+        self.primary_ewma_ms: Optional[float] = None
+        self.under_pressure = False
+        self._next_probe_at = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold_ms > 0
+
+    def use_student(self) -> bool:
+        """Whether the next "latest" request goes to the student"""
+        if not self.under_pressure:
+            return False
+
+        now = self.clock()
+        if now >= self._next_probe_at:
+            # Let this request through to the primary to re-measure it
+            self._next_probe_at = now + self.cooldown_seconds
+            return False
+        return True
+
+    def record(self, latency_ms: float, primary: bool = True):
+        """Record the latency of a served request; only primary requests count"""
+        if not primary:
+            return
+
+        if self.primary_ewma_ms is None:
+            self.primary_ewma_ms = latency_ms
+        else:
+            self.primary_ewma_ms += self.alpha * (latency_ms - self.primary_ewma_ms)
+
+        if not self.enabled:
+            return
+
+        if not self.under_pressure and self.primary_ewma_ms > self.threshold_ms:
+            self.under_pressure = True
+            self._next_probe_at = self.clock() + self.cooldown_seconds
+            logger.warning(f"Latency {self.primary_ewma_ms:.1f}ms over threshold, serving student model")
+        elif self.under_pressure and self.primary_ewma_ms < self.threshold_ms / 2:
+            self.under_pressure = False
+            logger.info(f"Latency recovered to {self.primary_ewma_ms:.1f}ms, serving primary model")
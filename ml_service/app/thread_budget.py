@@ -0,0 +1,95 @@
+"""
+Per-process CPU thread budget for BLAS, OpenMP and model parallelism
+"""
+import os
+import logging
+from typing import Dict, Any, Optional
+
+from investwise_common.cpus import THREAD_ENV_VARS, available_cpus
+
+logger = logging.getLogger(__name__)
+
+def _env_int(name: str) -> Optional[int]:
+    value = os.getenv(name)
+    return int(value) if value else None
+
+class ThreadBudget:
+    """
+    Splits the node's cores across uvicorn workers
+
+    Each worker gets `cores // workers` threads. Those are shared between
+    concurrent requests (executor threads) and the threads a single
+    prediction may use (inference threads), so that
+    `executor_threads * inference_threads` stays within the worker's share.
+    """
+
+    def __init__(
+        self,
+        workers: int = None,
+        cores: int = None,
+        inference_threads: int = None
+    ):
+        self.cores = cores or _env_int("CPU_CORES") or available_cpus()
+        self.workers = workers or _env_int("WEB_CONCURRENCY") or 1
+        self.threads_per_worker = max(1, self.cores // self.workers)
+
+        # Single-row inference gains little from intra-op threads, so by
+        # default spend the worker's share on concurrent requests instead
+        self.inference_threads = min(
+            inference_threads or _env_int("INFERENCE_THREADS") or 1,
+            self.threads_per_worker
+        )
+        self.executor_threads = _env_int("EXECUTOR_THREADS") or max(
+            1, self.threads_per_worker // self.inference_threads
+        )
+
+        self._limiter = None
+
+    def apply_environment(self):
+        """
+        Export thread caps for native libraries
+
+        Must run before numpy, scikit-learn, LightGBM or XGBoost are
+        imported, since their thread pools read these variables on load.
+        Variables already set by the operator are left untouched.
+        """
+        for var in THREAD_ENV_VARS:
+            os.environ.setdefault(var, str(self.inference_threads))
+
+    def limit_loaded_pools(self):
+        """Cap thread pools of native libraries that are already loaded"""
+        try:
+            from threadpoolctl import threadpool_limits
+            self._limiter = threadpool_limits(limits=self.inference_threads)
+        except ImportError:
+            logger.debug("threadpoolctl not installed, relying on environment limits")
+
+    def limit_executor(self):
+        """Cap the threadpool used by run_in_threadpool; needs a running event loop"""
+        try:
+            import anyio.to_thread
+            anyio.to_thread.current_default_thread_limiter().total_tokens = self.executor_threads
+        except Exception as e:
+            logger.warning(f"Could not limit executor threads: {e}")
+
+    def configure_model(self, model):
+        """Set a loaded model's own parallelism to the inference budget"""
+        try:
+            if hasattr(model, "get_params") and "n_jobs" in model.get_params():
+                model.set_params(n_jobs=self.inference_threads)
+            elif hasattr(model, "params") and isinstance(model.params, dict):
+                # LightGBM Booster
+                model.params["num_threads"] = self.inference_threads
+        except Exception as e:
+            logger.debug(f"Could not set threads on {type(model).__name__}: {e}")
+        return model
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Describe the budget"""
+        return {
+            "cores": self.cores,
+            "workers": self.workers,
+            "threads_per_worker": self.threads_per_worker,
+            "inference_threads": self.inference_threads,
+            "executor_threads": self.executor_threads,
+        }
@@ -0,0 +1,183 @@
+import os
+import sys
+import threading
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.linear_model import LinearRegression
+from sklearn.preprocessing import StandardScaler
+
+# Add the service directory to Python path
+SERVICE_DIR = os.path.join(os.path.dirname(__file__), '..')
+sys.path.append(SERVICE_DIR)
+sys.path.append(os.path.join(SERVICE_DIR, '..'))
+
+from app.ensemble import (
+    BASE_FEATURES, ENGINEERED_FEATURES, EnsembleFailed, EnsembleManager, engineer_features
+)
+
+
+def training_frame(n=200, seed=0):
+    """Base indicators in the ranges the service accepts"""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "gdp_growth_rate": rng.normal(4.0, 2.0, n),
+        "inflation_rate": rng.normal(7.0, 2.0, n),
+        "usd_kes_rate": rng.normal(130.0, 10.0, n),
+        "cbr_rate": rng.normal(9.0, 1.5, n),
+        "trade_balance": rng.normal(-1000.0, 300.0, n),
+    })
+
+
+@pytest.fixture(scope="module")
+def artifacts(tmp_path_factory):
+    """Members and scaler fitted and saved the way InvestWiseTrainer does"""
+    models_dir = tmp_path_factory.mktemp("artifacts")
+    X = engineer_features(training_frame().to_numpy())
+    y = 0.5 * X["gdp_growth_rate"] - 0.1 * X["inflation_rate"] + 0.01 * X["usd_inflation_interaction"]
+
+    scaler = StandardScaler()
+    X_scaled = pd.DataFrame(scaler.fit_transform(X), columns=X.columns)
+    linear = LinearRegression().fit(X_scaled, y)
+    forest = RandomForestRegressor(n_estimators=10, random_state=42).fit(X, y)
+
+    joblib.dump(scaler, models_dir / "scaler.joblib")
+    joblib.dump(linear, models_dir / "linear_model.joblib")
+    joblib.dump(forest, models_dir / "random_forest_model.joblib")
+    return models_dir, scaler, linear, forest
+
+
+def manager(models_dir, members="linear_model:1,random_forest_model:3", **kwargs):
+    ensemble = EnsembleManager(models_dir=str(models_dir), members=members, **kwargs)
+    ensemble.load_members()
+    return ensemble
+
+
+class SlowModel:
+    def predict(self, X):
+        time.sleep(0.5)
+        return np.zeros(len(X))
+
+
+class BrokenModel:
+    def predict(self, X):
+        raise ValueError("bad input")
+
+
+class HangingModel:
+    """Blocks until released, counting the calls that reached it"""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.calls = 0
+
+    def predict(self, X):
+        self.calls += 1
+        self.release.wait(5)
+        return np.zeros(len(X))
+
+
+class ConstantModel:
+    def predict(self, X):
+        return np.ones(len(X))
+
+
+class TestEngineerFeatures:
+    """Test the feature engineering shared with training"""
+
+    def test_columns_match_training(self):
+        X = engineer_features([[1.0, 8.0, 130.0, 9.0, -1000.0]])
+        assert list(X.columns) == ENGINEERED_FEATURES
+        assert len(ENGINEERED_FEATURES) == 11
+        row = X.iloc[0]
+        assert row["cbr_inflation_diff"] == 1.0
+        assert row["usd_inflation_interaction"] == 1040.0
+        assert row["economic_stress"] == 1
+
+
+class TestEnsembleManager:
+    """Test ensemble predictions with trained artifacts"""
+
+    def test_loads_members_and_scaler(self, artifacts):
+        models_dir = artifacts[0]
+        ensemble = manager(models_dir)
+        assert set(ensemble.models) == {"linear_model", "random_forest_model"}
+        assert ensemble.scaler is not None
+        ensemble.shutdown()
+
+    def test_batch_matches_members_on_training_features(self, artifacts):
+        models_dir, scaler, linear, forest = artifacts
+        ensemble = manager(models_dir, latency_budget_ms=5000)
+        rows = training_frame(n=5, seed=1)
+
+        result = ensemble.predict(rows[BASE_FEATURES].to_numpy().tolist())
+
+        X = engineer_features(rows.to_numpy())
+        expected_linear = linear.predict(pd.DataFrame(scaler.transform(X), columns=X.columns))
+        expected_forest = forest.predict(X)
+        assert np.allclose(result["predictions"], (expected_linear + 3 * expected_forest) / 4)
+        by_name = {m["name"]: m for m in result["members"]}
+        assert np.allclose(by_name["linear_model"]["predictions"], expected_linear)
+        assert result["dropped_members"] == []
+        ensemble.shutdown()
+
+    def test_scaled_member_is_skipped_without_scaler(self, artifacts, tmp_path):
+        models_dir = artifacts[0]
+        for name in ("linear_model", "random_forest_model"):
+            joblib.dump(joblib.load(models_dir / f"{name}.joblib"), tmp_path / f"{name}.joblib")
+
+        ensemble = manager(tmp_path)
+        assert set(ensemble.models) == {"random_forest_model"}
+        ensemble.shutdown()
+
+    def test_every_member_failing_is_not_a_timeout(self, artifacts):
+        ensemble = manager(artifacts[0], members="a:1,b:1")
+        ensemble.models = {"a": BrokenModel(), "b": BrokenModel()}
+        ensemble.load_members()
+
+        with pytest.raises(EnsembleFailed):
+            ensemble.predict([[1.0, 8.0, 130.0, 9.0, -1000.0]])
+        ensemble.shutdown()
+
+    def test_no_member_in_time_is_a_timeout(self, artifacts):
+        ensemble = manager(artifacts[0], members="a:1,b:1")
+        ensemble.models = {"a": SlowModel(), "b": BrokenModel()}
+        ensemble.load_members()
+
+        with pytest.raises(TimeoutError):
+            ensemble.predict([[1.0, 8.0, 130.0, 9.0, -1000.0]], latency_budget_ms=50)
+        ensemble.shutdown()
+
+    def test_hanging_member_holds_at_most_its_in_flight_slots(self, artifacts):
+        ensemble = manager(artifacts[0], members="a:1,b:1", max_workers=2)
+        hanging = HangingModel()
+        ensemble.models = {"a": hanging, "b": ConstantModel()}
+        ensemble.load_members()
+        assert ensemble.max_in_flight == 1
+
+        first = ensemble.predict([[1.0, 8.0, 130.0, 9.0, -1000.0]], latency_budget_ms=50)
+        assert first["dropped_members"] == ["a"]
+
+        for _ in range(3):
+            result = ensemble.predict([[1.0, 8.0, 130.0, 9.0, -1000.0]], latency_budget_ms=50)
+            by_name = {m["name"]: m for m in result["members"]}
+            assert by_name["a"]["status"] == "busy"
+            assert by_name["b"]["status"] == "ok"
+            assert result["predictions"] == [1.0]
+        assert hanging.calls == 1
+
+        # Once the stuck call returns its slot is free again
+        hanging.release.set()
+        deadline = time.time() + 2
+        while time.time() < deadline:
+            result = ensemble.predict([[1.0, 8.0, 130.0, 9.0, -1000.0]], latency_budget_ms=1000)
+            if not result["dropped_members"]:
+                break
+            time.sleep(0.01)
+        assert result["dropped_members"] == []
+        assert hanging.calls == 2
+        ensemble.shutdown()
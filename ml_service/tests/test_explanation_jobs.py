@@ -0,0 +1,125 @@
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+# Add the service directory to Python path
+SERVICE_DIR = os.path.join(os.path.dirname(__file__), '..')
+sys.path.append(SERVICE_DIR)
+
+from app.explanation_jobs import CallbackNotAllowed, ExplanationJobStore, JobQueueFull
+
+UNREACHABLE_REDIS = "redis://127.0.0.1:1/0"
+FEATURES = ["gdp_growth_rate", "inflation_rate"]
+
+
+class FakeExplainer:
+    """Explains instantly, or once `release` is set"""
+
+    def __init__(self, blocking=False):
+        self.started = threading.Event()
+        self.release = threading.Event()
+        if not blocking:
+            self.release.set()
+
+    def explain_prediction(self, model, features, feature_names):
+        self.started.set()
+        self.release.wait(5)
+        return {"shap_values": [{"feature": feature_names[0], "shap_value": 0.5}]}
+
+
+def wait_for(store, job_id, status="completed"):
+    deadline = time.time() + 5
+    while time.time() < deadline:
+        job = store.get(job_id)
+        if job and job["status"] == status:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} never became {status}")
+
+
+class TestExplanationJobStore:
+    """Test background explanation jobs"""
+
+    def test_job_completes_in_memory(self):
+        store = ExplanationJobStore(FakeExplainer())
+        job_id = store.submit(object(), [1.0, 2.0], FEATURES)
+
+        job = wait_for(store, job_id)
+        assert job["explanation"]["shap_values"][0]["feature"] == "gdp_growth_rate"
+        assert store.stats()["store"] == "memory"
+        store.shutdown()
+
+    def test_jobs_are_shared_through_redis(self):
+        fakeredis = pytest.importorskip("fakeredis")
+        server = fakeredis.FakeServer()
+        worker, poller = ExplanationJobStore(FakeExplainer()), ExplanationJobStore(FakeExplainer())
+        worker.redis = fakeredis.FakeRedis(server=server)
+        poller.redis = fakeredis.FakeRedis(server=server)
+
+        job_id = worker.submit(object(), [1.0, 2.0], FEATURES)
+        job = wait_for(poller, job_id)
+        assert job["status"] == "completed"
+        assert 0 < poller.redis.ttl(ExplanationJobStore.KEY_PREFIX + job_id) <= 600
+        assert worker.jobs == {}
+        worker.shutdown()
+
+    def test_unreachable_redis_keeps_jobs_locally(self):
+        store = ExplanationJobStore(FakeExplainer(), redis_url=UNREACHABLE_REDIS)
+        job_id = store.submit(object(), [1.0, 2.0], FEATURES)
+
+        assert wait_for(store, job_id)["status"] == "completed"
+        store.shutdown()
+
+    def test_queue_is_bounded(self):
+        explainer = FakeExplainer(blocking=True)
+        store = ExplanationJobStore(explainer, max_workers=1, max_queue=1)
+
+        running = store.submit(object(), [1.0, 2.0], FEATURES)
+        assert explainer.started.wait(5)
+        store.submit(object(), [1.0, 2.0], FEATURES)
+        with pytest.raises(JobQueueFull):
+            store.submit(object(), [1.0, 2.0], FEATURES)
+
+        explainer.release.set()
+        wait_for(store, running)
+        store.shutdown()
+
+
+class TestCallbacks:
+    """Test callback URLs are limited to allowed hosts"""
+
+    @pytest.mark.parametrize("url", [
+        "http://169.254.169.254/latest/meta-data/",
+        "http://localhost:6379/",
+        "file:///etc/passwd",
+        "ftp://backend/job",
+        "http://backend.evil.example/job",
+    ])
+    def test_disallowed_callbacks_are_refused(self, url):
+        store = ExplanationJobStore(FakeExplainer(), callback_hosts=["backend"])
+        with pytest.raises(CallbackNotAllowed):
+            store.submit(object(), [1.0, 2.0], FEATURES, callback_url=url)
+        assert store.stats()["queued"] == 0
+        store.shutdown()
+
+    def test_no_allowlist_refuses_every_callback(self):
+        store = ExplanationJobStore(FakeExplainer())
+        with pytest.raises(CallbackNotAllowed):
+            store.check_callback("https://backend/job")
+        store.shutdown()
+
+    def test_allowed_callback_receives_the_finished_job(self, monkeypatch):
+        pushed = []
+        store = ExplanationJobStore(FakeExplainer(), callback_hosts=["Backend"])
+        monkeypatch.setattr(store, "_push", lambda url, job: pushed.append((url, job["status"])))
+
+        job_id = store.submit(object(), [1.0, 2.0], FEATURES, callback_url="https://backend:4000/job")
+        wait_for(store, job_id)
+        deadline = time.time() + 5
+        while not pushed and time.time() < deadline:
+            time.sleep(0.01)
+        assert pushed == [("https://backend:4000/job", "completed")]
+        store.shutdown()
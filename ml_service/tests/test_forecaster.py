@@ -0,0 +1,97 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# Add the service directory to Python path
+SERVICE_DIR = os.path.join(os.path.dirname(__file__), '..')
+sys.path.append(SERVICE_DIR)
+sys.path.append(os.path.join(SERVICE_DIR, '..'))
+
+from app.forecaster import RecursiveForecaster
+
+FEATURES = ["gdp_growth_rate", "inflation_rate"]
+SCENARIO = {"gdp_growth_rate": 1.0, "inflation_rate": 5.0}
+
+
+class CountingModel:
+    """Adds `step` to the target feature and counts predicted rows"""
+
+    def __init__(self, step):
+        self.step = step
+        self.rows = 0
+
+    def predict(self, X):
+        X = np.asarray(X)
+        self.rows += len(X)
+        return X[:, 0] + self.step
+
+
+class TestRecursiveForecaster:
+    """Test forecast paths and their cache"""
+
+    def test_paths_feed_predictions_back(self):
+        forecaster = RecursiveForecaster(FEATURES)
+        (path,) = forecaster.forecast(CountingModel(0.5), [SCENARIO], 3, "1")
+        assert path == [1.5, 2.0, 2.5]
+
+    def test_longer_horizon_resumes_cached_path(self):
+        forecaster = RecursiveForecaster(FEATURES)
+        model = CountingModel(1.0)
+
+        forecaster.forecast(model, [SCENARIO], 2, "1")
+        (path,) = forecaster.forecast(model, [SCENARIO], 4, "1")
+        assert path == [2.0, 3.0, 4.0, 5.0]
+        assert model.rows == 4
+
+    def test_swapped_model_under_same_version_is_not_served_from_cache(self):
+        forecaster = RecursiveForecaster(FEATURES)
+        forecaster.forecast(CountingModel(1.0), [SCENARIO], 2, "latest")
+
+        replacement = CountingModel(10.0)
+        (path,) = forecaster.forecast(replacement, [SCENARIO], 2, "latest")
+        assert path == [11.0, 21.0]
+        assert replacement.rows == 2
+        assert forecaster.cache_info()["entries"] == 1
+
+    def test_versions_are_cached_separately(self):
+        forecaster = RecursiveForecaster(FEATURES)
+        old, new = CountingModel(1.0), CountingModel(2.0)
+
+        assert forecaster.forecast(old, [SCENARIO], 1, "1") == [[2.0]]
+        assert forecaster.forecast(new, [SCENARIO], 1, "2") == [[3.0]]
+        assert forecaster.forecast(old, [SCENARIO], 1, "1") == [[2.0]]
+        assert old.rows == 1
+
+    def test_invalidate_drops_one_version(self):
+        forecaster = RecursiveForecaster(FEATURES)
+        model = CountingModel(1.0)
+        forecaster.forecast(model, [SCENARIO], 1, "1")
+        forecaster.forecast(CountingModel(2.0), [SCENARIO], 1, "2")
+
+        forecaster.invalidate("1")
+        assert forecaster.cache_info()["model_versions"] == ["2"]
+        forecaster.forecast(model, [SCENARIO], 1, "1")
+        assert model.rows == 2
+
+
+class TestForecastEndpoint:
+    """Test /forecast reports the version that produced the paths"""
+
+    def test_latest_is_reported_as_the_resolved_version(self, monkeypatch):
+        pytest.importorskip("mlflow")
+        from fastapi.testclient import TestClient
+        from app import main
+
+        monkeypatch.setattr(main.model_manager, "models", {"7": CountingModel(1.0)})
+        monkeypatch.setattr(main.model_manager, "latest_version", "7")
+        monkeypatch.setattr(main.model_manager, "current_model", main.model_manager.models["7"])
+        main.forecaster.clear_cache()
+
+        scenario = {f: 1.0 for f in main.FEATURE_ORDER}
+        response = TestClient(main.app).post("/forecast", json={"scenarios": [scenario], "horizon": 2})
+        assert response.status_code == 200
+        assert response.json()["model_version"] == "7"
+        assert response.headers["X-Model-Version"] == "7"
+        assert main.forecaster.cache_info()["model_versions"] == ["7"]
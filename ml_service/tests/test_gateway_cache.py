@@ -0,0 +1,36 @@
+import json
+import os
+import sys
+
+import pytest
+
+# Add the service directory to Python path
+SERVICE_DIR = os.path.join(os.path.dirname(__file__), '..')
+sys.path.append(SERVICE_DIR)
+
+from app.gateway_cache import INVALIDATION_CHANNEL, GatewayCacheInvalidator
+
+UNREACHABLE_REDIS = "redis://127.0.0.1:1/0"
+
+
+class TestGatewayCacheInvalidator:
+    """Test model swaps are announced to the gateway"""
+
+    def test_publishes_new_latest_version(self):
+        fakeredis = pytest.importorskip("fakeredis")
+        client = fakeredis.FakeRedis()
+        pubsub = client.pubsub()
+        pubsub.subscribe(INVALIDATION_CHANNEL)
+        pubsub.get_message(timeout=1)
+
+        assert GatewayCacheInvalidator(client=client).publish_latest_version("8") == 1
+        message = pubsub.get_message(timeout=1)
+        assert json.loads(message["data"]) == {"latest_version": "8"}
+
+    def test_without_redis_is_a_no_op(self):
+        assert GatewayCacheInvalidator().publish_latest_version("8") == 0
+
+    def test_unreachable_redis_is_not_an_error(self):
+        invalidator = GatewayCacheInvalidator(UNREACHABLE_REDIS)
+        assert invalidator.publish_latest_version("8") == 0
+        invalidator.close()
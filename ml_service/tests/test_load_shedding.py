@@ -0,0 +1,164 @@
+import asyncio
+import os
+import sys
+import time
+
+import pytest
+
+# Add the service directory to Python path
+SERVICE_DIR = os.path.join(os.path.dirname(__file__), '..')
+sys.path.append(SERVICE_DIR)
+sys.path.append(os.path.join(SERVICE_DIR, '..'))
+
+from app.load_shedding import (
+    AdaptiveConcurrencyLimiter, DeadlineExceeded, Overloaded, parse_deadline
+)
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+class TestAdaptiveConcurrencyLimiter:
+    """Test AIMD limit changes, queueing and shedding"""
+
+    def test_limit_grows_when_requests_do_not_queue(self):
+        async def scenario():
+            limiter = AdaptiveConcurrencyLimiter(initial_limit=2, max_limit=3)
+            for _ in range(20):
+                await limiter.acquire()
+                limiter.release(0.0)
+            return limiter
+
+        limiter = run(scenario())
+        assert limiter.current_limit == 3
+        assert limiter.in_flight == 0
+
+    def test_limit_shrinks_on_slow_queueing_at_most_once_per_interval(self):
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=10, target_queue_delay_ms=50, backoff=0.5)
+        limiter.in_flight = 3
+
+        limiter.release(0.2)
+        limiter.release(0.2)
+        assert limiter.limit == 5.0
+
+        limiter._last_backoff = time.monotonic() - 1
+        limiter.release(0.2)
+        assert limiter.limit == 2.5
+        assert limiter.in_flight == 0
+
+    def test_limit_never_drops_below_minimum(self):
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=1, min_limit=1, backoff=0.1)
+        limiter.in_flight = 1
+        limiter.release(10.0)
+        assert limiter.current_limit == 1
+
+    def test_full_queue_is_overloaded(self):
+        async def scenario():
+            limiter = AdaptiveConcurrencyLimiter(initial_limit=1, max_queue=1, target_queue_delay_ms=1000)
+            await limiter.acquire()
+            queued = asyncio.ensure_future(limiter.acquire())
+            await asyncio.sleep(0)
+
+            with pytest.raises(Overloaded, match="queue full"):
+                await limiter.acquire()
+
+            limiter.release(0.0)
+            assert await queued >= 0.0
+            return limiter
+
+        limiter = run(scenario())
+        assert limiter.in_flight == 1
+        assert limiter.queue_depth == 0
+
+    def test_waiting_past_target_delay_is_shed_and_backs_off(self):
+        async def scenario():
+            limiter = AdaptiveConcurrencyLimiter(initial_limit=1, target_queue_delay_ms=10, backoff=0.5)
+            limiter.limit = 2.0
+            await limiter.acquire()
+            await limiter.acquire()
+
+            with pytest.raises(Overloaded, match="queue delay"):
+                await limiter.acquire()
+            return limiter
+
+        limiter = run(scenario())
+        assert limiter.limit == 1.0
+        assert limiter.queue_depth == 0
+
+    def test_freed_slots_go_to_waiters_in_arrival_order(self):
+        async def scenario():
+            limiter = AdaptiveConcurrencyLimiter(initial_limit=1, target_queue_delay_ms=1000)
+            order = []
+
+            async def request(name):
+                await limiter.acquire()
+                order.append(name)
+
+            await limiter.acquire()
+            waiters = [asyncio.ensure_future(request(name)) for name in ("a", "b")]
+            await asyncio.sleep(0)
+
+            limiter.release(0.0)
+            await asyncio.sleep(0)
+            limiter.release(0.0)
+            await asyncio.gather(*waiters)
+            return order
+
+        assert run(scenario()) == ["a", "b"]
+
+    def test_expired_deadline(self):
+        async def scenario():
+            limiter = AdaptiveConcurrencyLimiter(initial_limit=1, target_queue_delay_ms=1000)
+            with pytest.raises(DeadlineExceeded):
+                await limiter.acquire(deadline=time.time() - 1)
+
+            await limiter.acquire()
+            with pytest.raises(DeadlineExceeded):
+                await limiter.acquire(deadline=time.time() + 0.01)
+            return limiter
+
+        limiter = run(scenario())
+        assert limiter.queue_depth == 0
+
+    def test_state_changes_are_reported(self):
+        seen = []
+
+        async def scenario():
+            limiter = AdaptiveConcurrencyLimiter(on_change=lambda l: seen.append(l.in_flight))
+            await limiter.acquire()
+            limiter.release(0.0)
+
+        run(scenario())
+        assert seen == [1, 0]
+
+    def test_malformed_deadline_is_ignored(self):
+        assert parse_deadline("soon") is None
+        assert parse_deadline("1700000000.5") == 1700000000.5
+
+
+class TestLoadSheddingMiddleware:
+    """Test shed requests are answered before reaching a model"""
+
+    def test_overloaded_requests_get_503(self, monkeypatch):
+        pytest.importorskip("mlflow")
+        from fastapi.testclient import TestClient
+        from app import main
+
+        async def overloaded(deadline=None):
+            raise Overloaded("queue full")
+
+        monkeypatch.setattr(main.limiter, "acquire", overloaded)
+        response = TestClient(main.app).post("/predict", json={"features": {}})
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "1"
+
+    def test_expired_deadline_gets_504(self):
+        pytest.importorskip("mlflow")
+        from fastapi.testclient import TestClient
+        from app import main
+
+        response = TestClient(main.app).post(
+            "/predict", json={"features": {}}, headers={"X-Request-Deadline": str(time.time() - 1)}
+        )
+        assert response.status_code == 504
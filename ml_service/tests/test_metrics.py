@@ -0,0 +1,100 @@
+import multiprocessing as mp
+import os
+import re
+import sys
+
+import pytest
+
+# Add the service directory to Python path
+SERVICE_DIR = os.path.join(os.path.dirname(__file__), '..')
+sys.path.append(SERVICE_DIR)
+
+
+def _worker(metrics_dir, predictions, queue_depth, barrier, done):
+    """Simulate a uvicorn worker recording metrics"""
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = metrics_dir
+    sys.path.append(SERVICE_DIR)
+    from app import metrics
+
+    metrics.PREDICTION_COUNTER.inc(predictions)
+    metrics.QUEUE_DEPTH.set(queue_depth)
+    metrics.SHED_COUNTER.labels(reason="overloaded").inc()
+
+    barrier.wait()
+    done.wait()
+
+
+def _render(metrics_dir):
+    """Render /metrics output as a fresh worker would"""
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = metrics_dir
+    sys.path.append(SERVICE_DIR)
+    from app import metrics
+    return metrics.render_metrics().decode()
+
+
+def _sample(text, name):
+    match = re.search(rf"^{re.escape(name)} ([0-9.e+]+)$", text, re.MULTILINE)
+    assert match, f"{name} not found in metrics output"
+    return float(match.group(1))
+
+
+class TestMultiprocessMetrics:
+    """Test metrics aggregation across workers"""
+
+    @pytest.fixture
+    def ctx(self):
+        return mp.get_context("spawn")
+
+    def test_metrics_aggregate_across_workers(self, tmp_path, ctx):
+        """Counters and live gauges sum over all running workers"""
+        metrics_dir = str(tmp_path)
+        barrier = ctx.Barrier(4)
+        done = ctx.Event()
+
+        workers = [
+            ctx.Process(target=_worker, args=(metrics_dir, n, n * 10, barrier, done))
+            for n in (1, 2, 3)
+        ]
+        for w in workers:
+            w.start()
+
+        try:
+            barrier.wait(timeout=60)
+            with ctx.Pool(1) as pool:
+                text = pool.apply(_render, (metrics_dir,))
+        finally:
+            done.set()
+            for w in workers:
+                w.join(timeout=30)
+
+        assert _sample(text, "predictions_total") == 6
+        assert _sample(text, "inference_queue_depth") == 60
+        assert _sample(text, 'requests_shed_total{reason="overloaded"}') == 3
+
+    def test_dead_worker_gauges_dropped_counters_kept(self, tmp_path, ctx):
+        """A crashed worker's live gauges disappear but its counts remain"""
+        metrics_dir = str(tmp_path)
+        barrier = ctx.Barrier(2)
+        done = ctx.Event()
+
+        survivor = ctx.Process(target=_worker, args=(metrics_dir, 5, 7, barrier, done))
+        survivor.start()
+        barrier.wait(timeout=60)
+
+        crashed_ready = ctx.Barrier(2)
+        never = ctx.Event()
+        crashed = ctx.Process(target=_worker, args=(metrics_dir, 4, 100, crashed_ready, never))
+        crashed.start()
+        crashed_ready.wait(timeout=60)
+        crashed.kill()
+        crashed.join()
+
+        try:
+            with ctx.Pool(1) as pool:
+                text = pool.apply(_render, (metrics_dir,))
+        finally:
+            done.set()
+            survivor.join(timeout=30)
+
+        assert _sample(text, "predictions_total") == 9
+        assert _sample(text, "inference_queue_depth") == 7
@@ -0,0 +1,34 @@
+import os
+import sys
+
+import pytest
+
+# Add the service directory to Python path
+SERVICE_DIR = os.path.join(os.path.dirname(__file__), '..')
+sys.path.append(SERVICE_DIR)
+sys.path.append(os.path.join(SERVICE_DIR, '..'))
+
+mlflow = pytest.importorskip("mlflow")
+
+from app.model_loader import ModelManager
+
+
+class TestModelVersions:
+    """Test the concrete version reported behind "latest" """
+
+    def test_dummy_models_get_content_versions(self):
+        first, second = ModelManager(), ModelManager()
+        first._create_dummy_model()
+        second._create_dummy_model()
+
+        assert first.resolved_version("latest").startswith("dummy-")
+        assert first.resolved_version("latest") != second.resolved_version("latest")
+
+    def test_loading_a_version_makes_it_latest(self, monkeypatch):
+        manager = ModelManager()
+        model = object()
+        monkeypatch.setattr(mlflow.sklearn, "load_model", lambda uri: model)
+
+        assert manager.load_model("5")
+        assert manager.get_model("latest") is model
+        assert manager.resolved_version("latest") == "5"
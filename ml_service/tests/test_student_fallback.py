@@ -0,0 +1,144 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+
+# Add the service directory to Python path
+SERVICE_DIR = os.path.join(os.path.dirname(__file__), '..')
+sys.path.append(SERVICE_DIR)
+sys.path.append(os.path.join(SERVICE_DIR, '..'))
+
+from app.student_fallback import EngineeredFeatureModel, StudentFallback
+from investwise_common.features import BASE_FEATURES, engineer_features
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def fallback(clock, **kwargs):
+    return StudentFallback(threshold_ms=100.0, cooldown_seconds=30.0, alpha=1.0, clock=clock, **kwargs)
+
+
+class TestStudentFallback:
+    """Test switching between the primary and student models"""
+
+    def test_disabled_without_threshold(self):
+        switch = StudentFallback(clock=FakeClock())
+        switch.record(10_000.0)
+        assert not switch.use_student()
+
+    def test_switches_over_when_primary_is_slow(self):
+        switch = fallback(FakeClock())
+        switch.record(50.0)
+        assert not switch.use_student()
+
+        switch.record(150.0)
+        assert switch.under_pressure
+        assert switch.use_student()
+
+    def test_fast_student_does_not_switch_back(self):
+        switch = fallback(FakeClock())
+        switch.record(150.0)
+
+        for _ in range(10):
+            switch.record(5.0, primary=False)
+        assert switch.under_pressure
+        assert switch.primary_ewma_ms == 150.0
+
+    def test_primary_is_probed_once_per_cooldown(self):
+        clock = FakeClock()
+        switch = fallback(clock)
+        switch.record(150.0)
+
+        assert [switch.use_student() for _ in range(3)] == [True, True, True]
+        clock.now = 30.0
+        assert [switch.use_student() for _ in range(3)] == [False, True, True]
+        clock.now = 45.0
+        assert switch.use_student()
+
+    def test_hysteresis_between_threshold_and_half(self):
+        clock = FakeClock()
+        switch = fallback(clock)
+        switch.record(150.0)
+
+        # Below the threshold but above half of it: keep serving the student
+        switch.record(80.0)
+        assert switch.under_pressure
+
+        switch.record(40.0)
+        assert not switch.under_pressure
+        assert not switch.use_student()
+
+        switch.record(90.0)
+        assert not switch.under_pressure
+
+
+@pytest.fixture(scope="module")
+def distilled_student(tmp_path_factory):
+    """A student distilled by InvestWiseTrainer from a forest on engineered features"""
+    for module in ("mlflow", "lightgbm", "xgboost"):
+        pytest.importorskip(module)
+    sys.path.append(os.path.join(SERVICE_DIR, '..', 'ml', 'training'))
+    from train import InvestWiseTrainer
+
+    workdir = tmp_path_factory.mktemp("training")
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        trainer = InvestWiseTrainer(
+            mlflow_uri=f"file:{workdir}/mlruns", distill=True,
+            student_type="forest", distill_samples=500
+        )
+        rng = np.random.default_rng(0)
+        X = engineer_features(pd.DataFrame(
+            rng.normal([4.0, 7.0, 130.0, 9.0, -1000.0], [2.0, 2.0, 10.0, 1.5, 300.0], (200, 5)),
+            columns=BASE_FEATURES
+        ))
+        y = 0.5 * X["gdp_growth_rate"] - 0.1 * X["inflation_squared"]
+        teacher = RandomForestRegressor(n_estimators=10, random_state=42).fit(X[:150], y[:150])
+        student = trainer.distill_random_forest(teacher, X[:150], X[150:], y[150:])["model"]
+    finally:
+        os.chdir(cwd)
+    return teacher, student
+
+
+class TestDistilledStudentServing:
+    """Test the student is served from the base features requests carry"""
+
+    ROW = [1.0, 8.0, 130.0, 9.0, -1000.0]
+
+    def test_predicts_from_base_features(self, distilled_student):
+        teacher, student = distilled_student
+        served = EngineeredFeatureModel(student)
+
+        prediction = served.predict([self.ROW])
+        assert prediction.shape == (1,)
+        assert np.allclose(prediction, student.predict(engineer_features([self.ROW])))
+
+    def test_predict_endpoints_fall_back_to_the_student(self, distilled_student, monkeypatch):
+        from fastapi.testclient import TestClient
+        from app import main
+
+        student = EngineeredFeatureModel(distilled_student[1])
+        monkeypatch.setattr(main.model_manager, "student_model", student)
+        monkeypatch.setattr(main.model_manager, "latest_version", "7")
+        monkeypatch.setattr(main.model_manager.fallback, "use_student", lambda: True)
+        client = TestClient(main.app)
+        features = dict(zip(BASE_FEATURES, self.ROW))
+
+        response = client.post("/predict", json={"features": features})
+        assert response.status_code == 200
+        assert response.json()["model_version"] == "student"
+        assert response.headers["X-Model-Version"] == "student"
+
+        response = client.post("/predict/batch", json={"instances": [features, features]})
+        assert response.status_code == 200
+        assert response.headers["X-Model-Version"] == "student"
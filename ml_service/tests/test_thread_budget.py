@@ -0,0 +1,87 @@
+import importlib.util
+import os
+import sys
+
+import pytest
+
+# Add the service directory to Python path
+SERVICE_DIR = os.path.join(os.path.dirname(__file__), '..')
+sys.path.append(SERVICE_DIR)
+sys.path.append(os.path.join(SERVICE_DIR, '..'))
+
+from app import thread_budget
+from app.thread_budget import ThreadBudget, available_cpus
+from investwise_common import cpus
+
+TRAINING_THREAD_BUDGET = os.path.join(SERVICE_DIR, '..', 'ml', 'training', 'thread_budget.py')
+
+
+@pytest.fixture
+def cgroup(tmp_path, monkeypatch):
+    """Point the quota files at a temporary directory on a 16-CPU host"""
+    monkeypatch.setattr(cpus.os, "sched_getaffinity", lambda pid: set(range(16)), raising=False)
+    paths = {
+        "CGROUP_V2_CPU_MAX": tmp_path / "cpu.max",
+        "CGROUP_V1_CFS_QUOTA": tmp_path / "cpu.cfs_quota_us",
+        "CGROUP_V1_CFS_PERIOD": tmp_path / "cpu.cfs_period_us",
+    }
+    for name, path in paths.items():
+        monkeypatch.setattr(cpus, name, str(path))
+    return paths
+
+
+class TestAvailableCpus:
+    """Test CPU detection under container quotas"""
+
+    def test_no_quota_uses_affinity(self, cgroup):
+        assert available_cpus() == 16
+
+    def test_cgroup_v2_quota(self, cgroup):
+        cgroup["CGROUP_V2_CPU_MAX"].write_text("400000 100000\n")
+        assert available_cpus() == 4
+
+    def test_cgroup_v2_unlimited(self, cgroup):
+        cgroup["CGROUP_V2_CPU_MAX"].write_text("max 100000\n")
+        assert available_cpus() == 16
+
+    def test_cgroup_v1_quota(self, cgroup):
+        cgroup["CGROUP_V1_CFS_QUOTA"].write_text("250000\n")
+        cgroup["CGROUP_V1_CFS_PERIOD"].write_text("100000\n")
+        assert available_cpus() == 2
+
+    def test_cgroup_v1_unlimited(self, cgroup):
+        cgroup["CGROUP_V1_CFS_QUOTA"].write_text("-1\n")
+        cgroup["CGROUP_V1_CFS_PERIOD"].write_text("100000\n")
+        assert available_cpus() == 16
+
+    def test_fractional_quota_keeps_one_cpu(self, cgroup):
+        cgroup["CGROUP_V2_CPU_MAX"].write_text("50000 100000\n")
+        assert available_cpus() == 1
+
+
+class TestThreadBudget:
+    """Test splitting cores across workers"""
+
+    def test_worker_share(self):
+        budget = ThreadBudget(workers=4, cores=16, inference_threads=2)
+        assert budget.threads_per_worker == 4
+        assert budget.executor_threads == 2
+
+
+class TestTrainingBudget:
+    """Test the training pipeline and the service detect CPUs the same way"""
+
+    def test_shares_available_cpus(self, cgroup, monkeypatch):
+        monkeypatch.delenv("CPU_CORES", raising=False)
+        monkeypatch.delenv("TRAINING_N_JOBS", raising=False)
+        spec = importlib.util.spec_from_file_location("training_thread_budget", TRAINING_THREAD_BUDGET)
+        training = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(training)
+
+        assert training.available_cpus is thread_budget.available_cpus is cpus.available_cpus
+        assert training.THREAD_ENV_VARS is thread_budget.THREAD_ENV_VARS
+
+        cgroup["CGROUP_V2_CPU_MAX"].write_text("300000 100000\n")
+        assert training.training_thread_budget()["cores"] == 3
+        assert ThreadBudget(workers=1).cores == 3
+        assert training.training_thread_budget(n_jobs=3)["grid_search_jobs"] == 3
@@ -0,0 +1,145 @@
+"""
+Benchmark random forest serving throughput with and without a thread budget
+
+Simulates several uvicorn workers on one node, each predicting with the same
+forest the way the ML service does: `executor_threads` concurrent requests
+per worker, each prediction using `inference_threads` model and OpenMP/BLAS
+threads. The "unbudgeted" run mirrors the defaults (n_jobs=-1, uncapped
+OpenMP/BLAS, the 40-thread run_in_threadpool limiter); the others sweep the
+inference/executor split of each worker's cores // workers share, starting
+with the split ThreadBudget ships.
+
+Usage:
+    python scripts/benchmark_thread_budget.py --workers 4 --duration 10
+"""
+import argparse
+import multiprocessing as mp
+import os
+import sys
+import tempfile
+import threading
+import time
+
+THREAD_ENV_VARS = ["OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"]
+
+# anyio's default run_in_threadpool limit, which applies without a budget
+UNBUDGETED_EXECUTOR_THREADS = 40
+
+def train_model(model_path, n_estimators):
+    """Train a forest comparable to the grid-searched one and save it"""
+    import joblib
+    import numpy as np
+    from sklearn.ensemble import RandomForestRegressor
+
+    rng = np.random.default_rng(42)
+    X = rng.normal(size=(5000, 11))
+    y = X[:, 0] * 0.5 + X[:, 1] * 0.1 + rng.normal(0, 0.1, 5000)
+
+    model = RandomForestRegressor(n_estimators=n_estimators, random_state=42, n_jobs=-1)
+    model.fit(X, y)
+    joblib.dump(model, model_path)
+
+def worker(model_path, inference_threads, executor_threads, batch_size, duration, start_event, results):
+    """Predict from `executor_threads` threads for `duration` seconds and report rows predicted"""
+    if inference_threads:
+        for var in THREAD_ENV_VARS:
+            os.environ[var] = str(inference_threads)
+
+    # Import after the environment is set so native pools pick it up
+    import joblib
+    import numpy as np
+
+    model = joblib.load(model_path)
+    model.set_params(n_jobs=inference_threads or -1)
+    X = np.random.default_rng(os.getpid()).normal(size=(batch_size, 11))
+    counts = [0] * executor_threads
+
+    def serve(slot, deadline):
+        while time.perf_counter() < deadline:
+            model.predict(X)
+            counts[slot] += batch_size
+
+    start_event.wait()
+    deadline = time.perf_counter() + duration
+    threads = [threading.Thread(target=serve, args=(i, deadline)) for i in range(executor_threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    results.put(sum(counts))
+
+def run(model_path, workers, inference_threads, executor_threads, batch_size, duration):
+    """Run all workers concurrently and return total rows per second"""
+    ctx = mp.get_context("spawn")
+    start_event = ctx.Event()
+    results = ctx.Queue()
+
+    procs = [
+        ctx.Process(
+            target=worker,
+            args=(model_path, inference_threads, executor_threads, batch_size, duration, start_event, results)
+        )
+        for _ in range(workers)
+    ]
+    for p in procs:
+        p.start()
+
+    # Give workers time to load the model before starting the clock
+    time.sleep(3)
+    start_event.set()
+
+    total = sum(results.get() for _ in procs)
+    for p in procs:
+        p.join()
+
+    return total / duration
+
+def splits(threads_per_worker):
+    """Every (inference_threads, executor_threads) split of a worker's share"""
+    return [
+        (inference, threads_per_worker // inference)
+        for inference in range(1, threads_per_worker + 1)
+        if threads_per_worker % inference == 0
+    ]
+
+def main():
+    parser = argparse.ArgumentParser(description="Thread budget throughput benchmark")
+    parser.add_argument("--workers", type=int, default=4, help="Simulated uvicorn workers")
+    parser.add_argument("--cores", type=int, default=None, help="Cores on the node (default: detected)")
+    parser.add_argument("--batch-size", type=int, default=1, help="Rows per predict call (1 mirrors /predict)")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per run")
+    parser.add_argument("--trees", type=int, default=200, help="Forest size")
+    args = parser.parse_args()
+
+    root = os.path.join(os.path.dirname(__file__), "..")
+    sys.path.insert(0, os.path.join(root, "ml_service"))
+    sys.path.insert(0, root)
+    from app.thread_budget import ThreadBudget
+
+    # The configuration the service ships: INFERENCE_THREADS and
+    # EXECUTOR_THREADS unset, so single-threaded predictions and the
+    # worker's whole share spent on concurrent requests
+    budget = ThreadBudget(workers=args.workers, cores=args.cores)
+    shipped = (budget.inference_threads, budget.executor_threads)
+    configs = [shipped] + [split for split in splits(budget.threads_per_worker) if split != shipped]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        model_path = os.path.join(tmp, "forest.joblib")
+        print(f"Training {args.trees}-tree forest...")
+        train_model(model_path, args.trees)
+
+        print(f"Node cores: {budget.cores}, workers: {args.workers}, batch: {args.batch_size}")
+
+        unbudgeted = run(model_path, args.workers, None, UNBUDGETED_EXECUTOR_THREADS, args.batch_size, args.duration)
+        print(f"  unbudgeted (n_jobs=-1, uncapped OpenMP, {UNBUDGETED_EXECUTOR_THREADS} executor threads): "
+              f"{unbudgeted:12.0f} rows/s")
+
+        for inference_threads, executor_threads in configs:
+            rate = run(model_path, args.workers, inference_threads, executor_threads, args.batch_size, args.duration)
+            label = " (shipped)" if (inference_threads, executor_threads) == shipped else ""
+            print(f"  inference_threads={inference_threads} executor_threads={executor_threads}{label}: "
+                  f"{rate:12.0f} rows/s, {rate / max(unbudgeted, 1e-9):.2f}x")
+
+if __name__ == "__main__":
+    main()